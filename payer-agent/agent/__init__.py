@@ -15,7 +15,11 @@ from .mcp_client import (
     MCPToolDefinition,
     MCPDiscoveryResponse,
     MCPInvocationResponse,
+    MCPToolCall,
+    MCPBatchItem,
+    MCPBatchResult,
     get_mcp_client,
+    close_mcp_client,
     discover_mcp_tools,
     get_tool_info,
     list_available_tools,
@@ -46,7 +50,11 @@ __all__ = [
     "MCPToolDefinition",
     "MCPDiscoveryResponse",
     "MCPInvocationResponse",
+    "MCPToolCall",
+    "MCPBatchItem",
+    "MCPBatchResult",
     "get_mcp_client",
+    "close_mcp_client",
     "discover_mcp_tools",
     "get_tool_info",
     "list_available_tools",
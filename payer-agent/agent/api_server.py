@@ -5,6 +5,8 @@ Supports two modes:
 1. Local mode (default): Runs the agent locally using Strands SDK + Bedrock
 2. AgentCore mode: Invokes a deployed AgentCore Runtime
 
+Metrics for Prometheus are served on GET /metrics (see agent.prometheus).
+
 Usage:
     # Local mode (default)
     python -m agent.api_server
@@ -13,20 +15,53 @@ Usage:
     AGENT_RUNTIME_ARN=arn:aws:... python -m agent.api_server
 """
 
+import asyncio
 import json
+import math
 import os
 import uuid
+from contextlib import asynccontextmanager
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
+from .prometheus import (
+    OPENMETRICS_CONTENT_TYPE,
+    PROMETHEUS_CONTENT_TYPE,
+    EventLoopMonitor,
+    MetricFamily,
+    get_prometheus_registry,
+    http_pool_families,
+    rate_limiter_families,
+)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """Sample event loop lag while the server runs; close the MCP pool on shutdown."""
+    _ensure_imports()
+    monitor = None
+    if config.prometheus_enabled:
+        monitor = EventLoopMonitor(get_prometheus_registry())
+        monitor.start()
+    try:
+        yield
+    finally:
+        if monitor is not None:
+            await monitor.stop()
+        from .mcp_client import close_mcp_client
+
+        await close_mcp_client()
+
+
 app = FastAPI(
     title="x402 Payer Agent API",
     description="API for invoking the x402 payer agent",
     version="1.0.0",
+    lifespan=_lifespan,
 )
 
 # CORS configuration for web UI
@@ -46,6 +81,7 @@ app.add_middleware(
 # Lazy-loaded components
 _agent = None
 _runtime_client = None
+_session_limiter = None
 _imports_done = False
 
 
@@ -94,6 +130,69 @@ def _get_runtime_client():
     return _runtime_client
 
 
+def _check_session_rate_limit(session_id: Optional[str]) -> None:
+    """
+    Reject a request whose session is over the per-session rate limit.
+    
+    Only requests that name a session are limited; a generated session ID is
+    new on every request.
+    
+    Raises:
+        HTTPException: 429 with Retry-After if the session is rate limited
+    """
+    global _session_limiter
+    _ensure_imports()
+    if not session_id or config.session_rate_limit_rps <= 0:
+        return
+    if _session_limiter is None:
+        from .keyed_rate_limiter import KeyedRateLimiter
+        from .rate_limiter import RateLimitConfig
+        _session_limiter = KeyedRateLimiter(RateLimitConfig(
+            requests_per_second=config.session_rate_limit_rps,
+            burst_capacity=config.session_rate_limit_burst,
+        ))
+    key = f"session:{session_id}"
+    if not _session_limiter.try_acquire(key):
+        retry_after = _session_limiter.retry_after(key)
+        raise HTTPException(
+            429,
+            "Too many requests for this session",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def _collect_runtime_stats() -> list[MetricFamily]:
+    """Connection pool and rate limiter state, computed on every scrape."""
+    from .mcp_client import current_mcp_client
+    from .rate_limiter import get_rate_limiter_registry
+    
+    # A scrape reports the MCP client's pool but never creates the client
+    client = current_mcp_client()
+    families = http_pool_families(client.pool_stats()) if client is not None else []
+    registries = {"tools": get_rate_limiter_registry()}
+    if client is not None and client.rate_limiters is not registries["tools"]:
+        registries["mcp"] = client.rate_limiters
+    families.extend(rate_limiter_families(registries))
+    if _session_limiter is not None:
+        stats = _session_limiter.stats
+        sessions = MetricFamily(
+            "x402_payer_session_rate_limiter_requests",
+            "counter",
+            "Requests checked against the per-session limit",
+        )
+        sessions.add(stats.allowed_requests, {"result": "allowed"}, "_total")
+        sessions.add(stats.throttled_requests, {"result": "throttled"}, "_total")
+        tracked = MetricFamily(
+            "x402_payer_session_rate_limiter_sessions", "gauge", "Sessions with a bucket"
+        )
+        tracked.add(len(_session_limiter))
+        families.extend([sessions, tracked])
+    return families
+
+
+get_prometheus_registry().register_collector(_collect_runtime_stats)
+
+
 class InvokeRequest(BaseModel):
     prompt: Optional[str] = None
     message: Optional[str] = None  # Alternative field name for AgentCore
@@ -174,6 +273,8 @@ async def invocations(request: InvokeRequest):
         logger.error("No prompt or message provided")
         raise HTTPException(400, "Either 'prompt' or 'message' field is required")
     
+    _check_session_rate_limit(request.session_id)
+    
     try:
         if _use_local_mode():
             # Local mode: use Strands agent directly
@@ -220,6 +321,8 @@ async def invoke_agent(request: InvokeRequest):
     if not prompt_text:
         raise HTTPException(400, "Either 'prompt' or 'message' field is required")
     
+    _check_session_rate_limit(request.session_id)
+    
     try:
         if _use_local_mode():
             # Local mode: use Strands agent directly
@@ -255,6 +358,7 @@ async def invoke_agent_streaming(request: InvokeRequest):
     """Invoke the agent and stream the response (SSE)."""
     session_id = request.session_id or str(uuid.uuid4())
     prompt_text = request.text
+    _check_session_rate_limit(request.session_id)
     
     async def generate():
         try:
@@ -287,6 +391,28 @@ async def invoke_agent_streaming(request: InvokeRequest):
     )
 
 
+@app.get("/metrics")
+async def metrics(request: Request):
+    """
+    Prometheus scrape endpoint.
+    
+    Serves OpenMetrics when the Accept header asks for it. The body is
+    rendered on a worker thread so a scrape does not hold up the event loop.
+    """
+    _ensure_imports()
+    if not config.prometheus_enabled:
+        raise HTTPException(404, "Prometheus metrics are disabled")
+    # Creating the global emitter attaches the mirror feeding the registry
+    from .metrics import get_metrics_emitter
+    get_metrics_emitter()
+    openmetrics = "application/openmetrics-text" in request.headers.get("accept", "")
+    body = await asyncio.to_thread(get_prometheus_registry().render, openmetrics)
+    return Response(
+        body,
+        media_type=OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE,
+    )
+
+
 @app.get("/info")
 async def get_info():
     """Get agent configuration info."""
@@ -300,7 +426,6 @@ async def get_info():
 
 
 if __name__ == "__main__":
-    import asyncio
     import uvicorn
     
     port = int(os.getenv("API_PORT", "8080"))
@@ -0,0 +1,342 @@
+"""
+Cardinality limits for EMF metric dimensions.
+
+Every distinct dimension value is its own CloudWatch metric, so dimensions
+built from request data (content paths, tool names, error messages) can
+create an unbounded number of metrics. DimensionGovernor gives one dimension
+a budget of distinct values: a Space-Saving sketch tracks the most frequent
+values in a fixed amount of memory, the top `budget` of them are reported
+as themselves, and everything else is reported as "other".
+
+Error messages are first reduced to stable classes by error_class(), which
+drops the variable parts (URLs, addresses, ids, numbers) so that the same
+failure is always reported with the same ErrorType.
+
+Usage:
+    from agent.cardinality import CardinalityGovernor, error_class
+
+    governor = CardinalityGovernor({"ContentPath": 50})
+    dimensions = governor.apply({"Environment": "prod", "ContentPath": path})
+    error_type = error_class("Request failed: [Errno 111] Connection refused")
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Value reported for dimension values outside a budget
+OTHER = "other"
+
+# Budgets of the dimensions taken from request data; the rest are not limited
+DEFAULT_DIMENSION_BUDGETS = {
+    "ContentPath": 50,
+    "ErrorType": 20,
+    "ToolName": 50,
+    "RejectionReason": 20,
+}
+
+# CloudWatch dimension values are limited to 1024 characters; 50 keeps them readable
+MAX_ERROR_CLASS_LENGTH = 50
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch.
+
+    Counts at most `capacity` values. A value not being counted replaces the
+    one with the lowest count and inherits that count as its error, so a
+    value's count overestimates its true frequency by at most its error, and
+    every value more frequent than total / capacity is guaranteed to be
+    counted. Values are kept in buckets by count, which makes every offer
+    O(1).
+
+    Not thread-safe; DimensionGovernor guards its sketch with a lock.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            capacity: Number of values counted
+
+        Raises:
+            ValueError: If capacity is not positive
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        # Count -> values with that count, oldest first
+        self._buckets: dict[int, dict[str, None]] = {}
+        self._min = 0
+
+    def offer(self, value: str) -> int:
+        """
+        Count one occurrence of a value.
+
+        Returns:
+            The value's estimated count
+        """
+        self.total += 1
+        counts = self._counts
+        count = counts.get(value)
+        if count is not None:
+            bucket = self._buckets[count]
+            del bucket[value]
+            if not bucket:
+                del self._buckets[count]
+                if self._min == count:
+                    self._min = count + 1
+            count += 1
+        elif len(counts) < self.capacity:
+            count = 1
+            self._errors[value] = 0
+            self._min = 1
+        else:
+            bucket = self._buckets[self._min]
+            victim = next(iter(bucket))
+            del bucket[victim]
+            del counts[victim]
+            del self._errors[victim]
+            self._errors[value] = self._min
+            count = self._min + 1
+            if not bucket:
+                del self._buckets[self._min]
+                self._min = count
+        counts[value] = count
+        self._buckets.setdefault(count, {})[value] = None
+        return count
+
+    def count(self, value: str) -> int:
+        """Estimated count of a value; 0 if it is not counted."""
+        return self._counts.get(value, 0)
+
+    def error(self, value: str) -> int:
+        """Largest overestimate of a value's count."""
+        return self._errors.get(value, 0)
+
+    def top(self, k: int) -> list[tuple[str, int]]:
+        """
+        Get the most frequent values.
+
+        Args:
+            k: Number of values
+
+        Returns:
+            (value, estimated count) pairs, most frequent first
+        """
+        ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:k]
+
+
+_URL = re.compile(r"\b[a-z][a-z0-9+.-]*://\S+", re.IGNORECASE)
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_UUID = re.compile(
+    r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE
+)
+_HEX = re.compile(r"\b0x[0-9a-f]+\b", re.IGNORECASE)
+# Decimals and integers of four or more digits; short integers are usually
+# status codes or errno values, which are worth keeping
+_NUMBER = re.compile(r"\d+\.\d+|\d{4,}")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def error_class(message: Optional[str]) -> str:
+    """
+    Reduce an error message to a stable class for the ErrorType dimension.
+
+    Short codes such as "rate_limited" or "status_503" are returned as they
+    are. Otherwise only the part before the first ": " is kept, since callers
+    prefix the underlying exception text with what failed ("Request failed:
+    ..."), and URLs, quoted strings, UUIDs, hex values and long numbers are
+    replaced with placeholders.
+
+    Args:
+        message: Error message or code
+
+    Returns:
+        The error class, at most 50 characters; "unknown" for an empty message
+    """
+    if not message:
+        return "unknown"
+    text = _URL.sub("<url>", message)
+    prefix = text.split(": ", 1)[0]
+    if prefix.strip():
+        text = prefix
+    text = _QUOTED.sub("<str>", text)
+    text = _UUID.sub("<id>", text)
+    text = _HEX.sub("<hex>", text)
+    text = _NUMBER.sub("<n>", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text[:MAX_ERROR_CLASS_LENGTH] or "unknown"
+
+
+@dataclass
+class DimensionStats:
+    """Usage of one dimension's budget."""
+
+    name: str
+    budget: int
+    admitted: int
+    collapsed: int
+    top: list[tuple[str, int]]
+
+
+class DimensionGovernor:
+    """
+    Budget of distinct values for one dimension.
+
+    Until the budget is used up, every new value is admitted. After that,
+    values outside the admitted set are reported as "other", and every
+    rerank_every values the admitted set is replaced by the top `budget`
+    values of the sketch, so a value that becomes frequent later displaces
+    one that has gone quiet.
+
+    Thread-safe for use in multi-threaded applications.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budget: int,
+        capacity: Optional[int] = None,
+        rerank_every: int = 1000,
+    ):
+        """
+        Initialize the governor.
+
+        Args:
+            name: Dimension name, for logs and stats
+            budget: Distinct values reported as themselves; 0 reports every
+                value as "other"
+            capacity: Values counted by the sketch; 4 x budget if not provided
+            rerank_every: Values seen between two recomputations of the
+                admitted set
+
+        Raises:
+            ValueError: If budget is negative
+        """
+        if budget < 0:
+            raise ValueError(f"Budget of {name} must not be negative")
+        self.name = name
+        self.budget = budget
+        self.rerank_every = rerank_every
+        self._sketch = SpaceSaving(capacity or max(4 * budget, 1))
+        self._admitted: set[str] = set()
+        self._until_rerank = rerank_every
+        self._collapsed = 0
+        self._lock = threading.Lock()
+
+    def admit(self, value: str) -> str:
+        """
+        Count a value and get what to report for it.
+
+        Returns:
+            The value itself if it is within the budget, otherwise "other"
+        """
+        with self._lock:
+            self._sketch.offer(value)
+            self._until_rerank -= 1
+            if self._until_rerank <= 0:
+                self._rerank()
+            if value in self._admitted:
+                return value
+            if len(self._admitted) < self.budget:
+                self._admitted.add(value)
+                return value
+            if not self._collapsed:
+                logger.warning(
+                    "Metric dimension %s exceeded its budget of %d values; "
+                    "less frequent values are reported as %r",
+                    self.name,
+                    self.budget,
+                    OTHER,
+                )
+            self._collapsed += 1
+            return OTHER
+
+    def _rerank(self) -> None:
+        """Admit the most frequent values. Caller must hold the lock."""
+        self._until_rerank = self.rerank_every
+        self._admitted = {value for value, _ in self._sketch.top(self.budget)}
+
+    def stats(self, top: int = 10) -> DimensionStats:
+        """
+        Get the dimension's budget usage.
+
+        Args:
+            top: Number of most frequent values to include
+        """
+        with self._lock:
+            return DimensionStats(
+                name=self.name,
+                budget=self.budget,
+                admitted=len(self._admitted),
+                collapsed=self._collapsed,
+                top=self._sketch.top(top),
+            )
+
+
+class CardinalityGovernor:
+    """
+    Per-dimension budgets applied to a whole dimension set.
+
+    Thread-safe for use in multi-threaded applications.
+    """
+
+    def __init__(self, budgets: Optional[Mapping[str, int]] = None, rerank_every: int = 1000):
+        """
+        Initialize the governor.
+
+        Args:
+            budgets: Dimension name -> distinct values reported as themselves.
+                Dimensions without a budget are not limited. Uses
+                DEFAULT_DIMENSION_BUDGETS if not provided.
+            rerank_every: See DimensionGovernor
+        """
+        if budgets is None:
+            budgets = DEFAULT_DIMENSION_BUDGETS
+        self._governors = {
+            name: DimensionGovernor(name, budget, rerank_every=rerank_every)
+            for name, budget in budgets.items()
+        }
+
+    @classmethod
+    def from_agent_config(cls) -> "CardinalityGovernor":
+        """Build a governor from METRIC_DIMENSION_BUDGETS over the default budgets."""
+        from .config import config as agent_config
+
+        return cls({**DEFAULT_DIMENSION_BUDGETS, **dict(agent_config.metric_dimension_budgets)})
+
+    def apply(self, dimensions: dict[str, str]) -> dict[str, str]:
+        """
+        Replace values outside their dimension's budget with "other".
+
+        Args:
+            dimensions: Dimension name -> value
+
+        Returns:
+            The dimensions to report; the input itself if no value was replaced
+        """
+        result = dimensions
+        for name, value in dimensions.items():
+            governor = self._governors.get(name)
+            if governor is None:
+                continue
+            admitted = governor.admit(value)
+            if admitted is not value:
+                if result is dimensions:
+                    result = dict(dimensions)
+                result[name] = admitted
+        return result
+
+    def stats(self, top: int = 10) -> list[DimensionStats]:
+        """Budget usage of every governed dimension."""
+        return [governor.stats(top) for governor in self._governors.values()]
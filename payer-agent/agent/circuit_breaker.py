@@ -0,0 +1,333 @@
+"""
+Per-endpoint circuit breaker for seller endpoints.
+
+When a seller endpoint goes down, every agent turn would otherwise wait out
+the full request timeout against it. The breaker tracks outcomes over a
+sliding time window and, once the error rate or slow-call rate crosses a
+threshold, fails calls immediately for a cool-down period before letting a
+probe request through.
+
+States:
+- CLOSED: requests flow; outcomes are recorded in the window
+- OPEN: requests are rejected until ``open_seconds`` have passed
+- HALF_OPEN: a limited number of probe requests decide whether to close
+  (probes succeed) or re-open (any probe fails)
+
+Usage:
+    from agent.circuit_breaker import CircuitBreakerRegistry
+
+    breakers = CircuitBreakerRegistry()
+    breaker = breakers.get("/api/premium-article")
+
+    if not breaker.allow():
+        raise CircuitOpenError(breaker.name, breaker.retry_after())
+
+    start = time.monotonic()
+    try:
+        response = await send()
+    except httpx.TransportError:
+        breaker.record_failure(time.monotonic() - start)
+        raise
+    breaker.record(response.status_code >= 500, time.monotonic() - start)
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitBreakerConfig:
+    """Configuration for per-endpoint circuit breakers."""
+
+    # Disable to let every request through
+    enabled: bool = True
+
+    # Length of the sliding outcome window (seconds)
+    window_seconds: float = 60.0
+
+    # Calls needed in the window before the breaker can trip
+    min_requests: int = 10
+
+    # Fraction of failed calls that opens the circuit
+    failure_rate_threshold: float = 0.5
+
+    # Calls slower than this count as slow
+    slow_call_seconds: float = 10.0
+
+    # Fraction of slow calls that opens the circuit
+    slow_call_rate_threshold: float = 0.8
+
+    # How long the circuit stays open before probing (seconds)
+    open_seconds: float = 30.0
+
+    # Probe calls allowed (and needed to close) in the half-open state
+    half_open_max_calls: int = 1
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuit open for {name}; retry in {retry_after:.1f}s"
+        )
+
+
+# Called with (breaker name, old state, new state)
+StateChangeCallback = Callable[[str, CircuitState, CircuitState], None]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker driven by error rate and latency over a sliding window.
+
+    Thread-safe for use in multi-threaded applications.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: Optional[CircuitBreakerConfig] = None,
+        on_state_change: Optional[StateChangeCallback] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            name: Endpoint the breaker protects
+            config: Breaker configuration. Uses defaults if not provided.
+            on_state_change: Called after every state transition
+            clock: Monotonic time source
+        """
+        self.name = name
+        self.config = config or CircuitBreakerConfig()
+        self._on_state_change = on_state_change
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        # (timestamp, failed, slow) per call in the window
+        self._window: deque[tuple[float, bool, bool]] = deque()
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probe_successes = 0
+        self._probe_at = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state (an expired OPEN circuit reports HALF_OPEN)."""
+        with self._lock:
+            transition = self._maybe_half_open(self._clock())
+            state = self._state
+        self._notify(transition)
+        return state
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may proceed.
+
+        In the half-open state this reserves one of the probe slots.
+
+        Returns:
+            True if the call may be sent
+        """
+        if not self.config.enabled:
+            return True
+
+        with self._lock:
+            now = self._clock()
+            transition = self._maybe_half_open(now)
+            if self._state == CircuitState.CLOSED:
+                allowed = True
+            elif self._state == CircuitState.OPEN:
+                allowed = False
+            else:
+                # Free probe slots whose outcome never arrived
+                if now - self._probe_at >= self.config.open_seconds:
+                    self._probes_started = self._probe_successes
+                allowed = self._probes_started < self.config.half_open_max_calls
+                if allowed:
+                    self._probes_started += 1
+                    self._probe_at = now
+        self._notify(transition)
+        return allowed
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through."""
+        with self._lock:
+            if self._state != CircuitState.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.config.open_seconds - self._clock())
+
+    def record_success(self, latency_seconds: float = 0.0) -> None:
+        """Record a successful call."""
+        self.record(False, latency_seconds)
+
+    def record_failure(self, latency_seconds: float = 0.0) -> None:
+        """Record a failed call."""
+        self.record(True, latency_seconds)
+
+    def record(self, failed: bool, latency_seconds: float = 0.0) -> None:
+        """
+        Record the outcome of a call.
+
+        Args:
+            failed: Whether the call failed (transport error or 5xx)
+            latency_seconds: How long the call took
+        """
+        if not self.config.enabled:
+            return
+
+        slow = latency_seconds >= self.config.slow_call_seconds
+        with self._lock:
+            now = self._clock()
+            if self._state == CircuitState.HALF_OPEN:
+                transition = self._record_probe(failed or slow, now)
+            elif self._state == CircuitState.CLOSED:
+                transition = self._record_closed(failed, slow, now)
+            else:
+                transition = None
+        self._notify(transition)
+
+    def reset(self) -> None:
+        """Close the circuit and forget recorded outcomes."""
+        with self._lock:
+            transition = self._transition(CircuitState.CLOSED, self._clock())
+        self._notify(transition)
+
+    def _record_closed(
+        self, failed: bool, slow: bool, now: float
+    ) -> Optional[tuple[CircuitState, CircuitState]]:
+        """Add an outcome to the window and trip if a threshold is crossed."""
+        self._window.append((now, failed, slow))
+        self._failures += failed
+        self._slow += slow
+
+        cutoff = now - self.config.window_seconds
+        while self._window and self._window[0][0] < cutoff:
+            _, old_failed, old_slow = self._window.popleft()
+            self._failures -= old_failed
+            self._slow -= old_slow
+
+        total = len(self._window)
+        if total < self.config.min_requests:
+            return None
+        if (
+            self._failures / total >= self.config.failure_rate_threshold
+            or self._slow / total >= self.config.slow_call_rate_threshold
+        ):
+            return self._transition(CircuitState.OPEN, now)
+        return None
+
+    def _record_probe(
+        self, failed: bool, now: float
+    ) -> Optional[tuple[CircuitState, CircuitState]]:
+        """Close after enough successful probes; re-open on any failure."""
+        if failed:
+            return self._transition(CircuitState.OPEN, now)
+        self._probe_successes += 1
+        if self._probe_successes >= self.config.half_open_max_calls:
+            return self._transition(CircuitState.CLOSED, now)
+        return None
+
+    def _maybe_half_open(self, now: float) -> Optional[tuple[CircuitState, CircuitState]]:
+        """Move an expired OPEN circuit to HALF_OPEN."""
+        if (
+            self._state == CircuitState.OPEN
+            and now - self._opened_at >= self.config.open_seconds
+        ):
+            return self._transition(CircuitState.HALF_OPEN, now)
+        return None
+
+    def _transition(
+        self, new_state: CircuitState, now: float
+    ) -> Optional[tuple[CircuitState, CircuitState]]:
+        """Change state and reset the bookkeeping for it (caller holds the lock)."""
+        old_state = self._state
+        self._state = new_state
+        self._probes_started = 0
+        self._probe_successes = 0
+        if new_state == CircuitState.OPEN:
+            self._opened_at = now
+        if new_state == CircuitState.CLOSED:
+            self._window.clear()
+            self._failures = 0
+            self._slow = 0
+        if old_state == new_state:
+            return None
+        return old_state, new_state
+
+    def _notify(self, transition: Optional[tuple[CircuitState, CircuitState]]) -> None:
+        """Log and report a state transition outside the lock."""
+        if transition is None:
+            return
+        old_state, new_state = transition
+        logger.warning(f"Circuit for {self.name}: {old_state.value} -> {new_state.value}")
+        if self._on_state_change:
+            try:
+                self._on_state_change(self.name, old_state, new_state)
+            except Exception as e:
+                logger.warning(f"Circuit state callback failed: {e}")
+
+
+class CircuitBreakerRegistry:
+    """
+    Lazily created circuit breakers, one per endpoint.
+
+    Thread-safe for use in multi-threaded applications.
+    """
+
+    def __init__(
+        self,
+        config: Optional[CircuitBreakerConfig] = None,
+        on_state_change: Optional[StateChangeCallback] = None,
+    ):
+        """
+        Initialize the registry.
+
+        Args:
+            config: Configuration shared by every breaker
+            on_state_change: Called after any breaker changes state
+        """
+        self.config = config or CircuitBreakerConfig()
+        self._on_state_change = on_state_change
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Get the breaker for an endpoint, creating it on first use."""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = CircuitBreaker(name, self.config, self._on_state_change)
+                    self._breakers[name] = breaker
+        return breaker
+
+    def states(self) -> dict[str, CircuitState]:
+        """Current state of every known breaker."""
+        return {name: breaker.state for name, breaker in list(self._breakers.items())}
+
+    def reset(self) -> None:
+        """Close every breaker."""
+        for breaker in list(self._breakers.values()):
+            breaker.reset()
@@ -31,6 +31,50 @@ class AgentConfig:
     # Seller API configuration
     seller_api_url: str = ""
     
+    # Directory for the persisted MCP discovery snapshot (empty disables it)
+    mcp_snapshot_dir: str = ""
+    
+    # Optimistic pre-payment: services paid on the first request, and the price cap
+    prepay_services: tuple[str, ...] = ()
+    prepay_max_price_units: int = 10000
+    
+    # How long decoded 402 payment requirements are reused per endpoint (0 disables)
+    payment_quote_ttl_seconds: int = 300
+    
+    # Client-side rate limit for outbound HTTP calls, per host (0 rps disables)
+    rate_limit_requests_per_second: float = 10.0
+    rate_limit_burst: int = 20
+    rate_limit_per_tool: bool = False
+    rate_limit_max_wait_seconds: float = 30.0
+    # Adaptive (AIMD) mode: the rate follows 429/503 and Retry-After within these bounds
+    rate_limit_adaptive: bool = False
+    rate_limit_min_rps: float = 1.0
+    rate_limit_max_rps: float = 50.0
+    # How often each bucket's wait time percentiles and queue depth are exported (0 disables)
+    rate_limit_report_interval_seconds: float = 60.0
+    # Redis-protocol server holding buckets shared by all replicas (empty keeps them local)
+    rate_limit_redis_url: str = ""
+    
+    # Per-session limit on agent invocations through the API server (0 rps disables)
+    session_rate_limit_rps: float = 0.0
+    session_rate_limit_burst: int = 5
+    
+    # EMF metrics: with a flush interval above 0, samples are buffered and written
+    # from a background thread as value arrays; 0 writes one line per call
+    metrics_flush_interval_seconds: float = 0.0
+    metrics_max_buffered_samples: int = 1000
+    # JSON encoder for EMF properties and value arrays: auto (orjson if installed), json, orjson
+    metrics_json_backend: str = "auto"
+    # Latency sketches per operation: how often percentiles are exported (0 disables)
+    # and the relative error of every percentile
+    latency_export_interval_seconds: float = 60.0
+    latency_relative_accuracy: float = 0.01
+    # Serve every metric in Prometheus/OpenMetrics format on the API server's /metrics
+    prometheus_enabled: bool = True
+    # Distinct values per EMF dimension, overriding the defaults of
+    # agent.cardinality (ContentPath=50, ErrorType=20, ToolName=50, RejectionReason=20)
+    metric_dimension_budgets: tuple[tuple[str, int], ...] = ()
+    
     # OpenTelemetry configuration
     otel_endpoint: str = ""
     otel_console_export: bool = False
@@ -48,6 +92,68 @@ class AgentConfig:
             cdp_wallet_address=os.getenv("CDP_WALLET_ADDRESS", ""),
             network_id=os.getenv("NETWORK_ID", cls.network_id),
             seller_api_url=os.getenv("SELLER_API_URL", ""),
+            mcp_snapshot_dir=os.getenv("MCP_SNAPSHOT_DIR", ""),
+            prepay_services=tuple(
+                name.strip()
+                for name in os.getenv("PREPAY_SERVICES", "").split(",")
+                if name.strip()
+            ),
+            prepay_max_price_units=int(
+                os.getenv("PREPAY_MAX_PRICE_UNITS", str(cls.prepay_max_price_units))
+            ),
+            payment_quote_ttl_seconds=int(
+                os.getenv("PAYMENT_QUOTE_TTL_SECONDS", str(cls.payment_quote_ttl_seconds))
+            ),
+            rate_limit_requests_per_second=float(
+                os.getenv("RATE_LIMIT_RPS", str(cls.rate_limit_requests_per_second))
+            ),
+            rate_limit_burst=int(os.getenv("RATE_LIMIT_BURST", str(cls.rate_limit_burst))),
+            rate_limit_per_tool=os.getenv("RATE_LIMIT_PER_TOOL", "").lower() == "true",
+            rate_limit_max_wait_seconds=float(
+                os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", str(cls.rate_limit_max_wait_seconds))
+            ),
+            rate_limit_adaptive=os.getenv("RATE_LIMIT_ADAPTIVE", "").lower() == "true",
+            rate_limit_min_rps=float(os.getenv("RATE_LIMIT_MIN_RPS", str(cls.rate_limit_min_rps))),
+            rate_limit_max_rps=float(os.getenv("RATE_LIMIT_MAX_RPS", str(cls.rate_limit_max_rps))),
+            rate_limit_report_interval_seconds=float(
+                os.getenv(
+                    "RATE_LIMIT_REPORT_INTERVAL_SECONDS",
+                    str(cls.rate_limit_report_interval_seconds),
+                )
+            ),
+            rate_limit_redis_url=os.getenv("RATE_LIMIT_REDIS_URL", ""),
+            session_rate_limit_rps=float(
+                os.getenv("SESSION_RATE_LIMIT_RPS", str(cls.session_rate_limit_rps))
+            ),
+            session_rate_limit_burst=int(
+                os.getenv("SESSION_RATE_LIMIT_BURST", str(cls.session_rate_limit_burst))
+            ),
+            metrics_flush_interval_seconds=float(
+                os.getenv(
+                    "METRICS_FLUSH_INTERVAL_SECONDS", str(cls.metrics_flush_interval_seconds)
+                )
+            ),
+            metrics_max_buffered_samples=int(
+                os.getenv("METRICS_MAX_BUFFERED_SAMPLES", str(cls.metrics_max_buffered_samples))
+            ),
+            metrics_json_backend=os.getenv("METRICS_JSON_BACKEND", cls.metrics_json_backend),
+            latency_export_interval_seconds=float(
+                os.getenv(
+                    "LATENCY_EXPORT_INTERVAL_SECONDS", str(cls.latency_export_interval_seconds)
+                )
+            ),
+            latency_relative_accuracy=float(
+                os.getenv("LATENCY_RELATIVE_ACCURACY", str(cls.latency_relative_accuracy))
+            ),
+            prometheus_enabled=os.getenv("PROMETHEUS_ENABLED", "true").lower() == "true",
+            metric_dimension_budgets=tuple(
+                (name.strip(), int(budget))
+                for name, _, budget in (
+                    entry.partition("=")
+                    for entry in os.getenv("METRIC_DIMENSION_BUDGETS", "").split(",")
+                    if entry.strip()
+                )
+            ),
             otel_endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", ""),
             otel_console_export=os.getenv("OTEL_CONSOLE_EXPORT", "").lower() == "true",
         )
@@ -0,0 +1,504 @@
+"""
+Distributed rate limiting across runtime replicas.
+
+Every AgentCore container has its own in-process token buckets, so the rate
+the Gateway actually sees is the configured rate times the number of
+replicas. DistributedRateLimiter keeps the bucket in a shared key-value store
+instead and is a drop-in replacement for RateLimiter:
+
+- The bucket update (refill, take, persist) runs as one Lua script on the
+  store, so concurrent replicas never lose or double-spend tokens
+- Tokens are leased from the store in small batches and spent locally, so
+  most calls never leave the process. A lease expires after
+  ``batch_ttl_seconds`` so tokens held by an idle replica do not pile up
+  into a burst later.
+- While the shared bucket is empty, the wait it reported is cached locally
+  and callers are not sent back to the store before it has passed
+- If the store is unreachable, the limiter falls back to a local bucket for
+  ``fallback_seconds`` before trying the store again, so an outage of the
+  store degrades to per-replica limits instead of failing requests
+
+Any client that speaks the Redis protocol and has ``register_script`` (for
+example redis-py or valkey-py) can back RedisTokenBucketStore. The client
+library is an optional dependency (``pip install .[distributed]``) and is
+only imported by ``RedisTokenBucketStore.from_url``.
+
+Usage:
+    from agent.distributed_rate_limiter import (
+        DistributedRateLimiter,
+        RedisTokenBucketStore,
+    )
+    from agent.rate_limiter import RateLimitConfig
+
+    store = RedisTokenBucketStore.from_url("redis://rate-limits:6379/0")
+    limiter = DistributedRateLimiter(
+        store,
+        "gateway.example.com",
+        RateLimitConfig(requests_per_second=10, burst_capacity=20),
+    )
+    wait_time = limiter.acquire()
+
+    # Or for every host at once, via RATE_LIMIT_REDIS_URL
+    registry = RateLimiterRegistry(config, store=store)
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Protocol
+
+from .rate_limiter import RateLimitConfig, RateLimiter, RateLimitExceeded, RateLimitStats
+
+logger = logging.getLogger(__name__)
+
+
+# Atomic token bucket update, run by the store. The bucket is a hash with the
+# token count and the time it was last refilled, taken from the server clock
+# so replicas with skewed clocks agree. Up to ARGV[3] whole tokens are taken;
+# when none are available the reply carries the wait for the next one. Idle
+# buckets expire once they would have refilled anyway.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1])
+local updated = tonumber(state[2])
+if tokens == nil or updated == nil then
+  tokens = burst
+  updated = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+local wait_ms = 0
+if granted == 0 then
+  wait_ms = math.ceil((1 - tokens) / rate * 1000)
+end
+return {granted, wait_ms}
+"""
+
+
+class TokenBucketStore(Protocol):
+    """Shared storage for token buckets."""
+
+    def take(self, key: str, requested: int, rate: float, burst: int) -> tuple[int, float]:
+        """
+        Atomically refill a bucket and take up to ``requested`` tokens from it.
+
+        Args:
+            key: Bucket key
+            requested: Most tokens to take
+            rate: Refill rate in tokens per second
+            burst: Bucket capacity
+
+        Returns:
+            Tokens taken and, if none were, seconds until the next one
+        """
+        ...
+
+
+class InMemoryTokenBucketStore:
+    """
+    Process-local TokenBucketStore with the same semantics as the Lua script.
+
+    Lets several limiters in one process share buckets, which is how tests and
+    single-replica deployments stand in for a shared store.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the store.
+
+        Args:
+            clock: Time source (injectable for tests)
+        """
+        self._clock = clock
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, requested: int, rate: float, burst: int) -> tuple[int, float]:
+        """Atomically refill a bucket and take up to ``requested`` tokens from it."""
+        with self._lock:
+            now = self._clock()
+            tokens, updated = self._buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + max(0.0, now - updated) * rate)
+            granted = min(requested, math.floor(tokens))
+            tokens -= granted
+            self._buckets[key] = (tokens, now)
+        wait_time = 0.0 if granted else (1 - tokens) / rate
+        return granted, wait_time
+
+    def reset(self) -> None:
+        """Drop every bucket."""
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisTokenBucketStore:
+    """TokenBucketStore backed by a Redis-protocol server."""
+
+    def __init__(self, client: Any, key_prefix: str = "x402:ratelimit:"):
+        """
+        Initialize the store.
+
+        Args:
+            client: Redis client with ``register_script`` (redis-py, valkey-py).
+                The script is sent with EVALSHA and reloaded automatically if
+                the server has flushed its script cache.
+            key_prefix: Prefix for bucket keys on the server
+        """
+        self.key_prefix = key_prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    @classmethod
+    def from_url(
+        cls, url: str, timeout_seconds: float = 0.5, **kwargs: Any
+    ) -> "RedisTokenBucketStore":
+        """
+        Connect to a Redis server by URL.
+
+        Args:
+            url: Server URL, e.g. ``redis://host:6379/0`` or ``rediss://...``
+            timeout_seconds: Connect and socket timeout; kept short so a slow
+                store triggers the local fallback instead of stalling calls
+            **kwargs: Passed to RedisTokenBucketStore
+
+        Raises:
+            ImportError: If the redis package is not installed
+        """
+        import redis
+
+        client = redis.Redis.from_url(
+            url,
+            socket_timeout=timeout_seconds,
+            socket_connect_timeout=timeout_seconds,
+        )
+        return cls(client, **kwargs)
+
+    def take(self, key: str, requested: int, rate: float, burst: int) -> tuple[int, float]:
+        """Atomically refill a bucket and take up to ``requested`` tokens from it."""
+        granted, wait_ms = self._script(
+            keys=[self.key_prefix + key],
+            args=[rate, burst, requested],
+        )
+        return int(granted), int(wait_ms) / 1000
+
+
+@dataclass
+class DistributedRateLimitStats(RateLimitStats):
+    """Statistics for a distributed rate limiter."""
+
+    store_calls: int = 0
+    store_errors: int = 0
+    fallback_requests: int = 0
+
+    @property
+    def local_hit_rate(self) -> float:
+        """Percentage of requests answered without a store round trip."""
+        if self.total_requests == 0:
+            return 0.0
+        return (1 - self.store_calls / self.total_requests) * 100
+
+
+def default_batch_size(config: RateLimitConfig) -> int:
+    """Tokens leased per store call: about 100ms of traffic, at most a tenth of the burst."""
+    return max(1, min(math.ceil(config.requests_per_second / 10), config.burst_capacity // 10))
+
+
+class DistributedRateLimiter:
+    """
+    Token bucket shared by every replica through a TokenBucketStore.
+
+    Has the RateLimiter interface, so the registry and tools use it unchanged.
+    Each replica may hold up to ``batch_size`` unspent tokens, which bounds
+    how far the combined rate can overshoot. Waiters poll the store at the
+    wait it reports, so unlike AsyncRateLimiter they are not served FIFO.
+
+    Thread-safe for use in multi-threaded applications.
+    """
+
+    def __init__(
+        self,
+        store: TokenBucketStore,
+        key: str,
+        config: Optional[RateLimitConfig] = None,
+        batch_size: Optional[int] = None,
+        batch_ttl_seconds: float = 1.0,
+        fallback_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            store: Shared bucket storage
+            key: Bucket key in the store
+            config: Rate limit configuration. Uses defaults if not provided.
+                Adaptive mode is not shared across replicas and is ignored.
+            batch_size: Tokens leased per store call. Uses default_batch_size
+                if not provided.
+            batch_ttl_seconds: Unspent leased tokens are dropped after this long
+            fallback_seconds: How long to use a local bucket after a store error
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.config = config or RateLimitConfig()
+        self.key = key
+        self.batch_size = batch_size or default_batch_size(self.config)
+        self.batch_ttl_seconds = batch_ttl_seconds
+        self.fallback_seconds = fallback_seconds
+        self._store = store
+        self._clock = clock
+        # Guards local state only; never held across a store call
+        self._lock = threading.Lock()
+        # Serializes store calls
+        self._store_lock = threading.Lock()
+        self._stats = DistributedRateLimitStats()
+        self._local_tokens = 0
+        self._lease_expires = 0.0
+        self._blocked_until = 0.0
+        self._fallback_until = 0.0
+        self._waiting = 0
+        self._fallback = RateLimiter(RateLimitConfig(
+            requests_per_second=self.config.requests_per_second,
+            burst_capacity=self.config.burst_capacity,
+            enable_logging=False,
+        ))
+
+    @property
+    def stats(self) -> DistributedRateLimitStats:
+        """Get current rate limiting statistics."""
+        return self._stats
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of callers in this replica waiting for a shared token."""
+        return self._waiting
+
+    @property
+    def available_tokens(self) -> float:
+        """Leased tokens this replica can spend without a store call."""
+        with self._lock:
+            return float(self._local_tokens) if self._clock() < self._lease_expires else 0.0
+
+    @property
+    def effective_rate(self) -> float:
+        """Refill rate of the shared bucket in requests per second."""
+        return self.config.requests_per_second
+
+    def record_response(self, status_code: int, retry_after: Optional[float] = None) -> float:
+        """
+        Honour a Retry-After by pausing this replica until it has passed.
+
+        Leased tokens are dropped. The shared rate is not adapted.
+
+        Args:
+            status_code: HTTP status of the response
+            retry_after: Parsed Retry-After delay in seconds, if any
+
+        Returns:
+            The effective rate
+        """
+        if retry_after:
+            with self._lock:
+                self._local_tokens = 0
+                self._blocked_until = max(self._blocked_until, self._clock() + retry_after)
+        return self.config.requests_per_second
+
+    def _take_local(self) -> Optional[float]:
+        """
+        Take one token without a store call, returning 0 on success or the
+        time to wait for one; None if the store has to be asked.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._local_tokens > 0 and now < self._lease_expires:
+                self._local_tokens -= 1
+                return 0.0
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if now < self._fallback_until:
+                self._stats.fallback_requests += 1
+                if self._fallback.try_acquire():
+                    return 0.0
+                return 1 / self.config.requests_per_second
+            return None
+
+    def _take(self) -> float:
+        """
+        Take one token, returning 0 on success or the time to wait for one.
+
+        The store is called outside the state lock, so a slow round trip
+        only holds up callers that need a new lease; one caller at a time
+        goes to the store and the others use the lease it brings back.
+        """
+        wait_time = self._take_local()
+        if wait_time is not None:
+            return wait_time
+
+        with self._store_lock:
+            # Another caller may have leased tokens while this one waited
+            wait_time = self._take_local()
+            if wait_time is not None:
+                return wait_time
+            with self._lock:
+                self._stats.store_calls += 1
+            try:
+                granted, wait_time = self._store.take(
+                    self.key,
+                    self.batch_size,
+                    self.config.requests_per_second,
+                    self.config.burst_capacity,
+                )
+            except Exception as e:
+                with self._lock:
+                    self._stats.store_errors += 1
+                    self._fallback_until = self._clock() + self.fallback_seconds
+                    self._fallback.reset()
+                    self._fallback.try_acquire()
+                logger.warning(
+                    "Rate limit store unavailable for %s, using a local bucket for %.0fs: %s",
+                    self.key, self.fallback_seconds, e,
+                )
+                return 0.0
+
+            with self._lock:
+                now = self._clock()
+                if granted:
+                    self._local_tokens = granted - 1
+                    self._lease_expires = now + self.batch_ttl_seconds
+                    return 0.0
+                self._blocked_until = now + wait_time
+                return wait_time
+
+    async def _take_async(self) -> float:
+        """_take that only goes to a worker thread when the store is called."""
+        wait_time = self._take_local()
+        if wait_time is None:
+            wait_time = await asyncio.to_thread(self._take)
+        return wait_time
+
+    def _admit(self, wait_time: float, blocking: bool = False) -> None:
+        """Update stats for an admitted request."""
+        with self._lock:
+            self._stats.total_requests += 1
+            self._stats.allowed_requests += 1
+            self._stats.total_wait_time += wait_time
+            self._stats.last_request_time = time.time()
+            if blocking:
+                self._stats.wait_histogram.record(wait_time)
+
+    def _throttle(self) -> None:
+        """Update stats for a rejected request."""
+        with self._lock:
+            self._stats.total_requests += 1
+            self._stats.throttled_requests += 1
+            self._stats.last_request_time = time.time()
+
+    def _set_waiting(self, delta: int) -> None:
+        with self._lock:
+            self._waiting += delta
+
+    def try_acquire(self) -> bool:
+        """
+        Try to acquire a token without blocking.
+
+        Returns:
+            True if token was acquired, False if rate limited.
+        """
+        if self._take() == 0:
+            self._admit(0.0)
+            return True
+        self._throttle()
+        return False
+
+    def _next_wait(self, start: float, timeout: Optional[float], wait_time: float) -> float:
+        """Admit a taken token or return how long to sleep before retrying."""
+        timeout = timeout if timeout is not None else self.config.max_wait_time
+        if wait_time == 0:
+            self._admit(self._clock() - start, blocking=True)
+            return 0.0
+        if not self.config.block_on_limit or self._clock() - start + wait_time > timeout:
+            self._throttle()
+            if self.config.enable_logging:
+                logger.warning("Shared rate limit for %s exceeded", self.key)
+            raise RateLimitExceeded(wait_time)
+        return wait_time
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Acquire a token, blocking until one is available.
+
+        Args:
+            timeout: Maximum time to wait. Uses config.max_wait_time if not provided.
+
+        Returns:
+            Time spent waiting (0 if no wait was needed)
+
+        Raises:
+            RateLimitExceeded: If blocking is disabled or the wait exceeds the timeout
+        """
+        start = self._clock()
+        waiting = False
+        try:
+            while True:
+                wait_time = self._next_wait(start, timeout, self._take())
+                if wait_time == 0:
+                    return self._clock() - start
+                if not waiting:
+                    waiting = True
+                    self._set_waiting(1)
+                time.sleep(wait_time)
+        finally:
+            if waiting:
+                self._set_waiting(-1)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> float:
+        """
+        Async version of acquire.
+
+        Leased tokens are spent inline; only store calls run in a worker
+        thread, so a slow store never blocks the event loop.
+
+        Raises:
+            RateLimitExceeded: If blocking is disabled or the wait exceeds the timeout
+        """
+        start = self._clock()
+        waiting = False
+        try:
+            while True:
+                wait_time = await self._take_async()
+                wait_time = self._next_wait(start, timeout, wait_time)
+                if wait_time == 0:
+                    return self._clock() - start
+                if not waiting:
+                    waiting = True
+                    self._set_waiting(1)
+                await asyncio.sleep(wait_time)
+        finally:
+            if waiting:
+                self._set_waiting(-1)
+
+    async def try_acquire_async(self) -> bool:
+        """Async version of try_acquire."""
+        if await self._take_async() == 0:
+            self._admit(0.0)
+            return True
+        self._throttle()
+        return False
+
+    def reset(self) -> None:
+        """Drop leased tokens and local state. The shared bucket is untouched."""
+        with self._lock:
+            self._local_tokens = 0
+            self._lease_expires = 0.0
+            self._blocked_until = 0.0
+            self._fallback_until = 0.0
+            self._stats = DistributedRateLimitStats()
@@ -0,0 +1,237 @@
+"""
+Template-based encoder for CloudWatch Embedded Metric Format (EMF) log lines.
+
+Building an EMF document as a dict and running json.dumps on it re-encodes
+the ``_aws`` metadata block (namespace, dimension key list, metric names and
+units) on every call, although only the timestamp and the values change.
+EMFEncoder compiles one template per metric set and dimension key set: the
+constant JSON is serialized once and every call only splices in the
+timestamp, dimension values, metric values and properties.
+
+Scalars (numbers and strings) are encoded inline. Properties and value arrays
+go through a JSON backend: orjson when it is installed (``pip install
+.[fast-json]``), otherwise the standard library.
+
+Usage:
+    from agent.emf_encoder import EMFEncoder
+
+    encoder = EMFEncoder("X402PayerAgent", "x402-payer-agent")
+    line = encoder.encode(
+        {"MCPInvocationLatency": (120.0, MetricUnit.MILLISECONDS)},
+        {"Environment": "production"},
+        {"toolName": "get_weather"},
+    )
+"""
+
+import json
+import time
+from json.encoder import encode_basestring_ascii
+from math import isfinite
+from types import ModuleType
+from typing import Any, Callable, Optional
+
+orjson: Optional[ModuleType]
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder is used instead
+    orjson = None
+
+# Most templates kept before the cache is cleared; metric and dimension sets
+# are fixed by the record_* helpers, so this is only a guard against misuse
+MAX_TEMPLATES = 1024
+
+JSON_BACKENDS = ("auto", "json", "orjson")
+
+
+def _json_dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def resolve_json_backend(name: str = "auto") -> Callable[[Any], str]:
+    """
+    Get the dumps function for a JSON backend.
+
+    Args:
+        name: "orjson", "json", or "auto" for orjson when it is installed
+
+    Returns:
+        Function encoding a value to a compact JSON string
+
+    Raises:
+        ValueError: If the backend is unknown, or orjson is requested but not installed
+    """
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend {name!r}; expected one of {JSON_BACKENDS}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("The orjson backend was requested but orjson is not installed")
+    if name == "json" or orjson is None:
+        return _json_dumps
+    orjson_dumps: Callable[[Any], bytes] = orjson.dumps
+
+    def dumps(value: Any) -> str:
+        return orjson_dumps(value).decode()
+
+    return dumps
+
+
+class _Template:
+    """Pre-serialized fragments of one metric set and dimension key set."""
+
+    __slots__ = ("units", "head", "dimension_keys", "metric_keys", "reserved")
+
+    def __init__(
+        self,
+        namespace: str,
+        service_name: str,
+        names: tuple[str, ...],
+        units: list[Any],
+        dimension_keys: tuple[str, ...],
+    ):
+        self.units = units
+        metadata = _json_dumps({
+            "Namespace": namespace,
+            "Dimensions": [list(dimension_keys)],
+            "Metrics": [
+                {"Name": name, "Unit": getattr(unit, "value", unit)}
+                for name, unit in zip(names, units)
+            ],
+        })
+        # Everything after the timestamp up to the first dimension value
+        self.head = (
+            ',"CloudWatchMetrics":[' + metadata + ']},"service":'
+            + encode_basestring_ascii(service_name)
+        )
+        self.dimension_keys = tuple(f",{encode_basestring_ascii(key)}:" for key in dimension_keys)
+        self.metric_keys = tuple(f",{encode_basestring_ascii(name)}:" for name in names)
+        # Properties with these keys would override a member of the template
+        self.reserved = frozenset(("_aws", "service", *dimension_keys, *names))
+
+
+class EMFEncoder:
+    """
+    Encodes EMF log lines from cached templates.
+
+    Thread-safe: templates are immutable and the cache is only ever added to
+    or replaced whole.
+    """
+
+    def __init__(self, namespace: str, service_name: str, json_backend: str = "auto"):
+        """
+        Initialize the encoder.
+
+        Args:
+            namespace: CloudWatch metric namespace
+            service_name: Value of the ``service`` member of every line
+            json_backend: "auto", "json" or "orjson" (see resolve_json_backend)
+        """
+        self.namespace = namespace
+        self.service_name = service_name
+        self._dumps = resolve_json_backend(json_backend)
+        self._templates: dict[tuple[tuple[str, ...], tuple[str, ...]], _Template] = {}
+
+    def _template(
+        self,
+        metrics: dict[str, tuple[Any, Any]],
+        dimensions: dict[str, str],
+    ) -> _Template:
+        # Keyed by names only, which hash fast; units are enum members, so
+        # checking them is an identity comparison per metric
+        key = (tuple(metrics), tuple(dimensions))
+        units = [value_unit[1] for value_unit in metrics.values()]
+        template = self._templates.get(key)
+        if template is None or template.units != units:
+            if len(self._templates) >= MAX_TEMPLATES:
+                self._templates = {}
+            template = _Template(self.namespace, self.service_name, key[0], units, key[1])
+            self._templates[key] = template
+        return template
+
+    def _value(self, value: Any) -> str:
+        """Encode one value, inline for common scalars."""
+        kind = type(value)
+        if kind is str:
+            return encode_basestring_ascii(value)
+        if kind is int:
+            return int.__repr__(value)
+        if kind is float and isfinite(value):
+            return float.__repr__(value)
+        return self._dumps(value)
+
+    def encode(
+        self,
+        metrics: dict[str, tuple[Any, Any]],
+        dimensions: dict[str, str],
+        properties: Optional[dict[str, Any]] = None,
+        timestamp_ms: Optional[int] = None,
+    ) -> str:
+        """
+        Encode one EMF log line.
+
+        Args:
+            metrics: Metric name to (value, unit); a value may be a list of up
+                to 100 values
+            dimensions: Dimension name to value
+            properties: Additional members of the line
+            timestamp_ms: Epoch milliseconds; now if not provided
+
+        Returns:
+            The JSON document, without a trailing newline
+        """
+        template = self._template(metrics, dimensions)
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 1000)
+        if properties and not template.reserved.isdisjoint(properties):
+            # A property replacing a template member would duplicate its key
+            return self._encode_document(metrics, dimensions, properties, timestamp_ms)
+        parts = ['{"_aws":{"Timestamp":', int.__repr__(timestamp_ms), template.head]
+        append = parts.append
+        encode_value = self._value
+        for key, value in zip(template.dimension_keys, dimensions.values()):
+            append(key)
+            append(encode_basestring_ascii(value) if type(value) is str else encode_value(value))
+        for key, (value, _) in zip(template.metric_keys, metrics.values()):
+            append(key)
+            kind = type(value)
+            if kind is int:
+                append(int.__repr__(value))
+            elif kind is float and isfinite(value):
+                append(float.__repr__(value))
+            else:
+                append(encode_value(value))
+        if properties:
+            encoded = self._dumps(properties)
+            if len(encoded) > 2:
+                parts.append(",")
+                parts.append(encoded[1:-1])
+        parts.append("}")
+        return "".join(parts)
+
+    def _encode_document(
+        self,
+        metrics: dict[str, tuple[Any, Any]],
+        dimensions: dict[str, str],
+        properties: dict[str, Any],
+        timestamp_ms: int,
+    ) -> str:
+        """Encode a line as a whole document, with later members replacing earlier ones."""
+        document: dict[str, Any] = {
+            "_aws": {
+                "Timestamp": timestamp_ms,
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [list(dimensions)],
+                        "Metrics": [
+                            {"Name": name, "Unit": getattr(unit, "value", unit)}
+                            for name, (_, unit) in metrics.items()
+                        ],
+                    }
+                ],
+            },
+            "service": self.service_name,
+            **dimensions,
+        }
+        for name, (value, _) in metrics.items():
+            document[name] = value
+        document.update(properties)
+        return self._dumps(document)
@@ -0,0 +1,248 @@
+"""
+Keyed rate limiter for per-session, per-tenant and per-wallet limits.
+
+A RateLimiter object per key does not scale to one bucket per caller: every
+key costs a lock, a stats object and an AdaptiveRate, and nothing ever frees
+them. KeyedRateLimiter keeps all buckets of one limit in a single structure:
+
+- Each bucket is a two-slot record (tokens, last update) with ``__slots__``
+- Buckets live in an OrderedDict in least-recently-used order, so lookup,
+  touch and eviction are O(1)
+- Buckets idle for longer than ``idle_ttl_seconds`` are dropped a few at a
+  time on each call; once a bucket has been idle for long enough to refill,
+  dropping it loses nothing
+- ``max_keys`` caps memory: past it, the least recently used bucket is
+  evicted, so memory stays flat however many distinct keys are seen
+
+Keys are plain strings; prefix them to share one limiter between kinds of
+caller (for example ``"session:<id>"`` and ``"wallet:<address>"``).
+
+Usage:
+    from agent.keyed_rate_limiter import KeyedRateLimiter
+    from agent.rate_limiter import RateLimitConfig
+
+    sessions = KeyedRateLimiter(
+        RateLimitConfig(requests_per_second=1.0, burst_capacity=5),
+        max_keys=10_000,
+    )
+
+    if not sessions.try_acquire(f"session:{session_id}"):
+        # Reject with 429 and sessions.retry_after(...)
+        ...
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .rate_limiter import RateLimitConfig, RateLimitExceeded
+
+# Idle buckets dropped per call, so TTL eviction never makes one call slow
+_IDLE_EVICTIONS_PER_CALL = 4
+
+
+class _Bucket:
+    """Token count and last refill time of one key."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+@dataclass
+class KeyedRateLimitStats:
+    """Statistics for a keyed rate limiter."""
+
+    allowed_requests: int = 0
+    throttled_requests: int = 0
+    idle_evictions: int = 0
+    lru_evictions: int = 0
+
+
+class KeyedRateLimiter:
+    """
+    Token buckets for many keys sharing one configuration.
+
+    Thread-safe; one lock guards all buckets and is only held for O(1) work.
+    Blocking acquires reserve their tokens up front (the bucket may go
+    negative), so waiters on one key are served in call order.
+    """
+
+    def __init__(
+        self,
+        config: Optional[RateLimitConfig] = None,
+        max_keys: int = 10_000,
+        idle_ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            config: Rate and burst applied to every key. Uses defaults if not provided.
+            max_keys: Maximum number of buckets kept; the least recently used
+                bucket is evicted beyond this
+            idle_ttl_seconds: Buckets unused for this long are dropped. Keep it
+                at least burst_capacity / requests_per_second so only full
+                buckets are dropped.
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.config = config or RateLimitConfig()
+        self.max_keys = max_keys
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._clock = clock
+        self._buckets: OrderedDict[str, _Bucket] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = KeyedRateLimitStats()
+
+    @property
+    def stats(self) -> KeyedRateLimitStats:
+        """Get rate limiting and eviction statistics."""
+        return self._stats
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _bucket(self, key: str, now: float) -> _Bucket:
+        """Get the refilled bucket for a key, creating it. Caller must hold the lock."""
+        self._evict_idle(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket(float(self.config.burst_capacity), now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self._stats.lru_evictions += 1
+            return bucket
+        self._buckets.move_to_end(key)
+        bucket.tokens = min(
+            float(self.config.burst_capacity),
+            bucket.tokens + (now - bucket.updated) * self.config.requests_per_second,
+        )
+        bucket.updated = now
+        return bucket
+
+    def _evict_idle(self, now: float) -> None:
+        """Drop a few buckets idle past the TTL from the LRU end."""
+        for _ in range(_IDLE_EVICTIONS_PER_CALL):
+            if not self._buckets:
+                return
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated < self.idle_ttl_seconds:
+                return
+            del self._buckets[key]
+            self._stats.idle_evictions += 1
+
+    def _check_weight(self, n: int) -> None:
+        if n > self.config.burst_capacity:
+            raise ValueError(
+                f"Cannot acquire {n} tokens with a burst capacity of {self.config.burst_capacity}"
+            )
+
+    def try_acquire(self, key: str, n: int = 1) -> bool:
+        """
+        Take n tokens from a key's bucket without waiting.
+
+        Args:
+            key: Caller key (session, tenant, wallet, ...)
+            n: Number of tokens (the request's weight)
+
+        Returns:
+            True if the tokens were taken, False if the key is rate limited
+        """
+        self._check_weight(n)
+        with self._lock:
+            bucket = self._bucket(key, self._clock())
+            if bucket.tokens >= n:
+                bucket.tokens -= n
+                self._stats.allowed_requests += 1
+                return True
+            self._stats.throttled_requests += 1
+            return False
+
+    def retry_after(self, key: str, n: int = 1) -> float:
+        """
+        Seconds until n tokens are available for a key.
+
+        Args:
+            key: Caller key
+            n: Number of tokens
+
+        Returns:
+            Time to wait, 0 if the tokens are available now
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return 0.0
+            now = self._clock()
+            tokens = min(
+                float(self.config.burst_capacity),
+                bucket.tokens + (now - bucket.updated) * self.config.requests_per_second,
+            )
+        return max(0.0, (n - tokens) / self.config.requests_per_second)
+
+    def _reserve(self, key: str, n: int, timeout: Optional[float]) -> float:
+        """Reserve n tokens, returning how long to wait for them."""
+        self._check_weight(n)
+        timeout = timeout if timeout is not None else self.config.max_wait_time
+        with self._lock:
+            bucket = self._bucket(key, self._clock())
+            wait_time = max(0.0, (n - bucket.tokens) / self.config.requests_per_second)
+            if wait_time > 0 and (not self.config.block_on_limit or wait_time > timeout):
+                self._stats.throttled_requests += 1
+                raise RateLimitExceeded(wait_time)
+            bucket.tokens -= n
+            self._stats.allowed_requests += 1
+        return wait_time
+
+    def acquire(self, key: str, n: int = 1, timeout: Optional[float] = None) -> float:
+        """
+        Take n tokens from a key's bucket, blocking until they are available.
+
+        Args:
+            key: Caller key
+            n: Number of tokens (the request's weight)
+            timeout: Maximum time to wait. Uses config.max_wait_time if not provided.
+
+        Returns:
+            Time spent waiting (0 if no wait was needed)
+
+        Raises:
+            RateLimitExceeded: If blocking is disabled or the wait exceeds the timeout
+        """
+        wait_time = self._reserve(key, n, timeout)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    async def acquire_async(self, key: str, n: int = 1, timeout: Optional[float] = None) -> float:
+        """
+        Async version of acquire.
+
+        Raises:
+            RateLimitExceeded: If blocking is disabled or the wait exceeds the timeout
+        """
+        wait_time = self._reserve(key, n, timeout)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return wait_time
+
+    def reset(self, key: Optional[str] = None) -> None:
+        """
+        Forget one key's bucket, or every bucket.
+
+        Args:
+            key: Key to reset; all keys if not provided
+        """
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+                self._stats = KeyedRateLimitStats()
+            else:
+                self._buckets.pop(key, None)
@@ -0,0 +1,490 @@
+"""
+In-process latency percentiles for the agent's hot operations.
+
+DDSketch keeps a latency distribution in logarithmically sized buckets: a
+bucket's bounds differ by a factor of (1 + a) / (1 - a), so any percentile it
+reports is within a relative error ``a`` of the true value, whatever the
+distribution. Sketches with the same accuracy merge by adding bucket counts,
+which makes them cheap to combine across tools, outcomes and time windows.
+
+LatencyHistograms keeps one sketch per operation, tool, endpoint and outcome
+and answers percentile queries in-process (the MCP client sizes its hedging
+delay from it). Samples are kept in two windows of export_interval_seconds
+each: queries see the current and the previous window, and every export
+writes the current window's p50/p90/p99/max to on_export before starting a
+new one. A daemon thread ends each window on schedule, so an operation that
+goes quiet still has its last window exported; close() exports whatever is
+left and runs at interpreter exit.
+
+Usage:
+    from agent.latency_sketch import get_latency_histograms
+
+    latencies = get_latency_histograms()
+    latencies.record("mcp_invocation", 120.0, tool="get_weather")
+    p99_ms = latencies.percentile("mcp_invocation", 99, tool="get_weather")
+"""
+
+import atexit
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+# Values at or below this are counted as zero; log-bucketing needs a positive floor
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative-error guarantees.
+
+    Not thread-safe; LatencyHistograms guards its sketches with a lock.
+    """
+
+    __slots__ = (
+        "relative_accuracy",
+        "max_bins",
+        "_gamma",
+        "_log_gamma",
+        "_bins",
+        "count",
+        "zero_count",
+        "sum",
+        "min",
+        "max",
+    )
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy: Largest relative error of a reported percentile
+            max_bins: Bucket limit; past it the lowest buckets are merged,
+                so only the smallest values lose accuracy
+
+        Raises:
+            ValueError: If relative_accuracy is not between 0 and 1
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._bins: dict[int, int] = {}
+        self.count = 0
+        self.zero_count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        """
+        Add a value.
+
+        Args:
+            value: The value; negative values are counted as zero
+            count: Number of times the value was observed
+        """
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        bins = self._bins
+        if index in bins:
+            bins[index] += count
+        else:
+            bins[index] = count
+            if len(bins) > self.max_bins:
+                self._collapse()
+
+    def _collapse(self) -> None:
+        """Merge the lowest bucket into the next one."""
+        lowest, second = sorted(self._bins)[:2]
+        self._bins[second] += self._bins.pop(lowest)
+
+    def merge(self, other: "DDSketch") -> None:
+        """
+        Add every value of another sketch to this one.
+
+        Raises:
+            ValueError: If the sketches have different accuracies
+        """
+        if other._gamma != self._gamma:
+            raise ValueError("Only sketches with the same relative_accuracy can be merged")
+        if not other.count:
+            return
+        bins = self._bins
+        for index, count in other._bins.items():
+            bins[index] = bins.get(index, 0) + count
+        while len(bins) > self.max_bins:
+            self._collapse()
+        self.count += other.count
+        self.zero_count += other.zero_count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> "DDSketch":
+        """Get an independent copy of the sketch."""
+        sketch = DDSketch(self.relative_accuracy, self.max_bins)
+        sketch.merge(self)
+        return sketch
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Estimate a percentile.
+
+        Args:
+            pct: Percentile in [0, 100]
+
+        Returns:
+            The estimate, or None if the sketch is empty
+        """
+        if not self.count:
+            return None
+        rank = pct / 100 * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+        seen = self.zero_count
+        for index in sorted(self._bins):
+            seen += self._bins[index]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                estimate = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+
+@dataclass(frozen=True)
+class LatencyKey:
+    """Identity of one latency series."""
+
+    operation: str
+    tool: Optional[str] = None
+    endpoint: Optional[str] = None
+    outcome: Optional[str] = None
+
+
+@dataclass
+class LatencySummary:
+    """Percentiles of one latency series over an export window."""
+
+    key: LatencyKey
+    count: int
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def http_outcome(status_code: int) -> str:
+    """Outcome of an HTTP request: "success", "payment_required" or "error"."""
+    if status_code < 400:
+        return "success"
+    if status_code == 402:
+        return "payment_required"
+    return "error"
+
+
+def endpoint_path(url: str) -> str:
+    """
+    Endpoint a latency series is keyed on: the path of a URL.
+
+    Keying on the path rather than the full URL keeps one series per endpoint
+    whatever the host, and keeps the ContentPath dimension short without
+    truncating different endpoints into one value.
+    """
+    return urlsplit(url).path or url
+
+
+def _percentile_ms(sketch: DDSketch, pct: float) -> float:
+    """Percentile of a window's sketch; windows only hold sketches with samples."""
+    value = sketch.percentile(pct)
+    return value if value is not None else 0.0
+
+
+def _summary(key: LatencyKey, sketch: DDSketch) -> LatencySummary:
+    return LatencySummary(
+        key=key,
+        count=sketch.count,
+        p50_ms=_percentile_ms(sketch, 50),
+        p90_ms=_percentile_ms(sketch, 90),
+        p99_ms=_percentile_ms(sketch, 99),
+        max_ms=sketch.max,
+    )
+
+
+class LatencyHistograms:
+    """
+    Latency sketches per operation, tool, endpoint and outcome.
+
+    Thread-safe for use in multi-threaded applications.
+    """
+
+    def __init__(
+        self,
+        relative_accuracy: float = 0.01,
+        export_interval_seconds: float = 60.0,
+        on_export: Optional[Callable[[LatencySummary], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the histograms.
+
+        Args:
+            relative_accuracy: Relative error of every percentile
+            export_interval_seconds: Length of a window; 0 keeps one window
+                forever and never exports on its own
+            on_export: Called with every series' summary when a window ends
+            clock: Monotonic clock in seconds
+        """
+        # Checked here so a bad setting fails at startup, not on the first sample
+        DDSketch(relative_accuracy)
+        self.relative_accuracy = relative_accuracy
+        self.export_interval_seconds = export_interval_seconds
+        self._on_export = on_export
+        self._clock = clock
+        self._current: dict[LatencyKey, DDSketch] = {}
+        self._previous: dict[LatencyKey, DDSketch] = {}
+        self._window_started = clock()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.close)
+
+    @classmethod
+    def from_agent_config(cls) -> "LatencyHistograms":
+        """
+        Build histograms from the LATENCY_* settings in AgentConfig.
+
+        Window summaries are exported as the Latency* metrics.
+        """
+        from .config import config as agent_config
+
+        return cls(
+            relative_accuracy=agent_config.latency_relative_accuracy,
+            export_interval_seconds=agent_config.latency_export_interval_seconds,
+            on_export=_emit_summary,
+        )
+
+    def record(
+        self,
+        operation: str,
+        latency_ms: float,
+        tool: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        outcome: Optional[str] = "success",
+    ) -> None:
+        """
+        Record a latency sample.
+
+        Args:
+            operation: Operation name, e.g. "payment_signing"
+            latency_ms: Latency in milliseconds
+            tool: Tool the operation ran for
+            endpoint: Endpoint path the operation called (see endpoint_path)
+            outcome: Result class, e.g. "success", "error" or "payment_required"
+        """
+        key = LatencyKey(operation, tool, endpoint, outcome)
+        with self._lock:
+            sketch = self._current.get(key)
+            if sketch is None:
+                sketch = self._current[key] = DDSketch(self.relative_accuracy)
+            sketch.add(latency_ms)
+            if self._thread is None and self.export_interval_seconds > 0 and not self._closed:
+                self._start()
+        self._maybe_export()
+
+    def _start(self) -> None:
+        """Start the export thread. Caller must hold the lock."""
+        self._thread = threading.Thread(
+            target=self._run, name="latency-export", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            remaining = self._window_started + self.export_interval_seconds - self._clock()
+            self._wakeup.wait(max(remaining, 0.0))
+            self._wakeup.clear()
+            if not self._closed:
+                self._maybe_export()
+
+    def _matching(
+        self,
+        operation: str,
+        tool: Optional[str],
+        endpoint: Optional[str],
+        outcome: Optional[str],
+    ) -> list[DDSketch]:
+        """Sketches of both windows matching a query. Caller must hold the lock."""
+        if tool is not None and endpoint is not None and outcome is not None:
+            key = LatencyKey(operation, tool, endpoint, outcome)
+            return [
+                window[key] for window in (self._current, self._previous) if key in window
+            ]
+        return [
+            sketch
+            for window in (self._current, self._previous)
+            for key, sketch in window.items()
+            if key.operation == operation
+            and (tool is None or key.tool == tool)
+            and (endpoint is None or key.endpoint == endpoint)
+            and (outcome is None or key.outcome == outcome)
+        ]
+
+    def sketch(
+        self,
+        operation: str,
+        tool: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        outcome: Optional[str] = None,
+    ) -> DDSketch:
+        """
+        Merge the recent samples of every matching series.
+
+        Args:
+            operation: Operation name
+            tool: Only this tool; any if not provided
+            endpoint: Only this endpoint; any if not provided
+            outcome: Only this outcome; any if not provided
+
+        Returns:
+            A new sketch over the current and previous window
+        """
+        merged = DDSketch(self.relative_accuracy)
+        with self._lock:
+            for sketch in self._matching(operation, tool, endpoint, outcome):
+                merged.merge(sketch)
+        return merged
+
+    def percentile(
+        self,
+        operation: str,
+        pct: float,
+        tool: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        outcome: Optional[str] = None,
+        min_samples: int = 1,
+    ) -> Optional[float]:
+        """
+        Get a recent latency percentile.
+
+        Args:
+            operation: Operation name
+            pct: Percentile in [0, 100]
+            tool: Only this tool; any if not provided
+            endpoint: Only this endpoint; any if not provided
+            outcome: Only this outcome; any if not provided
+            min_samples: Samples required before a value is returned
+
+        Returns:
+            Latency in milliseconds, or None if there are too few samples
+        """
+        sketch = self.sketch(operation, tool, endpoint, outcome)
+        if sketch.count < max(1, min_samples):
+            return None
+        return sketch.percentile(pct)
+
+    def keys(self) -> list[LatencyKey]:
+        """Every series with samples in the current or previous window."""
+        with self._lock:
+            return list({**self._previous, **self._current})
+
+    def export(self) -> list[LatencySummary]:
+        """
+        End the current window and summarize it.
+
+        Series without samples in the window are skipped. Every summary is
+        passed to on_export.
+
+        Returns:
+            The summaries
+        """
+        with self._lock:
+            summaries = self._rotate()
+        self._publish(summaries)
+        return summaries
+
+    def _maybe_export(self) -> None:
+        """Export if the window has run for export_interval_seconds."""
+        if self.export_interval_seconds <= 0:
+            return
+        with self._lock:
+            # Checked under the lock so concurrent callers end a window only once
+            if self._clock() - self._window_started < self.export_interval_seconds:
+                return
+            summaries = self._rotate()
+        self._publish(summaries)
+
+    def _rotate(self) -> list[LatencySummary]:
+        """Start a new window. Caller must hold the lock."""
+        self._window_started = self._clock()
+        window, self._previous, self._current = self._current, self._current, {}
+        return [_summary(key, sketch) for key, sketch in window.items()]
+
+    def _publish(self, summaries: list[LatencySummary]) -> None:
+        if self._on_export is not None:
+            for summary in summaries:
+                self._on_export(summary)
+
+    def reset(self) -> None:
+        """Drop every sample."""
+        with self._lock:
+            self._current.clear()
+            self._previous.clear()
+            self._window_started = self._clock()
+
+    def close(self) -> None:
+        """Stop the export thread and export the current window."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5.0)
+        if self.export_interval_seconds > 0:
+            self.export()
+        atexit.unregister(self.close)
+
+
+def _emit_summary(summary: LatencySummary) -> None:
+    """Export a window's percentiles as metrics."""
+    from .metrics import get_metrics_emitter
+
+    get_metrics_emitter().record_latency_summary(
+        operation=summary.key.operation,
+        count=summary.count,
+        p50_ms=summary.p50_ms,
+        p90_ms=summary.p90_ms,
+        p99_ms=summary.p99_ms,
+        max_ms=summary.max_ms,
+        tool=summary.key.tool,
+        endpoint=summary.key.endpoint,
+        outcome=summary.key.outcome,
+    )
+
+
+# Global histograms fed by the metrics emitter
+_histograms: Optional[LatencyHistograms] = None
+
+
+def get_latency_histograms() -> LatencyHistograms:
+    """Get the global latency histograms, configured from AgentConfig."""
+    global _histograms
+    if _histograms is None:
+        _histograms = LatencyHistograms.from_agent_config()
+    return _histograms
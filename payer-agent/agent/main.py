@@ -32,9 +32,11 @@ from .tools.payment import (
 from .tools.discovery import (
     discover_services,
     request_service,
+    quote_service,
     list_approved_services,
     check_service_approval,
 )
+from .tools.purchase import purchase_service, purchase_services
 from .tools.content import (
     request_content,
     request_content_with_payment,
@@ -48,8 +50,12 @@ CORE_TOOLS = [
     # Service Discovery (Enterprise-Ready)
     discover_services,
     request_service,
+    quote_service,
     list_approved_services,
     check_service_approval,
+    # Purchase Tools (whole x402 flow in one call)
+    purchase_service,
+    purchase_services,
     # Payment Tools
     analyze_payment,
     sign_payment,
@@ -72,9 +78,17 @@ You do NOT have hardcoded knowledge of available services. Instead, you MUST use
 ### Service Discovery Tools (USE THESE FIRST)
 - discover_services: Find all available paid services from the Gateway. Call this to see what's available.
 - request_service: Request any discovered service by name. Handles x402 payment flow automatically.
+- quote_service: Get a service's payment requirements without buying it. Answered from cache when \
+the price is already known.
 - list_approved_services: See which services are pre-approved for autonomous purchasing.
 - check_service_approval: Check if a specific purchase is pre-approved.
 
+### Purchase Tools (PREFERRED FOR BUYING)
+- purchase_service: Buy a service in one call. Quotes the price, checks approval and balance, \
+signs the payment and returns the content with a receipt.
+- purchase_services: Buy several services at once. One combined approval, then all payments are \
+signed and fetched in parallel.
+
 ### Wallet Tools
 - get_wallet_balance: Check your USDC and ETH balance on Base Sepolia testnet
 - request_faucet_funds: Request free testnet tokens (ETH or USDC)
@@ -91,9 +105,20 @@ When a user asks about available services or wants to access content:
 1. Call discover_services() to get the list of available services
 2. Present the services to the user with their names, descriptions, and prices
 
-### Step 2: Request a Service
+### Step 2: Purchase a Service
 When a user wants a specific service:
-1. Call request_service(service_name="<name>") 
+1. Call purchase_service(service_name="<name>", max_price="<most the user will pay in USDC>")
+2. If status is "purchased", return the content and report the receipt (amount, transaction)
+3. If status is "approval_required", ask the user to confirm the price. On confirmation, call \
+purchase_service again with user_confirmed=True
+4. If status is "rejected" or "failed", explain why to the user; nothing was paid unless the \
+failure stage is "fetch"
+5. When the user wants several services, call purchase_services(service_names=[...], \
+max_total_price="<USDC>") once instead of purchase_service per service
+
+### Step-by-Step Flow (only if purchase_service is unavailable)
+1. Call request_service(service_name="<name>") (or quote_service to see the price first; its \
+payment_required can go straight to sign_payment)
 2. If you get a 402 response with payment_required:
    a. Check if the service is pre-approved using check_service_approval
    b. If pre-approved, proceed automatically
@@ -103,11 +128,9 @@ When a user wants a specific service:
 5. Return the content to the user
 
 ### Step 3: Autonomous Purchasing (Pre-Approved Services)
-For services on the approved list:
-1. Check approval with check_service_approval(service_name, price)
-2. If approved, proceed without asking the user
-3. Complete the payment and deliver the content
-4. Inform the user what was purchased and the cost
+purchase_service checks the approved list itself:
+1. Pre-approved services within their price limit are bought without asking the user
+2. Inform the user what was purchased and the cost
 
 ## Example Conversations
 
@@ -115,14 +138,20 @@ User: "What services are available?"
 → Call discover_services() and present the list
 
 User: "Get me the weather data"
-→ Call request_service(service_name="get_weather_data")
-→ Handle 402 response, check approval, sign payment, retry with payment
-→ Return the weather data
+→ Call purchase_service(service_name="get_weather_data", max_price="0.001")
+→ Return the weather data and the receipt
 
 User: "I want the research report"
-→ Call request_service(service_name="get_research_report")
-→ If not pre-approved, ask: "The research report costs 0.005 USDC. Should I proceed?"
-→ On confirmation, complete the payment flow
+→ Call purchase_service(service_name="get_research_report", max_price="0.01")
+→ On "approval_required", ask: "The research report costs 0.005 USDC. Should I proceed?"
+→ On confirmation, call purchase_service(service_name="get_research_report", max_price="0.01", \
+user_confirmed=True)
+
+User: "Get me all the market data, the weather and the research report"
+→ Call purchase_services(service_names=["get_market_analysis", "get_weather_data", \
+"get_research_report"], max_total_price="0.01")
+→ On "approval_required", ask once for the combined total, then call again with \
+user_confirmed=True
 
 ## Payment Decision Guidelines
 - Always check wallet balance before approving payments
@@ -10,6 +10,11 @@ The MCP client:
 2. Converts MCP tool definitions to Strands-compatible tool functions
 3. Handles x402 payment headers during tool invocation
 4. Provides caching for tool discovery responses
+5. Keeps a pooled keep-alive HTTP connection to the Gateway across calls
+6. Caches free (non-payment) tool responses per their HTTP caching headers
+7. Retries transient failures with jittered backoff and optional hedging
+8. Fails fast against endpoints whose circuit breaker is open
+9. Optionally pre-pays approved services at their advertised price
 
 Usage:
     from agent.mcp_client import MCPClient, discover_mcp_tools
@@ -25,21 +30,77 @@ Usage:
     
     # Use with agent
     agent = create_payer_agent(additional_tools=tool_functions)
+    
+    # Release pooled connections on shutdown
+    await client.aclose()
 """
 
-import base64
+import asyncio
+import hashlib
+import importlib.util
 import json
+import logging
+import os
+import random
+import re
+import tempfile
 import time
-from dataclasses import dataclass, field
-from typing import Any, Callable, Optional
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Union
 from functools import wraps
 
 import httpx
 from strands import tool
 
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitBreakerRegistry,
+    CircuitState,
+)
 from .config import config
 from .tracing import get_tracer
+from .x402_headers import (
+    PAYMENT_SIGNATURE_HEADER,
+    encode_payment_signature,
+    read_payment_required,
+    read_payment_response,
+)
 from .metrics import get_metrics_emitter
+from .latency_sketch import (
+    LatencyHistograms,
+    endpoint_path,
+    get_latency_histograms,
+    http_outcome,
+)
+from .prepayment import (
+    PrepaymentPolicy,
+    PrepaymentStats,
+    advertised_requirement,
+    requirement_matches,
+    sign_requirement,
+)
+from .rate_limiter import (
+    RateLimitExceeded,
+    RateLimiterRegistry,
+    RateLimitStats,
+    get_rate_limiter_registry,
+)
+from .response_cache import ResponseCache, ResponseCacheConfig, ResponseCacheStats
+from .retry import (
+    RetryBudget,
+    RetryConfig,
+    RetryStats,
+    backoff_delay,
+    parse_retry_after,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk discovery snapshot layout changes
+DISCOVERY_SNAPSHOT_VERSION = 1
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
 
 
 @dataclass
@@ -85,6 +146,23 @@ class MCPToolDefinition:
             "requires_payment": self.requires_payment,
             "payment_info": self.payment_info,
         }
+    
+    def fingerprint(self) -> str:
+        """
+        Stable hash of the full definition.
+        
+        Two definitions with the same fingerprint produce identical Strands
+        wrappers, so the wrapper can be reused across discovery refreshes.
+        """
+        encoded = json.dumps(asdict(self), sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+    
+    @classmethod
+    def from_snapshot(cls, data: dict[str, Any]) -> "MCPToolDefinition":
+        """Rebuild a tool definition from its ``dataclasses.asdict`` form."""
+        fields = dict(data)
+        fields["parameters"] = [MCPToolParameter(**p) for p in data.get("parameters", [])]
+        return cls(**fields)
 
 
 @dataclass
@@ -95,19 +173,159 @@ class MCPDiscoveryResponse:
     metadata: dict[str, Any] = field(default_factory=dict)
     error: Optional[str] = None
     cached: bool = False
+    stale: bool = False
+    revalidated: bool = False
     discovered_at: float = field(default_factory=time.time)
 
 
+@dataclass
+class MCPDiscoveryStats:
+    """Counters for discovery refreshes."""
+    fetches: int = 0
+    coalesced_callers: int = 0
+    background_refreshes: int = 0
+    stale_served: int = 0
+    not_modified: int = 0
+    snapshot_loads: int = 0
+    tools_built: int = 0
+    tools_reused: int = 0
+    tools_dropped: int = 0
+
+
+@dataclass
+class HTTPPoolStats:
+    """Snapshot of the shared connection pool."""
+    max_connections: int = 0
+    open_connections: int = 0
+    idle_connections: int = 0
+    in_flight_requests: int = 0
+
+
+class MCPResponseTooLarge(Exception):
+    """Raised when a streamed response body exceeds the configured size cap."""
+    
+    def __init__(self, limit_bytes: int, received_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.received_bytes = received_bytes
+        super().__init__(
+            f"Response body exceeds max_response_bytes ({received_bytes} > {limit_bytes})"
+        )
+
+
+class MCPResponseBody:
+    """
+    Response body read incrementally into a spool.
+    
+    Bodies up to the spool threshold stay in memory; larger bodies roll over
+    to a temporary file, so a multi-MB dataset is held on disk once rather
+    than in memory several times over. JSON is parsed only when ``json()``
+    is called, and the parsed value is cached.
+    """
+    
+    def __init__(self, spool: tempfile.SpooledTemporaryFile, size: int, content_type: str = ""):
+        self._spool = spool
+        self._size = size
+        self.content_type = content_type
+        self._parsed: Any = None
+        self._is_parsed = False
+    
+    @property
+    def size(self) -> int:
+        """Body size in bytes."""
+        return self._size
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def read(self) -> bytes:
+        """Read the whole body into memory."""
+        self._spool.seek(0)
+        return self._spool.read()
+    
+    def iter_chunks(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Iterate over the body without loading it all at once."""
+        self._spool.seek(0)
+        while chunk := self._spool.read(chunk_size):
+            yield chunk
+    
+    def json(self) -> Any:
+        """Parse the body as JSON on first use and return the cached value."""
+        if not self._is_parsed:
+            self._spool.seek(0)
+            self._parsed = json.load(self._spool)
+            self._is_parsed = True
+        return self._parsed
+    
+    def close(self) -> None:
+        """Release the spool (and its temporary file, if any)."""
+        self._spool.close()
+    
+    def __enter__(self) -> "MCPResponseBody":
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
 @dataclass
 class MCPInvocationResponse:
     """Response from MCP tool invocation."""
     success: bool
     status_code: int = 0
+    # Parsed JSON, or an MCPResponseBody handle when invoked with stream=True
     data: Any = None
     payment_required: Optional[dict[str, Any]] = None
     payment_response: Optional[dict[str, Any]] = None
     error: Optional[str] = None
     headers: dict[str, str] = field(default_factory=dict)
+    # True when served from the free-tool response cache
+    from_cache: bool = False
+    # Set when the endpoint's circuit breaker rejected the call without sending it
+    circuit_open: bool = False
+    retry_after_seconds: Optional[float] = None
+    # True when a pre-signed payment for the advertised price was accepted
+    prepaid: bool = False
+
+
+@dataclass
+class MCPToolCall:
+    """A single tool invocation in a batch."""
+    tool_name: str
+    arguments: dict[str, Any] = field(default_factory=dict)
+    payment_signature: Optional[str] = None
+
+
+@dataclass
+class MCPBatchItem:
+    """Result of one call in a batch, tagged with its position in the request."""
+    index: int
+    call: MCPToolCall
+    response: MCPInvocationResponse
+
+
+@dataclass
+class MCPBatchResult:
+    """Results of a batch invocation, in request order."""
+    items: list[MCPBatchItem] = field(default_factory=list)
+    wall_time_ms: float = 0.0
+    
+    @property
+    def succeeded(self) -> list[MCPBatchItem]:
+        """Calls that returned 200."""
+        return [item for item in self.items if item.response.success]
+    
+    @property
+    def payment_required(self) -> list[MCPBatchItem]:
+        """Calls that returned 402, grouped so they can be signed and retried together."""
+        return [item for item in self.items if item.response.status_code == 402]
+    
+    @property
+    def failed(self) -> list[MCPBatchItem]:
+        """Calls that failed for any reason other than 402."""
+        return [
+            item for item in self.items
+            if not item.response.success and item.response.status_code != 402
+        ]
 
 
 @dataclass
@@ -119,6 +337,32 @@ class MCPClientConfig:
     timeout_seconds: int = 30
     cache_ttl_seconds: int = 300
     enable_caching: bool = True
+    # How long past the TTL a stale catalog may be served while it is refreshed
+    stale_while_revalidate_seconds: int = 600
+    # Directory for the persisted discovery snapshot ("" disables it)
+    snapshot_dir: str = ""
+    # Connection pool settings for the shared HTTP client
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry_seconds: float = 30.0
+    http2: bool = True
+    # Default fan-out limit for invoke_many
+    max_batch_concurrency: int = 8
+    # Streaming invocation: hard body size cap and in-memory spool threshold
+    max_response_bytes: int = 50 * 1024 * 1024
+    spool_threshold_bytes: int = 1024 * 1024
+    # Response cache for free tools (0 bytes disables it)
+    response_cache_max_bytes: int = 8 * 1024 * 1024
+    response_cache_max_entries: int = 256
+    # Retry, backoff and hedging policy for tool invocations
+    retry: RetryConfig = field(default_factory=RetryConfig)
+    # Per-endpoint circuit breaker thresholds
+    circuit_breaker: CircuitBreakerConfig = field(default_factory=CircuitBreakerConfig)
+
+
+def _http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
 
 
 class MCPClient:
@@ -127,14 +371,30 @@ class MCPClient:
     
     The MCP client handles:
     - Tool discovery from the Gateway MCP endpoint
-    - Caching of discovery responses
+    - Caching of discovery responses, with single-flight refreshes and
+      stale-while-revalidate so discovery stays off the turn's critical path
     - Tool invocation with x402 header passthrough
     - Conversion of MCP tools to Strands-compatible functions
+    - A long-lived connection pool shared by discovery and invocation, so a
+      402-then-retry flow reuses one warm TLS connection
+    - An HTTP-semantics response cache for tools that do not require payment
+    - Retries with jittered backoff, Retry-After and a retry budget, plus
+      optional hedged requests for tail latency, delayed by the endpoint's
+      recent latency percentile from the shared latency sketches
+    - A circuit breaker per endpoint, so a down seller fails fast instead of
+      costing every turn a full timeout
+    - Opt-in pre-payment of approved services at their advertised price
+    - Client-side rate limiting with one token bucket per host (optionally
+      per tool), so bursts wait locally instead of drawing 429s
+    
+    The pool is opened lazily on first use. Call ``aclose()`` (or use the
+    client as an async context manager) to release connections on shutdown.
     
     Attributes:
         config: MCP client configuration
         _tools_cache: Cached tool definitions
         _cache_timestamp: When the cache was last updated
+        _http_client: Pooled HTTP client (created on first request)
     """
     
     def __init__(
@@ -145,6 +405,24 @@ class MCPClient:
         timeout_seconds: int = 30,
         cache_ttl_seconds: int = 300,
         enable_caching: bool = True,
+        stale_while_revalidate_seconds: int = 600,
+        snapshot_dir: Optional[str] = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry_seconds: float = 30.0,
+        http2: bool = True,
+        max_batch_concurrency: int = 8,
+        max_response_bytes: int = 50 * 1024 * 1024,
+        spool_threshold_bytes: int = 1024 * 1024,
+        response_cache_max_bytes: int = 8 * 1024 * 1024,
+        response_cache_max_entries: int = 256,
+        retry_config: Optional[RetryConfig] = None,
+        circuit_breaker_config: Optional[CircuitBreakerConfig] = None,
+        prepayment_policy: Optional[PrepaymentPolicy] = None,
+        payment_signer: Optional[Callable[[dict[str, Any]], Optional[dict[str, Any]]]] = None,
+        rate_limiters: Optional[RateLimiterRegistry] = None,
+        latencies: Optional[LatencyHistograms] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ):
         """
         Initialize the MCP client.
@@ -156,6 +434,33 @@ class MCPClient:
             timeout_seconds: Request timeout
             cache_ttl_seconds: How long to cache discovery responses
             enable_caching: Whether to cache discovery responses
+            stale_while_revalidate_seconds: How long past the TTL a stale catalog
+                is served while a background refresh runs (0 disables)
+            snapshot_dir: Directory for the on-disk discovery snapshot.
+                Uses config.mcp_snapshot_dir if not provided; empty disables it.
+            max_connections: Maximum concurrent connections in the pool
+            max_keepalive_connections: Maximum idle connections kept alive
+            keepalive_expiry_seconds: How long an idle connection is kept
+            http2: Negotiate HTTP/2 when the h2 package is installed
+            max_batch_concurrency: Default fan-out limit for invoke_many
+            max_response_bytes: Largest body accepted by a streaming invocation
+            spool_threshold_bytes: Streamed bodies above this size are spooled to disk
+            response_cache_max_bytes: Byte budget for cached free-tool responses
+                (0 disables the response cache)
+            response_cache_max_entries: Maximum number of cached responses
+            retry_config: Retry and hedging policy. Uses defaults if not provided.
+            circuit_breaker_config: Per-endpoint circuit breaker settings.
+                Uses defaults if not provided.
+            prepayment_policy: Services that may be paid on the first request.
+                Uses PrepaymentPolicy.from_config() if not provided.
+            payment_signer: Signs an x402 requirement and returns the payload
+                (defaults to the agent wallet)
+            rate_limiters: Token buckets for outbound requests. Uses the
+                process-wide get_rate_limiter_registry(), shared with the
+                HTTP tools, if not provided.
+            latencies: Latency sketches that time each request and set the
+                hedging delay. Uses get_latency_histograms() if not provided.
+            transport: Optional custom httpx transport for the connection pool
         """
         self.config = MCPClientConfig(
             gateway_url=gateway_url or config.seller_api_url,
@@ -164,11 +469,133 @@ class MCPClient:
             timeout_seconds=timeout_seconds,
             cache_ttl_seconds=cache_ttl_seconds,
             enable_caching=enable_caching,
+            stale_while_revalidate_seconds=stale_while_revalidate_seconds,
+            snapshot_dir=config.mcp_snapshot_dir if snapshot_dir is None else snapshot_dir,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry_seconds=keepalive_expiry_seconds,
+            http2=http2,
+            max_batch_concurrency=max_batch_concurrency,
+            max_response_bytes=max_response_bytes,
+            spool_threshold_bytes=spool_threshold_bytes,
+            response_cache_max_bytes=response_cache_max_bytes,
+            response_cache_max_entries=response_cache_max_entries,
+            retry=retry_config or RetryConfig(),
+            circuit_breaker=circuit_breaker_config or CircuitBreakerConfig(),
+        )
+        self._transport = transport
+        self._response_cache = ResponseCache(ResponseCacheConfig(
+            max_bytes=response_cache_max_bytes,
+            max_entries=response_cache_max_entries,
+        ))
+        self._retry_budget = RetryBudget(
+            self.config.retry.budget_ratio, self.config.retry.budget_min_retries
         )
+        self._retry_stats = RetryStats()
+        self._in_flight = 0
+        self._latencies = latencies or get_latency_histograms()
+        self._breakers = CircuitBreakerRegistry(
+            self.config.circuit_breaker, on_state_change=self._on_circuit_change
+        )
+        self._prepayment_policy = prepayment_policy or PrepaymentPolicy.from_config()
+        self._payment_signer = payment_signer or sign_requirement
+        self._prepayment_stats = PrepaymentStats()
+        self._rate_limiters = rate_limiters or get_rate_limiter_registry()
         
         self._tools_cache: list[MCPToolDefinition] = []
         self._cache_timestamp: float = 0
         self._strands_tools: list[Callable] = []
+        # Tool name -> (definition fingerprint, generated Strands wrapper)
+        self._tool_wrappers: dict[str, tuple[str, Callable]] = {}
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._discovery_stats = MCPDiscoveryStats()
+        # HTTP validators and freshness from the last discovery response
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._cache_max_age: Optional[int] = None
+        self._snapshot_loaded_for: Optional[str] = None
+        # Catalog and validators last written to or read from the snapshot
+        self._saved_snapshot: Optional[dict[str, Any]] = None
+    
+    async def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled HTTP client, creating it on first use.
+        
+        Connections are bound to the event loop that opened them, so a new
+        pool is created if the client is used from a different loop (for
+        example when Strands runs a tool in its own loop), and the pool of
+        the previous loop is closed.
+        
+        Returns:
+            Shared httpx.AsyncClient instance
+        """
+        loop = asyncio.get_running_loop()
+        
+        if (
+            self._http_client is None
+            or self._http_client.is_closed is True
+            or self._http_client_loop is not loop
+        ):
+            stale, stale_loop = self._http_client, self._http_client_loop
+            self._http_client = httpx.AsyncClient(
+                timeout=self.config.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive_connections,
+                    keepalive_expiry=self.config.keepalive_expiry_seconds,
+                ),
+                http2=self.config.http2 and _http2_available(),
+                transport=self._transport,
+            )
+            self._http_client_loop = loop
+            if stale is not None and stale.is_closed is not True:
+                await self._close_stale_client(stale, stale_loop)
+        return self._http_client
+    
+    async def _close_stale_client(
+        self,
+        client: httpx.AsyncClient,
+        loop: Optional[asyncio.AbstractEventLoop],
+    ) -> None:
+        """
+        Close a pool opened on another event loop.
+        
+        If that loop is still running (in another thread), the pool is closed
+        there; otherwise its connections can only be dropped from this loop,
+        and errors from sockets of a finished loop are ignored.
+        """
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug("Error closing HTTP client of a previous event loop: %s", e)
+    
+    async def open(self) -> "MCPClient":
+        """
+        Open the connection pool ahead of the first request.
+        
+        Returns:
+            This client, for chaining
+        """
+        await self._get_http_client()
+        return self
+    
+    async def aclose(self) -> None:
+        """Close the connection pool and release all pooled connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._http_client_loop = None
+    
+    async def __aenter__(self) -> "MCPClient":
+        return await self.open()
+    
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
     
     def _is_cache_valid(self) -> bool:
         """Check if the tools cache is still valid."""
@@ -177,7 +604,13 @@ class MCPClient:
         if not self._tools_cache:
             return False
         age = time.time() - self._cache_timestamp
-        return age < self.config.cache_ttl_seconds
+        return age < self._effective_ttl()
+    
+    def _effective_ttl(self) -> int:
+        """TTL for the cache, preferring the Gateway's Cache-Control max-age."""
+        if self._cache_max_age is not None:
+            return self._cache_max_age
+        return self.config.cache_ttl_seconds
     
     def _parse_tool_definition(self, tool_data: dict[str, Any]) -> MCPToolDefinition:
         """Parse a tool definition from the discovery response."""
@@ -208,6 +641,8 @@ class MCPClient:
                 "scheme": x402_metadata.get("scheme", ""),
                 "asset_address": x402_metadata.get("asset_address", ""),
                 "asset_name": x402_metadata.get("asset_name", ""),
+                "pay_to": x402_metadata.get("pay_to", ""),
+                "timeout_seconds": x402_metadata.get("timeout_seconds", 60),
             }
         
         # Get MCP metadata
@@ -229,125 +664,458 @@ class MCPClient:
         """
         Discover available MCP tools from the Gateway.
         
+        Fresh cache entries are returned directly. Once the TTL has passed but
+        the cache is still within ``stale_while_revalidate_seconds``, the stale
+        catalog is returned immediately and a background refresh is started.
+        Concurrent callers that need a refresh share a single in-flight request.
+        
         Args:
             force_refresh: Force refresh even if cache is valid
             
+        Returns:
+            MCPDiscoveryResponse with discovered tools
+        """
+        await self._ensure_snapshot_loaded()
+        
+        if not force_refresh:
+            if self._is_cache_valid():
+                return MCPDiscoveryResponse(
+                    success=True,
+                    tools=self._tools_cache,
+                    cached=True,
+                    discovered_at=self._cache_timestamp,
+                )
+            
+            if self._is_cache_stale_usable():
+                self._start_background_refresh()
+                self._discovery_stats.stale_served += 1
+                return MCPDiscoveryResponse(
+                    success=True,
+                    tools=self._tools_cache,
+                    cached=True,
+                    stale=True,
+                    discovered_at=self._cache_timestamp,
+                )
+        
+        return await self._refresh_tools()
+    
+    def _is_cache_stale_usable(self) -> bool:
+        """Check if an expired cache may still be served while revalidating."""
+        if not self.config.enable_caching or not self._tools_cache:
+            return False
+        age = time.time() - self._cache_timestamp
+        max_age = self._effective_ttl() + self.config.stale_while_revalidate_seconds
+        return age < max_age
+    
+    def _get_inflight_refresh(self) -> Optional[asyncio.Task]:
+        """Get the in-flight discovery task if it belongs to the running loop."""
+        task = self._refresh_task
+        if task is None or task.done():
+            return None
+        if task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+    
+    def _create_refresh_task(self) -> asyncio.Task:
+        """Start a discovery request as a task shared by all waiting callers."""
+        task = asyncio.get_running_loop().create_task(self._fetch_tools())
+        task.add_done_callback(self._on_refresh_done)
+        self._refresh_task = task
+        self._discovery_stats.fetches += 1
+        return task
+    
+    def _on_refresh_done(self, task: asyncio.Task) -> None:
+        """Clear the in-flight slot and surface unexpected refresh errors."""
+        if self._refresh_task is task:
+            self._refresh_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("MCP discovery refresh failed: %s", task.exception())
+    
+    async def _refresh_tools(self) -> MCPDiscoveryResponse:
+        """
+        Refresh the tool catalog, coalescing concurrent callers.
+        
+        Returns:
+            MCPDiscoveryResponse from the shared in-flight request
+        """
+        task = self._get_inflight_refresh()
+        if task is None:
+            task = self._create_refresh_task()
+        else:
+            self._discovery_stats.coalesced_callers += 1
+        
+        # Shield so a cancelled caller doesn't cancel the request for the others
+        return await asyncio.shield(task)
+    
+    def _start_background_refresh(self) -> None:
+        """Start a background refresh unless one is already in flight."""
+        if self._get_inflight_refresh() is not None:
+            return
+        self._create_refresh_task()
+        self._discovery_stats.background_refreshes += 1
+    
+    @property
+    def discovery_stats(self) -> MCPDiscoveryStats:
+        """Get discovery refresh statistics."""
+        return self._discovery_stats
+    
+    @property
+    def response_cache_stats(self) -> ResponseCacheStats:
+        """Get free-tool response cache statistics."""
+        return self._response_cache.stats
+    
+    @property
+    def retry_stats(self) -> RetryStats:
+        """Get retry and hedging statistics."""
+        return self._retry_stats
+    
+    @property
+    def prepayment_stats(self) -> PrepaymentStats:
+        """Get optimistic pre-payment statistics."""
+        return self._prepayment_stats
+    
+    def rate_limit_stats(self) -> dict[str, RateLimitStats]:
+        """Get rate limiter statistics for every bucket used so far."""
+        return self._rate_limiters.stats()
+    
+    @property
+    def rate_limiters(self) -> RateLimiterRegistry:
+        """The token buckets for outbound requests."""
+        return self._rate_limiters
+    
+    def pool_stats(self) -> HTTPPoolStats:
+        """Get the state of the shared connection pool."""
+        stats = HTTPPoolStats(
+            max_connections=self.config.max_connections,
+            in_flight_requests=self._in_flight,
+        )
+        # httpx keeps its httpcore pool private; a custom transport has none
+        transport = getattr(self._http_client, "_transport", None)
+        connections = list(getattr(getattr(transport, "_pool", None), "connections", ()))
+        stats.open_connections = len(connections)
+        stats.idle_connections = sum(1 for connection in connections if connection.is_idle())
+        return stats
+    
+    def circuit_states(self) -> dict[str, CircuitState]:
+        """Get the circuit breaker state of every endpoint called so far."""
+        return self._breakers.states()
+    
+    @staticmethod
+    def _on_circuit_change(
+        endpoint: str, old_state: CircuitState, new_state: CircuitState
+    ) -> None:
+        """Export circuit breaker transitions as metrics."""
+        get_metrics_emitter().record_circuit_breaker(endpoint, new_state.value)
+    
+    def _snapshot_file(self) -> Optional[str]:
+        """Path of the discovery snapshot for the current gateway URL."""
+        if not self.config.snapshot_dir:
+            return None
+        url_hash = hashlib.sha256(self.config.gateway_url.encode()).hexdigest()[:16]
+        return os.path.join(self.config.snapshot_dir, f"mcp-tools-{url_hash}.json")
+    
+    async def _ensure_snapshot_loaded(self) -> None:
+        """
+        Load the snapshot off the event loop once per gateway URL if the cache
+        is still empty.
+        """
+        if self._snapshot_loaded_for == self.config.gateway_url:
+            return
+        self._snapshot_loaded_for = self.config.gateway_url
+        if not self._tools_cache:
+            await asyncio.to_thread(self.load_snapshot)
+    
+    def load_snapshot(self) -> bool:
+        """
+        Load the persisted discovery snapshot into the cache.
+        
+        The snapshot keeps its original discovery time and validators, so an
+        old snapshot is revalidated with a conditional GET rather than trusted.
+        
+        Returns:
+            True if a snapshot for the current gateway URL was loaded
+        """
+        path = self._snapshot_file()
+        if not path or not self.config.enable_caching:
+            return False
+        
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != DISCOVERY_SNAPSHOT_VERSION:
+                return False
+            if snapshot.get("gateway_url") != self.config.gateway_url:
+                return False
+            tools = [MCPToolDefinition.from_snapshot(t) for t in snapshot["tools"]]
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable MCP discovery snapshot %s: %s", path, e)
+            return False
+        
+        self._tools_cache = tools
+        self._cache_timestamp = float(snapshot.get("discovered_at", 0))
+        self._etag = snapshot.get("etag")
+        self._last_modified = snapshot.get("last_modified")
+        self._cache_max_age = snapshot.get("max_age")
+        self._strands_tools = self._generate_strands_tools(tools)
+        self._saved_snapshot = self._snapshot_identity(self._snapshot_contents())
+        self._discovery_stats.snapshot_loads += 1
+        return True
+    
+    def _snapshot_contents(self) -> dict[str, Any]:
+        """The cache, validators and freshness as written to the snapshot."""
+        return {
+            "version": DISCOVERY_SNAPSHOT_VERSION,
+            "gateway_url": self.config.gateway_url,
+            "discovered_at": self._cache_timestamp,
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "max_age": self._cache_max_age,
+            "tools": [asdict(t) for t in self._tools_cache],
+        }
+    
+    @staticmethod
+    def _snapshot_identity(snapshot: dict[str, Any]) -> dict[str, Any]:
+        """The part of a snapshot that changes only with the catalog or its validators."""
+        return {k: v for k, v in snapshot.items() if k not in ("discovered_at", "max_age")}
+    
+    def _write_snapshot(self, path: str, snapshot: dict[str, Any]) -> bool:
+        """Write a snapshot atomically so a crash never leaves a partial file."""
+        try:
+            os.makedirs(self.config.snapshot_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.config.snapshot_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Failed to write MCP discovery snapshot %s: %s", path, e)
+            return False
+        self._saved_snapshot = self._snapshot_identity(snapshot)
+        return True
+    
+    def save_snapshot(self) -> bool:
+        """
+        Persist the current cache, validators and freshness to disk.
+        
+        The file is written atomically so a crash never leaves a partial snapshot.
+        
+        Returns:
+            True if the snapshot was written
+        """
+        path = self._snapshot_file()
+        if not path or not self._tools_cache:
+            return False
+        return self._write_snapshot(path, self._snapshot_contents())
+    
+    async def _save_snapshot_if_changed(self) -> bool:
+        """
+        Persist the snapshot off the event loop if the catalog or validators changed.
+        
+        A revalidation that only refreshes freshness is not written: a client
+        starting from the older snapshot revalidates it with a conditional GET.
+        
+        Returns:
+            True if the snapshot was written
+        """
+        path = self._snapshot_file()
+        if not path or not self._tools_cache:
+            return False
+        snapshot = self._snapshot_contents()
+        if self._snapshot_identity(snapshot) == self._saved_snapshot:
+            return False
+        return await asyncio.to_thread(self._write_snapshot, path, snapshot)
+    
+    def _conditional_headers(self) -> dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for revalidation."""
+        headers: dict[str, str] = {}
+        if not self._tools_cache:
+            return headers
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        return headers
+    
+    def _store_cache_headers(self, response: httpx.Response) -> None:
+        """Remember validators and max-age from a discovery response."""
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        cache_control = response.headers.get("cache-control")
+        
+        if response.status_code == 304:
+            # A 304 may omit validators; the cached ones still describe the catalog
+            if isinstance(etag, str):
+                self._etag = etag
+            if isinstance(last_modified, str):
+                self._last_modified = last_modified
+        else:
+            # A new catalog without validators must not be revalidated with old ones
+            self._etag = etag if isinstance(etag, str) else None
+            self._last_modified = last_modified if isinstance(last_modified, str) else None
+        
+        self._cache_max_age = None
+        if isinstance(cache_control, str):
+            if "no-cache" in cache_control.lower():
+                self._cache_max_age = 0
+            else:
+                match = _MAX_AGE_RE.search(cache_control)
+                if match:
+                    age = response.headers.get("age")
+                    elapsed = int(age) if isinstance(age, str) and age.isdigit() else 0
+                    self._cache_max_age = max(0, int(match.group(1)) - elapsed)
+    
+    async def _fetch_tools(self) -> MCPDiscoveryResponse:
+        """
+        Fetch and parse the tool catalog from the Gateway, updating the cache.
+        
         Returns:
             MCPDiscoveryResponse with discovered tools
         """
         tracer = get_tracer()
         metrics = get_metrics_emitter()
         
-        # Check cache
-        if not force_refresh and self._is_cache_valid():
-            return MCPDiscoveryResponse(
-                success=True,
-                tools=self._tools_cache,
-                cached=True,
-                discovered_at=self._cache_timestamp,
-            )
-        
         with tracer.start_as_current_span("mcp.discover_tools") as span:
             discovery_url = f"{self.config.gateway_url}{self.config.mcp_discovery_path}"
             span.set_attribute("mcp.discovery_url", discovery_url)
             
             start_time = time.time()
             
-            async with httpx.AsyncClient() as client:
-                try:
-                    response = await client.get(
-                        discovery_url,
-                        headers={"Accept": "application/json"},
-                        timeout=self.config.timeout_seconds,
-                    )
-                    
-                    latency_ms = (time.time() - start_time) * 1000
-                    span.set_attribute("http.status_code", response.status_code)
-                    span.set_attribute("mcp.discovery_latency_ms", latency_ms)
-                    
-                    if response.status_code != 200:
-                        span.set_attribute("error.type", "discovery_failed")
-                        metrics.record_mcp_discovery(
-                            success=False,
-                            latency_ms=latency_ms,
-                            error=f"status_{response.status_code}",
-                        )
-                        return MCPDiscoveryResponse(
-                            success=False,
-                            error=f"Discovery failed with status {response.status_code}",
-                        )
-                    
-                    try:
-                        data = response.json()
-                    except (json.JSONDecodeError, ValueError) as e:
-                        span.set_attribute("error.type", "json_parse_error")
-                        span.set_attribute("error.message", str(e))
-                        metrics.record_mcp_discovery(
-                            success=False,
-                            latency_ms=latency_ms,
-                            error="json_parse_error",
-                        )
-                        return MCPDiscoveryResponse(
-                            success=False,
-                            error=f"Failed to parse discovery response: {str(e)}",
-                        )
-                    
-                    tools_data = data.get("tools") or []  # Handle None explicitly
-                    
-                    # Parse tool definitions
-                    tools = []
-                    for tool_data in tools_data:
-                        try:
-                            tool_def = self._parse_tool_definition(tool_data)
-                            tools.append(tool_def)
-                        except Exception as e:
-                            span.add_event(
-                                "tool_parse_error",
-                                {"tool_name": tool_data.get("name", "unknown"), "error": str(e)},
-                            )
-                    
-                    # Update cache
-                    self._tools_cache = tools
+            client = await self._get_http_client()
+
+            try:
+                await self._rate_limiters.acquire_async(discovery_url, span=span)
+                response = await client.get(
+                    discovery_url,
+                    headers={"Accept": "application/json", **self._conditional_headers()},
+                    timeout=self.config.timeout_seconds,
+                )
+                self._rate_limiters.record_response(
+                    discovery_url, None, response.status_code, response.headers.get("retry-after")
+                )
+                
+                latency_ms = (time.time() - start_time) * 1000
+                span.set_attribute("http.status_code", response.status_code)
+                span.set_attribute("mcp.discovery_latency_ms", latency_ms)
+                
+                if response.status_code == 304 and self._tools_cache:
+                    # Catalog unchanged: refresh freshness only, no parse or regeneration
+                    self._store_cache_headers(response)
                     self._cache_timestamp = time.time()
+                    self._discovery_stats.not_modified += 1
+                    await self._save_snapshot_if_changed()
                     
-                    # Generate Strands tools
-                    self._strands_tools = self._generate_strands_tools(tools)
-                    
-                    span.set_attribute("mcp.tools_discovered", len(tools))
+                    span.set_attribute("mcp.discovery_not_modified", True)
+                    span.set_attribute("mcp.tools_discovered", len(self._tools_cache))
                     metrics.record_mcp_discovery(
                         success=True,
                         latency_ms=latency_ms,
-                        tools_count=len(tools),
+                        tools_count=len(self._tools_cache),
                     )
-                    
                     return MCPDiscoveryResponse(
                         success=True,
-                        tools=tools,
-                        metadata=data.get("metadata", {}),
-                        cached=False,
+                        tools=self._tools_cache,
+                        cached=True,
+                        revalidated=True,
                         discovered_at=self._cache_timestamp,
                     )
-                    
-                except httpx.RequestError as e:
-                    latency_ms = (time.time() - start_time) * 1000
-                    span.set_attribute("error.type", "request_error")
+                
+                if response.status_code != 200:
+                    span.set_attribute("error.type", "discovery_failed")
+                    metrics.record_mcp_discovery(
+                        success=False,
+                        latency_ms=latency_ms,
+                        error=f"status_{response.status_code}",
+                    )
+                    return MCPDiscoveryResponse(
+                        success=False,
+                        error=f"Discovery failed with status {response.status_code}",
+                    )
+                
+                try:
+                    data = response.json()
+                except (json.JSONDecodeError, ValueError) as e:
+                    span.set_attribute("error.type", "json_parse_error")
                     span.set_attribute("error.message", str(e))
-                    span.record_exception(e)
                     metrics.record_mcp_discovery(
                         success=False,
                         latency_ms=latency_ms,
-                        error=str(e),
+                        error="json_parse_error",
                     )
                     return MCPDiscoveryResponse(
                         success=False,
-                        error=f"Request failed: {str(e)}",
+                        error=f"Failed to parse discovery response: {str(e)}",
                     )
+                
+                tools_data = data.get("tools") or []  # Handle None explicitly
+                
+                # Parse tool definitions
+                tools = []
+                for tool_data in tools_data:
+                    try:
+                        tool_def = self._parse_tool_definition(tool_data)
+                        tools.append(tool_def)
+                    except Exception as e:
+                        span.add_event(
+                            "tool_parse_error",
+                            {"tool_name": tool_data.get("name", "unknown"), "error": str(e)},
+                        )
+                
+                # Update cache
+                self._tools_cache = tools
+                self._cache_timestamp = time.time()
+                self._store_cache_headers(response)
+                
+                # Generate Strands tools
+                self._strands_tools = self._generate_strands_tools(tools)
+                await self._save_snapshot_if_changed()
+                
+                span.set_attribute("mcp.tools_discovered", len(tools))
+                metrics.record_mcp_discovery(
+                    success=True,
+                    latency_ms=latency_ms,
+                    tools_count=len(tools),
+                )
+                
+                return MCPDiscoveryResponse(
+                    success=True,
+                    tools=tools,
+                    metadata=data.get("metadata", {}),
+                    cached=False,
+                    discovered_at=self._cache_timestamp,
+                )
+                
+            except RateLimitExceeded as e:
+                span.set_attribute("error.type", "rate_limited")
+                metrics.record_mcp_discovery(
+                    success=False,
+                    latency_ms=(time.time() - start_time) * 1000,
+                    error="rate_limited",
+                )
+                return MCPDiscoveryResponse(success=False, error=str(e))
+                
+            except httpx.RequestError as e:
+                latency_ms = (time.time() - start_time) * 1000
+                span.set_attribute("error.type", "request_error")
+                span.set_attribute("error.message", str(e))
+                span.record_exception(e)
+                metrics.record_mcp_discovery(
+                    success=False,
+                    latency_ms=latency_ms,
+                    error=str(e),
+                )
+                return MCPDiscoveryResponse(
+                    success=False,
+                    error=f"Request failed: {str(e)}",
+                )
     
     async def invoke_tool(
         self,
         tool_name: str,
         arguments: dict[str, Any] = None,
         payment_signature: Optional[str] = None,
+        stream: bool = False,
+        prepay: bool = False,
     ) -> MCPInvocationResponse:
         """
         Invoke an MCP tool via the Gateway.
@@ -356,14 +1124,108 @@ class MCPClient:
         The endpoint path is determined from the tool definition discovered during
         MCP tool discovery.
         
+        With ``stream=True`` the body is read incrementally, capped at
+        ``max_response_bytes`` and spooled to disk past ``spool_threshold_bytes``.
+        ``data`` is then an MCPResponseBody that parses JSON on demand; the
+        caller should close it when done.
+        
+        Unpaid calls to tools that do not require payment go through the
+        response cache: fresh entries are returned without a request and stale
+        ones are revalidated with a conditional GET. Cached ``data`` is shared
+        between callers and should be treated as read-only.
+        
+        Transport errors and retryable statuses (429/5xx by default) are
+        retried per ``config.retry``. A paid retry resends the same signed
+        payload; it is never re-signed.
+        
+        If the endpoint's circuit breaker is open the call is not sent; the
+        response has ``circuit_open=True`` and ``retry_after_seconds`` set.
+        
+        With ``prepay=True`` and no signature, a tool approved by the
+        prepayment policy is paid up front at its advertised price. If the
+        seller still answers 402 (its requirements differ from discovery),
+        that 402 is returned for the normal analyze/sign/retry flow.
+        
         Args:
             tool_name: Name of the tool to invoke
             arguments: Tool arguments (currently unused for content tools)
             payment_signature: Optional x402 payment signature (Base64-encoded)
+            stream: Stream the body into a spool instead of buffering it
+            prepay: Pre-pay approved tools when no signature is given
             
         Returns:
             MCPInvocationResponse with the result
         """
+        prepaid_requirement = None
+        if prepay and not payment_signature:
+            prepayment = await self._prepare_prepayment(tool_name)
+            if prepayment is not None:
+                prepaid_requirement, payment_payload = prepayment
+                payment_signature = encode_payment_signature(payment_payload)
+        
+        response = await self._invoke_tool(tool_name, arguments, payment_signature, stream)
+        
+        if prepaid_requirement is not None:
+            self._record_prepayment(tool_name, prepaid_requirement, response)
+        return response
+    
+    async def _prepare_prepayment(
+        self, tool_name: str
+    ) -> Optional[tuple[dict[str, Any], dict[str, Any]]]:
+        """
+        Sign the advertised requirement for a tool approved for pre-payment.
+        
+        Returns:
+            (requirement, signed payload), or None if the tool is not eligible
+            or signing failed
+        """
+        tool_def = next((t for t in self._tools_cache if t.name == tool_name), None)
+        if tool_def is None or not self._prepayment_policy.allows(tool_def):
+            return None
+        
+        requirement = advertised_requirement(tool_def)
+        self._prepayment_stats.attempted += 1
+        try:
+            # Wallet signing is blocking; keep it off the event loop
+            payload = await asyncio.to_thread(self._payment_signer, requirement)
+        except Exception as e:
+            logger.warning(f"Pre-payment signing for {tool_name} failed: {e}")
+            payload = None
+        
+        if payload is None:
+            self._prepayment_stats.signing_failures += 1
+            return None
+        return requirement, payload
+    
+    def _record_prepayment(
+        self,
+        tool_name: str,
+        requirement: dict[str, Any],
+        response: MCPInvocationResponse,
+    ) -> None:
+        """Mark an accepted pre-payment, or log why the 402 flow takes over."""
+        if response.success:
+            response.prepaid = True
+            self._prepayment_stats.accepted += 1
+            return
+        if response.status_code == 402:
+            self._prepayment_stats.fallbacks += 1
+            if requirement_matches(requirement, response.payment_required):
+                logger.info(f"Pre-payment for {tool_name} was rejected; falling back to 402 flow")
+            else:
+                logger.info(
+                    f"Seller requirements for {tool_name} differ from discovery; "
+                    "falling back to 402 flow"
+                )
+    
+    async def _invoke_tool(
+        self,
+        tool_name: str,
+        arguments: Optional[dict[str, Any]],
+        payment_signature: Optional[str],
+        stream: bool,
+    ) -> MCPInvocationResponse:
+        """Send one invocation; see invoke_tool."""
         tracer = get_tracer()
         metrics = get_metrics_emitter()
         
@@ -392,6 +1254,7 @@ class MCPClient:
             span.set_attribute("mcp.tool_name", tool_name)
             span.set_attribute("mcp.endpoint_path", endpoint_path)
             span.set_attribute("mcp.has_payment", payment_signature is not None)
+            span.set_attribute("mcp.stream", stream)
             
             # Build the full URL to the content endpoint
             invoke_url = f"{self.config.gateway_url}{endpoint_path}"
@@ -403,131 +1266,550 @@ class MCPClient:
             
             # Add payment signature header if provided
             if payment_signature:
-                headers["X-PAYMENT-SIGNATURE"] = payment_signature
+                headers[PAYMENT_SIGNATURE_HEADER] = payment_signature
+            
+            # Free tools can be answered from the response cache
+            cacheable = (
+                tool_def is not None
+                and not tool_def.requires_payment
+                and not payment_signature
+                and not stream
+            )
+            cached = self._response_cache.lookup(invoke_url, headers) if cacheable else None
+            span.set_attribute("mcp.cache_hit", cached is not None and cached.is_fresh())
+            if cached is not None and cached.is_fresh():
+                return MCPInvocationResponse(
+                    success=True,
+                    status_code=200,
+                    data=cached.data,
+                    headers=cached.headers,
+                    from_cache=True,
+                )
+            
+            breaker = self._breakers.get(endpoint_path)
+            if not breaker.allow():
+                retry_after = breaker.retry_after()
+                span.set_attribute("mcp.circuit_open", True)
+                metrics.record_circuit_breaker(
+                    endpoint_path, breaker.state.value, rejected=True
+                )
+                return MCPInvocationResponse(
+                    success=False,
+                    status_code=0,
+                    error=(
+                        f"Endpoint {endpoint_path} is unavailable (circuit open); "
+                        f"retry in {retry_after:.0f}s"
+                    ),
+                    circuit_open=True,
+                    retry_after_seconds=retry_after,
+                )
             
             start_time = time.time()
             
-            async with httpx.AsyncClient() as client:
-                try:
-                    # Make GET request to the content endpoint
-                    response = await client.get(
-                        invoke_url,
-                        headers=headers,
-                        timeout=self.config.timeout_seconds,
-                        follow_redirects=True,
-                    )
-                    
-                    latency_ms = (time.time() - start_time) * 1000
-                    span.set_attribute("http.status_code", response.status_code)
-                    span.set_attribute("mcp.invoke_latency_ms", latency_ms)
-                    
-                    # Extract x402 headers
-                    response_headers = dict(response.headers)
-                    payment_required = None
-                    payment_response = None
-                    
-                    # Check for payment required header (both X- prefixed and non-prefixed)
-                    payment_required_header = (
-                        response_headers.get("X-PAYMENT-REQUIRED") or
-                        response_headers.get("x-payment-required") or
-                        response_headers.get("PAYMENT-REQUIRED") or
-                        response_headers.get("payment-required")
+            client = await self._get_http_client()
+
+            try:
+                # Make GET request to the content endpoint
+                response, body = await self._send_with_retry(
+                    client,
+                    invoke_url,
+                    {**headers, **ResponseCache.conditional_headers(cached)},
+                    stream,
+                    span,
+                    breaker,
+                    tool_name,
+                )
+                if body is not None:
+                    span.set_attribute("mcp.response_bytes", body.size)
+                
+                latency_ms = (time.time() - start_time) * 1000
+                span.set_attribute("http.status_code", response.status_code)
+                span.set_attribute("mcp.invoke_latency_ms", latency_ms)
+                
+                # Extract x402 headers (read in place, decoded through the shared codec)
+                payment_required = read_payment_required(response.headers)
+                if payment_required is not None:
+                    span.set_attribute("mcp.payment_required", True)
+                payment_response = read_payment_response(response.headers)
+                if payment_response is not None:
+                    span.set_attribute("mcp.payment_settled", True)
+                response_headers = dict(response.headers)
+                
+                # Handle different status codes
+                if response.status_code == 304 and cached is not None:
+                    # Revalidated: the cached body is still current
+                    self._response_cache.refresh(cached, response_headers)
+                    span.set_attribute("mcp.cache_revalidated", True)
+                    metrics.record_mcp_invocation(
+                        success=True,
+                        tool_name=tool_name,
+                        latency_ms=latency_ms,
                     )
-                    if payment_required_header:
-                        try:
-                            payment_required = json.loads(
-                                base64.b64decode(payment_required_header)
-                            )
-                            span.set_attribute("mcp.payment_required", True)
-                        except Exception:
-                            payment_required = {"raw": payment_required_header}
-                    
-                    # Check for payment response header
-                    payment_response_header = (
-                        response_headers.get("X-PAYMENT-RESPONSE") or
-                        response_headers.get("x-payment-response") or
-                        response_headers.get("PAYMENT-RESPONSE") or
-                        response_headers.get("payment-response")
+                    return MCPInvocationResponse(
+                        success=True,
+                        status_code=200,
+                        data=cached.data,
+                        headers=cached.headers,
+                        from_cache=True,
                     )
-                    if payment_response_header:
-                        try:
-                            payment_response = json.loads(
-                                base64.b64decode(payment_response_header)
-                            )
-                            span.set_attribute("mcp.payment_settled", True)
-                        except Exception:
-                            payment_response = {"raw": payment_response_header}
-                    
-                    # Handle different status codes
-                    if response.status_code == 200:
-                        metrics.record_mcp_invocation(
-                            success=True,
-                            tool_name=tool_name,
-                            latency_ms=latency_ms,
-                        )
-                        return MCPInvocationResponse(
-                            success=True,
-                            status_code=200,
-                            data=response.json() if response.content else None,
-                            payment_response=payment_response,
-                            headers=response_headers,
-                        )
-                    
-                    if response.status_code == 402:
-                        span.set_attribute("mcp.payment_required", True)
-                        
-                        # Try to get payment requirements from response body if not in header
-                        if not payment_required and response.content:
-                            try:
-                                payment_required = response.json()
-                            except Exception:
-                                pass
-                        
-                        metrics.record_mcp_invocation(
-                            success=False,
-                            tool_name=tool_name,
-                            latency_ms=latency_ms,
-                            payment_required=True,
-                        )
-                        return MCPInvocationResponse(
-                            success=False,
-                            status_code=402,
-                            payment_required=payment_required,
-                            data=response.json() if response.content else None,
-                            headers=response_headers,
+                
+                if response.status_code == 200:
+                    data = self._response_data(response, body)
+                    if cacheable:
+                        self._response_cache.store(
+                            invoke_url,
+                            headers,
+                            response.status_code,
+                            response_headers,
+                            data,
+                            len(response.content),
                         )
-                    
-                    # Other error status codes
                     metrics.record_mcp_invocation(
-                        success=False,
+                        success=True,
                         tool_name=tool_name,
                         latency_ms=latency_ms,
-                        error=f"status_{response.status_code}",
                     )
                     return MCPInvocationResponse(
-                        success=False,
-                        status_code=response.status_code,
-                        error=f"Invocation failed with status {response.status_code}",
-                        data=response.json() if response.content else None,
+                        success=True,
+                        status_code=200,
+                        data=data,
+                        payment_response=payment_response,
                         headers=response_headers,
                     )
+                
+                if response.status_code == 402:
+                    span.set_attribute("mcp.payment_required", True)
+                    
+                    # Parse the body once; it is both the data and the fallback requirements
+                    data = None
+                    try:
+                        data = self._response_data(response, body)
+                        # Try to get payment requirements from response body if not in header
+                        if not payment_required and data is not None:
+                            payment_required = (
+                                data.json() if isinstance(data, MCPResponseBody) else data
+                            )
+                    except (json.JSONDecodeError, ValueError):
+                        pass
                     
-                except httpx.RequestError as e:
-                    latency_ms = (time.time() - start_time) * 1000
-                    span.set_attribute("error.type", "request_error")
-                    span.set_attribute("error.message", str(e))
-                    span.record_exception(e)
                     metrics.record_mcp_invocation(
                         success=False,
                         tool_name=tool_name,
                         latency_ms=latency_ms,
-                        error=str(e),
+                        payment_required=True,
                     )
                     return MCPInvocationResponse(
                         success=False,
-                        status_code=0,
-                        error=f"Request failed: {str(e)}",
+                        status_code=402,
+                        payment_required=payment_required,
+                        data=data,
+                        headers=response_headers,
+                    )
+                
+                # Other error status codes
+                metrics.record_mcp_invocation(
+                    success=False,
+                    tool_name=tool_name,
+                    latency_ms=latency_ms,
+                    error=f"status_{response.status_code}",
+                )
+                return MCPInvocationResponse(
+                    success=False,
+                    status_code=response.status_code,
+                    error=f"Invocation failed with status {response.status_code}",
+                    data=self._response_data(response, body),
+                    headers=response_headers,
+                )
+                
+            except MCPResponseTooLarge as e:
+                latency_ms = (time.time() - start_time) * 1000
+                span.set_attribute("error.type", "response_too_large")
+                span.set_attribute("error.message", str(e))
+                metrics.record_mcp_invocation(
+                    success=False,
+                    tool_name=tool_name,
+                    latency_ms=latency_ms,
+                    error="response_too_large",
+                )
+                return MCPInvocationResponse(
+                    success=False,
+                    status_code=0,
+                    error=str(e),
+                )
+                
+            except RateLimitExceeded as e:
+                latency_ms = (time.time() - start_time) * 1000
+                span.set_attribute("error.type", "rate_limited")
+                metrics.record_mcp_invocation(
+                    success=False,
+                    tool_name=tool_name,
+                    latency_ms=latency_ms,
+                    error="rate_limited",
+                )
+                return MCPInvocationResponse(
+                    success=False,
+                    status_code=429,
+                    error=str(e),
+                    retry_after_seconds=e.wait_time,
+                )
+                
+            except httpx.RequestError as e:
+                latency_ms = (time.time() - start_time) * 1000
+                span.set_attribute("error.type", "request_error")
+                span.set_attribute("error.message", str(e))
+                span.record_exception(e)
+                metrics.record_mcp_invocation(
+                    success=False,
+                    tool_name=tool_name,
+                    latency_ms=latency_ms,
+                    error=str(e),
+                )
+                return MCPInvocationResponse(
+                    success=False,
+                    status_code=0,
+                    error=f"Request failed: {str(e)}",
+                )
+    
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: dict[str, str],
+        stream: bool,
+    ) -> tuple[httpx.Response, Optional[MCPResponseBody]]:
+        """Send a single GET, streamed or buffered."""
+        self._in_flight += 1
+        try:
+            if stream:
+                return await self._get_streamed(client, url, headers)
+            response = await client.get(
+                url,
+                headers=headers,
+                timeout=self.config.timeout_seconds,
+                follow_redirects=True,
+            )
+            return response, None
+        finally:
+            self._in_flight -= 1
+    
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> Optional[float]:
+        """
+        Decide whether to retry and how long to wait first.
+        
+        Args:
+            attempt: Zero-based retry number
+            response: The retryable response, or None after a transport error
+            
+        Returns:
+            Seconds to wait, or None if the failure should be returned as is
+        """
+        policy = self.config.retry
+        if attempt >= policy.max_retries:
+            return None
+        
+        retry_after = None
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            if retry_after is not None and retry_after > policy.max_retry_after_seconds:
+                return None
+        
+        if not self._retry_budget.try_withdraw():
+            self._retry_stats.budget_exhausted += 1
+            return None
+        
+        if retry_after is not None:
+            return retry_after
+        return backoff_delay(attempt, policy, random.random)
+    
+    async def _send_with_retry(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: dict[str, str],
+        stream: bool,
+        span: Any,
+        breaker: CircuitBreaker,
+        tool_name: Optional[str] = None,
+    ) -> tuple[httpx.Response, Optional[MCPResponseBody]]:
+        """
+        Send a GET, retrying transport errors and retryable statuses.
+        
+        The same headers, including any payment signature, are sent on every
+        attempt. Each attempt first takes a token from the host's rate limiter,
+        and its outcome is recorded on the endpoint's circuit breaker;
+        retrying stops as soon as the breaker opens. The last response (or
+        transport error) is returned when retries or the retry budget run out.
+        
+        Raises:
+            httpx.RequestError: If the final attempt fails at the transport level
+            RateLimitExceeded: If a token cannot be had within max_wait_time
+        """
+        self._retry_budget.record_request()
+        attempt = 0
+        
+        while True:
+            await self._rate_limiters.acquire_async(url, tool_name, span)
+            self._retry_stats.attempts += 1
+            started = time.monotonic()
+            try:
+                response, body = await self._send_hedged(
+                    client, url, headers, stream, tool_name
+                )
+            except httpx.TransportError as e:
+                breaker.record_failure(time.monotonic() - started)
+                delay = self._retry_delay(attempt, None) if breaker.allow() else None
+                if delay is None:
+                    raise
+                logger.info(f"Retrying {url} after transport error: {e}")
+            else:
+                elapsed = time.monotonic() - started
+                breaker.record(response.status_code >= 500, elapsed)
+                self._rate_limiters.record_response(
+                    url, tool_name, response.status_code, response.headers.get("retry-after")
+                )
+                if response.status_code not in self.config.retry.retry_statuses:
+                    self._latencies.record(
+                        "mcp_request",
+                        elapsed * 1000,
+                        tool=tool_name,
+                        endpoint=endpoint_path(url),
+                        outcome=http_outcome(response.status_code),
                     )
+                    return response, body
+                delay = self._retry_delay(attempt, response) if breaker.allow() else None
+                if delay is None:
+                    return response, body
+                if body is not None:
+                    body.close()
+                logger.info(f"Retrying {url} after status {response.status_code}")
+            
+            attempt += 1
+            self._retry_stats.retries += 1
+            span.set_attribute("mcp.retries", attempt)
+            await asyncio.sleep(delay)
+    
+    async def _send_hedged(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: dict[str, str],
+        stream: bool,
+        tool_name: Optional[str] = None,
+    ) -> tuple[httpx.Response, Optional[MCPResponseBody]]:
+        """
+        Send a GET, firing a second copy if the first is slower than usual.
+        
+        Hedging only applies to unpaid, buffered requests once enough latency
+        samples exist for the endpoint; the first successful copy wins and the
+        other is cancelled. A hedge is only sent if the rate limiter has a
+        token to spare right away.
+        """
+        policy = self.config.retry
+        delay = None
+        if policy.hedge and not stream and PAYMENT_SIGNATURE_HEADER not in headers:
+            delay_ms = self._latencies.percentile(
+                "mcp_request",
+                policy.hedge_percentile,
+                endpoint=endpoint_path(url),
+                min_samples=policy.hedge_min_samples,
+            )
+            if delay_ms is not None:
+                delay = delay_ms / 1000
+        if delay is None:
+            return await self._send(client, url, headers, stream)
+        
+        primary = asyncio.ensure_future(self._send(client, url, headers, stream))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait(
+                {primary}, timeout=max(delay, policy.hedge_min_delay_seconds)
+            )
+            if (
+                done
+                or not await self._rate_limiters.try_acquire_async(url, tool_name)
+                or not self._retry_budget.try_withdraw()
+            ):
+                return await primary
+            
+            hedge = asyncio.ensure_future(self._send(client, url, headers, stream))
+            self._retry_stats.hedges_sent += 1
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._retry_stats.hedges_won += 1
+                        return task.result()
+            # Both copies failed; surface the primary's error
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    async def _get_streamed(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: dict[str, str],
+    ) -> tuple[httpx.Response, MCPResponseBody]:
+        """
+        GET a URL and read its body incrementally into a size-capped spool.
+        
+        Raises:
+            MCPResponseTooLarge: If Content-Length or the bytes read exceed the cap
+        """
+        limit = self.config.max_response_bytes
+        request = client.build_request(
+            "GET", url, headers=headers, timeout=self.config.timeout_seconds
+        )
+        response = await client.send(request, stream=True, follow_redirects=True)
+        try:
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > limit:
+                raise MCPResponseTooLarge(limit, int(declared))
+            
+            spool = tempfile.SpooledTemporaryFile(max_size=self.config.spool_threshold_bytes)
+            size = 0
+            try:
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > limit:
+                        raise MCPResponseTooLarge(limit, size)
+                    spool.write(chunk)
+            except BaseException:
+                spool.close()
+                raise
+        finally:
+            await response.aclose()
+        
+        body = MCPResponseBody(spool, size, response.headers.get("content-type", ""))
+        return response, body
+    
+    @staticmethod
+    def _response_data(
+        response: httpx.Response,
+        body: Optional[MCPResponseBody],
+    ) -> Any:
+        """Get the response data: the streamed body handle, or the parsed JSON."""
+        if body is not None:
+            if body.size:
+                return body
+            body.close()
+            return None
+        return response.json() if response.content else None
+    
+    async def _invoke_call(
+        self,
+        call: MCPToolCall,
+        timeout_seconds: Optional[float],
+    ) -> MCPInvocationResponse:
+        """Invoke one batch call, bounding it by the per-call timeout."""
+        invocation = self.invoke_tool(
+            tool_name=call.tool_name,
+            arguments=call.arguments,
+            payment_signature=call.payment_signature,
+        )
+        if timeout_seconds is None:
+            return await invocation
+        try:
+            return await asyncio.wait_for(invocation, timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            return MCPInvocationResponse(
+                success=False,
+                status_code=0,
+                error=f"Invocation timed out after {timeout_seconds}s",
+            )
+    
+    async def invoke_many_as_completed(
+        self,
+        calls: list[Union[MCPToolCall, str]],
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+    ) -> AsyncIterator[MCPBatchItem]:
+        """
+        Invoke several tools concurrently, yielding results as they complete.
+        
+        Calls fan out over the shared connection pool with at most
+        ``max_concurrency`` requests in flight. If the caller stops iterating
+        early, the remaining calls are cancelled.
+        
+        Args:
+            calls: Tool calls, or bare tool names for calls without arguments
+            max_concurrency: Maximum calls in flight (defaults to config.max_batch_concurrency)
+            timeout_seconds: Optional overall timeout for each call
+            
+        Yields:
+            MCPBatchItem for each call, in completion order
+        """
+        normalized = [
+            MCPToolCall(tool_name=call) if isinstance(call, str) else call
+            for call in calls
+        ]
+        semaphore = asyncio.Semaphore(max_concurrency or self.config.max_batch_concurrency)
+        
+        async def run(index: int, call: MCPToolCall) -> MCPBatchItem:
+            async with semaphore:
+                response = await self._invoke_call(call, timeout_seconds)
+            return MCPBatchItem(index=index, call=call, response=response)
+        
+        tasks = [asyncio.ensure_future(run(i, call)) for i, call in enumerate(normalized)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def invoke_many(
+        self,
+        calls: list[Union[MCPToolCall, str]],
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+    ) -> MCPBatchResult:
+        """
+        Invoke several tools concurrently and collect the results.
+        
+        The wall time of the batch is roughly that of the slowest call. Calls
+        that return 402 are available from ``MCPBatchResult.payment_required``
+        so they can be signed together and retried in a second batch with
+        ``payment_signature`` set on each call.
+        
+        Args:
+            calls: Tool calls, or bare tool names for calls without arguments
+            max_concurrency: Maximum calls in flight (defaults to config.max_batch_concurrency)
+            timeout_seconds: Optional overall timeout for each call
+            
+        Returns:
+            MCPBatchResult with one item per call, in request order
+        """
+        tracer = get_tracer()
+        
+        with tracer.start_as_current_span("mcp.invoke_many") as span:
+            span.set_attribute("mcp.batch_size", len(calls))
+            start_time = time.time()
+            
+            items = [
+                item async for item in self.invoke_many_as_completed(
+                    calls,
+                    max_concurrency=max_concurrency,
+                    timeout_seconds=timeout_seconds,
+                )
+            ]
+            items.sort(key=lambda item: item.index)
+            
+            result = MCPBatchResult(
+                items=items,
+                wall_time_ms=(time.time() - start_time) * 1000,
+            )
+            span.set_attribute("mcp.batch_succeeded", len(result.succeeded))
+            span.set_attribute("mcp.batch_payment_required", len(result.payment_required))
+            span.set_attribute("mcp.batch_failed", len(result.failed))
+            span.set_attribute("mcp.batch_wall_time_ms", result.wall_time_ms)
+            return result
     
     def _generate_strands_tools(
         self,
@@ -536,6 +1818,12 @@ class MCPClient:
         """
         Generate Strands-compatible tool functions from MCP tool definitions.
         
+        Generation is incremental: wrappers are keyed by tool name and
+        definition fingerprint, so unchanged tools keep their existing function
+        objects and only new or changed tools are rebuilt. If nothing changed,
+        the current tool list itself is returned, so agents built from it
+        remain valid.
+        
         Args:
             tool_definitions: List of MCP tool definitions
             
@@ -543,12 +1831,29 @@ class MCPClient:
             List of Strands tool functions
         """
         tools = []
+        wrappers: dict[str, tuple[str, Callable]] = {}
+        changed = False
         
         for tool_def in tool_definitions:
-            # Create a tool function for each MCP tool
-            tool_func = self._create_tool_function(tool_def)
+            fingerprint = tool_def.fingerprint()
+            existing = self._tool_wrappers.get(tool_def.name)
+            if existing is not None and existing[0] == fingerprint:
+                tool_func = existing[1]
+                self._discovery_stats.tools_reused += 1
+            else:
+                # Create a tool function for each new or changed MCP tool
+                tool_func = self._create_tool_function(tool_def)
+                self._discovery_stats.tools_built += 1
+                changed = True
+            wrappers[tool_def.name] = (fingerprint, tool_func)
             tools.append(tool_func)
         
+        dropped = self._tool_wrappers.keys() - wrappers.keys()
+        self._discovery_stats.tools_dropped += len(dropped)
+        self._tool_wrappers = wrappers
+        
+        if not changed and not dropped and tools == self._strands_tools:
+            return self._strands_tools
         return tools
     
     def _create_tool_function(self, tool_def: MCPToolDefinition) -> Callable:
@@ -593,25 +1898,28 @@ class MCPClient:
             Returns:
                 Dictionary with status, content (if 200), or payment requirements (if 402)
             """
-            # Encode payment payload as base64 if provided
+            # Encode the payment payload once; retries reuse the same value
             payment_signature = None
             if payment_payload:
-                payment_signature = base64.b64encode(
-                    json.dumps(payment_payload).encode()
-                ).decode()
+                payment_signature = encode_payment_signature(payment_payload)
             
             response = await mcp_client.invoke_tool(
                 tool_name=tool_name,
                 arguments={},
                 payment_signature=payment_signature,
+                prepay=True,
             )
             
             if response.success:
-                return {
+                result = {
                     "status": 200,
                     "content": response.data,
                     "settlement": response.payment_response,
                 }
+                if response.prepaid:
+                    # Paid at the advertised price without a 402 round trip
+                    result["prepaid"] = True
+                return result
             
             if response.status_code == 402:
                 # Extract payment requirements in a format compatible with analyze_payment
@@ -641,6 +1949,13 @@ class MCPClient:
                     ),
                 }
             
+            if response.circuit_open:
+                return {
+                    "status": "unavailable",
+                    "error": response.error,
+                    "retry_after_seconds": response.retry_after_seconds,
+                }
+            
             return {
                 "status": response.status_code,
                 "error": response.error,
@@ -678,6 +1993,11 @@ class MCPClient:
         self._tools_cache = []
         self._cache_timestamp = 0
         self._strands_tools = []
+        self._tool_wrappers = {}
+        self._etag = None
+        self._last_modified = None
+        self._cache_max_age = None
+        self._response_cache.clear()
 
 
 # Global MCP client instance
@@ -692,6 +2012,19 @@ def get_mcp_client() -> MCPClient:
     return _mcp_client
 
 
+def current_mcp_client() -> Optional[MCPClient]:
+    """Get the global MCP client if one was created, without creating it."""
+    return _mcp_client
+
+
+async def close_mcp_client() -> None:
+    """Close the global MCP client's connection pool, if one was created."""
+    global _mcp_client
+    if _mcp_client is not None:
+        await _mcp_client.aclose()
+        _mcp_client = None
+
+
 async def discover_mcp_tools(
     gateway_url: Optional[str] = None,
     force_refresh: bool = False,
@@ -9,16 +9,47 @@ Metrics are organized into the following categories:
 - Payment Signing: Wallet operations and transaction signing
 - Content Requests: HTTP requests to seller infrastructure
 - Wallet Operations: Balance checks and faucet requests
+
+MetricsEmitter writes one EMF line per call. BufferedMetricsEmitter instead
+collects samples per dimension set and writes them from a background thread
+as EMF value arrays, many observations per line; it is used when
+METRICS_FLUSH_INTERVAL_SECONDS is set.
+
+Every latency recorded by the record_* helpers also feeds the in-process
+sketches of agent.latency_sketch, which export p50/p90/p99/max per operation,
+tool, endpoint and outcome as the Latency* metrics. With PROMETHEUS_ENABLED,
+every metric is also recorded in the Prometheus registry served on /metrics.
+
+Error messages are reported as stable error classes (agent.cardinality), and
+the emitter created by get_metrics_emitter() limits the distinct values of
+ContentPath, ErrorType, ToolName and RejectionReason to the budgets of
+METRIC_DIMENSION_BUDGETS, reporting the long tail as "other".
+
+Usage:
+    from agent.metrics import get_metrics_emitter
+    
+    get_metrics_emitter().record_mcp_invocation(True, "get_weather", 120.0)
 """
 
-import json
+import atexit
 import logging
 import os
-import time
+import sys
+import threading
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Optional
 
+from .cardinality import CardinalityGovernor, error_class
+from .emf_encoder import EMFEncoder
+from .latency_sketch import (
+    LatencyHistograms,
+    endpoint_path,
+    get_latency_histograms,
+    http_outcome,
+)
+from .prometheus import EMFMirror, get_prometheus_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,6 +59,7 @@ class MetricUnit(str, Enum):
     MILLISECONDS = "Milliseconds"
     BYTES = "Bytes"
     PERCENT = "Percent"
+    COUNT_PER_SECOND = "Count/Second"
     NONE = "None"
 
 
@@ -63,6 +95,11 @@ class PayerMetricName(str, Enum):
     PAYMENT_AMOUNT_WEI = "PaymentAmountWei"
     PAYMENT_AMOUNT_ETH = "PaymentAmountETH"
     
+    # Payment Requirements (Quote) Cache Metrics
+    PAYMENT_QUOTE_LOOKUP = "PaymentQuoteLookup"
+    PAYMENT_QUOTE_CACHE_HIT = "PaymentQuoteCacheHit"
+    PAYMENT_QUOTE_CACHE_HIT_RATE = "PaymentQuoteCacheHitRate"
+    
     # MCP Tool Discovery Metrics
     MCP_DISCOVERY_COUNT = "MCPDiscoveryCount"
     MCP_DISCOVERY_SUCCESS = "MCPDiscoverySuccess"
@@ -77,11 +114,56 @@ class PayerMetricName(str, Enum):
     MCP_INVOCATION_402 = "MCPInvocation402"
     MCP_INVOCATION_LATENCY = "MCPInvocationLatency"
     
+    # MCP Circuit Breaker Metrics
+    MCP_CIRCUIT_STATE = "MCPCircuitState"
+    MCP_CIRCUIT_OPENED = "MCPCircuitOpened"
+    MCP_CIRCUIT_REJECTED = "MCPCircuitRejected"
+    
+    # Client-side Rate Limiter Metrics
+    RATE_LIMIT_EFFECTIVE_RATE = "RateLimitEffectiveRate"
+    RATE_LIMIT_THROTTLED = "RateLimitThrottled"
+    RATE_LIMIT_REQUESTS = "RateLimitRequests"
+    RATE_LIMIT_REJECTED = "RateLimitRejected"
+    RATE_LIMIT_WAIT_P50 = "RateLimitWaitP50"
+    RATE_LIMIT_WAIT_P95 = "RateLimitWaitP95"
+    RATE_LIMIT_WAIT_P99 = "RateLimitWaitP99"
+    RATE_LIMIT_WAIT_MAX = "RateLimitWaitMax"
+    RATE_LIMIT_QUEUE_DEPTH = "RateLimitQueueDepth"
+    RATE_LIMIT_AVAILABLE_TOKENS = "RateLimitAvailableTokens"
+    
+    # Latency Percentile Metrics (per operation, from in-process sketches)
+    LATENCY_SAMPLES = "LatencySamples"
+    LATENCY_P50 = "LatencyP50"
+    LATENCY_P90 = "LatencyP90"
+    LATENCY_P99 = "LatencyP99"
+    LATENCY_MAX = "LatencyMax"
+    
     # Error Metrics
     AGENT_ERROR_COUNT = "AgentErrorCount"
     VALIDATION_ERROR_COUNT = "ValidationErrorCount"
 
 
+# Prometheus kinds where the unit alone would be wrong: Count metrics that are
+# levels, millisecond metrics that are precomputed percentiles, and running sums
+PROMETHEUS_GAUGES = frozenset(name.value for name in (
+    PayerMetricName.MCP_TOOLS_DISCOVERED,
+    PayerMetricName.RATE_LIMIT_WAIT_P50,
+    PayerMetricName.RATE_LIMIT_WAIT_P95,
+    PayerMetricName.RATE_LIMIT_WAIT_P99,
+    PayerMetricName.RATE_LIMIT_WAIT_MAX,
+    PayerMetricName.RATE_LIMIT_QUEUE_DEPTH,
+    PayerMetricName.LATENCY_SAMPLES,
+    PayerMetricName.LATENCY_P50,
+    PayerMetricName.LATENCY_P90,
+    PayerMetricName.LATENCY_P99,
+    PayerMetricName.LATENCY_MAX,
+))
+PROMETHEUS_COUNTERS = frozenset(name.value for name in (
+    PayerMetricName.PAYMENT_AMOUNT_WEI,
+    PayerMetricName.PAYMENT_AMOUNT_ETH,
+))
+
+
 @dataclass
 class MetricDimensions:
     """Dimensions for CloudWatch metrics."""
@@ -91,6 +173,9 @@ class MetricDimensions:
     rejection_reason: Optional[str] = None
     error_type: Optional[str] = None
     content_path: Optional[str] = None
+    operation: Optional[str] = None
+    tool_name: Optional[str] = None
+    outcome: Optional[str] = None
     
     def to_dict(self) -> dict[str, str]:
         """Convert to dictionary, excluding None values."""
@@ -105,6 +190,12 @@ class MetricDimensions:
             result["ErrorType"] = self.error_type
         if self.content_path:
             result["ContentPath"] = self.content_path
+        if self.operation:
+            result["Operation"] = self.operation
+        if self.tool_name:
+            result["ToolName"] = self.tool_name
+        if self.outcome:
+            result["Outcome"] = self.outcome
         return result
 
 
@@ -118,67 +209,67 @@ class MetricsEmitter:
     
     NAMESPACE = "X402PayerAgent"
     
-    def __init__(self, service_name: str = "x402-payer-agent"):
+    def __init__(
+        self,
+        service_name: str = "x402-payer-agent",
+        json_backend: str = "auto",
+        latencies: Optional[LatencyHistograms] = None,
+        prometheus: Optional[EMFMirror] = None,
+        governor: Optional[CardinalityGovernor] = None,
+    ):
         """
         Initialize the metrics emitter.
         
         Args:
             service_name: Service name for metric attribution
+            json_backend: JSON encoder for properties: "auto" (orjson if
+                installed), "json" or "orjson"
+            latencies: Sketches fed by every recorded latency. Uses the
+                global get_latency_histograms() if not provided.
+            prometheus: Mirror recording every metric for /metrics as well
+            governor: Budgets of distinct dimension values; dimensions are
+                not limited if not provided
         """
         self.service_name = service_name
         self._pending_metrics: list[dict[str, Any]] = []
         self._dimensions = MetricDimensions()
+        self._encoder = EMFEncoder(self.NAMESPACE, service_name, json_backend)
+        self._latencies = latencies
+        self._prometheus = prometheus
+        self._governor = governor
+    
+    @property
+    def latencies(self) -> LatencyHistograms:
+        """Sketches fed by the latencies of the record_* helpers."""
+        if self._latencies is None:
+            self._latencies = get_latency_histograms()
+        return self._latencies
+    
+    def _dimension_dict(self, dimensions: Optional[MetricDimensions]) -> dict[str, str]:
+        """Get the dimensions to report, within the governor's budgets."""
+        dim_dict = (dimensions or self._dimensions).to_dict()
+        if self._governor is not None:
+            return self._governor.apply(dim_dict)
+        return dim_dict
     
-    def _create_emf_log(
+    def _encode_emf_log(
         self,
-        metrics: dict[str, tuple[float, MetricUnit]],
-        dimensions: Optional[MetricDimensions] = None,
+        metrics: dict[str, tuple[Any, MetricUnit]],
+        dimensions: dict[str, str],
         properties: Optional[dict[str, Any]] = None,
-    ) -> dict[str, Any]:
+    ) -> str:
         """
-        Create an EMF-formatted log entry.
+        Encode an EMF-formatted log line.
         
         Args:
             metrics: Dictionary of metric name to (value, unit) tuples
-            dimensions: Optional custom dimensions
+            dimensions: Dimension name to value, as returned by _dimension_dict
             properties: Additional properties to include in the log
             
         Returns:
-            EMF-formatted dictionary
-        """
-        dims = dimensions or self._dimensions
-        dim_dict = dims.to_dict()
-        
-        # Build metrics array for EMF
-        metrics_array = [
-            {"Name": name, "Unit": unit.value}
-            for name, (_, unit) in metrics.items()
-        ]
-        
-        emf_log: dict[str, Any] = {
-            "_aws": {
-                "Timestamp": int(time.time() * 1000),
-                "CloudWatchMetrics": [
-                    {
-                        "Namespace": self.NAMESPACE,
-                        "Dimensions": [list(dim_dict.keys())],
-                        "Metrics": metrics_array,
-                    }
-                ],
-            },
-            "service": self.service_name,
-            **dim_dict,
-        }
-        
-        # Add metric values
-        for name, (value, _) in metrics.items():
-            emf_log[name] = value
-        
-        # Add additional properties
-        if properties:
-            emf_log.update(properties)
-        
-        return emf_log
+            EMF JSON document
+        """
+        return self._encoder.encode(metrics, dimensions, properties)
     
     def emit(
         self,
@@ -198,13 +289,13 @@ class MetricsEmitter:
             dimensions: Optional custom dimensions
             properties: Additional properties to log
         """
-        emf_log = self._create_emf_log(
-            {metric_name.value: (value, unit)},
-            dimensions,
-            properties,
-        )
-        # Print to stdout for CloudWatch to pick up
-        print(json.dumps(emf_log))
+        metrics_dict = {metric_name.value: (value, unit)}
+        dim_dict = self._dimension_dict(dimensions)
+        if self._prometheus is not None:
+            self._prometheus.observe(metrics_dict, dim_dict)
+        line = self._encode_emf_log(metrics_dict, dim_dict, properties)
+        # Write to stdout for CloudWatch to pick up
+        sys.stdout.write(line + "\n")
     
     def emit_multiple(
         self,
@@ -220,9 +311,12 @@ class MetricsEmitter:
             dimensions: Optional custom dimensions
             properties: Additional properties to log
         """
-        metrics_dict = {name.value: value_unit for name, value_unit in metrics.items()}
-        emf_log = self._create_emf_log(metrics_dict, dimensions, properties)
-        print(json.dumps(emf_log))
+        # _value_ is the member's plain attribute; .value goes through a descriptor
+        metrics_dict = {name._value_: value_unit for name, value_unit in metrics.items()}
+        dim_dict = self._dimension_dict(dimensions)
+        if self._prometheus is not None:
+            self._prometheus.observe(metrics_dict, dim_dict)
+        sys.stdout.write(self._encode_emf_log(metrics_dict, dim_dict, properties) + "\n")
     
     # Convenience methods for common metrics
     
@@ -248,6 +342,9 @@ class MetricsEmitter:
             currency=currency,
             rejection_reason=rejection_reason if not approved else None,
         )
+        self.latencies.record(
+            "payment_analysis", latency_ms, outcome="approved" if approved else "rejected"
+        )
         
         metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
             PayerMetricName.PAYMENT_ANALYSIS_COUNT: (1, MetricUnit.COUNT),
@@ -285,11 +382,15 @@ class MetricsEmitter:
             latency_ms: Time taken for signing in milliseconds
             network: Blockchain network
             amount: Payment amount
-            error: Error message if failed
+            error: Error message if failed; the ErrorType dimension is its
+                error_class()
         """
         dims = MetricDimensions(
             network=network,
-            error_type=error[:50] if error else None,
+            error_type=error_class(error) if error else None,
+        )
+        self.latencies.record(
+            "payment_signing", latency_ms, outcome="success" if success else "error"
         )
         
         metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
@@ -332,8 +433,12 @@ class MetricsEmitter:
             payment_required: Whether 402 was returned
             error: Error message if request failed
         """
-        dims = MetricDimensions(
-            content_path=content_path[:50] if content_path else None,
+        dims = MetricDimensions(content_path=content_path)
+        self.latencies.record(
+            "content_request",
+            latency_ms,
+            endpoint=endpoint_path(content_path),
+            outcome=http_outcome(status_code),
         )
         
         metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
@@ -429,11 +534,11 @@ class MetricsEmitter:
         Record an error.
         
         Args:
-            error_type: Type of error
+            error_type: Type of error; the ErrorType dimension is its error_class()
             error_message: Error message
             operation: Operation that failed
         """
-        dims = MetricDimensions(error_type=error_type[:50])
+        dims = MetricDimensions(error_type=error_class(error_type))
         
         self.emit(
             PayerMetricName.AGENT_ERROR_COUNT,
@@ -447,6 +552,30 @@ class MetricsEmitter:
             },
         )
     
+    def record_quote_lookup(
+        self,
+        hit: bool,
+        content_path: str,
+        hit_rate: float,
+    ) -> None:
+        """
+        Record a payment requirements cache lookup.
+        
+        Args:
+            hit: Whether cached requirements were used instead of a probe
+            content_path: Endpoint path that was quoted
+            hit_rate: Cumulative cache hit rate in percent
+        """
+        dims = MetricDimensions(content_path=content_path)
+        
+        metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
+            PayerMetricName.PAYMENT_QUOTE_LOOKUP: (1, MetricUnit.COUNT),
+            PayerMetricName.PAYMENT_QUOTE_CACHE_HIT: (1 if hit else 0, MetricUnit.COUNT),
+            PayerMetricName.PAYMENT_QUOTE_CACHE_HIT_RATE: (hit_rate, MetricUnit.PERCENT),
+        }
+        
+        self.emit_multiple(metrics, dims, {"cacheHit": hit})
+    
     def record_mcp_discovery(
         self,
         success: bool,
@@ -464,7 +593,10 @@ class MetricsEmitter:
             error: Error message if failed
         """
         dims = MetricDimensions(
-            error_type=error[:50] if error else None,
+            error_type=error_class(error) if error else None,
+        )
+        self.latencies.record(
+            "mcp_discovery", latency_ms, outcome="success" if success else "error"
         )
         
         metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
@@ -503,8 +635,15 @@ class MetricsEmitter:
             error: Error message if failed
         """
         dims = MetricDimensions(
-            error_type=error[:50] if error else None,
+            error_type=error_class(error) if error else None,
         )
+        if success:
+            outcome = "success"
+        elif payment_required:
+            outcome = "payment_required"
+        else:
+            outcome = "error"
+        self.latencies.record("mcp_invocation", latency_ms, tool=tool_name, outcome=outcome)
         
         metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
             PayerMetricName.MCP_INVOCATION_COUNT: (1, MetricUnit.COUNT),
@@ -523,17 +662,381 @@ class MetricsEmitter:
             properties["error"] = error
         
         self.emit_multiple(metrics, dims, properties)
+    
+    # Numeric encoding of circuit states for the MCPCircuitState gauge
+    CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+    
+    def record_circuit_breaker(
+        self,
+        endpoint: str,
+        state: str,
+        rejected: bool = False,
+    ) -> None:
+        """
+        Record a circuit breaker state change or a rejected call.
+        
+        Args:
+            endpoint: Endpoint path the breaker protects
+            state: Breaker state ("closed", "half_open" or "open")
+            rejected: Whether a call was rejected because the circuit is open
+        """
+        dims = MetricDimensions(content_path=endpoint)
+        
+        metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
+            PayerMetricName.MCP_CIRCUIT_STATE: (
+                self.CIRCUIT_STATE_VALUES.get(state, 0), MetricUnit.NONE
+            ),
+        }
+        
+        if rejected:
+            metrics[PayerMetricName.MCP_CIRCUIT_REJECTED] = (1, MetricUnit.COUNT)
+        elif state == "open":
+            metrics[PayerMetricName.MCP_CIRCUIT_OPENED] = (1, MetricUnit.COUNT)
+        
+        self.emit_multiple(metrics, dims, {"endpoint": endpoint, "circuitState": state})
+    
+    def record_rate_limit(
+        self,
+        key: str,
+        rate: float,
+        throttled: bool = False,
+    ) -> None:
+        """
+        Record the effective rate of an adaptive rate limiter.
+        
+        Args:
+            key: Limiter key (host, or host/tool)
+            rate: Current refill rate in requests per second
+            throttled: Whether the rate was cut after a 429, 503 or Retry-After
+        """
+        dims = MetricDimensions(content_path=key)
+        
+        metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
+            PayerMetricName.RATE_LIMIT_EFFECTIVE_RATE: (rate, MetricUnit.COUNT_PER_SECOND),
+        }
+        
+        if throttled:
+            metrics[PayerMetricName.RATE_LIMIT_THROTTLED] = (1, MetricUnit.COUNT)
+        
+        self.emit_multiple(metrics, dims, {"rateLimitKey": key})
+    
+    def record_rate_limit_saturation(
+        self,
+        key: str,
+        requests: int,
+        throttled_requests: int,
+        wait_p50_ms: float,
+        wait_p95_ms: float,
+        wait_p99_ms: float,
+        wait_max_ms: float,
+        queue_depth: int,
+        available_tokens: float,
+        burst_capacity: int,
+    ) -> None:
+        """
+        Record a rate limiter's wait times and saturation over a report window.
+        
+        Args:
+            key: Limiter key (host, or host/tool)
+            requests: Blocking acquires admitted in the window
+            throttled_requests: Requests rejected in the window
+            wait_p50_ms: Median wait in milliseconds
+            wait_p95_ms: 95th percentile wait in milliseconds
+            wait_p99_ms: 99th percentile wait in milliseconds
+            wait_max_ms: Longest wait in milliseconds
+            queue_depth: Callers waiting for a token when the report was taken
+            available_tokens: Tokens in the bucket when the report was taken
+            burst_capacity: Bucket size, for comparison with the token level
+        """
+        dims = MetricDimensions(content_path=key)
+        
+        metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
+            PayerMetricName.RATE_LIMIT_REQUESTS: (requests, MetricUnit.COUNT),
+            PayerMetricName.RATE_LIMIT_REJECTED: (throttled_requests, MetricUnit.COUNT),
+            PayerMetricName.RATE_LIMIT_WAIT_P50: (wait_p50_ms, MetricUnit.MILLISECONDS),
+            PayerMetricName.RATE_LIMIT_WAIT_P95: (wait_p95_ms, MetricUnit.MILLISECONDS),
+            PayerMetricName.RATE_LIMIT_WAIT_P99: (wait_p99_ms, MetricUnit.MILLISECONDS),
+            PayerMetricName.RATE_LIMIT_WAIT_MAX: (wait_max_ms, MetricUnit.MILLISECONDS),
+            PayerMetricName.RATE_LIMIT_QUEUE_DEPTH: (queue_depth, MetricUnit.COUNT),
+            PayerMetricName.RATE_LIMIT_AVAILABLE_TOKENS: (available_tokens, MetricUnit.NONE),
+        }
+        
+        self.emit_multiple(
+            metrics,
+            dims,
+            {"rateLimitKey": key, "burstCapacity": burst_capacity},
+        )
+    
+    def record_latency_summary(
+        self,
+        operation: str,
+        count: int,
+        p50_ms: float,
+        p90_ms: float,
+        p99_ms: float,
+        max_ms: float,
+        tool: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        outcome: Optional[str] = None,
+    ) -> None:
+        """
+        Record the latency percentiles of one operation over an export window.
+        
+        Args:
+            operation: Operation name, e.g. "payment_signing"
+            count: Samples in the window
+            p50_ms: Median latency in milliseconds
+            p90_ms: 90th percentile latency in milliseconds
+            p99_ms: 99th percentile latency in milliseconds
+            max_ms: Longest latency in milliseconds
+            tool: Tool the operation ran for
+            endpoint: Endpoint path the operation called
+            outcome: Result class ("success", "error", ...)
+        """
+        dims = MetricDimensions(
+            content_path=endpoint_path(endpoint) if endpoint else None,
+            operation=operation,
+            tool_name=tool,
+            outcome=outcome,
+        )
+        
+        metrics: dict[PayerMetricName, tuple[float, MetricUnit]] = {
+            PayerMetricName.LATENCY_SAMPLES: (count, MetricUnit.COUNT),
+            PayerMetricName.LATENCY_P50: (p50_ms, MetricUnit.MILLISECONDS),
+            PayerMetricName.LATENCY_P90: (p90_ms, MetricUnit.MILLISECONDS),
+            PayerMetricName.LATENCY_P99: (p99_ms, MetricUnit.MILLISECONDS),
+            PayerMetricName.LATENCY_MAX: (max_ms, MetricUnit.MILLISECONDS),
+        }
+        
+        self.emit_multiple(metrics, dims, {"operation": operation, "endpoint": endpoint})
+
+
+
+# EMF allows at most this many values in one metric's value array
+EMF_MAX_VALUES_PER_METRIC = 100
+
+
+class BufferedMetricsEmitter(MetricsEmitter):
+    """
+    Metrics emitter that aggregates samples and flushes them in the background.
+    
+    Recording a metric only appends its value to an in-memory buffer keyed by
+    dimension set, properties and metric name; nothing is serialized or
+    written on the caller's thread. A daemon thread flushes the buffer every
+    flush_interval_seconds, or as soon as max_buffered_samples samples are
+    waiting, writing one EMF line per dimension set and properties with up to
+    100 values per metric. The buffer is also flushed by close(), which runs
+    at interpreter exit.
+    
+    Properties (error messages, tool names, ...) are kept: samples are only
+    packed together when their properties are equal, so calls with a unique
+    property such as an error message still get a line of their own.
+    """
+    
+    def __init__(
+        self,
+        service_name: str = "x402-payer-agent",
+        flush_interval_seconds: float = 10.0,
+        max_buffered_samples: int = 1000,
+        json_backend: str = "auto",
+        latencies: Optional[LatencyHistograms] = None,
+        prometheus: Optional[EMFMirror] = None,
+        governor: Optional[CardinalityGovernor] = None,
+    ):
+        """
+        Initialize the emitter.
+        
+        Args:
+            service_name: Service name for metric attribution
+            json_backend: JSON encoder for value arrays ("auto", "json" or "orjson")
+            flush_interval_seconds: Longest time a sample waits in the buffer
+            max_buffered_samples: Number of buffered samples that triggers an
+                early flush
+            latencies: Sketches fed by every recorded latency (see MetricsEmitter)
+            prometheus: Mirror recording every metric for /metrics as well
+            governor: Budgets of distinct dimension values (see MetricsEmitter)
+        """
+        super().__init__(service_name, json_backend, latencies, prometheus, governor)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_buffered_samples = max_buffered_samples
+        # (dimension set, properties) -> (dimensions, properties,
+        # metric name -> (unit, values))
+        self._buffer: dict[
+            tuple[tuple[tuple[str, str], ...], tuple[tuple[str, str], ...]],
+            tuple[
+                dict[str, str],
+                Optional[dict[str, Any]],
+                dict[str, tuple[MetricUnit, list[float]]],
+            ],
+        ] = {}
+        self._buffered_samples = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.close)
+    
+    def _start(self) -> None:
+        """Start the flush thread. Caller must hold the lock."""
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-flush", daemon=True
+        )
+        self._thread.start()
+    
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval_seconds)
+            self._wakeup.clear()
+            self.flush()
+    
+    def _buffer_samples(
+        self,
+        metrics: dict[str, tuple[float, MetricUnit]],
+        dimensions: Optional[MetricDimensions],
+        properties: Optional[dict[str, Any]],
+    ) -> None:
+        """Append samples to the buffer, waking the flush thread when it is full."""
+        dim_dict = self._dimension_dict(dimensions)
+        if self._prometheus is not None:
+            self._prometheus.observe(metrics, dim_dict)
+        properties = properties or None
+        # repr keeps the key hashable whatever the property values are
+        key = (
+            tuple(dim_dict.items()),
+            tuple(sorted((name, repr(value)) for name, value in (properties or {}).items())),
+        )
+        with self._lock:
+            if self._closed:
+                sys.stdout.write(self._encode_emf_log(metrics, dim_dict, properties) + "\n")
+                return
+            entry = self._buffer.get(key)
+            if entry is None:
+                entry = self._buffer[key] = (dim_dict, properties, {})
+            series = entry[2]
+            for name, (value, unit) in metrics.items():
+                values = series.get(name)
+                if values is None:
+                    series[name] = (unit, [value])
+                else:
+                    values[1].append(value)
+            self._buffered_samples += len(metrics)
+            if self._thread is None:
+                self._start()
+            if self._buffered_samples >= self.max_buffered_samples:
+                self._wakeup.set()
+    
+    def emit(
+        self,
+        metric_name: PayerMetricName,
+        value: float,
+        unit: MetricUnit = MetricUnit.COUNT,
+        dimensions: Optional[MetricDimensions] = None,
+        properties: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """Buffer a single metric."""
+        self._buffer_samples({metric_name.value: (value, unit)}, dimensions, properties)
+    
+    def emit_multiple(
+        self,
+        metrics: dict[PayerMetricName, tuple[float, MetricUnit]],
+        dimensions: Optional[MetricDimensions] = None,
+        properties: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """Buffer multiple metrics sharing dimensions and properties."""
+        self._buffer_samples(
+            {name._value_: value_unit for name, value_unit in metrics.items()},
+            dimensions,
+            properties,
+        )
+    
+    @property
+    def buffered_samples(self) -> int:
+        """Number of samples waiting to be flushed."""
+        return self._buffered_samples
+    
+    def flush(self) -> int:
+        """
+        Write every buffered sample to stdout.
+        
+        Returns:
+            Number of EMF lines written
+        """
+        with self._flush_lock:
+            with self._lock:
+                buffer, self._buffer = self._buffer, {}
+                self._buffered_samples = 0
+            lines = []
+            for dim_dict, properties, series in buffer.values():
+                offset = 0
+                while True:
+                    chunk = {
+                        name: (values[offset:offset + EMF_MAX_VALUES_PER_METRIC], unit)
+                        for name, (unit, values) in series.items()
+                        if len(values) > offset
+                    }
+                    if not chunk:
+                        break
+                    lines.append(self._encode_emf_log(chunk, dim_dict, properties))
+                    offset += EMF_MAX_VALUES_PER_METRIC
+            if lines:
+                try:
+                    sys.stdout.write("\n".join(lines) + "\n")
+                    sys.stdout.flush()
+                except ValueError:
+                    # stdout already closed at interpreter exit
+                    pass
+            return len(lines)
+    
+    def close(self) -> None:
+        """Stop the flush thread and write everything still buffered."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5.0)
+        self.flush()
+        atexit.unregister(self.close)
 
 
 # Global metrics emitter instance
 _metrics_emitter: Optional[MetricsEmitter] = None
 
 
+def _create_emitter(service_name: str) -> MetricsEmitter:
+    """Create the emitter configured by the METRICS_* settings."""
+    from .config import config
+    
+    prometheus = None
+    if config.prometheus_enabled:
+        prometheus = EMFMirror(
+            get_prometheus_registry(),
+            gauges=PROMETHEUS_GAUGES,
+            counters=PROMETHEUS_COUNTERS,
+        )
+    governor = CardinalityGovernor.from_agent_config()
+    if config.metrics_flush_interval_seconds > 0:
+        return BufferedMetricsEmitter(
+            service_name,
+            flush_interval_seconds=config.metrics_flush_interval_seconds,
+            max_buffered_samples=config.metrics_max_buffered_samples,
+            json_backend=config.metrics_json_backend,
+            prometheus=prometheus,
+            governor=governor,
+        )
+    return MetricsEmitter(
+        service_name, config.metrics_json_backend, prometheus=prometheus, governor=governor
+    )
+
+
 def get_metrics_emitter() -> MetricsEmitter:
     """Get the global metrics emitter instance."""
     global _metrics_emitter
     if _metrics_emitter is None:
-        _metrics_emitter = MetricsEmitter()
+        _metrics_emitter = _create_emitter("x402-payer-agent")
     return _metrics_emitter
 
 
@@ -541,6 +1044,8 @@ def init_metrics(service_name: str = "x402-payer-agent") -> MetricsEmitter:
     """
     Initialize the global metrics emitter.
     
+    A buffered emitter being replaced is flushed first.
+    
     Args:
         service_name: Service name for metric attribution
         
@@ -548,5 +1053,7 @@ def init_metrics(service_name: str = "x402-payer-agent") -> MetricsEmitter:
         Configured MetricsEmitter instance
     """
     global _metrics_emitter
-    _metrics_emitter = MetricsEmitter(service_name)
+    if isinstance(_metrics_emitter, BufferedMetricsEmitter):
+        _metrics_emitter.close()
+    _metrics_emitter = _create_emitter(service_name)
     return _metrics_emitter
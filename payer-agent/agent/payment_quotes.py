@@ -0,0 +1,168 @@
+"""
+Per-endpoint cache of x402 payment requirements.
+
+A seller answers every unpaid request to an endpoint with the same 402 and
+the same PAYMENT-REQUIRED header. Probing the endpoint with a full GET just to
+learn ``accepts[0]`` costs a round trip per purchase, so the decoded
+requirements are kept here and reused:
+
+- Requirements are stored whenever a tool sees a 402 from an endpoint
+- Entries expire after ``ttl_seconds`` and are dropped explicitly when the
+  endpoint stops asking for payment or a quote is refreshed
+- A quote for a cached endpoint needs no request, so a purchase can go
+  straight to signing
+
+Entries are shared between callers and should be treated as read-only.
+
+Usage:
+    from agent.payment_quotes import get_quote_cache
+
+    quotes = get_quote_cache()
+
+    payment_data = quotes.get(url)
+    if payment_data is None:
+        # ... probe the endpoint (HEAD, falling back to GET) ...
+        quotes.put(url, payment_data)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .config import config
+
+
+@dataclass
+class PaymentQuoteStats:
+    """Statistics for the payment requirements cache."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Percentage of lookups answered without probing the endpoint."""
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return (self.hits / total) * 100
+
+
+class PaymentQuoteCache:
+    """
+    Thread-safe TTL cache of decoded payment requirements, keyed by endpoint URL.
+
+    Tools are synchronous and may run on several threads, so all access is
+    guarded by a lock.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: How long stored requirements are reused (0 disables the cache)
+            max_entries: Maximum number of endpoints kept; the oldest is evicted
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = PaymentQuoteStats()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether requirements are cached at all."""
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @property
+    def stats(self) -> PaymentQuoteStats:
+        """Get cache statistics."""
+        return self._stats
+
+    def get(self, endpoint: str) -> Optional[Any]:
+        """
+        Look up fresh payment requirements for an endpoint.
+
+        Args:
+            endpoint: Endpoint URL
+
+        Returns:
+            Decoded PAYMENT-REQUIRED body, or None on a miss or expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[endpoint]
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._stats.hits += 1
+            return entry[1]
+
+    def put(self, endpoint: str, payment_data: Any) -> None:
+        """
+        Store the payment requirements an endpoint answered with.
+
+        Args:
+            endpoint: Endpoint URL
+            payment_data: Decoded PAYMENT-REQUIRED body
+        """
+        if not self.enabled or not isinstance(payment_data, dict):
+            return
+        if not payment_data.get("accepts"):
+            return
+        with self._lock:
+            self._entries.pop(endpoint, None)
+            self._entries[endpoint] = (self._clock() + self.ttl_seconds, payment_data)
+            self._stats.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, endpoint: str) -> bool:
+        """
+        Drop the cached requirements for an endpoint.
+
+        Args:
+            endpoint: Endpoint URL
+
+        Returns:
+            True if an entry was removed
+        """
+        with self._lock:
+            if self._entries.pop(endpoint, None) is None:
+                return False
+            self._stats.invalidations += 1
+            return True
+
+    def clear(self) -> None:
+        """Drop all cached requirements."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global payment requirements cache
+_quote_cache: Optional[PaymentQuoteCache] = None
+
+
+def get_quote_cache() -> PaymentQuoteCache:
+    """Get the global payment requirements cache."""
+    global _quote_cache
+    if _quote_cache is None:
+        _quote_cache = PaymentQuoteCache(ttl_seconds=config.payment_quote_ttl_seconds)
+    return _quote_cache
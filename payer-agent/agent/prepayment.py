@@ -0,0 +1,165 @@
+"""
+Optimistic pre-payment for approved x402 services.
+
+Discovery already advertises each paid tool's price, network, asset and
+recipient. For services the operator has approved, the MCP client can sign
+that advertised requirement up front and send it with the first request,
+skipping the 402 round trip and the model turns spent analyzing and signing.
+
+Pre-payment is opt-in and bounded:
+- Only services listed in the policy are pre-paid
+- The advertised price must be at or below ``max_price_units``
+- The advertised requirement must be complete (scheme, network, asset, payTo)
+- The payload signs exactly the advertised amount, so a seller cannot
+  settle more than was approved; if the seller's requirements differ it
+  answers 402 and the normal analyze/sign/retry flow takes over
+
+Usage:
+    from agent.prepayment import PrepaymentPolicy, advertised_requirement
+
+    policy = PrepaymentPolicy(approved_services=frozenset({"get_premium_article"}))
+    if policy.allows(tool_def):
+        requirement = advertised_requirement(tool_def)
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
+
+from .config import config
+
+if TYPE_CHECKING:
+    from .mcp_client import MCPToolDefinition
+
+logger = logging.getLogger(__name__)
+
+# Requirement fields that must match between a pre-signed payment and the 402
+_MATCH_FIELDS = ("scheme", "network", "amount", "asset", "payTo")
+
+
+@dataclass
+class PrepaymentPolicy:
+    """Which services may be paid before the seller asks."""
+
+    # Tool names approved for pre-payment (empty disables pre-payment)
+    approved_services: frozenset[str] = field(default_factory=frozenset)
+
+    # Highest advertised price, in atomic units, that is pre-paid
+    max_price_units: int = 10_000
+
+    @classmethod
+    def from_config(cls) -> "PrepaymentPolicy":
+        """Build the policy from the agent configuration."""
+        return cls(
+            approved_services=frozenset(config.prepay_services),
+            max_price_units=config.prepay_max_price_units,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any service is approved for pre-payment."""
+        return bool(self.approved_services)
+
+    def allows(self, tool_def: "MCPToolDefinition") -> bool:
+        """
+        Check whether a tool may be pre-paid.
+
+        Args:
+            tool_def: Discovered tool definition
+
+        Returns:
+            True if the tool is approved, priced within policy and fully advertised
+        """
+        if not tool_def.requires_payment or tool_def.name not in self.approved_services:
+            return False
+        requirement = advertised_requirement(tool_def)
+        if requirement is None:
+            return False
+        return int(requirement["amount"]) <= self.max_price_units
+
+
+@dataclass
+class PrepaymentStats:
+    """Statistics for optimistic pre-payment."""
+
+    attempted: int = 0
+    accepted: int = 0
+    fallbacks: int = 0
+    signing_failures: int = 0
+
+
+def advertised_requirement(tool_def: "MCPToolDefinition") -> Optional[dict[str, Any]]:
+    """
+    Build an x402 v2 payment requirement from a tool's discovery metadata.
+
+    Args:
+        tool_def: Discovered tool definition
+
+    Returns:
+        Requirement in the shape of a 402 ``accepts`` entry, or None if the
+        advertised metadata is incomplete
+    """
+    info = tool_def.payment_info
+    amount = str(info.get("price_units", ""))
+    requirement = {
+        "scheme": info.get("scheme") or "exact",
+        "network": info.get("network", ""),
+        "amount": amount,
+        "asset": info.get("asset_address", ""),
+        "payTo": info.get("pay_to", ""),
+        "maxTimeoutSeconds": int(info.get("timeout_seconds") or 60),
+    }
+    if not amount.isdigit() or not all(requirement[name] for name in _MATCH_FIELDS):
+        return None
+    return requirement
+
+
+def requirement_matches(requirement: dict[str, Any], payment_required: Any) -> bool:
+    """
+    Check whether a seller's 402 would accept a pre-signed requirement.
+
+    Args:
+        requirement: Requirement the payment was signed for
+        payment_required: Decoded PAYMENT-REQUIRED body from the seller
+
+    Returns:
+        True if one of the seller's accepted requirements matches
+    """
+    if not isinstance(payment_required, dict):
+        return False
+    for accepted in payment_required.get("accepts", []):
+        if all(
+            str(accepted.get(name, "")).lower() == str(requirement[name]).lower()
+            for name in _MATCH_FIELDS
+        ):
+            return True
+    return False
+
+
+def sign_requirement(requirement: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """
+    Sign a payment requirement with the agent wallet.
+
+    This is blocking (it calls the CDP wallet) and should be run in a thread.
+
+    Args:
+        requirement: Requirement from advertised_requirement
+
+    Returns:
+        Signed x402 v2 payment payload, or None if signing failed
+    """
+    # Imported lazily: the wallet stack is heavy and only needed when pre-paying
+    from .tools.payment import sign_payment
+
+    result = sign_payment(
+        scheme=requirement["scheme"],
+        network=requirement["network"],
+        amount=requirement["amount"],
+        recipient=requirement["payTo"],
+        asset=requirement["asset"],
+        max_timeout_seconds=requirement["maxTimeoutSeconds"],
+    )
+    if not result.get("success"):
+        logger.warning(f"Pre-payment signing failed: {result.get('error')}")
+        return None
+    return result["payload"]
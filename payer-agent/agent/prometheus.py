@@ -0,0 +1,589 @@
+"""
+Prometheus / OpenMetrics exposition for the payer agent.
+
+The API server serves everything in the PrometheusRegistry at ``GET /metrics``:
+- Every EMF metric the MetricsEmitter records (the PayerMetricName set),
+  mirrored by EMFMirror: counts become counters, latencies become histograms
+  in seconds, and everything else becomes gauges. EMF dimensions become labels.
+- Connection pool state of the MCP client
+- Token bucket state of the rate limiter registries
+- Event loop lag and task count, sampled by EventLoopMonitor
+
+Recording never takes a lock: counters and histograms keep one accumulator
+per thread that only that thread writes, and a scrape adds them up. Gauges
+are single dict assignments. A scrape never blocks a request and a request
+never waits for a scrape.
+
+The text format is Prometheus 0.0.4, or OpenMetrics 1.0 when the scraper
+asks for it in its Accept header.
+
+Usage:
+    from agent.prometheus import get_prometheus_registry
+
+    registry = get_prometheus_registry()
+    invocations = registry.counter("x402_payer_invocations", "Agent invocations")
+    invocations.inc(labels={"route": "/invoke"})
+    body = registry.render()
+"""
+
+import asyncio
+import logging
+import math
+import re
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Mapping,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    from .mcp_client import HTTPPoolStats
+    from .rate_limiter import RateLimiterRegistry
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Upper bounds in seconds of latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = tuple[tuple[str, Any], ...]
+
+# Per-series accumulator: a float for counters, bucket counts and sum for histograms
+V = TypeVar("V")
+M = TypeVar("M", "Counter", "Gauge", "Histogram")
+
+
+def _label_key(labels: Optional[Mapping[str, Any]]) -> LabelKey:
+    return tuple(labels.items()) if labels else ()
+
+
+@dataclass
+class MetricFamily:
+    """One metric and its samples, as rendered on /metrics."""
+
+    name: str
+    # "counter", "gauge" or "histogram"
+    kind: str
+    help: str
+    # (name suffix, labels, value)
+    samples: list[tuple[str, dict[str, Any], float]] = field(default_factory=list)
+
+    def add(
+        self, value: float, labels: Optional[Mapping[str, Any]] = None, suffix: str = ""
+    ) -> None:
+        """Add a sample; counters take the "_total" suffix."""
+        self.samples.append((suffix, dict(labels or {}), value))
+
+    def add_histogram(
+        self,
+        bounds: Sequence[float],
+        counts: Sequence[float],
+        total: float,
+        labels: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        """
+        Add the samples of one histogram series.
+
+        Args:
+            bounds: Upper bucket bounds, ascending
+            counts: Observations per bucket (not cumulative), with one more
+                entry than bounds for values above the last bound
+            total: Sum of the observed values
+            labels: Series labels
+        """
+        labels = dict(labels or {})
+        cumulative: float = 0
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            self.samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        cumulative += counts[len(bounds)]
+        self.samples.append(("_bucket", {**labels, "le": "+Inf"}, cumulative))
+        self.samples.append(("_sum", labels, total))
+        self.samples.append(("_count", labels, cumulative))
+
+
+class _PerThread(Generic[V]):
+    """One accumulator dict per thread; only the owning thread writes to it."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: list[dict[LabelKey, V]] = []
+        # Only taken when a thread records its first value, and by scrapes
+        self._lock = threading.Lock()
+
+    def shard(self) -> dict[LabelKey, V]:
+        shard: Optional[dict[LabelKey, V]] = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def snapshots(self) -> list[dict[LabelKey, V]]:
+        """Copies of every thread's accumulators."""
+        with self._lock:
+            shards = list(self._shards)
+        # dict() copies in a single call under the GIL, so writers are never seen mid-update
+        return [dict(shard) for shard in shards]
+
+
+class Counter:
+    """Monotonic counter with per-thread accumulators."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: _PerThread[float] = _PerThread()
+
+    def inc(self, amount: float = 1.0, labels: Optional[Mapping[str, Any]] = None) -> None:
+        """
+        Add to the counter.
+
+        Raises:
+            ValueError: If amount is negative
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        shard = self._values.shard()
+        key = _label_key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def _totals(self) -> dict[LabelKey, float]:
+        totals: dict[LabelKey, float] = {}
+        for shard in self._values.snapshots():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def value(self, labels: Optional[Mapping[str, Any]] = None) -> float:
+        """Current value of one series."""
+        return self._totals().get(_label_key(labels), 0.0)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help)
+        for key, value in self._totals().items():
+            family.add(value, dict(key), "_total")
+        return family
+
+
+class Gauge:
+    """Value that goes up and down; the last write wins."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[LabelKey, float] = {}
+
+    def set(self, value: float, labels: Optional[Mapping[str, Any]] = None) -> None:
+        """Set the gauge."""
+        self._values[_label_key(labels)] = value
+
+    def value(self, labels: Optional[Mapping[str, Any]] = None) -> Optional[float]:
+        """Current value of one series, or None if it was never set."""
+        return self._values.get(_label_key(labels))
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help)
+        for key, value in list(self._values.items()):
+            family.add(value, dict(key))
+        return family
+
+
+class Histogram:
+    """Fixed-bucket histogram with per-thread accumulators."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._values: _PerThread[list[float]] = _PerThread()
+
+    def observe(self, value: float, labels: Optional[Mapping[str, Any]] = None) -> None:
+        """Record one observation."""
+        shard = self._values.shard()
+        key = _label_key(labels)
+        series = shard.get(key)
+        if series is None:
+            # Bucket counts, the overflow bucket, then the sum
+            series = shard[key] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> MetricFamily:
+        merged: dict[LabelKey, list[float]] = {}
+        for shard in self._values.snapshots():
+            for key, series in shard.items():
+                totals = merged.get(key)
+                if totals is None:
+                    merged[key] = list(series)
+                else:
+                    for index, value in enumerate(series):
+                        totals[index] += value
+        family = MetricFamily(self.name, self.kind, self.help)
+        for key, series in merged.items():
+            family.add_histogram(self.buckets, series[:-1], series[-1], dict(key))
+        return family
+
+
+# Returns families computed at scrape time
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class PrometheusRegistry:
+    """
+    Metrics served on /metrics.
+
+    Thread-safe; the lock is only taken to register metrics and collectors.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._collectors: list[Collector] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: type[M], name: str, help: str, **kwargs: Any) -> M:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help, **kwargs)
+        if not isinstance(metric, cls):
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        """Get the counter with this name, creating it."""
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        """Get the gauge with this name, creating it."""
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get the histogram with this name, creating it with these buckets."""
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def register_collector(self, collector: Collector) -> None:
+        """Add a function called on every scrape for families computed on demand."""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def unregister_collector(self, collector: Collector) -> None:
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def collect(self) -> list[MetricFamily]:
+        """
+        Collect every family, merging families of the same name.
+
+        A failing collector is logged and skipped.
+        """
+        families: dict[str, MetricFamily] = {}
+
+        def add(family: MetricFamily) -> None:
+            existing = families.get(family.name)
+            if existing is None:
+                families[family.name] = family
+            else:
+                existing.samples.extend(family.samples)
+
+        for metric in list(self._metrics.values()):
+            add(metric.collect())
+        for collector in list(self._collectors):
+            try:
+                for family in collector():
+                    add(family)
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector!r} failed: {e}")
+        return list(families.values())
+
+    def render(self, openmetrics: bool = False) -> str:
+        """
+        Render every metric in the text exposition format.
+
+        Args:
+            openmetrics: Use OpenMetrics 1.0 instead of Prometheus 0.0.4
+
+        Returns:
+            The response body for /metrics
+        """
+        return render_families(self.collect(), openmetrics)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_families(families: Iterable[MetricFamily], openmetrics: bool = False) -> str:
+    """
+    Render metric families in the text exposition format.
+
+    In Prometheus 0.0.4 a counter's metadata names the ``_total`` series; in
+    OpenMetrics it names the family, and the body ends with ``# EOF``.
+    """
+    lines = []
+    for family in families:
+        meta_name = family.name
+        if family.kind == "counter" and not openmetrics:
+            meta_name += "_total"
+        help_text = family.help.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {meta_name} {help_text}")
+        lines.append(f"# TYPE {meta_name} {family.kind}")
+        for suffix, labels, value in family.samples:
+            label_text = ""
+            if labels:
+                label_text = "{" + ",".join(
+                    f'{name}="{_escape(str(label))}"' for name, label in labels.items()
+                ) + "}"
+            lines.append(f"{family.name}{suffix}{label_text} {_format_value(value)}")
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def snake_case(name: str) -> str:
+    """Convert a CamelCase metric or dimension name, e.g. MCPInvocation402 -> mcp_invocation_402."""
+    name = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1_\2", name)
+    name = re.sub(r"([a-z])([A-Z0-9])", r"\1_\2", name)
+    name = re.sub(r"([0-9])([A-Za-z])", r"\1_\2", name)
+    return name.lower()
+
+
+def _in_seconds(
+    record: Callable[[float, dict[str, str]], None],
+) -> Callable[[float, dict[str, str]], None]:
+    """Wrap a recorder of seconds so it takes milliseconds."""
+
+    def recorder(value: float, labels: dict[str, str]) -> None:
+        record(value / 1000, labels)
+
+    return recorder
+
+
+class EMFMirror:
+    """
+    Records EMF metrics in a PrometheusRegistry as they are emitted.
+
+    A metric's kind follows its unit: Count is a counter, Milliseconds a
+    histogram in seconds, anything else a gauge. Names in ``gauges`` are
+    gauges and names in ``counters`` counters whatever their unit.
+    """
+
+    def __init__(
+        self,
+        registry: "PrometheusRegistry",
+        prefix: str = "x402_payer_",
+        gauges: Iterable[str] = (),
+        counters: Iterable[str] = (),
+    ):
+        """
+        Initialize the mirror.
+
+        Args:
+            registry: Registry the metrics are created in
+            prefix: Prepended to every metric name
+            gauges: EMF names recorded as gauges (levels, precomputed percentiles)
+            counters: EMF names recorded as counters (running sums)
+        """
+        self.registry = registry
+        self.prefix = prefix
+        self._gauges = frozenset(gauges)
+        self._counters = frozenset(counters)
+        # EMF name -> function recording one value with its labels
+        self._recorders: dict[str, Callable[[float, dict[str, str]], None]] = {}
+        self._label_names: dict[str, str] = {}
+
+    def _recorder(self, name: str, unit: Any) -> Callable[[float, dict[str, str]], None]:
+        unit = getattr(unit, "value", unit)
+        base = self.prefix + snake_case(name)
+        help_text = f"{name} ({unit}), mirrored from the EMF metric"
+        recorder: Callable[[float, dict[str, str]], None]
+        if name in self._counters or (unit == "Count" and name not in self._gauges):
+            recorder = self.registry.counter(base.removesuffix("_count"), help_text).inc
+        elif unit == "Milliseconds" and name not in self._gauges:
+            recorder = _in_seconds(self.registry.histogram(base + "_seconds", help_text).observe)
+        elif unit == "Milliseconds":
+            recorder = _in_seconds(self.registry.gauge(base + "_seconds", help_text).set)
+        else:
+            recorder = self.registry.gauge(base, help_text).set
+        self._recorders[name] = recorder
+        return recorder
+
+    def observe(
+        self,
+        metrics: Mapping[str, tuple[Any, Any]],
+        dimensions: Mapping[str, str],
+    ) -> None:
+        """
+        Record one EMF line.
+
+        Args:
+            metrics: Metric name to (value, unit)
+            dimensions: Dimension name to value
+        """
+        label_names = self._label_names
+        labels = {}
+        for key, value in dimensions.items():
+            label = label_names.get(key)
+            if label is None:
+                label = label_names[key] = snake_case(key)
+            labels[label] = value
+        for name, (value, unit) in metrics.items():
+            recorder = self._recorders.get(name) or self._recorder(name, unit)
+            recorder(value, labels)
+
+
+def http_pool_families(
+    stats: "HTTPPoolStats", labels: Optional[Mapping[str, Any]] = None
+) -> list[MetricFamily]:
+    """Gauges for the state of an MCP client's connection pool."""
+    families = []
+    for attribute, help_text in (
+        ("max_connections", "Connection limit of the HTTP pool"),
+        ("open_connections", "Connections currently open in the HTTP pool"),
+        ("idle_connections", "Open connections waiting for a request"),
+        ("in_flight_requests", "Requests sent through the pool and not yet answered"),
+    ):
+        family = MetricFamily(f"x402_payer_http_pool_{attribute}", "gauge", help_text)
+        family.add(getattr(stats, attribute), labels)
+        families.append(family)
+    return families
+
+
+def rate_limiter_families(registries: Mapping[str, "RateLimiterRegistry"]) -> list[MetricFamily]:
+    """
+    Counters, gauges and wait histograms for every bucket of rate limiter registries.
+
+    Args:
+        registries: Registry by the value of its ``limiter`` label
+
+    Returns:
+        Families named x402_payer_rate_limiter_*
+    """
+    from .rate_limiter import WAIT_BUCKETS_MS
+
+    prefix = "x402_payer_rate_limiter_"
+    allowed = MetricFamily(prefix + "allowed", "counter", "Requests admitted by the bucket")
+    throttled = MetricFamily(prefix + "throttled", "counter", "Requests rejected by the bucket")
+    waits = MetricFamily(
+        prefix + "wait_seconds", "histogram", "Time blocking acquires waited for a token"
+    )
+    rate = MetricFamily(prefix + "rate", "gauge", "Current refill rate in requests per second")
+    tokens = MetricFamily(prefix + "available_tokens", "gauge", "Tokens in the bucket")
+    depth = MetricFamily(prefix + "queue_depth", "gauge", "Callers waiting for a token")
+    bounds = [bound / 1000 for bound in WAIT_BUCKETS_MS]
+    for limiter, registry in registries.items():
+        rates = registry.effective_rates()
+        saturation = registry.saturation()
+        for key, stats in registry.stats().items():
+            labels = {"limiter": limiter, "key": key}
+            allowed.add(stats.allowed_requests, labels, "_total")
+            throttled.add(stats.throttled_requests, labels, "_total")
+            waits.add_histogram(
+                bounds, list(stats.wait_histogram.counts), stats.total_wait_time, labels
+            )
+            if key in rates:
+                rate.add(rates[key], labels)
+            if key in saturation:
+                tokens.add(saturation[key].available_tokens, labels)
+                depth.add(saturation[key].queue_depth, labels)
+    return [allowed, throttled, waits, rate, tokens, depth]
+
+
+class EventLoopMonitor:
+    """
+    Samples event loop lag and task count from a task on the loop.
+
+    Every interval the task sleeps and measures how late it woke up; that lag
+    is time the loop spent running other callbacks instead of serving
+    requests.
+    """
+
+    def __init__(self, registry: PrometheusRegistry, interval_seconds: float = 0.5):
+        """
+        Initialize the monitor.
+
+        Args:
+            registry: Registry the lag histogram and task gauge are created in
+            interval_seconds: Time between samples
+        """
+        self.interval_seconds = interval_seconds
+        self.lag = registry.histogram(
+            "x402_payer_event_loop_lag_seconds",
+            "How late the event loop ran a timer callback",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+        )
+        self.tasks = registry.gauge(
+            "x402_payer_event_loop_tasks", "Tasks scheduled on the event loop"
+        )
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        """Start sampling on the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            self.lag.observe(max(0.0, loop.time() - expected))
+            self.tasks.set(len(asyncio.all_tasks(loop)))
+
+
+# Global registry served by the API server
+_registry: Optional[PrometheusRegistry] = None
+
+
+def get_prometheus_registry() -> PrometheusRegistry:
+    """Get the global Prometheus registry."""
+    global _registry
+    if _registry is None:
+        _registry = PrometheusRegistry()
+    return _registry
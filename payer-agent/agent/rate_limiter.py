@@ -27,15 +27,35 @@ Usage:
     else:
         # Handle rate limit
         pass
+    
+    # Or share one bucket per host (and optionally per tool) across callers
+    registry = get_rate_limiter_registry()
+    wait_time = registry.acquire(url, tool="request_content", span=span)
+    
+    # Async callers reserve FIFO slots; heavier requests can take several tokens
+    async_limiter = AsyncRateLimiter(config)
+    await async_limiter.acquire(n=3)
+    
+    # Adaptive mode: feed responses back so the rate follows the server
+    limiter = RateLimiter(RateLimitConfig(adaptive=True))
+    limiter.record_response(response.status_code, retry_after=2.0)
 """
 
 import asyncio
+import bisect
 import logging
 import threading
 import time
 from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Callable, Optional, Protocol
+from urllib.parse import urlsplit
+
+from .metrics import get_metrics_emitter
+from .retry import parse_retry_after
+
+if TYPE_CHECKING:
+    from .distributed_rate_limiter import DistributedRateLimiter, TokenBucketStore
 
 logger = logging.getLogger(__name__)
 
@@ -58,6 +78,104 @@ class RateLimitConfig:
     
     # Enable logging of rate limit events
     enable_logging: bool = True
+    
+    # Adaptive (AIMD) mode: requests_per_second is the starting rate, cut by
+    # decrease_factor on 429/503 or Retry-After and raised by increase_step
+    # after every success_window successes, within the floor and ceiling
+    adaptive: bool = False
+    min_requests_per_second: float = 1.0
+    max_requests_per_second: float = 50.0
+    increase_step: float = 1.0
+    success_window: int = 10
+    decrease_factor: float = 0.5
+    
+    # Throttling responses already in flight when the rate was cut are
+    # ignored for this long, so one burst of 429s only halves the rate once
+    decrease_cooldown: float = 1.0
+
+
+# Statuses that mean the server is shedding load
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# Called with the new rate and whether it was a decrease
+RateChangeCallback = Callable[[float, bool], None]
+
+# Upper bounds in milliseconds of the wait time histogram buckets; longer
+# waits land in one overflow bucket
+WAIT_BUCKETS_MS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+@dataclass
+class WaitTimeHistogram:
+    """
+    Fixed-bucket histogram of the time blocking acquires waited.
+    
+    Recording is a bisect and an increment, so it is cheap enough to do
+    under the limiter's lock. Percentiles are the upper bound of the bucket
+    holding the rank, capped by the largest wait seen.
+    """
+    
+    counts: list[int] = field(default_factory=lambda: [0] * (len(WAIT_BUCKETS_MS) + 1))
+    max_ms: float = 0.0
+    
+    @property
+    def count(self) -> int:
+        """Number of waits recorded."""
+        return sum(self.counts)
+    
+    def record(self, wait_seconds: float) -> None:
+        """Record one wait."""
+        wait_ms = wait_seconds * 1000
+        self.counts[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        if wait_ms > self.max_ms:
+            self.max_ms = wait_ms
+    
+    def percentile(self, pct: float) -> float:
+        """
+        Estimate a percentile of the recorded waits.
+        
+        Args:
+            pct: Percentile between 0 and 100
+            
+        Returns:
+            Wait time in milliseconds, 0 if nothing was recorded
+        """
+        total = self.count
+        if total == 0:
+            return 0.0
+        rank = max(1, round(total * pct / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index == len(WAIT_BUCKETS_MS):
+                    return self.max_ms
+                return min(float(WAIT_BUCKETS_MS[index]), self.max_ms)
+        return self.max_ms
+    
+    def copy(self) -> "WaitTimeHistogram":
+        """Snapshot the histogram."""
+        return WaitTimeHistogram(list(self.counts), self.max_ms)
+    
+    def since(self, earlier: "WaitTimeHistogram") -> "WaitTimeHistogram":
+        """
+        Waits recorded after an earlier snapshot of this histogram.
+        
+        The maximum is that of the highest non-empty bucket in the window. If
+        the histogram was reset after the snapshot, returns a copy of it.
+        """
+        counts = [now - then for now, then in zip(self.counts, earlier.counts)]
+        if any(count < 0 for count in counts):
+            return self.copy()
+        window = WaitTimeHistogram(counts, 0.0)
+        for index in range(len(counts) - 1, -1, -1):
+            if counts[index]:
+                window.max_ms = (
+                    self.max_ms if index == len(WAIT_BUCKETS_MS)
+                    else min(float(WAIT_BUCKETS_MS[index]), self.max_ms)
+                )
+                break
+        return window
 
 
 @dataclass
@@ -69,6 +187,7 @@ class RateLimitStats:
     throttled_requests: int = 0
     total_wait_time: float = 0.0
     last_request_time: Optional[float] = None
+    wait_histogram: WaitTimeHistogram = field(default_factory=WaitTimeHistogram)
     
     @property
     def throttle_rate(self) -> float:
@@ -78,6 +197,94 @@ class RateLimitStats:
         return (self.throttled_requests / self.total_requests) * 100
 
 
+@dataclass
+class RateLimitSaturation:
+    """Wait time distribution and saturation of one bucket."""
+    
+    key: str
+    # Blocking acquires admitted and requests rejected in the window
+    requests: int
+    throttled_requests: int
+    wait_p50_ms: float
+    wait_p95_ms: float
+    wait_p99_ms: float
+    wait_max_ms: float
+    # Sampled when the report was taken
+    queue_depth: int
+    available_tokens: float
+    burst_capacity: int
+
+
+class AdaptiveRate:
+    """
+    Additive-increase/multiplicative-decrease control of a refill rate.
+    
+    Not thread-safe on its own; the owning limiter calls it under its lock.
+    """
+    
+    def __init__(self, config: RateLimitConfig):
+        """
+        Initialize the controller.
+        
+        Args:
+            config: Rate limit configuration; adaptive settings are ignored
+                unless config.adaptive is set
+        """
+        self.config = config
+        self.reset()
+    
+    def reset(self) -> None:
+        """Return to the configured starting rate."""
+        self.rate = self.config.requests_per_second
+        if self.config.adaptive:
+            self.rate = self._clamp(self.rate)
+        self._successes = 0
+        self._last_decrease = float("-inf")
+    
+    def _clamp(self, rate: float) -> float:
+        return min(
+            self.config.max_requests_per_second,
+            max(self.config.min_requests_per_second, rate),
+        )
+    
+    def on_success(self) -> bool:
+        """
+        Count a success, raising the rate after a full window of them.
+        
+        Returns:
+            True if the rate changed
+        """
+        if not self.config.adaptive:
+            return False
+        self._successes += 1
+        if self._successes < self.config.success_window:
+            return False
+        self._successes = 0
+        old_rate = self.rate
+        self.rate = self._clamp(self.rate + self.config.increase_step)
+        return self.rate != old_rate
+    
+    def on_throttle(self, now: float) -> bool:
+        """
+        Cut the rate after a throttling response.
+        
+        Args:
+            now: Current monotonic time
+            
+        Returns:
+            True if the rate changed
+        """
+        if not self.config.adaptive:
+            return False
+        self._successes = 0
+        if now - self._last_decrease < self.config.decrease_cooldown:
+            return False
+        self._last_decrease = now
+        old_rate = self.rate
+        self.rate = self._clamp(self.rate * self.config.decrease_factor)
+        return self.rate != old_rate
+
+
 class RateLimitExceeded(Exception):
     """Exception raised when rate limit is exceeded and blocking is disabled."""
     
@@ -100,24 +307,37 @@ class RateLimiter:
     Thread-safe for use in multi-threaded applications.
     """
     
-    def __init__(self, config: Optional[RateLimitConfig] = None):
+    def __init__(
+        self,
+        config: Optional[RateLimitConfig] = None,
+        on_rate_change: Optional[RateChangeCallback] = None,
+    ):
         """
         Initialize the rate limiter.
         
         Args:
             config: Rate limit configuration. Uses defaults if not provided.
+            on_rate_change: Called after an adaptive rate change
         """
         self.config = config or RateLimitConfig()
         self._tokens = float(self.config.burst_capacity)
         self._last_update = time.monotonic()
         self._lock = threading.Lock()
         self._stats = RateLimitStats()
+        self._rate = AdaptiveRate(self.config)
+        self._on_rate_change = on_rate_change
+        self._waiting = 0
     
     @property
     def stats(self) -> RateLimitStats:
         """Get current rate limiting statistics."""
         return self._stats
     
+    @property
+    def queue_depth(self) -> int:
+        """Number of callers currently blocked waiting for a token."""
+        return self._waiting
+    
     @property
     def available_tokens(self) -> float:
         """Get the current number of available tokens."""
@@ -132,7 +352,7 @@ class RateLimiter:
         self._last_update = now
         
         # Add tokens based on elapsed time
-        tokens_to_add = elapsed * self.config.requests_per_second
+        tokens_to_add = elapsed * self._rate.rate
         self._tokens = min(
             self.config.burst_capacity,
             self._tokens + tokens_to_add
@@ -143,7 +363,49 @@ class RateLimiter:
         if self._tokens >= 1:
             return 0.0
         tokens_needed = 1 - self._tokens
-        return tokens_needed / self.config.requests_per_second
+        return tokens_needed / self._rate.rate
+    
+    @property
+    def effective_rate(self) -> float:
+        """Current refill rate in requests per second."""
+        return self._rate.rate
+    
+    def record_response(self, status_code: int, retry_after: Optional[float] = None) -> float:
+        """
+        Feed a response back into the adaptive rate.
+        
+        A 429, a 503 or a Retry-After cuts the rate, and a Retry-After also
+        holds back the next token until it has passed. Other responses below
+        500 count towards the next increase. Does nothing unless
+        config.adaptive is set.
+        
+        Args:
+            status_code: HTTP status of the response
+            retry_after: Parsed Retry-After delay in seconds, if any
+            
+        Returns:
+            The effective rate after the update
+        """
+        if not self.config.adaptive:
+            return self._rate.rate
+        throttled = status_code in THROTTLE_STATUSES or retry_after is not None
+        with self._lock:
+            self._refill_tokens()
+            if throttled:
+                changed = self._rate.on_throttle(time.monotonic())
+                if retry_after:
+                    self._tokens = min(self._tokens, 1 - retry_after * self._rate.rate)
+            elif status_code < 500:
+                changed = self._rate.on_success()
+            else:
+                changed = False
+            rate = self._rate.rate
+        if changed:
+            if self.config.enable_logging:
+                logger.info("Adaptive rate limit now %.2f requests/second", rate)
+            if self._on_rate_change is not None:
+                self._on_rate_change(rate, throttled)
+        return rate
     
     def try_acquire(self) -> bool:
         """
@@ -194,6 +456,7 @@ class RateLimiter:
             if self._tokens >= 1:
                 self._tokens -= 1
                 self._stats.allowed_requests += 1
+                self._stats.wait_histogram.record(0.0)
                 return 0.0
             
             wait_time = self._calculate_wait_time()
@@ -208,29 +471,38 @@ class RateLimiter:
                     wait_time,
                     f"Rate limit exceeded. Wait time ({wait_time:.2f}s) exceeds timeout ({timeout:.2f}s)"
                 )
+            self._waiting += 1
         
         # Wait outside the lock
         if self.config.enable_logging:
             logger.info("Rate limited. Waiting %.2f seconds", wait_time)
         
-        time.sleep(wait_time)
-        
-        # Try again after waiting
-        with self._lock:
-            self._refill_tokens()
-            if self._tokens >= 1:
-                self._tokens -= 1
-                self._stats.allowed_requests += 1
-                actual_wait = time.monotonic() - start_time
-                self._stats.total_wait_time += actual_wait
-                return actual_wait
-            else:
-                # Still no tokens (shouldn't happen normally)
-                self._stats.throttled_requests += 1
-                raise RateLimitExceeded(
-                    self._calculate_wait_time(),
-                    "Rate limit still exceeded after waiting"
-                )
+        try:
+            time.sleep(wait_time)
+            
+            # Try again after waiting; a concurrent caller may have taken the
+            # token first, in which case wait for the next one within the timeout
+            while True:
+                with self._lock:
+                    self._refill_tokens()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._stats.allowed_requests += 1
+                        actual_wait = time.monotonic() - start_time
+                        self._stats.total_wait_time += actual_wait
+                        self._stats.wait_histogram.record(actual_wait)
+                        return actual_wait
+                    wait_time = self._calculate_wait_time()
+                    if time.monotonic() - start_time + wait_time > timeout:
+                        self._stats.throttled_requests += 1
+                        raise RateLimitExceeded(
+                            wait_time,
+                            "Rate limit still exceeded after waiting"
+                        )
+                time.sleep(wait_time)
+        finally:
+            with self._lock:
+                self._waiting -= 1
     
     @contextmanager
     def rate_limited(self, timeout: Optional[float] = None):
@@ -260,6 +532,7 @@ class RateLimiter:
             self._tokens = float(self.config.burst_capacity)
             self._last_update = time.monotonic()
             self._stats = RateLimitStats()
+            self._rate.reset()
     
     def reset_stats(self) -> None:
         """Reset statistics only."""
@@ -269,133 +542,192 @@ class RateLimiter:
 
 class AsyncRateLimiter:
     """
-    Async version of the token bucket rate limiter.
+    Async rate limiter that hands out FIFO reservations.
+    
+    Each acquire takes the bucket's lock once, reserves the next free slot by
+    taking its tokens up front (letting the token count go negative), and
+    then sleeps until the slot without re-checking. Callers are admitted in
+    arrival order at exactly the configured rate, with up to burst_capacity
+    admitted at once, and there is no herd of waiters racing for the same
+    token. This is the Generic Cell Rate Algorithm expressed in tokens.
+    
+    The tokens live in a RateLimiter bucket, which may be shared with
+    synchronous callers: a negative token count makes them wait behind the
+    reservations, so sync and async callers together stay within one rate.
     
-    Use this for async/await code patterns.
+    The state is guarded by a threading lock rather than an asyncio.Lock:
+    the critical section never awaits, and a thread lock keeps one limiter
+    usable from any event loop (Strands may run tools in a loop of their own).
     """
     
-    def __init__(self, config: Optional[RateLimitConfig] = None):
+    def __init__(
+        self,
+        config: Optional[RateLimitConfig] = None,
+        on_rate_change: Optional[RateChangeCallback] = None,
+        bucket: Optional[RateLimiter] = None,
+    ):
         """
         Initialize the async rate limiter.
         
         Args:
             config: Rate limit configuration. Uses defaults if not provided.
+            on_rate_change: Called after an adaptive rate change
+            bucket: Token bucket to draw from, shared with its synchronous
+                callers. A new one is created from config if not provided.
         """
-        self.config = config or RateLimitConfig()
-        self._tokens = float(self.config.burst_capacity)
-        self._last_update = time.monotonic()
-        self._lock = asyncio.Lock()
-        self._stats = RateLimitStats()
+        self._bucket = bucket or RateLimiter(config, on_rate_change)
+        self.config = self._bucket.config
+        # Incremented by every reservation; a cancelled waiter only gives its
+        # tokens back if nobody reserved behind it
+        self._reservations = 0
+    
+    @property
+    def bucket(self) -> RateLimiter:
+        """The token bucket this limiter draws from."""
+        return self._bucket
     
     @property
     def stats(self) -> RateLimitStats:
         """Get current rate limiting statistics."""
-        return self._stats
+        return self._bucket.stats
     
-    def _refill_tokens(self) -> None:
-        """Refill tokens based on elapsed time."""
-        now = time.monotonic()
-        elapsed = now - self._last_update
-        self._last_update = now
+    @property
+    def effective_rate(self) -> float:
+        """Current refill rate in requests per second."""
+        return self._bucket.effective_rate
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of callers holding a reservation and waiting for their slot."""
+        return self._bucket.queue_depth
+    
+    @property
+    def available_tokens(self) -> float:
+        """Get the current number of requests that would be admitted without waiting."""
+        return self._bucket.available_tokens
+    
+    def _wait_for(self, n: int) -> float:
+        """
+        Time until n tokens are available. Caller must hold the bucket's lock.
         
-        tokens_to_add = elapsed * self.config.requests_per_second
-        self._tokens = min(
-            self.config.burst_capacity,
-            self._tokens + tokens_to_add
-        )
+        Raises:
+            ValueError: If n exceeds burst_capacity
+        """
+        if n > self.config.burst_capacity:
+            raise ValueError(
+                f"Cannot acquire {n} tokens with a burst capacity of {self.config.burst_capacity}"
+            )
+        bucket = self._bucket
+        bucket._refill_tokens()
+        return max(0.0, (n - bucket._tokens) / bucket._rate.rate)
     
-    def _calculate_wait_time(self) -> float:
-        """Calculate time to wait for a token to become available."""
-        if self._tokens >= 1:
-            return 0.0
-        tokens_needed = 1 - self._tokens
-        return tokens_needed / self.config.requests_per_second
+    def record_response(self, status_code: int, retry_after: Optional[float] = None) -> float:
+        """
+        Feed a response back into the bucket's adaptive rate.
+        
+        See RateLimiter.record_response; reserved slots are paced at the new
+        rate, and a Retry-After holds back the next slot until it has passed.
+        
+        Returns:
+            The effective rate after the update
+        """
+        return self._bucket.record_response(status_code, retry_after)
     
-    async def try_acquire(self) -> bool:
+    async def try_acquire(self, n: int = 1) -> bool:
         """
-        Try to acquire a token without blocking.
+        Try to acquire tokens without waiting.
         
+        Args:
+            n: Number of tokens (the request's weight)
+            
         Returns:
-            True if token was acquired, False if rate limited.
+            True if the tokens were acquired, False if rate limited.
         """
-        async with self._lock:
-            self._refill_tokens()
-            self._stats.total_requests += 1
-            self._stats.last_request_time = time.time()
+        bucket = self._bucket
+        with bucket._lock:
+            wait_time = self._wait_for(n)
+            bucket._stats.total_requests += 1
+            bucket._stats.last_request_time = time.time()
             
-            if self._tokens >= 1:
-                self._tokens -= 1
-                self._stats.allowed_requests += 1
+            if wait_time == 0:
+                bucket._tokens -= n
+                bucket._stats.allowed_requests += 1
                 return True
-            else:
-                self._stats.throttled_requests += 1
-                if self.config.enable_logging:
-                    logger.warning(
-                        "Rate limit exceeded. Available tokens: %.2f",
-                        self._tokens
-                    )
-                return False
+            bucket._stats.throttled_requests += 1
+        
+        if self.config.enable_logging:
+            logger.warning("Rate limit exceeded. Next slot in %.2f seconds", wait_time)
+        return False
     
-    async def acquire(self, timeout: Optional[float] = None) -> float:
+    async def acquire(self, timeout: Optional[float] = None, n: int = 1) -> float:
         """
-        Acquire a token, blocking if necessary.
+        Reserve the next slot for n tokens and wait for it.
+        
+        Slots are handed out in call order. A caller cancelled while waiting
+        gives its slot back if no later caller has reserved one behind it.
         
         Args:
             timeout: Maximum time to wait. Uses config.max_wait_time if not provided.
+            n: Number of tokens (the request's weight); at most burst_capacity
             
         Returns:
             Time spent waiting (0 if no wait was needed).
             
         Raises:
             RateLimitExceeded: If blocking is disabled or timeout exceeded.
+            ValueError: If n exceeds burst_capacity.
         """
         timeout = timeout if timeout is not None else self.config.max_wait_time
-        start_time = time.monotonic()
+        bucket = self._bucket
         
-        async with self._lock:
-            self._refill_tokens()
-            self._stats.total_requests += 1
-            self._stats.last_request_time = time.time()
-            
-            if self._tokens >= 1:
-                self._tokens -= 1
-                self._stats.allowed_requests += 1
-                return 0.0
-            
-            wait_time = self._calculate_wait_time()
+        with bucket._lock:
+            wait_time = self._wait_for(n)
+            bucket._stats.total_requests += 1
+            bucket._stats.last_request_time = time.time()
             
-            if not self.config.block_on_limit:
-                self._stats.throttled_requests += 1
+            if wait_time > 0 and not self.config.block_on_limit:
+                bucket._stats.throttled_requests += 1
                 raise RateLimitExceeded(wait_time)
             
             if wait_time > timeout:
-                self._stats.throttled_requests += 1
+                bucket._stats.throttled_requests += 1
                 raise RateLimitExceeded(
                     wait_time,
-                    f"Rate limit exceeded. Wait time ({wait_time:.2f}s) exceeds timeout ({timeout:.2f}s)"
+                    f"Rate limit exceeded. Wait time ({wait_time:.2f}s) "
+                    f"exceeds timeout ({timeout:.2f}s)",
                 )
+            
+            bucket._tokens -= n
+            self._reservations += 1
+            reservation = self._reservations
+            bucket._stats.allowed_requests += 1
+            bucket._stats.total_wait_time += wait_time
+            bucket._stats.wait_histogram.record(wait_time)
+            if wait_time > 0:
+                bucket._waiting += 1
+        
+        if wait_time == 0:
+            return 0.0
         
-        # Wait outside the lock
         if self.config.enable_logging:
             logger.info("Rate limited. Waiting %.2f seconds", wait_time)
         
-        await asyncio.sleep(wait_time)
-        
-        # Try again after waiting
-        async with self._lock:
-            self._refill_tokens()
-            if self._tokens >= 1:
-                self._tokens -= 1
-                self._stats.allowed_requests += 1
-                actual_wait = time.monotonic() - start_time
-                self._stats.total_wait_time += actual_wait
-                return actual_wait
-            else:
-                self._stats.throttled_requests += 1
-                raise RateLimitExceeded(
-                    self._calculate_wait_time(),
-                    "Rate limit still exceeded after waiting"
-                )
+        try:
+            await asyncio.sleep(wait_time)
+        except asyncio.CancelledError:
+            with bucket._lock:
+                if self._reservations == reservation:
+                    bucket._refill_tokens()
+                    bucket._tokens = min(self.config.burst_capacity, bucket._tokens + n)
+            raise
+        finally:
+            with bucket._lock:
+                bucket._waiting -= 1
+        return wait_time
+    
+    def reset(self) -> None:
+        """Reset the rate limiter to initial state."""
+        self._bucket.reset()
 
 
 def create_rate_limiter(
@@ -425,3 +757,437 @@ def create_rate_limiter(
     if async_mode:
         return AsyncRateLimiter(config)
     return RateLimiter(config)
+
+
+class BucketLimiter(Protocol):
+    """
+    The limiter of one registry key.
+    
+    RateLimiter for local buckets, DistributedRateLimiter with a shared store.
+    """
+    
+    config: RateLimitConfig
+    
+    @property
+    def stats(self) -> RateLimitStats: ...
+    
+    @property
+    def queue_depth(self) -> int: ...
+    
+    @property
+    def available_tokens(self) -> float: ...
+    
+    @property
+    def effective_rate(self) -> float: ...
+    
+    def acquire(self, timeout: Optional[float] = None) -> float: ...
+    
+    def try_acquire(self) -> bool: ...
+    
+    def record_response(self, status_code: int, retry_after: Optional[float] = None) -> float: ...
+
+
+class RateLimiterRegistry:
+    """
+    Lazily created rate limiters, one per host and optionally per tool.
+    
+    Every outbound HTTP call acquires a token from the bucket for its key
+    before it is sent, so bursts from parallel tool calls are smoothed out
+    client-side instead of coming back from the Gateway as 429s. Synchronous
+    and async callers share one bucket per key: the async limiter is a
+    FIFO view (AsyncRateLimiter) of the same RateLimiter, so together they
+    stay within the configured rate. In adaptive mode, responses reported
+    through record_response adjust the rate of the key's bucket.
+    
+    Every report_interval_seconds, acquire passes the wait time percentiles,
+    queue depth and token level of each bucket over the last interval to
+    on_saturation, for sizing burst capacity from real traffic.
+    
+    With a shared store, every key gets one DistributedRateLimiter instead,
+    used by sync and async callers alike, so the configured rate holds across
+    all runtime replicas rather than per replica.
+    
+    Thread-safe for use in multi-threaded applications.
+    """
+    
+    def __init__(
+        self,
+        config: Optional[RateLimitConfig] = None,
+        per_tool: bool = False,
+        on_rate_change: Optional[Callable[[str, float, bool], None]] = None,
+        store: Optional["TokenBucketStore"] = None,
+        on_saturation: Optional[Callable[[RateLimitSaturation], None]] = None,
+        report_interval_seconds: float = 60.0,
+    ):
+        """
+        Initialize the registry.
+        
+        Args:
+            config: Configuration shared by every bucket. A requests_per_second
+                of 0 or less disables rate limiting.
+            per_tool: Give each tool its own bucket on a host instead of one
+                bucket per host
+            on_rate_change: Called with the key, new rate and whether it was a
+                decrease after any bucket's adaptive rate changes
+            store: Shared TokenBucketStore; buckets are local to this process
+                if not provided
+            on_saturation: Called with each bucket's saturation over the last
+                report interval
+            report_interval_seconds: How often saturation is reported (0 disables)
+        """
+        self.config = config or RateLimitConfig()
+        self.per_tool = per_tool
+        self._on_rate_change = on_rate_change
+        self.store = store
+        self._on_saturation = on_saturation
+        self.report_interval_seconds = report_interval_seconds
+        self._limiters: dict[str, BucketLimiter] = {}
+        self._async_limiters: dict[str, AsyncRateLimiter] = {}
+        self._lock = threading.Lock()
+        self._last_report = time.monotonic()
+        # Histogram and throttle count of each bucket at the last report
+        self._report_marks: dict[str, tuple[WaitTimeHistogram, int]] = {}
+    
+    @classmethod
+    def from_agent_config(cls) -> "RateLimiterRegistry":
+        """
+        Build a registry from the RATE_LIMIT_* settings in AgentConfig.
+        
+        Adaptive rate changes are exported as the RateLimitEffectiveRate gauge
+        and saturation as the RateLimitWait* and RateLimitQueueDepth metrics.
+        With RATE_LIMIT_REDIS_URL set, buckets are shared through that server.
+        """
+        from .config import config as agent_config
+        
+        return cls(
+            RateLimitConfig(
+                requests_per_second=agent_config.rate_limit_requests_per_second,
+                burst_capacity=agent_config.rate_limit_burst,
+                max_wait_time=agent_config.rate_limit_max_wait_seconds,
+                adaptive=agent_config.rate_limit_adaptive,
+                min_requests_per_second=agent_config.rate_limit_min_rps,
+                max_requests_per_second=agent_config.rate_limit_max_rps,
+            ),
+            per_tool=agent_config.rate_limit_per_tool,
+            on_rate_change=_emit_rate_change,
+            store=_store_from_url(agent_config.rate_limit_redis_url),
+            on_saturation=_emit_saturation,
+            report_interval_seconds=agent_config.rate_limit_report_interval_seconds,
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether calls are rate limited at all."""
+        return self.config.requests_per_second > 0
+    
+    def key_for(self, url: str, tool: Optional[str] = None) -> str:
+        """
+        Get the bucket key for a request.
+        
+        Args:
+            url: Full request URL
+            tool: Name of the tool making the request
+            
+        Returns:
+            The URL's host, or ``host/tool`` when buckets are per tool
+        """
+        host = urlsplit(url).netloc or url
+        if self.per_tool and tool:
+            return f"{host}/{tool}"
+        return host
+    
+    def _rate_callback(self, key: str) -> Optional[RateChangeCallback]:
+        """Bind the registry's rate change callback to one key."""
+        if self._on_rate_change is None:
+            return None
+        callback = self._on_rate_change
+        return lambda rate, decreased: callback(key, rate, decreased)
+    
+    def get(self, key: str) -> BucketLimiter:
+        """Get the synchronous limiter for a key, creating it on first use."""
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    limiter = self._create(key)
+                    self._limiters[key] = limiter
+        return limiter
+    
+    def _create(self, key: str) -> BucketLimiter:
+        """Create the limiter for a key. Caller must hold the lock."""
+        if self.store is not None:
+            from .distributed_rate_limiter import DistributedRateLimiter
+            
+            return DistributedRateLimiter(self.store, key, self.config)
+        return RateLimiter(self.config, self._rate_callback(key))
+    
+    def _get_shared(self, key: str) -> "DistributedRateLimiter":
+        """Get the limiter for a key of a registry with a shared store."""
+        from .distributed_rate_limiter import DistributedRateLimiter
+        
+        limiter = self.get(key)
+        if not isinstance(limiter, DistributedRateLimiter):
+            raise TypeError(f"Bucket {key} is not backed by the shared store")
+        return limiter
+    
+    def get_async(self, key: str) -> AsyncRateLimiter:
+        """
+        Get the async limiter for a key, creating it on first use.
+        
+        It draws from the same bucket as get(key). Only used for local
+        buckets; a DistributedRateLimiter serves async callers itself.
+        
+        Raises:
+            TypeError: If the registry has a shared store
+        """
+        limiter = self._async_limiters.get(key)
+        if limiter is None:
+            bucket = self.get(key)
+            if not isinstance(bucket, RateLimiter):
+                raise TypeError(f"Bucket {key} is shared; use its limiter directly")
+            with self._lock:
+                limiter = self._async_limiters.get(key)
+                if limiter is None:
+                    limiter = AsyncRateLimiter(bucket=bucket)
+                    self._async_limiters[key] = limiter
+        return limiter
+    
+    def acquire(self, url: str, tool: Optional[str] = None, span: Any = None) -> float:
+        """
+        Take a token for a request, blocking until one is available.
+        
+        Args:
+            url: Full request URL
+            tool: Name of the tool making the request
+            span: Optional span to record the key and wait time on
+            
+        Returns:
+            Time spent waiting in seconds
+            
+        Raises:
+            RateLimitExceeded: If the wait would exceed max_wait_time
+        """
+        if not self.enabled:
+            return 0.0
+        key = self.key_for(url, tool)
+        limiter = self.get(key)
+        wait_time = limiter.acquire()
+        _record_wait(span, key, wait_time, limiter)
+        self._maybe_report()
+        return wait_time
+    
+    async def acquire_async(self, url: str, tool: Optional[str] = None, span: Any = None) -> float:
+        """
+        Async version of acquire.
+        
+        Raises:
+            RateLimitExceeded: If the wait would exceed max_wait_time
+        """
+        if not self.enabled:
+            return 0.0
+        key = self.key_for(url, tool)
+        limiter: "DistributedRateLimiter | AsyncRateLimiter"
+        if self.store is not None:
+            limiter = self._get_shared(key)
+            wait_time = await limiter.acquire_async()
+        else:
+            limiter = self.get_async(key)
+            wait_time = await limiter.acquire()
+        _record_wait(span, key, wait_time, limiter)
+        self._maybe_report()
+        return wait_time
+    
+    async def try_acquire_async(self, url: str, tool: Optional[str] = None) -> bool:
+        """
+        Take a token for an optional request (such as a hedge) without waiting.
+        
+        Returns:
+            True if the request may be sent
+        """
+        if not self.enabled:
+            return True
+        if self.store is not None:
+            return await self._get_shared(self.key_for(url, tool)).try_acquire_async()
+        return await self.get_async(self.key_for(url, tool)).try_acquire()
+    
+    def record_response(
+        self,
+        url: str,
+        tool: Optional[str],
+        status_code: int,
+        retry_after: Any = None,
+    ) -> None:
+        """
+        Report a response to the bucket for its key.
+        
+        Local buckets only use it in adaptive mode; shared buckets honour
+        Retry-After.
+        
+        Args:
+            url: Full request URL
+            tool: Name of the tool that made the request
+            status_code: HTTP status of the response
+            retry_after: Retry-After header value or delay in seconds
+        """
+        if not self.enabled or not (self.config.adaptive or self.store is not None):
+            return
+        if isinstance(retry_after, str):
+            retry_after = parse_retry_after(retry_after)
+        limiter = self._limiters.get(self.key_for(url, tool))
+        if limiter is not None:
+            limiter.record_response(status_code, retry_after)
+    
+    def effective_rates(self) -> dict[str, float]:
+        """Current refill rate of every known bucket."""
+        return {key: limiter.effective_rate for key, limiter in list(self._limiters.items())}
+    
+    def stats(self) -> dict[str, RateLimitStats]:
+        """Statistics for every known bucket, sync and async callers together."""
+        return {key: limiter.stats for key, limiter in list(self._limiters.items())}
+    
+    def _limiters_by_key(self) -> dict[str, BucketLimiter]:
+        """Every known bucket."""
+        return dict(list(self._limiters.items()))
+    
+    def saturation(self) -> dict[str, RateLimitSaturation]:
+        """Wait time percentiles and saturation of every bucket since it was created."""
+        saturation = {}
+        for key, limiter in self._limiters_by_key().items():
+            stats = limiter.stats
+            saturation[key] = _saturation(
+                key, limiter, stats.wait_histogram, stats.throttled_requests
+            )
+        return saturation
+    
+    def report(self) -> list[RateLimitSaturation]:
+        """
+        Report each bucket's saturation since the previous report.
+        
+        Buckets without traffic in the window are skipped. Every report is
+        passed to on_saturation.
+        
+        Returns:
+            The reports
+        """
+        with self._lock:
+            self._last_report = time.monotonic()
+            reports = []
+            for key, limiter in self._limiters_by_key().items():
+                stats = limiter.stats
+                histogram = stats.wait_histogram.copy()
+                throttled = stats.throttled_requests
+                last_histogram, last_throttled = self._report_marks.get(
+                    key, (WaitTimeHistogram(), 0)
+                )
+                self._report_marks[key] = (histogram, throttled)
+                window = histogram.since(last_histogram)
+                # A reset bucket starts counting from zero again
+                window_throttled = throttled - last_throttled
+                if window_throttled < 0:
+                    window_throttled = throttled
+                if window.count or window_throttled:
+                    reports.append(_saturation(key, limiter, window, window_throttled))
+        if self._on_saturation is not None:
+            for saturation in reports:
+                self._on_saturation(saturation)
+        return reports
+    
+    def _maybe_report(self) -> None:
+        """Report saturation if the report interval has passed."""
+        if self._on_saturation is None or self.report_interval_seconds <= 0:
+            return
+        if time.monotonic() - self._last_report >= self.report_interval_seconds:
+            self.report()
+    
+    def reset(self) -> None:
+        """Drop every bucket."""
+        with self._lock:
+            self._limiters.clear()
+            self._async_limiters.clear()
+            self._report_marks.clear()
+
+
+def _saturation(
+    key: str,
+    limiter: BucketLimiter,
+    histogram: WaitTimeHistogram,
+    throttled_requests: int,
+) -> RateLimitSaturation:
+    """Summarize a bucket's wait times and current load."""
+    return RateLimitSaturation(
+        key=key,
+        requests=histogram.count,
+        throttled_requests=throttled_requests,
+        wait_p50_ms=histogram.percentile(50),
+        wait_p95_ms=histogram.percentile(95),
+        wait_p99_ms=histogram.percentile(99),
+        wait_max_ms=histogram.max_ms,
+        queue_depth=limiter.queue_depth,
+        available_tokens=limiter.available_tokens,
+        burst_capacity=limiter.config.burst_capacity,
+    )
+
+
+def _record_wait(span: Any, key: str, wait_time: float, limiter: Any = None) -> None:
+    """Record a rate limiter wait, queue depth and token level on a span."""
+    if span is None:
+        return
+    span.set_attribute("rate_limit.key", key)
+    span.set_attribute("rate_limit.wait_ms", wait_time * 1000)
+    if limiter is not None:
+        span.set_attribute("rate_limit.queue_depth", limiter.queue_depth)
+        span.set_attribute("rate_limit.tokens", limiter.available_tokens)
+    if wait_time > 0:
+        span.add_event(
+            "rate_limit.wait", {"rate_limit.key": key, "rate_limit.wait_ms": wait_time * 1000}
+        )
+
+
+def _store_from_url(url: str) -> Optional["TokenBucketStore"]:
+    """Connect to a shared bucket store, or None to keep buckets local."""
+    if not url:
+        return None
+    from .distributed_rate_limiter import RedisTokenBucketStore
+    
+    try:
+        return RedisTokenBucketStore.from_url(url)
+    except ImportError:
+        logger.warning(
+            "RATE_LIMIT_REDIS_URL is set but the redis package is not installed; "
+            "rate limits are per replica"
+        )
+        return None
+
+
+def _emit_rate_change(key: str, rate: float, decreased: bool) -> None:
+    """Export an adaptive rate change as a metric."""
+    get_metrics_emitter().record_rate_limit(key, rate, throttled=decreased)
+
+
+def _emit_saturation(saturation: RateLimitSaturation) -> None:
+    """Export a bucket's saturation report as metrics."""
+    get_metrics_emitter().record_rate_limit_saturation(
+        key=saturation.key,
+        requests=saturation.requests,
+        throttled_requests=saturation.throttled_requests,
+        wait_p50_ms=saturation.wait_p50_ms,
+        wait_p95_ms=saturation.wait_p95_ms,
+        wait_p99_ms=saturation.wait_p99_ms,
+        wait_max_ms=saturation.wait_max_ms,
+        queue_depth=saturation.queue_depth,
+        available_tokens=saturation.available_tokens,
+        burst_capacity=saturation.burst_capacity,
+    )
+
+
+# Global registry shared by the HTTP tools and the MCP client
+_registry: Optional[RateLimiterRegistry] = None
+
+
+def get_rate_limiter_registry() -> RateLimiterRegistry:
+    """Get the global rate limiter registry, configured from AgentConfig."""
+    global _registry
+    if _registry is None:
+        _registry = RateLimiterRegistry.from_agent_config()
+    return _registry
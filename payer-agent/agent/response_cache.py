@@ -0,0 +1,393 @@
+"""
+In-process HTTP response cache for free (non-payment) MCP tools.
+
+This module provides a small private HTTP cache that follows the origin's
+caching headers, so repeated free lookups inside a conversation are answered
+locally instead of going back to CloudFront.
+
+Caching rules:
+- Only 200 responses to requests without a payment signature are stored
+- Responses carrying any x402 payment header are never stored
+- Freshness comes from Cache-Control max-age (minus Age) or Expires
+- ``no-store`` is never stored; ``no-cache`` is stored only to revalidate
+- Stale entries with an ETag or Last-Modified are revalidated conditionally
+- Entries are evicted least-recently-used within a byte and entry budget
+
+Usage:
+    from agent.response_cache import ResponseCache, ResponseCacheConfig
+
+    cache = ResponseCache(ResponseCacheConfig(max_bytes=8 * 1024 * 1024))
+
+    entry = cache.lookup(url, request_headers)
+    if entry and entry.is_fresh():
+        return entry.data
+
+    # ... make the request, adding cache.conditional_headers(entry) ...
+
+    if response.status_code == 304 and entry:
+        cache.refresh(entry, response.headers)
+    else:
+        cache.store(url, request_headers, response.status_code,
+                    response.headers, data, len(response.content))
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping, Optional
+
+from .x402_headers import PAYMENT_REQUIRED_HEADERS, PAYMENT_RESPONSE_HEADERS, get_header
+
+# Response headers that mark an x402 payment exchange
+PAYMENT_HEADERS = PAYMENT_REQUIRED_HEADERS + PAYMENT_RESPONSE_HEADERS
+
+# Request headers that mark a paid request
+PAYMENT_REQUEST_HEADERS = (
+    "x-payment-signature",
+    "payment-signature",
+    "x-payment",
+)
+
+# Request headers that always take part in the cache key
+KEY_HEADERS = ("accept",)
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+@dataclass
+class ResponseCacheConfig:
+    """Configuration for the response cache."""
+
+    # Total size budget for cached bodies (0 disables the cache)
+    max_bytes: int = 8 * 1024 * 1024
+
+    # Maximum number of cached responses
+    max_entries: int = 256
+
+
+@dataclass
+class ResponseCacheStats:
+    """Statistics for the response cache."""
+
+    hits: int = 0
+    misses: int = 0
+    revalidations: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Percentage of lookups answered from the cache without a request."""
+        total = self.hits + self.misses + self.revalidations
+        if total == 0:
+            return 0.0
+        return (self.hits / total) * 100
+
+
+@dataclass
+class CachedResponse:
+    """A stored response and its HTTP freshness information."""
+
+    key: tuple[str, ...]
+    status_code: int
+    headers: dict[str, str]
+    data: Any
+    size_bytes: int
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = field(default_factory=time.time)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """Check if the entry can be served without revalidation."""
+        return (now if now is not None else time.time()) < self.expires_at
+
+    @property
+    def revalidatable(self) -> bool:
+        """Whether the entry has a validator for a conditional request."""
+        return bool(self.etag or self.last_modified)
+
+
+def freshness_lifetime(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Compute how long a response stays fresh from its caching headers.
+
+    Args:
+        headers: Response headers
+        now: Current time (defaults to time.time())
+
+    Returns:
+        Seconds of freshness remaining, or None if the headers give none
+    """
+    now = now if now is not None else time.time()
+    cache_control = (get_header(headers, "cache-control") or "").lower()
+
+    if "no-cache" in cache_control:
+        return 0.0
+
+    match = _MAX_AGE_RE.search(cache_control)
+    if match:
+        age = get_header(headers, "age")
+        elapsed = int(age) if age and age.isdigit() else 0
+        return float(max(0, int(match.group(1)) - elapsed))
+
+    expires = get_header(headers, "expires")
+    if expires:
+        try:
+            expires_at = parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            # Invalid Expires values mean "already expired"
+            return 0.0
+        date = get_header(headers, "date")
+        try:
+            origin_now = parsedate_to_datetime(date).timestamp() if date else now
+        except (TypeError, ValueError):
+            origin_now = now
+        return max(0.0, expires_at - origin_now)
+
+    return None
+
+
+class ResponseCache:
+    """
+    LRU response cache with a byte budget and HTTP freshness semantics.
+
+    Keys combine the URL with the request headers that affect the response
+    (Accept plus anything the origin lists in Vary). Cached data is shared
+    between callers and should be treated as read-only.
+
+    Thread-safe for use in multi-threaded applications.
+    """
+
+    def __init__(self, config: Optional[ResponseCacheConfig] = None):
+        """
+        Initialize the response cache.
+
+        Args:
+            config: Cache configuration. Uses defaults if not provided.
+        """
+        self.config = config or ResponseCacheConfig()
+        self._entries: OrderedDict[tuple[str, ...], CachedResponse] = OrderedDict()
+        self._vary: dict[str, tuple[str, ...]] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = ResponseCacheStats()
+
+    @property
+    def stats(self) -> ResponseCacheStats:
+        """Get current cache statistics."""
+        return self._stats
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache has any budget to store responses."""
+        return self.config.max_bytes > 0 and self.config.max_entries > 0
+
+    @property
+    def total_bytes(self) -> int:
+        """Total size of cached bodies."""
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _make_key(self, url: str, request_headers: Mapping[str, str]) -> tuple[str, ...]:
+        """Build the cache key from the URL and the relevant request headers."""
+        names = KEY_HEADERS + self._vary.get(url, ())
+        return (url,) + tuple(
+            f"{name}={get_header(request_headers, name) or ''}" for name in names
+        )
+
+    @staticmethod
+    def is_paid_request(request_headers: Mapping[str, str]) -> bool:
+        """Check if a request carries an x402 payment."""
+        return get_header(request_headers, *PAYMENT_REQUEST_HEADERS) is not None
+
+    def lookup(
+        self,
+        url: str,
+        request_headers: Mapping[str, str],
+    ) -> Optional[CachedResponse]:
+        """
+        Find a cached response for a request.
+
+        Fresh entries count as hits. Stale entries that can be revalidated are
+        returned (the caller should make a conditional request); stale entries
+        without validators are dropped.
+
+        Args:
+            url: Request URL
+            request_headers: Request headers
+
+        Returns:
+            The cached entry, or None on a miss
+        """
+        if not self.enabled or self.is_paid_request(request_headers):
+            return None
+
+        with self._lock:
+            key = self._make_key(url, request_headers)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            if entry.is_fresh():
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return entry
+
+            if entry.revalidatable:
+                self._stats.revalidations += 1
+                return entry
+
+            self._remove(key)
+            self._stats.misses += 1
+            return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CachedResponse]) -> dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for a stale entry."""
+        headers: dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(
+        self,
+        url: str,
+        request_headers: Mapping[str, str],
+        status_code: int,
+        response_headers: Mapping[str, str],
+        data: Any,
+        size_bytes: int,
+    ) -> bool:
+        """
+        Store a response if HTTP caching rules allow it.
+
+        Args:
+            url: Request URL
+            request_headers: Request headers
+            status_code: Response status code
+            response_headers: Response headers
+            data: Parsed response data to serve on hits
+            size_bytes: Size of the response body
+
+        Returns:
+            True if the response was stored
+        """
+        if not self.enabled or status_code != 200:
+            return False
+        if self.is_paid_request(request_headers):
+            return False
+        if get_header(response_headers, *PAYMENT_HEADERS) is not None:
+            return False
+
+        cache_control = (get_header(response_headers, "cache-control") or "").lower()
+        if "no-store" in cache_control:
+            return False
+
+        vary = get_header(response_headers, "vary") or ""
+        if vary.strip() == "*":
+            return False
+
+        etag = get_header(response_headers, "etag")
+        last_modified = get_header(response_headers, "last-modified")
+        lifetime = freshness_lifetime(response_headers)
+        if not lifetime and not (etag or last_modified):
+            return False
+        if size_bytes > self.config.max_bytes:
+            return False
+
+        with self._lock:
+            vary_names = tuple(
+                name.strip().lower() for name in vary.split(",")
+                if name.strip() and name.strip().lower() not in KEY_HEADERS
+            )
+            if vary_names:
+                self._vary[url] = vary_names
+            else:
+                self._vary.pop(url, None)
+
+            key = self._make_key(url, request_headers)
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = CachedResponse(
+                key=key,
+                status_code=status_code,
+                headers=dict(response_headers.items()),
+                data=data,
+                size_bytes=size_bytes,
+                expires_at=time.time() + (lifetime or 0.0),
+                etag=etag,
+                last_modified=last_modified,
+            )
+            self._total_bytes += size_bytes
+            self._stats.stores += 1
+            self._evict()
+        return True
+
+    def refresh(self, entry: CachedResponse, response_headers: Mapping[str, str]) -> None:
+        """
+        Update an entry after a 304 Not Modified revalidation.
+
+        Args:
+            entry: The revalidated entry
+            response_headers: Headers from the 304 response
+        """
+        lifetime = freshness_lifetime(response_headers) or 0.0
+        with self._lock:
+            entry.expires_at = time.time() + lifetime
+            entry.etag = get_header(response_headers, "etag") or entry.etag
+            entry.last_modified = (
+                get_header(response_headers, "last-modified") or entry.last_modified
+            )
+            if entry.key in self._entries:
+                self._entries.move_to_end(entry.key)
+
+    def invalidate(self, url: str) -> int:
+        """
+        Drop every cached response for a URL.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == url]
+            for key in keys:
+                self._remove(key)
+            self._vary.pop(url, None)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._entries.clear()
+            self._vary.clear()
+            self._total_bytes = 0
+
+    def _remove(self, key: tuple[str, ...]) -> None:
+        """Remove an entry (caller holds the lock)."""
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size_bytes
+
+    def _evict(self) -> None:
+        """Evict least-recently-used entries until within budget (caller holds the lock)."""
+        while self._entries and (
+            self._total_bytes > self.config.max_bytes
+            or len(self._entries) > self.config.max_entries
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self._stats.evictions += 1
@@ -0,0 +1,163 @@
+"""
+Retry policy for idempotent Gateway requests.
+
+This module provides the building blocks the MCP client uses to recover from
+transient failures without handing them back to the LLM:
+- Exponential backoff with full jitter, capped per attempt
+- Retry-After support for 429/503 responses (seconds or HTTP-date)
+- A retry budget that limits retries to a fraction of recent requests, so a
+  failing seller does not receive a retry storm
+
+Usage:
+    from agent.retry import RetryBudget, RetryConfig, backoff_delay
+
+    config = RetryConfig(max_retries=2)
+    budget = RetryBudget(config.budget_ratio, config.budget_min_retries)
+
+    budget.record_request()
+    for attempt in range(config.max_retries + 1):
+        response = await send()
+        if response.status_code not in config.retry_statuses:
+            break
+        if attempt == config.max_retries or not budget.try_withdraw():
+            break
+        await asyncio.sleep(backoff_delay(attempt, config))
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class RetryConfig:
+    """Configuration for retrying idempotent requests."""
+
+    # Retries after the first attempt (0 disables retrying)
+    max_retries: int = 2
+
+    # Backoff for attempt n is uniform(0, min(max, base * 2**n))
+    backoff_base_seconds: float = 0.2
+    backoff_max_seconds: float = 5.0
+
+    # Response statuses that are retried
+    retry_statuses: tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    # Retry-After values above this are returned to the caller instead
+    max_retry_after_seconds: float = 10.0
+
+    # Retries allowed per request on average, plus a reserve for bursts
+    budget_ratio: float = 0.2
+    budget_min_retries: int = 10
+
+    # Send a second request if the first is slower than this latency percentile
+    hedge: bool = False
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 20
+    hedge_min_delay_seconds: float = 0.05
+
+
+@dataclass
+class RetryStats:
+    """Statistics for retries and hedged requests."""
+
+    attempts: int = 0
+    retries: int = 0
+    budget_exhausted: int = 0
+    hedges_sent: int = 0
+    hedges_won: int = 0
+
+
+def parse_retry_after(value: Any, now: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+
+    Args:
+        value: Header value, either delay-seconds or an HTTP-date
+        now: Current time (defaults to time.time())
+
+    Returns:
+        Seconds to wait, or None if the value is missing or invalid
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+
+def backoff_delay(
+    attempt: int,
+    config: RetryConfig,
+    rng: Callable[[], float] = random.random,
+) -> float:
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        attempt: Zero-based retry number
+        config: Retry configuration
+        rng: Source of uniform [0, 1) values
+
+    Returns:
+        Seconds to wait before the retry
+    """
+    ceiling = min(config.backoff_max_seconds, config.backoff_base_seconds * (2 ** attempt))
+    return rng() * ceiling
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of requests.
+
+    Every request deposits ``ratio`` tokens and every retry (or hedge)
+    withdraws one. The balance starts at, and is capped by, ``min_retries`` so
+    a quiet client can still retry a short burst of failures.
+
+    Thread-safe for use in multi-threaded applications.
+    """
+
+    def __init__(self, ratio: float, min_retries: int):
+        """
+        Initialize the retry budget.
+
+        Args:
+            ratio: Tokens deposited per request
+            min_retries: Initial and maximum balance
+        """
+        self.ratio = ratio
+        self.capacity = float(max(min_retries, 1))
+        self._balance = self.capacity
+        self._lock = threading.Lock()
+
+    @property
+    def balance(self) -> float:
+        """Current number of retry tokens."""
+        return self._balance
+
+    def record_request(self) -> None:
+        """Deposit tokens for a new request."""
+        with self._lock:
+            self._balance = min(self.capacity, self._balance + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """
+        Take a token for a retry.
+
+        Returns:
+            True if the retry is within budget
+        """
+        with self._lock:
+            if self._balance >= 1.0:
+                self._balance -= 1.0
+                return True
+            return False
+
@@ -5,17 +5,22 @@ This module organizes tools into categories:
 1. Service Discovery Tools (Enterprise-Ready):
    - discover_services: Find available paid services from the Gateway
    - request_service: Request any discovered service by name
+   - quote_service: Get a service's price from cached requirements (or a HEAD probe)
    - list_approved_services: List pre-approved services for autonomous purchasing
    - check_service_approval: Check if a purchase is pre-approved
 
-2. Core Payment Tools:
+2. Purchase Tools:
+   - purchase_service: Quote, approve, sign and fetch a service in one call
+   - purchase_services: Buy several services in parallel behind one approval
+
+3. Core Payment Tools:
    - analyze_payment: Analyze payment requirements and decide whether to pay
    - sign_payment: Sign a payment using the AgentKit wallet
    - get_wallet_balance: Get current wallet balance
    - request_faucet_funds: Request testnet tokens from faucet
    - check_faucet_eligibility: Check if wallet is eligible for faucet
 
-3. Content Tools (Legacy - use discover_services + request_service instead):
+4. Content Tools (Legacy - use discover_services + request_service instead):
    - request_content: Request content from seller API
    - request_content_with_payment: Request content with signed payment
 """
@@ -24,10 +29,14 @@ This module organizes tools into categories:
 from .discovery import (
     discover_services,
     request_service,
+    quote_service,
     list_approved_services,
     check_service_approval,
 )
 
+# Purchase tools (whole x402 flow in one call)
+from .purchase import purchase_service, purchase_services
+
 # Core payment tools
 from .payment import (
     analyze_payment,
@@ -44,10 +53,17 @@ from .content import request_content, request_content_with_payment
 DISCOVERY_TOOLS = [
     discover_services,
     request_service,
+    quote_service,
     list_approved_services,
     check_service_approval,
 ]
 
+# Purchase tools - one call per purchase instead of one per x402 step
+PURCHASE_TOOLS = [
+    purchase_service,
+    purchase_services,
+]
+
 # Export core tools as the primary interface
 CORE_TOOLS = [
     analyze_payment,
@@ -71,8 +87,12 @@ __all__ = [
     # Discovery tools
     "discover_services",
     "request_service",
+    "quote_service",
     "list_approved_services",
     "check_service_approval",
+    # Purchase tools
+    "purchase_service",
+    "purchase_services",
     # Core payment tools
     "analyze_payment",
     "sign_payment",
@@ -85,6 +105,7 @@ __all__ = [
     "request_content_with_payment",
     # Tool collections
     "DISCOVERY_TOOLS",
+    "PURCHASE_TOOLS",
     "CORE_TOOLS",
     "FAUCET_TOOLS",
     "CONTENT_TOOLS",
@@ -1,7 +1,5 @@
 """Content request tools for the x402 payer agent."""
 
-import base64
-import json
 import time
 from typing import Any
 import httpx
@@ -10,6 +8,44 @@ from strands import tool
 from ..config import config
 from ..tracing import get_tracer
 from ..metrics import get_metrics_emitter
+from ..payment_quotes import get_quote_cache
+from ..rate_limiter import RateLimitExceeded, get_rate_limiter_registry
+from ..x402_headers import (
+    PAYMENT_REQUIRED_HEADERS,
+    PAYMENT_SIGNATURE_HEADER,
+    decode_header_value,
+    encode_payment_signature,
+    get_header,
+    read_payment_response,
+)
+
+
+def _payment_required_details(payment_data: dict[str, Any], span) -> dict[str, Any]:
+    """Flatten the first accepted requirement and tag the span with it."""
+    # x402 v2 uses "accepts" array, v1 used "requirements"
+    accepts = payment_data.get("accepts", payment_data.get("requirements", []))
+    requirement = accepts[0] if accepts else {}
+
+    # x402 v2 uses "payTo" instead of "recipient"
+    recipient = requirement.get("payTo", requirement.get("recipient", ""))
+    # x402 v2 uses "asset" address, extra.name has currency name
+    extra = requirement.get("extra", {})
+    currency = extra.get("name", requirement.get("currency", "USDC"))
+
+    span.set_attribute("payment.amount", requirement.get("amount", ""))
+    span.set_attribute("payment.currency", currency)
+    span.set_attribute("payment.network", requirement.get("network", ""))
+
+    return {
+        "scheme": requirement.get("scheme"),
+        "network": requirement.get("network"),
+        "amount": requirement.get("amount"),
+        "asset": requirement.get("asset"),
+        "currency": currency,
+        "recipient": recipient,
+        "description": payment_data.get("resource", {}).get("description", ""),
+        "maxTimeoutSeconds": requirement.get("maxTimeoutSeconds", 60),
+    }
 
 
 @tool
@@ -35,19 +71,45 @@ def request_content(url: str) -> dict[str, Any]:
         span.set_attribute("http.method", "GET")
         span.set_attribute("content.path", url)
 
+        # The requirements are the same on every unpaid probe; reuse the last 402
+        quotes = get_quote_cache()
+        payment_data = quotes.get(full_url)
+        metrics.record_quote_lookup(
+            hit=payment_data is not None,
+            content_path=url,
+            hit_rate=quotes.stats.hit_rate,
+        )
+        if payment_data is not None:
+            span.set_attribute("payment.required", True)
+            span.set_attribute("payment.quote_cached", True)
+            return {
+                "http_status": 402,
+                "payment_required": _payment_required_details(payment_data, span),
+                "cached": True,
+            }
+
+        limiters = get_rate_limiter_registry()
         try:
+            limiters.acquire(full_url, tool="request_content", span=span)
             with httpx.Client(timeout=30.0) as client:
                 response = client.get(
                     full_url,
                     headers={"Accept": "application/json"},
                     follow_redirects=True,
                 )
+                limiters.record_response(
+                    full_url,
+                    "request_content",
+                    response.status_code,
+                    response.headers.get("retry-after"),
+                )
                 
                 span.set_attribute("http.status_code", response.status_code)
                 latency_ms = (time.time() - start_time) * 1000
 
                 if response.status_code == 200:
                     span.set_attribute("content.delivered", True)
+                    quotes.invalidate(full_url)
                     metrics.record_content_request(
                         status_code=200,
                         latency_ms=latency_ms,
@@ -61,10 +123,8 @@ def request_content(url: str) -> dict[str, Any]:
                 if response.status_code == 402:
                     span.set_attribute("payment.required", True)
                     # Parse payment requirements from header (x402 v2 uses x-payment-required)
-                    payment_required_header = (
-                        response.headers.get("x-payment-required") or
-                        response.headers.get("X-PAYMENT-REQUIRED") or
-                        response.headers.get("PAYMENT-REQUIRED")
+                    payment_required_header = get_header(
+                        response.headers, *PAYMENT_REQUIRED_HEADERS
                     )
                     if not payment_required_header:
                         span.set_attribute("error.type", "missing_header")
@@ -81,21 +141,9 @@ def request_content(url: str) -> dict[str, Any]:
                         }
 
                     # Decode base64 payment requirements (x402 v2 format)
-                    payment_data = json.loads(base64.b64decode(payment_required_header))
-                    # x402 v2 uses "accepts" array, v1 used "requirements"
-                    accepts = payment_data.get("accepts", payment_data.get("requirements", []))
-                    requirement = accepts[0] if accepts else {}
-                    
-                    # x402 v2 uses "payTo" instead of "recipient"
-                    recipient = requirement.get("payTo", requirement.get("recipient", ""))
-                    # x402 v2 uses "asset" address, extra.name has currency name
-                    extra = requirement.get("extra", {})
-                    currency = extra.get("name", requirement.get("currency", "USDC"))
-                    
-                    span.set_attribute("payment.amount", requirement.get("amount", ""))
-                    span.set_attribute("payment.currency", currency)
-                    span.set_attribute("payment.network", requirement.get("network", ""))
-                    
+                    payment_data = decode_header_value(payment_required_header)
+                    quotes.put(full_url, payment_data)
+
                     metrics.record_content_request(
                         status_code=402,
                         latency_ms=latency_ms,
@@ -105,16 +153,7 @@ def request_content(url: str) -> dict[str, Any]:
 
                     return {
                         "http_status": 402,
-                        "payment_required": {
-                            "scheme": requirement.get("scheme"),
-                            "network": requirement.get("network"),
-                            "amount": requirement.get("amount"),
-                            "asset": requirement.get("asset"),
-                            "currency": currency,
-                            "recipient": recipient,
-                            "description": payment_data.get("resource", {}).get("description", ""),
-                            "maxTimeoutSeconds": requirement.get("maxTimeoutSeconds", 60),
-                        },
+                        "payment_required": _payment_required_details(payment_data, span),
                     }
 
                 span.set_attribute("error.type", "unexpected_status")
@@ -129,6 +168,20 @@ def request_content(url: str) -> dict[str, Any]:
                     "error_message": f"Unexpected status code: {response.status_code}",
                 }
 
+        except RateLimitExceeded as e:
+            span.set_attribute("error.type", "rate_limited")
+            metrics.record_content_request(
+                status_code=429,
+                latency_ms=(time.time() - start_time) * 1000,
+                content_path=url,
+                error="rate_limited",
+            )
+            return {
+                "http_status": 429,
+                "error_message": str(e),
+                "retry_after_seconds": e.wait_time,
+            }
+
         except httpx.RequestError as e:
             span.set_attribute("error.type", "request_error")
             span.set_attribute("error.message", str(e))
@@ -178,20 +231,26 @@ def request_content_with_payment(
             span.set_attribute("payment.network", payment_payload["network"])
 
         # Encode payment payload as base64
-        payment_signature = base64.b64encode(
-            json.dumps(payment_payload).encode()
-        ).decode()
+        payment_signature = encode_payment_signature(payment_payload)
 
+        limiters = get_rate_limiter_registry()
         try:
+            limiters.acquire(full_url, tool="request_content_with_payment", span=span)
             with httpx.Client(timeout=30.0) as client:
                 response = client.get(
                     full_url,
                     headers={
                         "Accept": "application/json",
-                        "x-payment-signature": payment_signature,  # x402 v2 header
+                        PAYMENT_SIGNATURE_HEADER: payment_signature,  # x402 v2 header
                     },
                     follow_redirects=True,
                 )
+                limiters.record_response(
+                    full_url,
+                    "request_content_with_payment",
+                    response.status_code,
+                    response.headers.get("retry-after"),
+                )
                 
                 span.set_attribute("http.status_code", response.status_code)
                 latency_ms = (time.time() - start_time) * 1000
@@ -201,14 +260,8 @@ def request_content_with_payment(
                     span.set_attribute("payment.accepted", True)
                     
                     # Parse settlement response from header (x402 v2 uses x-payment-response)
-                    payment_response_header = (
-                        response.headers.get("x-payment-response") or
-                        response.headers.get("X-PAYMENT-RESPONSE") or
-                        response.headers.get("PAYMENT-RESPONSE")
-                    )
-                    settlement = None
-                    if payment_response_header:
-                        settlement = json.loads(base64.b64decode(payment_response_header))
+                    settlement = read_payment_response(response.headers, strict=True)
+                    if settlement is not None:
                         span.set_attribute("payment.settled", True)
                         if settlement and "transactionHash" in settlement:
                             span.set_attribute("payment.transaction_hash", settlement["transactionHash"])
@@ -228,6 +281,8 @@ def request_content_with_payment(
                 if response.status_code == 402:
                     span.set_attribute("payment.accepted", False)
                     span.set_attribute("error.type", "payment_rejected")
+                    # The requirements may have changed; probe again next time
+                    get_quote_cache().invalidate(full_url)
                     metrics.record_content_request(
                         status_code=402,
                         latency_ms=latency_ms,
@@ -252,6 +307,20 @@ def request_content_with_payment(
                     "error_message": f"Unexpected status code: {response.status_code}",
                 }
 
+        except RateLimitExceeded as e:
+            span.set_attribute("error.type", "rate_limited")
+            metrics.record_content_request(
+                status_code=429,
+                latency_ms=(time.time() - start_time) * 1000,
+                content_path=url,
+                error="rate_limited",
+            )
+            return {
+                "http_status": 429,
+                "error_message": str(e),
+                "retry_after_seconds": e.wait_time,
+            }
+
         except httpx.RequestError as e:
             span.set_attribute("error.type", "request_error")
             span.set_attribute("error.message", str(e))
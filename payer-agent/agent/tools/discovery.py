@@ -10,18 +10,82 @@ The discovery flow:
 2. Agent receives a list of services with pricing, descriptions, and endpoints
 3. Agent can then use request_service to access any discovered service
 4. If payment is required, agent handles the x402 payment flow
+
+Payment requirements from 402 responses are cached per endpoint (see
+agent.payment_quotes), so quote_service and repeat probes of a service
+can go straight to signing without another request.
 """
 
-import base64
-import json
 import time
-from typing import Any
+from typing import Any, Optional
 import httpx
 from strands import tool
 
 from ..config import config
 from ..tracing import get_tracer
 from ..metrics import get_metrics_emitter
+from ..payment_quotes import PaymentQuoteCache, get_quote_cache
+from ..rate_limiter import RateLimitExceeded, get_rate_limiter_registry
+from ..x402_headers import (
+    PAYMENT_SIGNATURE_HEADER,
+    encode_payment_signature,
+    read_payment_required,
+    read_payment_response,
+)
+
+
+def _service_endpoint_path(service_name: str) -> str:
+    """Convert a service name to its endpoint path (get_premium_article -> /api/premium-article)."""
+    path_name = service_name.replace("get_", "").replace("_", "-")
+    return f"/api/{path_name}"
+
+
+def _read_payment_requirements(response: httpx.Response) -> Optional[dict[str, Any]]:
+    """Decode payment requirements from a 402's header, falling back to its body."""
+    try:
+        payment_data = read_payment_required(response.headers, strict=True)
+    except ValueError:
+        payment_data = None
+    
+    if not payment_data:
+        try:
+            payment_data = response.json()
+        except Exception:
+            pass
+    return payment_data if isinstance(payment_data, dict) else None
+
+
+def _payment_required_details(payment_data: Optional[dict[str, Any]]) -> dict[str, Any]:
+    """Flatten the first accepted requirement into the shape sign_payment takes."""
+    accepts = payment_data.get("accepts", []) if payment_data else []
+    requirement = accepts[0] if accepts else {}
+    extra = requirement.get("extra", {})
+    
+    return {
+        "scheme": requirement.get("scheme", "exact"),
+        "network": requirement.get("network", ""),
+        "amount": requirement.get("amount", ""),
+        "asset": requirement.get("asset", ""),
+        "currency": extra.get("name", "USDC"),
+        "recipient": requirement.get("payTo", ""),
+        "maxTimeoutSeconds": requirement.get("maxTimeoutSeconds", 60),
+        "description": (
+            payment_data.get("resource", {}).get("description", "") if payment_data else ""
+        ),
+    }
+
+
+def _lookup_quote(
+    quotes: PaymentQuoteCache, full_url: str, endpoint_path: str
+) -> Optional[dict[str, Any]]:
+    """Look up cached payment requirements and record the hit or miss."""
+    payment_data = quotes.get(full_url)
+    get_metrics_emitter().record_quote_lookup(
+        hit=payment_data is not None,
+        content_path=endpoint_path,
+        hit_rate=quotes.stats.hit_rate,
+    )
+    return payment_data
 
 
 @tool
@@ -48,12 +112,20 @@ def discover_services() -> dict[str, Any]:
         discovery_url = f"{gateway_url}/mcp/tools"
         span.set_attribute("discovery.url", discovery_url)
         
+        limiters = get_rate_limiter_registry()
         try:
+            limiters.acquire(discovery_url, tool="discover_services", span=span)
             with httpx.Client(timeout=30.0) as client:
                 response = client.get(
                     discovery_url,
                     headers={"Accept": "application/json"},
                 )
+                limiters.record_response(
+                    discovery_url,
+                    "discover_services",
+                    response.status_code,
+                    response.headers.get("retry-after"),
+                )
                 
                 latency_ms = (time.time() - start_time) * 1000
                 span.set_attribute("http.status_code", response.status_code)
@@ -102,6 +174,16 @@ def discover_services() -> dict[str, Any]:
                     "message": f"Found {len(services)} available services",
                 }
                 
+        except RateLimitExceeded as e:
+            span.set_attribute("error.type", "rate_limited")
+            return {
+                "http_status": 429,
+                "error_message": str(e),
+                "retry_after_seconds": e.wait_time,
+                "services": [],
+                "total_count": 0,
+            }
+        
         except httpx.RequestError as e:
             span.set_attribute("error.type", "request_error")
             span.set_attribute("error.message", str(e))
@@ -148,56 +230,64 @@ def request_service(
         
         # Convert service name to endpoint path
         # e.g., get_premium_article -> /api/premium-article
-        path_name = service_name.replace("get_", "").replace("_", "-")
-        endpoint_path = f"/api/{path_name}"
+        endpoint_path = _service_endpoint_path(service_name)
         
         gateway_url = config.seller_api_url
         full_url = f"{gateway_url}{endpoint_path}"
         span.set_attribute("http.url", full_url)
         
+        quotes = get_quote_cache()
+        
         # Build headers
         headers = {"Accept": "application/json"}
         
         # Add payment signature if provided
         if payment_payload:
-            payment_signature = base64.b64encode(
-                json.dumps(payment_payload).encode()
-            ).decode()
-            headers["X-PAYMENT-SIGNATURE"] = payment_signature
+            headers[PAYMENT_SIGNATURE_HEADER] = encode_payment_signature(payment_payload)
+        else:
+            # The requirements are the same on every unpaid probe; reuse the last 402
+            payment_data = _lookup_quote(quotes, full_url, endpoint_path)
+            if payment_data is not None:
+                span.set_attribute("payment.required", True)
+                span.set_attribute("payment.quote_cached", True)
+                return {
+                    "http_status": 402,
+                    "payment_required": _payment_required_details(payment_data),
+                    "service_name": service_name,
+                    "cached": True,
+                    "message": (
+                        "Payment required. Use sign_payment with the payment_required details, "
+                        "then call request_service again with the payment_payload."
+                    ),
+                }
         
+        limiters = get_rate_limiter_registry()
         try:
+            limiters.acquire(full_url, tool="request_service", span=span)
             with httpx.Client(timeout=30.0) as client:
                 response = client.get(
                     full_url,
                     headers=headers,
                     follow_redirects=True,
                 )
+                limiters.record_response(
+                    full_url,
+                    "request_service",
+                    response.status_code,
+                    response.headers.get("retry-after"),
+                )
                 
                 latency_ms = (time.time() - start_time) * 1000
                 span.set_attribute("http.status_code", response.status_code)
                 
-                # Extract x402 headers
-                payment_required_header = (
-                    response.headers.get("x-payment-required") or
-                    response.headers.get("X-PAYMENT-REQUIRED") or
-                    response.headers.get("PAYMENT-REQUIRED")
-                )
-                payment_response_header = (
-                    response.headers.get("x-payment-response") or
-                    response.headers.get("X-PAYMENT-RESPONSE") or
-                    response.headers.get("PAYMENT-RESPONSE")
-                )
-                
                 if response.status_code == 200:
                     span.set_attribute("service.delivered", True)
+                    if not payment_payload:
+                        # Served without payment; stop quoting a price for it
+                        quotes.invalidate(full_url)
                     
                     # Parse settlement if present
-                    settlement = None
-                    if payment_response_header:
-                        try:
-                            settlement = json.loads(base64.b64decode(payment_response_header))
-                        except Exception:
-                            settlement = {"raw": payment_response_header}
+                    settlement = read_payment_response(response.headers)
                     
                     return {
                         "http_status": 200,
@@ -209,38 +299,13 @@ def request_service(
                 if response.status_code == 402:
                     span.set_attribute("payment.required", True)
                     
-                    # Parse payment requirements
-                    payment_data = None
-                    if payment_required_header:
-                        try:
-                            payment_data = json.loads(base64.b64decode(payment_required_header))
-                        except Exception:
-                            pass
-                    
-                    # Also try response body
-                    if not payment_data:
-                        try:
-                            payment_data = response.json()
-                        except Exception:
-                            pass
-                    
-                    # Extract payment requirements
-                    accepts = payment_data.get("accepts", []) if payment_data else []
-                    requirement = accepts[0] if accepts else {}
-                    extra = requirement.get("extra", {})
+                    # Parse payment requirements (header, then body)
+                    payment_data = _read_payment_requirements(response)
+                    quotes.put(full_url, payment_data)
                     
                     return {
                         "http_status": 402,
-                        "payment_required": {
-                            "scheme": requirement.get("scheme", "exact"),
-                            "network": requirement.get("network", ""),
-                            "amount": requirement.get("amount", ""),
-                            "asset": requirement.get("asset", ""),
-                            "currency": extra.get("name", "USDC"),
-                            "recipient": requirement.get("payTo", ""),
-                            "maxTimeoutSeconds": requirement.get("maxTimeoutSeconds", 60),
-                            "description": payment_data.get("resource", {}).get("description", "") if payment_data else "",
-                        },
+                        "payment_required": _payment_required_details(payment_data),
                         "service_name": service_name,
                         "message": (
                             "Payment required. Use sign_payment with the payment_required details, "
@@ -254,6 +319,15 @@ def request_service(
                     "service_name": service_name,
                 }
                 
+        except RateLimitExceeded as e:
+            span.set_attribute("error.type", "rate_limited")
+            return {
+                "http_status": 429,
+                "error_message": str(e),
+                "retry_after_seconds": e.wait_time,
+                "service_name": service_name,
+            }
+        
         except httpx.RequestError as e:
             span.set_attribute("error.type", "request_error")
             span.set_attribute("error.message", str(e))
@@ -265,6 +339,126 @@ def request_service(
             }
 
 
+@tool
+def quote_service(
+    service_name: str,
+    refresh: bool = False,
+) -> dict[str, Any]:
+    """
+    Get the price of a service without buying it.
+    
+    Uses the payment requirements cached from an earlier 402 when available,
+    otherwise probes the service with a lightweight HEAD request. The
+    payment_required details can be passed straight to sign_payment, then
+    to request_service with the payment_payload.
+    
+    Args:
+        service_name: Name of the service to quote (e.g., "get_premium_article")
+        refresh: Ignore cached requirements and ask the service again
+    
+    Returns:
+        Dictionary with:
+        - requires_payment: Whether the service asks for payment
+        - payment_required: Payment details (if requires_payment)
+        - cached: Whether the quote was answered without a request
+    """
+    tracer = get_tracer()
+    
+    with tracer.start_as_current_span("discovery.quote_service") as span:
+        span.set_attribute("service.name", service_name)
+        
+        endpoint_path = _service_endpoint_path(service_name)
+        full_url = f"{config.seller_api_url}{endpoint_path}"
+        span.set_attribute("http.url", full_url)
+        
+        quotes = get_quote_cache()
+        if refresh:
+            quotes.invalidate(full_url)
+        
+        cached = True
+        payment_data = _lookup_quote(quotes, full_url, endpoint_path)
+        span.set_attribute("payment.quote_cached", payment_data is not None)
+        
+        if payment_data is None:
+            cached = False
+            limiters = get_rate_limiter_registry()
+            try:
+                with httpx.Client(timeout=30.0) as client:
+                    request_headers = {"Accept": "application/json"}
+                    limiters.acquire(full_url, tool="quote_service", span=span)
+                    response = client.head(full_url, headers=request_headers, follow_redirects=True)
+                    limiters.record_response(
+                        full_url,
+                        "quote_service",
+                        response.status_code,
+                        response.headers.get("retry-after"),
+                    )
+                    payment_data = _read_payment_requirements(response)
+                    if response.status_code == 405 or (
+                        response.status_code == 402 and payment_data is None
+                    ):
+                        # HEAD not supported, or no header to read: fall back to GET
+                        limiters.acquire(full_url, tool="quote_service", span=span)
+                        response = client.get(
+                            full_url, headers=request_headers, follow_redirects=True
+                        )
+                        limiters.record_response(
+                            full_url,
+                            "quote_service",
+                            response.status_code,
+                            response.headers.get("retry-after"),
+                        )
+                        payment_data = _read_payment_requirements(response)
+            except RateLimitExceeded as e:
+                span.set_attribute("error.type", "rate_limited")
+                return {
+                    "http_status": 429,
+                    "error_message": str(e),
+                    "retry_after_seconds": e.wait_time,
+                    "service_name": service_name,
+                }
+            except httpx.RequestError as e:
+                span.set_attribute("error.type", "request_error")
+                span.record_exception(e)
+                return {
+                    "http_status": 0,
+                    "error_message": f"Quote request failed: {str(e)}",
+                    "service_name": service_name,
+                }
+            
+            span.set_attribute("http.status_code", response.status_code)
+            
+            if response.status_code == 200:
+                quotes.invalidate(full_url)
+                return {
+                    "http_status": 200,
+                    "requires_payment": False,
+                    "service_name": service_name,
+                    "cached": False,
+                }
+            
+            if response.status_code != 402:
+                return {
+                    "http_status": response.status_code,
+                    "error_message": f"Unexpected status code: {response.status_code}",
+                    "service_name": service_name,
+                }
+            
+            quotes.put(full_url, payment_data)
+        
+        return {
+            "http_status": 402,
+            "requires_payment": True,
+            "payment_required": _payment_required_details(payment_data),
+            "service_name": service_name,
+            "cached": cached,
+            "message": (
+                "Use sign_payment with the payment_required details, "
+                "then call request_service with the payment_payload."
+            ),
+        }
+
+
 @tool
 def list_approved_services() -> dict[str, Any]:
     """
@@ -3,6 +3,7 @@
 import json
 import secrets
 import sys
+import threading
 import time
 from typing import Any, Literal
 from strands import tool
@@ -33,8 +34,9 @@ from ..config import config
 from ..tracing import get_tracer, add_payment_span_attributes
 from ..metrics import get_metrics_emitter
 
-# Wallet provider singleton
+# Wallet provider singleton (bulk purchases sign from several threads)
 _wallet_provider: CdpEvmWalletProvider | None = None
+_wallet_provider_lock = threading.Lock()
 
 # Supported testnet networks for faucet
 SUPPORTED_FAUCET_NETWORKS = ["base-sepolia", "ethereum-sepolia"]
@@ -93,14 +95,16 @@ def _get_wallet_provider_sync() -> CdpEvmWalletProvider:
     """Get or create the wallet provider (synchronous)."""
     global _wallet_provider
     if _wallet_provider is None:
-        wallet_config = CdpEvmWalletProviderConfig(
-            api_key_id=config.cdp_api_key_name,
-            api_key_secret=config.cdp_api_key_private_key,
-            wallet_secret=config.cdp_wallet_secret,
-            address=config.cdp_wallet_address if config.cdp_wallet_address else None,
-            network_id=config.network_id,
-        )
-        _wallet_provider = CdpEvmWalletProvider(wallet_config)
+        with _wallet_provider_lock:
+            if _wallet_provider is None:
+                wallet_config = CdpEvmWalletProviderConfig(
+                    api_key_id=config.cdp_api_key_name,
+                    api_key_secret=config.cdp_api_key_private_key,
+                    wallet_secret=config.cdp_wallet_secret,
+                    address=config.cdp_wallet_address if config.cdp_wallet_address else None,
+                    network_id=config.network_id,
+                )
+                _wallet_provider = CdpEvmWalletProvider(wallet_config)
     return _wallet_provider
 
 
@@ -0,0 +1,490 @@
+"""Purchase tools for the x402 payer agent.
+
+purchase_service runs the whole x402 flow in one tool call instead of one
+model round trip per step:
+
+1. Quote the service (cached payment requirements, or a HEAD probe)
+2. Check the price against the caller's max_price and the approval list
+3. Check the wallet balance and sanity-check the payment
+4. Sign the payment and request the service with it
+
+purchase_services does the same for several services at once: all quotes,
+signatures and fetches run concurrently behind one combined approval
+decision, so buying N services takes about as long as buying one.
+
+The model is only consulted when a purchase is not pre-approved: the tool
+returns ``approval_required`` and is called again with ``user_confirmed=True``
+once the user agrees.
+"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Optional, TypeVar
+
+from opentelemetry import trace
+from strands import tool
+
+from ..tracing import get_tracer
+from .discovery import check_service_approval, quote_service, request_service
+from .payment import analyze_payment, get_wallet_balance, sign_payment
+
+# USDC has 6 decimals; requirement amounts are in atomic units
+USDC_DECIMALS = 6
+
+# Most services quoted, signed or fetched at once by purchase_services
+BULK_MAX_WORKERS = 8
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def _units_to_usdc(amount: str) -> str:
+    """Convert an atomic-unit amount to a USDC string (e.g., "1000" -> "0.001")."""
+    return format(Decimal(amount).scaleb(-USDC_DECIMALS).normalize(), "f")
+
+
+def _failed(service_name: str, stage: str, error: str) -> dict[str, Any]:
+    """Build the result for a purchase that stopped before content was delivered."""
+    return {
+        "status": "failed",
+        "service_name": service_name,
+        "stage": stage,
+        "error": error,
+    }
+
+
+def _map_concurrently(fn: Callable[[T], R], items: list[T]) -> list[R]:
+    """Run fn over items on a thread pool, keeping order and the trace context."""
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(len(items), BULK_MAX_WORKERS)) as executor:
+        # Each task runs in a copy of the caller's context so its spans nest
+        # under the caller's span
+        futures = [
+            executor.submit(contextvars.copy_context().run, fn, item) for item in items
+        ]
+        return [future.result() for future in futures]
+
+
+def _quote(service_name: str, refresh: bool = False) -> dict[str, Any]:
+    """
+    Quote a service and normalize the result.
+
+    Returns:
+        Dictionary with ``free`` True for services that need no payment, or
+        ``details`` (payment_required), ``price_usdc`` and ``cached``; a
+        ``status: failed`` result if the quote could not be obtained
+    """
+    quote = quote_service(service_name=service_name, refresh=refresh)
+
+    if quote.get("http_status") == 200 and not quote.get("requires_payment"):
+        return {"service_name": service_name, "free": True}
+
+    if quote.get("http_status") != 402:
+        return _failed(service_name, "quote", quote.get("error_message", "Quote failed"))
+
+    details = quote["payment_required"]
+    try:
+        price_usdc = _units_to_usdc(details["amount"])
+    except (InvalidOperation, TypeError):
+        return _failed(service_name, "quote", f"Invalid price: {details.get('amount')}")
+
+    return {
+        "service_name": service_name,
+        "free": False,
+        "details": details,
+        "price_usdc": price_usdc,
+        "cached": quote.get("cached", False),
+    }
+
+
+def _sign(details: dict[str, Any]) -> dict[str, Any]:
+    """Sign the payment described by a quote's payment_required details."""
+    return sign_payment(
+        scheme=details.get("scheme") or "exact",
+        network=details.get("network", ""),
+        amount=details["amount"],
+        recipient=details.get("recipient", ""),
+        asset=details.get("asset", ""),
+        max_timeout_seconds=details.get("maxTimeoutSeconds", 60),
+    )
+
+
+# Fields of a payment requirement that the approval and payment checks covered
+_REQUIREMENT_FIELDS = ("scheme", "network", "amount", "asset", "recipient")
+
+
+def _changed_requirement(old: dict[str, Any], new: dict[str, Any]) -> list[str]:
+    """Names of the payment requirement fields that differ between two quotes."""
+    return [name for name in _REQUIREMENT_FIELDS if old.get(name) != new.get(name)]
+
+
+def _fetch_free(service_name: str) -> dict[str, Any]:
+    """Fetch a service that needs no payment."""
+    result = request_service(service_name=service_name)
+    if result.get("http_status") != 200:
+        return _failed(service_name, "fetch", result.get("error_message", "Request failed"))
+    return {
+        "status": "purchased",
+        "service_name": service_name,
+        "content": result.get("data"),
+        "receipt": None,
+    }
+
+
+def _fetch_paid(
+    quote: dict[str, Any],
+    payment_payload: dict[str, Any],
+    approval_type: str,
+) -> dict[str, Any]:
+    """
+    Request a service with a signed payment.
+
+    A payment signed for a cached quote may be rejected because the seller's
+    requirements changed. The service is then re-quoted once, and paid again
+    only if the whole requirement (scheme, network, amount, asset and
+    recipient) is unchanged, since that is what was approved and checked;
+    otherwise the result fails at stage "requote".
+    """
+    service_name = quote["service_name"]
+    result = request_service(service_name=service_name, payment_payload=payment_payload)
+
+    if result.get("http_status") == 402 and quote.get("cached"):
+        fresh = _quote(service_name, refresh=True)
+        if fresh.get("status") == "failed":
+            return fresh
+        if fresh["free"]:
+            return _failed(service_name, "requote", "Service became free; fetch it again")
+        changed = _changed_requirement(quote["details"], fresh["details"])
+        if changed:
+            return _failed(
+                service_name,
+                "requote",
+                f"Payment requirements changed ({', '.join(changed)}); "
+                "quote again before buying",
+            )
+        signed = _sign(fresh["details"])
+        if not signed.get("success"):
+            return _failed(service_name, "sign", signed.get("error", "Signing failed"))
+        quote = fresh
+        result = request_service(service_name=service_name, payment_payload=signed["payload"])
+
+    if result.get("http_status") != 200:
+        if result.get("http_status") == 402:
+            return _failed(service_name, "fetch", "Payment was rejected by the service")
+        return _failed(service_name, "fetch", result.get("error_message", "Request failed"))
+
+    details = quote["details"]
+    settlement = result.get("settlement") or {}
+    return {
+        "status": "purchased",
+        "service_name": service_name,
+        "content": result.get("data"),
+        "receipt": {
+            "amount_usdc": quote["price_usdc"],
+            "amount_units": details["amount"],
+            "currency": details.get("currency", "USDC"),
+            "network": details.get("network", ""),
+            "recipient": details.get("recipient", ""),
+            "transaction_hash": settlement.get("transactionHash") or settlement.get("transaction"),
+            "approval": approval_type,
+        },
+    }
+
+
+def _check_payment(quote: dict[str, Any], wallet_balance: str) -> Optional[str]:
+    """Run analyze_payment's checks; returns the rejection reason, if any."""
+    details = quote["details"]
+    analysis = analyze_payment(
+        amount=quote["price_usdc"],
+        currency=details.get("currency", "USDC"),
+        recipient=details.get("recipient", ""),
+        description=details.get("description") or quote["service_name"],
+        wallet_balance=wallet_balance,
+    )
+    return None if analysis["should_pay"] else analysis["reasoning"]
+
+
+def _purchase(
+    service_name: str,
+    max_price_usdc: Decimal,
+    user_confirmed: bool,
+    refresh: bool,
+    span: trace.Span,
+) -> dict[str, Any]:
+    """One quote-approve-sign-fetch pass of purchase_service."""
+    quote = _quote(service_name, refresh=refresh)
+    if quote.get("status") == "failed":
+        return quote
+    if quote["free"]:
+        return _fetch_free(service_name)
+
+    price_usdc = quote["price_usdc"]
+    span.set_attribute("purchase.price_usdc", price_usdc)
+
+    if Decimal(price_usdc) > max_price_usdc:
+        return {
+            "status": "rejected",
+            "service_name": service_name,
+            "price_usdc": price_usdc,
+            "reason": f"Price {price_usdc} USDC exceeds max_price {max_price_usdc} USDC",
+        }
+
+    approval = check_service_approval(service_name=service_name, price_usdc=price_usdc)
+    if not approval["approved"] and not user_confirmed:
+        return {
+            "status": "approval_required",
+            "service_name": service_name,
+            "price_usdc": price_usdc,
+            "currency": quote["details"].get("currency", "USDC"),
+            "reason": approval["reason"],
+            "message": (
+                f"{service_name} costs {price_usdc} USDC and is not pre-approved. "
+                "Ask the user to confirm, then call purchase_service again "
+                "with user_confirmed=True."
+            ),
+        }
+    approval_type = "pre_approved" if approval["approved"] else "user_confirmed"
+    span.set_attribute("purchase.approval", approval_type)
+
+    balance = get_wallet_balance()
+    if not balance.get("success"):
+        return _failed(service_name, "balance", balance.get("error", "Balance unavailable"))
+
+    rejection = _check_payment(quote, balance.get("usdc_balance", "0"))
+    if rejection:
+        return {
+            "status": "rejected",
+            "service_name": service_name,
+            "price_usdc": price_usdc,
+            "reason": rejection,
+        }
+
+    signed = _sign(quote["details"])
+    if not signed.get("success"):
+        return _failed(service_name, "sign", signed.get("error", "Signing failed"))
+
+    return _fetch_paid(quote, signed["payload"], approval_type)
+
+
+@tool
+def purchase_service(
+    service_name: str,
+    max_price: str,
+    user_confirmed: bool = False,
+) -> dict[str, Any]:
+    """
+    Buy a service in one step: quote, approval, balance check, sign and fetch.
+
+    Prefer this over calling request_service, check_service_approval,
+    analyze_payment and sign_payment one by one.
+
+    Args:
+        service_name: Name of the service to buy (e.g., "get_premium_article")
+        max_price: Most you are willing to pay, in USDC (e.g., "0.005")
+        user_confirmed: Set to True only after the user confirmed a purchase
+                        that returned status "approval_required"
+
+    Returns:
+        Dictionary with status:
+        - "purchased": content and a receipt (amount, network, transaction)
+        - "approval_required": price and reason; ask the user, then call again
+          with user_confirmed=True
+        - "rejected": the price or payment checks failed; nothing was paid
+        - "failed": an error at the given stage; nothing was paid unless the
+          stage is "fetch"
+    """
+    tracer = get_tracer()
+    start_time = time.time()
+
+    with tracer.start_as_current_span("purchase.purchase_service") as span:
+        span.set_attribute("service.name", service_name)
+        span.set_attribute("purchase.user_confirmed", user_confirmed)
+
+        try:
+            max_price_usdc = Decimal(max_price)
+        except InvalidOperation:
+            return _failed(service_name, "validate", f"Invalid max_price: {max_price}")
+
+        # If the price changed since a cached quote, decide again at the new price
+        for refresh in (False, True):
+            result = _purchase(service_name, max_price_usdc, user_confirmed, refresh, span)
+            if result.get("stage") != "requote" or refresh:
+                break
+            span.set_attribute("purchase.requoted", True)
+
+        span.set_attribute("purchase.status", result["status"])
+        span.set_attribute("purchase.latency_ms", (time.time() - start_time) * 1000)
+        return result
+
+
+@tool
+def purchase_services(
+    service_names: list[str],
+    max_total_price: str,
+    user_confirmed: bool = False,
+) -> dict[str, Any]:
+    """
+    Buy several services at once with a single approval.
+
+    All services are quoted together and approved as one purchase; the
+    payments are then signed and the content fetched in parallel. Use this
+    instead of calling purchase_service once per service.
+
+    Args:
+        service_names: Names of the services to buy (from discover_services)
+        max_total_price: Most you are willing to pay for all of them, in USDC
+        user_confirmed: Set to True only after the user confirmed a purchase
+                        that returned status "approval_required"
+
+    Returns:
+        Dictionary with:
+        - status: "purchased", "partial" (some items failed), "approval_required",
+          "rejected" or "failed"; nothing is paid unless status is "purchased"
+          or "partial"
+        - total_usdc: Combined price of the paid services
+        - results: Per-service result with content and receipt, or error
+    """
+    tracer = get_tracer()
+    start_time = time.time()
+
+    with tracer.start_as_current_span("purchase.purchase_services") as span:
+        # Keep the requested order, buying each service once
+        service_names = list(dict.fromkeys(service_names))
+        span.set_attribute("purchase.service_count", len(service_names))
+        span.set_attribute("purchase.user_confirmed", user_confirmed)
+
+        try:
+            max_total_usdc = Decimal(max_total_price)
+        except InvalidOperation:
+            return {
+                "status": "failed",
+                "error": f"Invalid max_total_price: {max_total_price}",
+                "results": {},
+            }
+
+        # 1. Quote everything at once
+        quotes = _map_concurrently(_quote, service_names)
+        failed = [quote for quote in quotes if quote.get("status") == "failed"]
+        if failed:
+            span.set_attribute("purchase.status", "failed")
+            return {
+                "status": "failed",
+                "error": "Could not quote: " + ", ".join(q["service_name"] for q in failed),
+                "results": {q["service_name"]: q for q in failed},
+            }
+        paid = [quote for quote in quotes if not quote["free"]]
+        total_usdc = sum((Decimal(quote["price_usdc"]) for quote in paid), Decimal(0))
+        total_display = format(total_usdc.normalize(), "f")
+        span.set_attribute("purchase.total_usdc", total_display)
+        prices = {quote["service_name"]: quote["price_usdc"] for quote in paid}
+
+        # 2. One combined decision for the whole basket
+        if total_usdc > max_total_usdc:
+            span.set_attribute("purchase.status", "rejected")
+            return {
+                "status": "rejected",
+                "total_usdc": total_display,
+                "prices_usdc": prices,
+                "reason": (
+                    f"Total {total_display} USDC exceeds max_total_price {max_total_price} USDC"
+                ),
+                "results": {},
+            }
+
+        not_approved = [
+            quote["service_name"]
+            for quote in paid
+            if not check_service_approval(
+                service_name=quote["service_name"], price_usdc=quote["price_usdc"]
+            )["approved"]
+        ]
+        if not_approved and not user_confirmed:
+            span.set_attribute("purchase.status", "approval_required")
+            return {
+                "status": "approval_required",
+                "total_usdc": total_display,
+                "prices_usdc": prices,
+                "not_pre_approved": not_approved,
+                "message": (
+                    f"These services cost {total_display} USDC in total and "
+                    f"{', '.join(not_approved)} not pre-approved. Ask the user to confirm, "
+                    "then call purchase_services again with user_confirmed=True."
+                ),
+                "results": {},
+            }
+        approval_type = "user_confirmed" if not_approved else "pre_approved"
+        span.set_attribute("purchase.approval", approval_type)
+
+        if paid:
+            balance = get_wallet_balance()
+            if not balance.get("success"):
+                return {
+                    "status": "failed",
+                    "error": balance.get("error", "Balance unavailable"),
+                    "results": {},
+                }
+            wallet_balance = balance.get("usdc_balance", "0")
+            try:
+                balance_usdc = Decimal(wallet_balance)
+            except (InvalidOperation, TypeError):
+                span.set_attribute("purchase.status", "failed")
+                error = f"Invalid wallet balance: {wallet_balance}"
+                return {
+                    "status": "failed",
+                    "error": error,
+                    "results": {
+                        quote["service_name"]: _failed(quote["service_name"], "balance", error)
+                        for quote in paid
+                    },
+                }
+            if balance_usdc < total_usdc:
+                span.set_attribute("purchase.status", "rejected")
+                return {
+                    "status": "rejected",
+                    "total_usdc": total_display,
+                    "reason": (
+                        f"Insufficient balance. Have {wallet_balance} USDC, "
+                        f"need {total_display} USDC"
+                    ),
+                    "results": {},
+                }
+            rejections = {
+                quote["service_name"]: reason
+                for quote in paid
+                if (reason := _check_payment(quote, wallet_balance))
+            }
+            if rejections:
+                span.set_attribute("purchase.status", "rejected")
+                return {
+                    "status": "rejected",
+                    "total_usdc": total_display,
+                    "reason": "; ".join(f"{name}: {reason}" for name, reason in rejections.items()),
+                    "results": {},
+                }
+
+        # 3 and 4. Sign and fetch every service in parallel
+        def buy(quote: dict[str, Any]) -> dict[str, Any]:
+            if quote["free"]:
+                return _fetch_free(quote["service_name"])
+            signed = _sign(quote["details"])
+            if not signed.get("success"):
+                return _failed(quote["service_name"], "sign", signed.get("error", "Signing failed"))
+            return _fetch_paid(quote, signed["payload"], approval_type)
+
+        results = _map_concurrently(buy, quotes)
+        purchased = [result for result in results if result["status"] == "purchased"]
+        status = "purchased" if len(purchased) == len(results) else "partial"
+        if not purchased:
+            status = "failed"
+
+        span.set_attribute("purchase.status", status)
+        span.set_attribute("purchase.purchased_count", len(purchased))
+        span.set_attribute("purchase.latency_ms", (time.time() - start_time) * 1000)
+        return {
+            "status": status,
+            "total_usdc": total_display,
+            "results": {result["service_name"]: result for result in results},
+        }
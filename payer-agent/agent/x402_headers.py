@@ -0,0 +1,150 @@
+"""
+x402 header codec shared by the MCP client and the content tools.
+
+Sellers send payment requirements and settlement receipts as Base64-encoded
+JSON headers, under either the x402 v2 ``X-`` prefixed names or the bare
+names. This module gives every caller one lookup and decode path:
+
+- Case-insensitive header lookup that reads ``httpx.Headers`` (or a plain
+  mapping) in place instead of copying it into a dict
+- Decoding memoized by header value, so the identical PAYMENT-REQUIRED blob a
+  seller returns on every 402 is only Base64/JSON-decoded once
+- A single encoder for the X-PAYMENT-SIGNATURE value, computed once per
+  payment and reused for every retry of the request
+
+Decoded values are shared between callers and should be treated as read-only.
+
+Usage:
+    from agent.x402_headers import (
+        PAYMENT_SIGNATURE_HEADER,
+        encode_payment_signature,
+        read_payment_required,
+    )
+
+    headers[PAYMENT_SIGNATURE_HEADER] = encode_payment_signature(payload)
+
+    requirements = read_payment_required(response.headers)
+"""
+
+import base64
+import json
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+import httpx
+
+# Header names in lookup order: x402 v2 prefixed names first
+PAYMENT_REQUIRED_HEADERS = ("x-payment-required", "payment-required")
+PAYMENT_RESPONSE_HEADERS = ("x-payment-response", "payment-response")
+PAYMENT_SIGNATURE_HEADER = "X-PAYMENT-SIGNATURE"
+
+# Distinct header values kept decoded
+DECODE_CACHE_SIZE = 256
+
+
+def get_header(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    """
+    Look up the first present header from a list of lowercase names.
+
+    ``httpx.Headers`` is already case-insensitive and is read in place. Other
+    mappings are tried by exact name first, then scanned case-insensitively.
+
+    Args:
+        headers: Response headers
+        names: Lowercase header names in order of preference
+
+    Returns:
+        The header value, or None if none of the names are present
+    """
+    for name in names:
+        value = headers.get(name)
+        if isinstance(value, str):
+            return value
+    if isinstance(headers, httpx.Headers):
+        return None
+
+    for name in names:
+        for key, value in headers.items():
+            if isinstance(key, str) and key.lower() == name and isinstance(value, str):
+                return value
+    return None
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def decode_header_value(value: str) -> Any:
+    """
+    Decode a Base64-encoded JSON header value (memoized by value).
+
+    Args:
+        value: Header value
+
+    Returns:
+        The decoded JSON value
+
+    Raises:
+        ValueError: If the value is not valid Base64-encoded JSON
+    """
+    return json.loads(base64.b64decode(value))
+
+
+def _read(headers: Mapping[str, str], names: tuple[str, ...], strict: bool) -> Optional[Any]:
+    """Look up and decode a header; undecodable values become {"raw": value}."""
+    value = get_header(headers, *names)
+    if value is None:
+        return None
+    try:
+        return decode_header_value(value)
+    except ValueError:
+        if strict:
+            raise
+        return {"raw": value}
+
+
+def read_payment_required(headers: Mapping[str, str], strict: bool = False) -> Optional[Any]:
+    """
+    Read and decode the PAYMENT-REQUIRED header.
+
+    Args:
+        headers: Response headers
+        strict: Raise on an undecodable value instead of returning {"raw": value}
+
+    Returns:
+        Decoded payment requirements, or None if the header is absent
+
+    Raises:
+        ValueError: If strict and the header is not valid Base64-encoded JSON
+    """
+    return _read(headers, PAYMENT_REQUIRED_HEADERS, strict)
+
+
+def read_payment_response(headers: Mapping[str, str], strict: bool = False) -> Optional[Any]:
+    """
+    Read and decode the PAYMENT-RESPONSE (settlement) header.
+
+    Args:
+        headers: Response headers
+        strict: Raise on an undecodable value instead of returning {"raw": value}
+
+    Returns:
+        Decoded settlement details, or None if the header is absent
+
+    Raises:
+        ValueError: If strict and the header is not valid Base64-encoded JSON
+    """
+    return _read(headers, PAYMENT_RESPONSE_HEADERS, strict)
+
+
+def encode_payment_signature(payment_payload: dict[str, Any]) -> str:
+    """
+    Encode a signed payment payload as an X-PAYMENT-SIGNATURE header value.
+
+    Encode once per payment and reuse the result for every attempt of the
+    request, so retries carry byte-identical signatures.
+
+    Args:
+        payment_payload: Signed payload from the sign_payment tool
+
+    Returns:
+        Base64-encoded JSON string
+    """
+    return base64.b64encode(json.dumps(payment_payload).encode()).decode()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for EMF metric encoding.
+
+Calls record_payment_signing and record_mcp_invocation in a loop with stdout
+sent to /dev/null and reports calls per second for:
+- dict + json.dumps: a copy of the previous encoder, which built the whole
+  EMF document as a dict and serialized it on every call
+- template (json): EMFEncoder with the standard library backend
+- template (orjson): EMFEncoder with orjson, if it is installed
+
+Usage:
+    cd payer-agent
+    python scripts/bench_metrics.py
+    python scripts/bench_metrics.py --calls 200000
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agent.emf_encoder import orjson  # noqa: E402
+from agent.metrics import MetricDimensions, MetricsEmitter, MetricUnit, PayerMetricName  # noqa: E402
+
+
+class DictEncodingEmitter(MetricsEmitter):
+    """The previous encoding: build the EMF document as a dict, then json.dumps it."""
+
+    def _encode_emf_log(
+        self,
+        metrics: dict[str, tuple[Any, MetricUnit]],
+        dim_dict: dict[str, str],
+        properties: Optional[dict[str, Any]] = None,
+    ) -> str:
+        emf_log: dict[str, Any] = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.NAMESPACE,
+                        "Dimensions": [list(dim_dict.keys())],
+                        "Metrics": [
+                            {"Name": name, "Unit": unit.value}
+                            for name, (_, unit) in metrics.items()
+                        ],
+                    }
+                ],
+            },
+            "service": self.service_name,
+            **dim_dict,
+        }
+        for name, (value, _) in metrics.items():
+            emf_log[name] = value
+        if properties:
+            emf_log.update(properties)
+        return json.dumps(emf_log)
+
+    def emit_multiple(
+        self,
+        metrics: dict[PayerMetricName, tuple[float, MetricUnit]],
+        dimensions: Optional[MetricDimensions] = None,
+        properties: Optional[dict[str, Any]] = None,
+    ) -> None:
+        metrics_dict = {name.value: value_unit for name, value_unit in metrics.items()}
+        dim_dict = (dimensions or self._dimensions).to_dict()
+        print(self._encode_emf_log(metrics_dict, dim_dict, properties))
+
+
+def signing(emitter: MetricsEmitter, i: int) -> None:
+    emitter.record_payment_signing(
+        success=i % 10 != 0,
+        latency_ms=41.5 + i % 13,
+        network="base-sepolia",
+        amount="0.001",
+        error="insufficient funds" if i % 10 == 0 else None,
+    )
+
+
+def invocation(emitter: MetricsEmitter, i: int) -> None:
+    emitter.record_mcp_invocation(
+        success=i % 5 != 0,
+        tool_name="get_premium_article",
+        latency_ms=120.25 + i % 17,
+        payment_required=i % 5 == 0,
+    )
+
+
+def run(emitter: MetricsEmitter, record, calls: int) -> float:
+    """Calls per second of one record_* helper."""
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for i in range(min(calls, 1000)):
+            record(emitter, i)
+        start = time.perf_counter()
+        for i in range(calls):
+            record(emitter, i)
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    emitters = {
+        "dict + json.dumps": DictEncodingEmitter(),
+        "template (json)": MetricsEmitter(json_backend="json"),
+    }
+    if orjson is not None:
+        emitters["template (orjson)"] = MetricsEmitter(json_backend="orjson")
+
+    print(f"{args.calls} calls each, calls/second")
+    print(f"{'':24}" + "".join(f"{name:>22}" for name in emitters))
+    benchmarks = (("record_payment_signing", signing), ("record_mcp_invocation", invocation))
+    for label, record in benchmarks:
+        rates = [run(emitter, record, args.calls) for emitter in emitters.values()]
+        speedups = "".join(f"{rate:>14,.0f} ({rate / rates[0]:.2f}x)" for rate in rates)
+        print(f"{label:24}{speedups}")
+
+
+if __name__ == "__main__":
+    main()
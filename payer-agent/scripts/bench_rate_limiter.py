@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for AsyncRateLimiter.
+
+Starts N concurrent waiters on one limiter and reports:
+- failures: waiters that got RateLimitExceeded despite a generous timeout
+- inversions: adjacent admissions out of call order (0 means FIFO)
+- lateness: how long after its ideal slot each waiter was admitted
+- lock hold time and lock acquisitions per waiter
+
+The same run is repeated against a copy of the previous sleep-and-race
+implementation, where every waiter computes the same wait, sleeps, and races
+for the token again, for comparison.
+
+Usage:
+    cd payer-agent
+    python scripts/bench_rate_limiter.py
+    python scripts/bench_rate_limiter.py --waiters 1000 --rate 2000 --burst 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agent.rate_limiter import AsyncRateLimiter, RateLimitConfig, RateLimitExceeded  # noqa: E402
+
+
+class TimedLock:
+    """threading.Lock wrapper that records how long each hold lasts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._acquired_at = 0.0
+        self.holds: list[float] = []
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._acquired_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.holds.append(time.perf_counter() - self._acquired_at)
+        self._lock.release()
+
+
+class SleepAndRaceLimiter:
+    """The previous AsyncRateLimiter algorithm: wait, then race for the token once."""
+
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+        self._tokens = float(config.burst_capacity)
+        self._last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.config.burst_capacity,
+            self._tokens + (now - self._last_update) * self.config.requests_per_second,
+        )
+        self._last_update = now
+
+    async def acquire(self, timeout: float) -> float:
+        start = time.monotonic()
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            wait_time = (1 - self._tokens) / self.config.requests_per_second
+            if wait_time > timeout:
+                raise RateLimitExceeded(wait_time)
+        await asyncio.sleep(wait_time)
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return time.monotonic() - start
+            raise RateLimitExceeded(0.0, "Rate limit still exceeded after waiting")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(limiter, waiters: int, rate: float, burst: int) -> dict:
+    lock = TimedLock()
+    # AsyncRateLimiter keeps its state in a RateLimiter bucket
+    getattr(limiter, "bucket", limiter)._lock = lock
+    admitted: list[tuple[int, float]] = []
+    failures = 0
+
+    async def worker(index: int) -> None:
+        nonlocal failures
+        try:
+            await limiter.acquire(timeout=60.0)
+        except RateLimitExceeded:
+            failures += 1
+            return
+        admitted.append((index, time.monotonic()))
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(waiters)))
+    elapsed = time.monotonic() - start
+
+    order = [index for index, _ in admitted]
+    inversions = sum(1 for a, b in zip(order, order[1:]) if b < a)
+    # Ideal slot for the k-th admission: the burst goes at once, then one per interval
+    lateness = [
+        max(0.0, at - start - max(0, k - burst + 1) / rate)
+        for k, (_, at) in enumerate(sorted(admitted, key=lambda item: item[1]))
+    ]
+    return {
+        "elapsed_s": elapsed,
+        "ideal_s": max(0, waiters - burst) / rate,
+        "failures": failures,
+        "inversions": inversions,
+        "lateness_p50_ms": percentile(lateness, 50) * 1000 if lateness else 0.0,
+        "lateness_p99_ms": percentile(lateness, 99) * 1000 if lateness else 0.0,
+        "lock_acquisitions_per_waiter": len(lock.holds) / waiters,
+        "lock_hold_p50_us": percentile(lock.holds, 50) * 1e6,
+        "lock_hold_p99_us": percentile(lock.holds, 99) * 1e6,
+        "lock_hold_max_us": max(lock.holds) * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--waiters", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=2000.0)
+    parser.add_argument("--burst", type=int, default=10)
+    args = parser.parse_args()
+
+    config = RateLimitConfig(
+        requests_per_second=args.rate,
+        burst_capacity=args.burst,
+        max_wait_time=60.0,
+        enable_logging=False,
+    )
+    results = {
+        "reservation (GCRA)": asyncio.run(
+            run(AsyncRateLimiter(config), args.waiters, args.rate, args.burst)
+        ),
+        "sleep-and-race": asyncio.run(
+            run(SleepAndRaceLimiter(config), args.waiters, args.rate, args.burst)
+        ),
+    }
+
+    print(f"{args.waiters} waiters, {args.rate:g} req/s, burst {args.burst}")
+    names = list(results)
+    print(f"{'':32}" + "".join(f"{name:>22}" for name in names))
+    for metric in results[names[0]]:
+        print(f"{metric:32}" + "".join(f"{results[name][metric]:>22.2f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
@@ -87,6 +87,50 @@ def mcp_client_with_mock(gateway_mock: GatewayTargetMock):
     return client
 
 
+@pytest.fixture(autouse=True)
+def reset_payment_quotes():
+    """
+    Start every test with an empty payment requirements cache.
+    
+    The cache is process-global, so a 402 seen by one test would otherwise
+    answer the next test's probe of the same endpoint.
+    """
+    from agent.payment_quotes import get_quote_cache
+    
+    get_quote_cache().clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiters():
+    """
+    Start every test with full rate limiter buckets.
+    
+    The tools share one process-global registry, so requests made by earlier
+    tests would otherwise throttle later ones.
+    """
+    from agent.rate_limiter import get_rate_limiter_registry
+    
+    get_rate_limiter_registry().reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_latency_histograms():
+    """
+    Start and end every test with empty global latency histograms.
+    
+    The histograms are process-global and export their last window at exit,
+    so samples left by the tests would otherwise be written to stdout after
+    the test summary.
+    """
+    from agent.latency_sketch import get_latency_histograms
+    
+    get_latency_histograms().reset()
+    yield
+    get_latency_histograms().reset()
+
+
 # ============================================================================
 # Environment-based Fixtures
 # ============================================================================
@@ -8,6 +8,8 @@ Available Mocks:
 - GatewayTargetMock: Mock for Gateway target endpoints (content server)
 - MockContentEndpoint: Definition of a mock content endpoint
 - GatewayTargetMockConfig: Configuration for the Gateway mock
+- FakeRedis: In-process Redis stand-in for the distributed rate limiter
+- LuaFakeRedis: FakeRedis running the real Lua script (requires lupa)
 
 Usage:
     from tests.mocks import GatewayTargetMock, GatewayTargetMockConfig
@@ -40,6 +42,7 @@ Usage:
     assert response.status_code == 200  # Content delivered
 """
 
+from .fake_redis import FakeRedis, LuaFakeRedis
 from .gateway_mock import (
     GatewayTargetMock,
     GatewayTargetMockConfig,
@@ -47,7 +50,9 @@ from .gateway_mock import (
 )
 
 __all__ = [
+    "FakeRedis",
     "GatewayTargetMock",
     "GatewayTargetMockConfig", 
+    "LuaFakeRedis",
     "MockContentEndpoint",
 ]
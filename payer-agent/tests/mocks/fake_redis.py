@@ -0,0 +1,154 @@
+"""
+In-process stand-in for a Redis server running the token bucket script.
+
+FakeRedis implements just enough of the redis-py client for
+RedisTokenBucketStore: ``register_script`` returns a callable that runs a
+Python port of TOKEN_BUCKET_SCRIPT against the fake's own keyspace, with the
+same argument and reply conversions a real server applies (arguments arrive
+as strings, numbers in the reply are truncated to integers, keys expire).
+LuaFakeRedis runs TOKEN_BUCKET_SCRIPT itself in an embedded Lua 5.1
+interpreter (the version Redis embeds) on the same keyspace, which requires
+the ``lupa`` package.
+
+Usage:
+    from tests.mocks import FakeRedis
+
+    server = FakeRedis()
+    store = RedisTokenBucketStore(server)
+    server.fail = True  # Raise ConnectionError from every script call
+
+    lua_server = LuaFakeRedis()  # Same, running the real script
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+from agent.distributed_rate_limiter import TOKEN_BUCKET_SCRIPT
+
+
+class FakeRedisConnectionError(ConnectionError):
+    """Raised for every call while the fake server is marked as failing."""
+
+
+class FakeRedis:
+    """Fake Redis client sharing one keyspace between every script call."""
+
+    def __init__(self, clock: Optional[Callable[[], float]] = None):
+        """
+        Initialize the fake server.
+
+        Args:
+            clock: Server clock (the script's TIME); wall-clock time if not provided
+        """
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.expires_at: dict[str, float] = {}
+        self.script_calls = 0
+        self.fail = False
+
+    def register_script(self, script: str) -> Callable:
+        """Register a Lua script; only the token bucket script is supported."""
+        if script != TOKEN_BUCKET_SCRIPT:
+            raise NotImplementedError("FakeRedis only runs TOKEN_BUCKET_SCRIPT")
+
+        def run(keys: list, args: list) -> list:
+            return self._token_bucket(keys[0], *(str(arg) for arg in args))
+
+        return run
+
+    def _expire(self, key: str, now: float) -> None:
+        """Drop a key whose expiry has passed. Caller must hold the lock."""
+        if key in self.expires_at and now >= self.expires_at[key]:
+            self.hashes.pop(key, None)
+            del self.expires_at[key]
+
+    def _token_bucket(self, key: str, rate_arg: str, burst_arg: str, requested_arg: str) -> list:
+        """Python port of TOKEN_BUCKET_SCRIPT."""
+        with self._lock:
+            self.script_calls += 1
+            if self.fail:
+                raise FakeRedisConnectionError("Connection refused")
+            rate = float(rate_arg)
+            burst = float(burst_arg)
+            requested = float(requested_arg)
+            now = self._clock()
+            self._expire(key, now)
+            state = self.hashes.get(key, {})
+            if "tokens" in state and "updated" in state:
+                tokens = float(state["tokens"])
+                updated = float(state["updated"])
+            else:
+                tokens, updated = burst, now
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            granted = min(requested, math.floor(tokens))
+            tokens -= granted
+            self.hashes[key] = {"tokens": repr(tokens), "updated": repr(now)}
+            self.expires_at[key] = now + (math.ceil(burst / rate * 1000) + 1000) / 1000
+            wait_ms = 0
+            if granted == 0:
+                wait_ms = math.ceil((1 - tokens) / rate * 1000)
+            # Lua numbers in a reply become integers
+            return [int(granted), int(wait_ms)]
+
+
+class LuaFakeRedis(FakeRedis):
+    """FakeRedis that runs the registered script in Lua instead of the port."""
+
+    def __init__(self, clock: Optional[Callable[[], float]] = None):
+        """
+        Initialize the fake server.
+
+        Args:
+            clock: Server clock (the script's TIME); wall-clock time if not provided
+
+        Raises:
+            ImportError: If lupa is not installed
+        """
+        from lupa import lua51
+
+        super().__init__(clock)
+        self._lua = lua51.LuaRuntime()
+
+    def register_script(self, script: str) -> Callable:
+        """Register a Lua script; it may only call TIME, HMGET, HSET and PEXPIRE."""
+        # KEYS, ARGV and redis are globals in Redis; parameters do the same here
+        function = self._lua.eval(f"function(KEYS, ARGV, redis)\n{script}\nend")
+
+        def run(keys: list, args: list) -> list:
+            with self._lock:
+                self.script_calls += 1
+                if self.fail:
+                    raise FakeRedisConnectionError("Connection refused")
+                reply = function(
+                    self._lua.table(*keys),
+                    self._lua.table(*(str(arg) for arg in args)),
+                    self._lua.table_from({"call": self._call}),
+                )
+                # Lua numbers in a reply become integers
+                return [int(value) for value in reply.values()]
+
+        return run
+
+    def _call(self, command: str, key: Optional[str] = None, *args):
+        """redis.call for the script. Caller must hold the lock."""
+        now = self._clock()
+        command = command.upper()
+        if command == "TIME":
+            seconds = math.floor(now)
+            return self._lua.table(str(seconds), str(round((now - seconds) * 1_000_000)))
+        self._expire(key, now)
+        state = self.hashes.setdefault(key, {}) if command == "HSET" else self.hashes.get(key, {})
+        if command == "HMGET":
+            # Missing fields come back as false, like nil bulk replies in Redis
+            return self._lua.table(*(state.get(field, False) for field in args))
+        if command == "HSET":
+            fields = dict(zip(args[::2], (str(value) for value in args[1::2])))
+            state.update(fields)
+            return len(fields)
+        if command == "PEXPIRE":
+            self.expires_at[key] = now + int(args[0]) / 1000
+            return 1
+        raise NotImplementedError(f"LuaFakeRedis does not support {command}")
@@ -243,6 +243,8 @@ class GatewayTargetMock:
                     "scheme": "exact",
                     "asset_address": self.config.default_asset,
                     "asset_name": "USDC",
+                    "pay_to": self.config.default_recipient,
+                    "timeout_seconds": 60,
                 } if endpoint.requires_payment else {},
                 "input_schema": {
                     "type": "object",
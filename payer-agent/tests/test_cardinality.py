@@ -0,0 +1,203 @@
+"""
+Tests for the metric dimension cardinality limits.
+"""
+
+import json
+import random
+import threading
+from collections import Counter
+
+import pytest
+
+from agent.cardinality import (
+    DEFAULT_DIMENSION_BUDGETS,
+    OTHER,
+    CardinalityGovernor,
+    DimensionGovernor,
+    SpaceSaving,
+    error_class,
+)
+from agent.metrics import MetricsEmitter
+
+
+class TestSpaceSaving:
+    """Tests for SpaceSaving."""
+
+    def test_exact_below_capacity(self):
+        """Test that counts are exact while every value fits."""
+        sketch = SpaceSaving(capacity=10)
+        for value in "aababc":
+            sketch.offer(value)
+
+        assert sketch.top(3) == [("a", 3), ("b", 2), ("c", 1)]
+        assert sketch.error("a") == 0
+        assert sketch.total == 6
+
+    def test_heavy_hitters_survive_long_tail(self):
+        """Test that frequent values are found among many rare ones with bounded error."""
+        rng = random.Random(3)
+        stream = [f"/api/item/{rng.randrange(100000)}" for _ in range(20000)]
+        stream += ["/api/premium-article"] * 3000 + ["/api/weather"] * 1500
+        rng.shuffle(stream)
+        sketch = SpaceSaving(capacity=50)
+        for value in stream:
+            sketch.offer(value)
+
+        true_counts = Counter(stream)
+        assert [value for value, _ in sketch.top(2)] == ["/api/premium-article", "/api/weather"]
+        for value in ("/api/premium-article", "/api/weather"):
+            estimate = sketch.count(value)
+            assert estimate - sketch.error(value) <= true_counts[value] <= estimate
+        assert len(sketch._counts) == 50
+
+    def test_replaced_value_inherits_minimum(self):
+        """Test that a new value replaces the least frequent one."""
+        sketch = SpaceSaving(capacity=2)
+        for value in ("a", "a", "b", "c"):
+            sketch.offer(value)
+
+        assert sketch.count("b") == 0
+        assert sketch.count("c") == 2
+        assert sketch.error("c") == 1
+
+    def test_invalid_capacity(self):
+        """Test that the capacity must be positive."""
+        with pytest.raises(ValueError):
+            SpaceSaving(0)
+
+
+class TestErrorClass:
+    """Tests for error_class."""
+
+    @pytest.mark.parametrize(
+        "message, expected",
+        [
+            ("rate_limited", "rate_limited"),
+            ("status_503", "status_503"),
+            ("Invocation failed with status 503", "Invocation failed with status 503"),
+            ("Request failed: [Errno 111] Connection refused", "Request failed"),
+            (
+                "Failed to parse discovery response: Expecting value",
+                "Failed to parse discovery response",
+            ),
+            ("Invocation timed out after 30.0s", "Invocation timed out after <n>s"),
+            (
+                "nonce too low for 0xAbC123 at block 18234567",
+                "nonce too low for <hex> at block <n>",
+            ),
+            (
+                "Server error '502 Bad Gateway' for url https://gw.example.com/mcp?id=1",
+                "Server error <str> for url <url>",
+            ),
+            ("session 123e4567-e89b-12d3-a456-426614174000 expired", "session <id> expired"),
+            ("", "unknown"),
+            (None, "unknown"),
+        ],
+    )
+    def test_normalization(self, message, expected):
+        """Test that variable parts of messages are removed."""
+        assert error_class(message) == expected
+
+    def test_same_failure_same_class(self):
+        """Test that messages differing only in ids map to one class."""
+        first = error_class("Transaction 0x1f2e reverted in block 19000001")
+        second = error_class("Transaction 0x9a8b reverted in block 19000417")
+
+        assert first == second
+
+    def test_length_limit(self):
+        """Test that classes fit the 50 character limit."""
+        assert len(error_class("word " * 40)) == 50
+
+
+class TestDimensionGovernor:
+    """Tests for DimensionGovernor."""
+
+    def test_budget_then_other(self):
+        """Test that values past the budget are reported as other."""
+        governor = DimensionGovernor("ContentPath", budget=2)
+
+        assert [governor.admit(v) for v in ("/a", "/b", "/c", "/a")] == ["/a", "/b", OTHER, "/a"]
+        stats = governor.stats()
+        assert (stats.admitted, stats.collapsed) == (2, 1)
+
+    def test_rerank_admits_new_heavy_hitter(self):
+        """Test that a value that becomes frequent displaces a quiet one."""
+        governor = DimensionGovernor("ToolName", budget=2, rerank_every=10)
+        governor.admit("get_weather")
+        governor.admit("get_news")
+        for _ in range(20):
+            governor.admit("get_weather")
+            governor.admit("get_premium_article")
+
+        assert governor.admit("get_premium_article") == "get_premium_article"
+        assert governor.admit("get_news") == OTHER
+
+    def test_zero_budget(self):
+        """Test that a budget of 0 collapses every value."""
+        assert DimensionGovernor("ErrorType", budget=0).admit("timeout") == OTHER
+
+    def test_negative_budget(self):
+        """Test that a budget cannot be negative."""
+        with pytest.raises(ValueError):
+            DimensionGovernor("ErrorType", budget=-1)
+
+    def test_concurrent_admits(self):
+        """Test that parallel threads never admit more than the budget."""
+        governor = DimensionGovernor("ContentPath", budget=5, rerank_every=50)
+        reported = set()
+
+        def worker(offset):
+            for i in range(500):
+                reported.add(governor.admit(f"/path/{(i * 7 + offset) % 40}"))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert governor.stats().admitted <= 5
+        assert OTHER in reported
+
+
+class TestCardinalityGovernor:
+    """Tests for CardinalityGovernor."""
+
+    def test_only_budgeted_dimensions_are_limited(self):
+        """Test that dimensions without a budget pass through."""
+        governor = CardinalityGovernor({"ContentPath": 1})
+        governor.apply({"Environment": "test", "ContentPath": "/a"})
+
+        result = governor.apply({"Environment": "test", "Network": "base", "ContentPath": "/b"})
+
+        assert result == {"Environment": "test", "Network": "base", "ContentPath": OTHER}
+
+    def test_unchanged_dimensions_are_not_copied(self):
+        """Test that a dimension set within budget is returned as it is."""
+        dimensions = {"Environment": "test", "ContentPath": "/a"}
+
+        assert CardinalityGovernor().apply(dimensions) is dimensions
+
+    def test_from_agent_config(self, monkeypatch):
+        """Test that configured budgets override the defaults."""
+        from agent.config import config as agent_config
+
+        monkeypatch.setattr(agent_config, "metric_dimension_budgets", (("ErrorType", 5),))
+        governor = CardinalityGovernor.from_agent_config()
+
+        budgets = {stats.name: stats.budget for stats in governor.stats()}
+
+        assert budgets == {**DEFAULT_DIMENSION_BUDGETS, "ErrorType": 5}
+
+    def test_emitter_applies_budgets(self, capsys):
+        """Test that emitted EMF lines use the governed dimensions."""
+        emitter = MetricsEmitter(governor=CardinalityGovernor({"ErrorType": 1}))
+        emitter.record_mcp_invocation(False, "get_weather", 10.0, error="Request failed: boom")
+        emitter.record_mcp_invocation(False, "get_weather", 10.0, error="rate_limited")
+
+        first, second = (json.loads(line) for line in capsys.readouterr().out.splitlines())
+
+        assert first["ErrorType"] == "Request failed"
+        assert first["error"] == "Request failed: boom"
+        assert second["ErrorType"] == OTHER
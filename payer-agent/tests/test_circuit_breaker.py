@@ -0,0 +1,232 @@
+"""
+Tests for the circuit breaker module.
+"""
+
+from agent.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    CircuitState,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_breaker(clock: FakeClock, on_state_change=None, **overrides) -> CircuitBreaker:
+    config = CircuitBreakerConfig(
+        window_seconds=60.0,
+        min_requests=4,
+        failure_rate_threshold=0.5,
+        slow_call_seconds=5.0,
+        slow_call_rate_threshold=0.75,
+        open_seconds=30.0,
+        half_open_max_calls=1,
+    )
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return CircuitBreaker("/api/test", config, on_state_change, clock=clock)
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_starts_closed(self):
+        """Test that a new breaker allows calls."""
+        breaker = make_breaker(FakeClock())
+
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.allow() is True
+
+    def test_needs_min_requests_to_trip(self):
+        """Test that a few failures alone do not open the circuit."""
+        breaker = make_breaker(FakeClock())
+        for _ in range(3):
+            breaker.record_failure()
+
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_opens_on_error_rate(self):
+        """Test that crossing the failure rate opens the circuit."""
+        breaker = make_breaker(FakeClock())
+        breaker.record_success()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.allow() is False
+        assert breaker.retry_after() == 30.0
+
+    def test_opens_on_slow_calls(self):
+        """Test that a high slow-call rate opens the circuit."""
+        breaker = make_breaker(FakeClock())
+        for _ in range(3):
+            breaker.record_success(latency_seconds=6.0)
+        breaker.record_success(latency_seconds=0.1)
+
+        assert breaker.state == CircuitState.OPEN
+
+    def test_old_outcomes_leave_window(self):
+        """Test that failures outside the sliding window are forgotten."""
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(3):
+            breaker.record_failure()
+
+        clock.advance(61)
+        breaker.record_failure()
+        for _ in range(3):
+            breaker.record_success()
+
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_after_cool_down(self):
+        """Test that an open circuit lets one probe through after open_seconds."""
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+
+        clock.advance(29)
+        assert breaker.allow() is False
+        clock.advance(1)
+
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+
+    def test_successful_probe_closes(self):
+        """Test that a successful probe closes the circuit and clears the window."""
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.advance(30)
+        breaker.allow()
+
+        breaker.record_success()
+
+        assert breaker.state == CircuitState.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed probe re-opens the circuit for another cool-down."""
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.advance(30)
+        breaker.allow()
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.retry_after() == 30.0
+
+    def test_abandoned_probe_slot_is_released(self):
+        """Test that a probe whose outcome never arrives does not wedge the breaker."""
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.advance(30)
+        assert breaker.allow() is True
+
+        clock.advance(30)
+
+        assert breaker.allow() is True
+
+    def test_state_change_callback(self):
+        """Test that every transition is reported."""
+        clock = FakeClock()
+        transitions = []
+        breaker = make_breaker(
+            clock, on_state_change=lambda name, old, new: transitions.append((name, old, new))
+        )
+        for _ in range(4):
+            breaker.record_failure()
+        clock.advance(30)
+        breaker.allow()
+        breaker.record_success()
+
+        assert transitions == [
+            ("/api/test", CircuitState.CLOSED, CircuitState.OPEN),
+            ("/api/test", CircuitState.OPEN, CircuitState.HALF_OPEN),
+            ("/api/test", CircuitState.HALF_OPEN, CircuitState.CLOSED),
+        ]
+
+    def test_disabled(self):
+        """Test that a disabled breaker never opens."""
+        breaker = make_breaker(FakeClock(), enabled=False)
+        for _ in range(10):
+            breaker.record_failure()
+
+        assert breaker.allow() is True
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_reset(self):
+        """Test that reset closes an open circuit."""
+        breaker = make_breaker(FakeClock())
+        for _ in range(4):
+            breaker.record_failure()
+
+        breaker.reset()
+
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.allow() is True
+
+
+class TestCircuitOpenError:
+    """Tests for CircuitOpenError."""
+
+    def test_message(self):
+        """Test the error carries the endpoint and retry delay."""
+        error = CircuitOpenError("/api/test", 12.5)
+
+        assert error.name == "/api/test"
+        assert error.retry_after == 12.5
+        assert "retry in 12.5s" in str(error)
+
+
+class TestCircuitBreakerRegistry:
+    """Tests for CircuitBreakerRegistry."""
+
+    def test_one_breaker_per_endpoint(self):
+        """Test that breakers are created lazily and reused."""
+        registry = CircuitBreakerRegistry()
+
+        assert registry.get("/a") is registry.get("/a")
+        assert registry.get("/a") is not registry.get("/b")
+
+    def test_endpoints_are_isolated(self):
+        """Test that one endpoint's failures do not affect another."""
+        registry = CircuitBreakerRegistry(CircuitBreakerConfig(min_requests=2))
+        registry.get("/down").record_failure()
+        registry.get("/down").record_failure()
+
+        assert registry.states() == {"/down": CircuitState.OPEN}
+        assert registry.get("/up").allow() is True
+
+    def test_reset(self):
+        """Test that reset closes every breaker."""
+        registry = CircuitBreakerRegistry(CircuitBreakerConfig(min_requests=1))
+        registry.get("/a").record_failure()
+
+        registry.reset()
+
+        assert registry.states() == {"/a": CircuitState.CLOSED}
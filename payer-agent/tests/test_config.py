@@ -28,6 +28,19 @@ class TestAgentConfig:
             assert config.model_id == "us.anthropic.claude-3-5-sonnet-20241022-v2:0"
             assert config.aws_region == "us-west-2"
             assert config.network_id == "base-sepolia"
+            assert config.prepay_services == ()
+            assert config.prepay_max_price_units == 10000
+            assert config.payment_quote_ttl_seconds == 300
+            assert config.rate_limit_requests_per_second == 10.0
+            assert config.rate_limit_burst == 20
+            assert config.rate_limit_per_tool is False
+            assert config.rate_limit_adaptive is False
+            assert config.rate_limit_redis_url == ""
+            assert config.session_rate_limit_rps == 0.0
+            assert config.metrics_flush_interval_seconds == 0.0
+            assert config.latency_export_interval_seconds == 60.0
+            assert config.prometheus_enabled is True
+            assert config.metric_dimension_budgets == ()
 
     def test_from_env_with_custom_values(self):
         """Test from_env reads environment variables correctly."""
@@ -38,6 +51,28 @@ class TestAgentConfig:
             "CDP_API_KEY_SECRET": "test-private-key",
             "NETWORK_ID": "base-mainnet",
             "SELLER_API_URL": "https://api.example.com",
+            "MCP_SNAPSHOT_DIR": "/tmp/mcp-snapshots",
+            "PREPAY_SERVICES": "get_premium_article, get_weather_data",
+            "PREPAY_MAX_PRICE_UNITS": "5000",
+            "PAYMENT_QUOTE_TTL_SECONDS": "60",
+            "RATE_LIMIT_RPS": "2.5",
+            "RATE_LIMIT_BURST": "5",
+            "RATE_LIMIT_PER_TOOL": "true",
+            "RATE_LIMIT_MAX_WAIT_SECONDS": "10",
+            "RATE_LIMIT_ADAPTIVE": "true",
+            "RATE_LIMIT_MIN_RPS": "0.5",
+            "RATE_LIMIT_MAX_RPS": "20",
+            "RATE_LIMIT_REPORT_INTERVAL_SECONDS": "15",
+            "RATE_LIMIT_REDIS_URL": "redis://rate-limits:6379/0",
+            "SESSION_RATE_LIMIT_RPS": "0.2",
+            "SESSION_RATE_LIMIT_BURST": "3",
+            "METRICS_FLUSH_INTERVAL_SECONDS": "5",
+            "METRICS_MAX_BUFFERED_SAMPLES": "200",
+            "METRICS_JSON_BACKEND": "json",
+            "LATENCY_EXPORT_INTERVAL_SECONDS": "30",
+            "LATENCY_RELATIVE_ACCURACY": "0.02",
+            "PROMETHEUS_ENABLED": "false",
+            "METRIC_DIMENSION_BUDGETS": "ContentPath=100, ErrorType=10",
         }
         
         with patch.dict(os.environ, env_vars, clear=True):
@@ -49,3 +84,25 @@ class TestAgentConfig:
             assert config.cdp_api_key_private_key == "test-private-key"
             assert config.network_id == "base-mainnet"
             assert config.seller_api_url == "https://api.example.com"
+            assert config.mcp_snapshot_dir == "/tmp/mcp-snapshots"
+            assert config.prepay_services == ("get_premium_article", "get_weather_data")
+            assert config.prepay_max_price_units == 5000
+            assert config.payment_quote_ttl_seconds == 60
+            assert config.rate_limit_requests_per_second == 2.5
+            assert config.rate_limit_burst == 5
+            assert config.rate_limit_per_tool is True
+            assert config.rate_limit_max_wait_seconds == 10.0
+            assert config.rate_limit_adaptive is True
+            assert config.rate_limit_min_rps == 0.5
+            assert config.rate_limit_max_rps == 20.0
+            assert config.rate_limit_report_interval_seconds == 15.0
+            assert config.rate_limit_redis_url == "redis://rate-limits:6379/0"
+            assert config.session_rate_limit_rps == 0.2
+            assert config.session_rate_limit_burst == 3
+            assert config.metrics_flush_interval_seconds == 5.0
+            assert config.metrics_max_buffered_samples == 200
+            assert config.metrics_json_backend == "json"
+            assert config.latency_export_interval_seconds == 30.0
+            assert config.latency_relative_accuracy == 0.02
+            assert config.prometheus_enabled is False
+            assert config.metric_dimension_budgets == (("ContentPath", 100), ("ErrorType", 10))
@@ -0,0 +1,336 @@
+"""
+Tests for the distributed rate limiter and its bucket stores.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from agent.distributed_rate_limiter import (
+    DistributedRateLimiter,
+    InMemoryTokenBucketStore,
+    RedisTokenBucketStore,
+    default_batch_size,
+)
+from agent.rate_limiter import RateLimitConfig, RateLimiterRegistry, RateLimitExceeded
+from tests.mocks import FakeRedis, LuaFakeRedis
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_config(**kwargs) -> RateLimitConfig:
+    return RateLimitConfig(
+        **{"requests_per_second": 10.0, "burst_capacity": 20, "enable_logging": False, **kwargs}
+    )
+
+
+class TestTokenBucketStores:
+    """Tests for the in-memory and Redis-protocol stores."""
+
+    @pytest.fixture(params=["memory", "redis", "lua"])
+    def store_and_clock(self, request):
+        clock = FakeClock()
+        if request.param == "memory":
+            return InMemoryTokenBucketStore(clock=clock), clock
+        if request.param == "lua":
+            pytest.importorskip("lupa")
+            return RedisTokenBucketStore(LuaFakeRedis(clock=clock)), clock
+        return RedisTokenBucketStore(FakeRedis(clock=clock)), clock
+
+    def test_grants_up_to_burst(self, store_and_clock):
+        """Test that a batch request is capped by the tokens in the bucket."""
+        store, _ = store_and_clock
+
+        assert store.take("host", 15, 10.0, 20) == (15, 0.0)
+        assert store.take("host", 15, 10.0, 20) == (5, 0.0)
+
+    def test_empty_bucket_reports_wait(self, store_and_clock):
+        """Test that an empty bucket grants nothing and reports the wait for a token."""
+        store, clock = store_and_clock
+        store.take("host", 20, 10.0, 20)
+
+        granted, wait_time = store.take("host", 1, 10.0, 20)
+
+        assert granted == 0
+        assert wait_time == pytest.approx(0.1)
+        clock.now += 0.25
+        assert store.take("host", 5, 10.0, 20) == (2, 0.0)
+
+    def test_keys_are_independent(self, store_and_clock):
+        """Test that buckets for different keys do not share tokens."""
+        store, _ = store_and_clock
+        store.take("a", 20, 10.0, 20)
+
+        assert store.take("b", 1, 10.0, 20) == (1, 0.0)
+
+    def test_redis_store_prefixes_keys(self):
+        """Test that bucket keys are namespaced on the server."""
+        server = FakeRedis()
+        RedisTokenBucketStore(server, key_prefix="test:").take("host", 1, 10.0, 20)
+
+        assert list(server.hashes) == ["test:host"]
+
+    def test_redis_bucket_expires_when_idle(self):
+        """Test that an idle bucket is dropped after it would have refilled."""
+        clock = FakeClock()
+        server = FakeRedis(clock=clock)
+        RedisTokenBucketStore(server).take("host", 20, 10.0, 20)
+
+        assert server.expires_at["x402:ratelimit:host"] == pytest.approx(clock.now + 3.0)
+
+    def test_lua_script_matches_python_port(self):
+        """Test that TOKEN_BUCKET_SCRIPT and FakeRedis's port agree on every reply."""
+        pytest.importorskip("lupa")
+        clock = FakeClock()
+        port, script = FakeRedis(clock=clock), LuaFakeRedis(clock=clock)
+        port_store, script_store = RedisTokenBucketStore(port), RedisTokenBucketStore(script)
+        steps = [(0.0, 15), (0.0, 15), (0.0, 1), (0.05, 1), (0.37, 8), (1.2, 20), (5.0, 3)]
+
+        for advance, requested in steps:
+            clock.now += advance
+            assert script_store.take("host", requested, 7.5, 12) == port_store.take(
+                "host", requested, 7.5, 12
+            )
+
+        assert script.hashes.keys() == port.hashes.keys()
+        assert script.expires_at == pytest.approx(port.expires_at)
+
+
+class TestDistributedRateLimiter:
+    """Tests for DistributedRateLimiter."""
+
+    def test_default_batch_size(self):
+        """Test that batches cover about 100ms of traffic within a tenth of the burst."""
+        assert default_batch_size(make_config()) == 1
+        assert default_batch_size(make_config(requests_per_second=100, burst_capacity=200)) == 10
+        assert default_batch_size(make_config(requests_per_second=100, burst_capacity=50)) == 5
+
+    def test_batches_avoid_store_calls(self):
+        """Test that leased tokens are spent locally."""
+        server = FakeRedis()
+        limiter = DistributedRateLimiter(
+            RedisTokenBucketStore(server), "host", make_config(burst_capacity=100), batch_size=10
+        )
+
+        for _ in range(100):
+            assert limiter.try_acquire() is True
+
+        assert server.script_calls == 10
+        assert limiter.stats.store_calls == 10
+        assert limiter.stats.local_hit_rate == pytest.approx(90.0)
+
+    def test_replicas_share_the_bucket(self):
+        """Test that the configured burst holds across several replicas."""
+        store = InMemoryTokenBucketStore(clock=FakeClock())
+        replicas = [
+            DistributedRateLimiter(store, "host", make_config(), batch_size=2, clock=FakeClock())
+            for _ in range(3)
+        ]
+
+        admitted = sum(replica.try_acquire() for _ in range(10) for replica in replicas)
+
+        assert admitted == 20
+
+    def test_concurrent_threads_never_overshoot(self):
+        """Test that parallel callers on parallel replicas admit exactly the burst."""
+        store = RedisTokenBucketStore(FakeRedis(clock=FakeClock()))
+        replicas = [
+            DistributedRateLimiter(store, "host", make_config(burst_capacity=50), batch_size=3)
+            for _ in range(4)
+        ]
+        admitted = []
+
+        def worker(replica):
+            admitted.extend(replica.try_acquire() for _ in range(40))
+
+        threads = [threading.Thread(target=worker, args=(replicas[i % 4],)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(admitted) == 50
+
+    def test_leases_expire(self):
+        """Test that unspent leased tokens are dropped after batch_ttl_seconds."""
+        clock = FakeClock()
+        store = InMemoryTokenBucketStore(clock=clock)
+        limiter = DistributedRateLimiter(
+            store, "host", make_config(), batch_size=5, batch_ttl_seconds=1.0, clock=clock
+        )
+        limiter.try_acquire()
+        assert limiter.available_tokens == 4
+
+        clock.now += 1.5
+
+        assert limiter.available_tokens == 0
+        limiter.try_acquire()
+        assert limiter.stats.store_calls == 2
+
+    def test_throttled_waits_are_cached(self):
+        """Test that an empty shared bucket is not polled before its wait passes."""
+        clock = FakeClock()
+        store = InMemoryTokenBucketStore(clock=clock)
+        limiter = DistributedRateLimiter(store, "host", make_config(burst_capacity=1), clock=clock)
+        limiter.try_acquire()
+
+        assert limiter.try_acquire() is False
+        assert limiter.try_acquire() is False
+        assert limiter.stats.store_calls == 2
+        assert limiter.stats.throttled_requests == 2
+
+        clock.now += 0.1
+        assert limiter.try_acquire() is True
+
+    def test_acquire_waits_for_shared_tokens(self):
+        """Test that acquire sleeps for the wait reported by the store."""
+        store = InMemoryTokenBucketStore()
+        limiter = DistributedRateLimiter(
+            store, "host", make_config(requests_per_second=100.0, burst_capacity=1)
+        )
+        limiter.acquire()
+
+        wait_time = limiter.acquire()
+
+        assert wait_time == pytest.approx(0.01, abs=0.01)
+
+    def test_acquire_timeout(self):
+        """Test that a wait longer than the timeout raises."""
+        store = InMemoryTokenBucketStore()
+        limiter = DistributedRateLimiter(
+            store, "host", make_config(requests_per_second=1.0, burst_capacity=1)
+        )
+        limiter.acquire()
+
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire(timeout=0.1)
+
+    @pytest.mark.asyncio
+    async def test_acquire_async(self):
+        """Test async acquisition against the shared bucket."""
+        store = InMemoryTokenBucketStore()
+        limiter = DistributedRateLimiter(
+            store, "host", make_config(requests_per_second=100.0, burst_capacity=2)
+        )
+
+        waits = await asyncio.gather(*(limiter.acquire_async() for _ in range(3)))
+
+        assert sorted(waits)[:2] == [pytest.approx(0.0, abs=0.005)] * 2
+        assert max(waits) > 0
+        assert await limiter.try_acquire_async() is False
+
+    def test_store_errors_fall_back_to_local_bucket(self):
+        """Test that an unreachable store degrades to a per-replica bucket."""
+        clock = FakeClock()
+        server = FakeRedis(clock=clock)
+        server.fail = True
+        limiter = DistributedRateLimiter(
+            RedisTokenBucketStore(server),
+            "host",
+            make_config(burst_capacity=3),
+            fallback_seconds=5.0,
+            clock=clock,
+        )
+
+        admitted = [limiter.try_acquire() for _ in range(5)]
+
+        assert admitted == [True, True, True, False, False]
+        assert limiter.stats.store_errors == 1
+        assert server.script_calls == 1
+
+        server.fail = False
+        clock.now += 5.0
+        assert limiter.try_acquire() is True
+        assert server.script_calls == 2
+
+    def test_slow_store_does_not_hold_the_lock(self):
+        """Test that a store round trip in progress does not block other callers."""
+        entered, release = threading.Event(), threading.Event()
+
+        class SlowStore(InMemoryTokenBucketStore):
+            def take(self, *args):
+                entered.set()
+                release.wait(timeout=5.0)
+                return super().take(*args)
+
+        limiter = DistributedRateLimiter(SlowStore(), "host", make_config(), batch_size=2)
+        leasing = threading.Thread(target=limiter.try_acquire)
+        leasing.start()
+        assert entered.wait(timeout=1.0)
+
+        done = threading.Event()
+
+        def read_state():
+            limiter.record_response(429, retry_after=0.01)
+            _ = limiter.available_tokens, limiter.stats.store_calls
+            done.set()
+
+        threading.Thread(target=read_state).start()
+        try:
+            assert done.wait(timeout=1.0)
+        finally:
+            release.set()
+            leasing.join()
+
+    def test_retry_after_pauses_replica(self):
+        """Test that a Retry-After drops leased tokens and holds calls back."""
+        clock = FakeClock()
+        limiter = DistributedRateLimiter(
+            InMemoryTokenBucketStore(clock=clock), "host", make_config(), batch_size=5, clock=clock
+        )
+        limiter.try_acquire()
+
+        limiter.record_response(429, retry_after=2.0)
+
+        assert limiter.try_acquire() is False
+        clock.now += 2.0
+        assert limiter.try_acquire() is True
+
+
+class TestRegistryWithStore:
+    """Tests for RateLimiterRegistry backed by a shared store."""
+
+    def test_registry_uses_distributed_limiters(self):
+        """Test that every key gets a limiter on the shared store."""
+        server = FakeRedis()
+        registry = RateLimiterRegistry(make_config(), store=RedisTokenBucketStore(server))
+
+        registry.acquire("https://gateway.example.com/mcp")
+
+        assert isinstance(registry.get("gateway.example.com"), DistributedRateLimiter)
+        assert list(server.hashes) == ["x402:ratelimit:gateway.example.com"]
+
+    @pytest.mark.asyncio
+    async def test_sync_and_async_share_one_bucket(self):
+        """Test that sync and async callers spend the same shared tokens."""
+        store = InMemoryTokenBucketStore()
+        registry = RateLimiterRegistry(make_config(burst_capacity=2), store=store)
+        url = "https://gateway.example.com/mcp"
+
+        registry.acquire(url)
+        await registry.acquire_async(url)
+
+        assert await registry.try_acquire_async(url) is False
+        assert registry.stats()["gateway.example.com"].allowed_requests == 2
+
+    def test_redis_url_without_client_library(self, monkeypatch):
+        """Test that a missing redis package keeps buckets local."""
+        from agent import rate_limiter
+        from agent.config import config as agent_config
+
+        def from_url(cls, url):
+            raise ImportError("No module named 'redis'")
+
+        monkeypatch.setattr(agent_config, "rate_limit_redis_url", "redis://localhost:6379/0")
+        monkeypatch.setattr(RedisTokenBucketStore, "from_url", classmethod(from_url))
+
+        assert rate_limiter.RateLimiterRegistry.from_agent_config().store is None
@@ -0,0 +1,142 @@
+"""Tests for the template-based EMF encoder."""
+
+import json
+
+import pytest
+
+from agent.emf_encoder import EMFEncoder, orjson, resolve_json_backend
+from agent.metrics import MetricUnit
+
+BACKENDS = ["json"] + (["orjson"] if orjson is not None else [])
+
+
+def expected_document(metrics, dimensions, properties, timestamp_ms):
+    """The document built the straightforward way, for comparison."""
+    document = {
+        "_aws": {
+            "Timestamp": timestamp_ms,
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": "TestNamespace",
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [
+                        {"Name": name, "Unit": unit.value} for name, (_, unit) in metrics.items()
+                    ],
+                }
+            ],
+        },
+        "service": "test-service",
+        **dimensions,
+    }
+    for name, (value, _) in metrics.items():
+        document[name] = value
+    document.update(properties or {})
+    return document
+
+
+@pytest.fixture(params=BACKENDS)
+def encoder(request):
+    return EMFEncoder("TestNamespace", "test-service", json_backend=request.param)
+
+
+class TestEMFEncoder:
+    """Tests for EMFEncoder."""
+
+    def test_matches_dict_encoding(self, encoder):
+        """Test that a line decodes to the same document as the dict-built one."""
+        metrics = {
+            "MCPInvocationCount": (1, MetricUnit.COUNT),
+            "MCPInvocationLatency": (120.25, MetricUnit.MILLISECONDS),
+        }
+        dimensions = {"Environment": "test", "ErrorType": 'quote " and \\u00e9'}
+        properties = {"toolName": "get_weather", "error": None, "nested": {"a": [1, 2]}}
+
+        line = encoder.encode(metrics, dimensions, properties, timestamp_ms=1700000000000)
+
+        assert json.loads(line) == expected_document(metrics, dimensions, properties, 1700000000000)
+        assert "\n" not in line
+
+    def test_template_is_reused(self, encoder):
+        """Test that one template serves every call with the same metric and dimension keys."""
+        metrics = {"PaymentSigningCount": (1, MetricUnit.COUNT)}
+
+        first = encoder.encode(metrics, {"Environment": "a"}, timestamp_ms=1)
+        second = encoder.encode(
+            {"PaymentSigningCount": (2, MetricUnit.COUNT)}, {"Environment": "b"}, timestamp_ms=2
+        )
+
+        assert len(encoder._templates) == 1
+        assert json.loads(first)["Environment"] == "a"
+        assert json.loads(second)["PaymentSigningCount"] == 2
+
+    def test_unit_change_rebuilds_template(self, encoder):
+        """Test that the same metric name with another unit gets the right metadata."""
+        encoder.encode({"Value": (1, MetricUnit.COUNT)}, {"Environment": "test"})
+
+        line = encoder.encode({"Value": (1, MetricUnit.PERCENT)}, {"Environment": "test"})
+
+        assert json.loads(line)["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+            {"Name": "Value", "Unit": "Percent"}
+        ]
+
+    def test_value_arrays(self, encoder):
+        """Test that a list of values is encoded as an EMF value array."""
+        line = encoder.encode(
+            {"ContentRequestLatency": ([1.5, 2, 3.25], MetricUnit.MILLISECONDS)},
+            {"Environment": "test"},
+        )
+
+        assert json.loads(line)["ContentRequestLatency"] == [1.5, 2, 3.25]
+
+    def test_bool_and_non_finite_values_use_backend(self, encoder):
+        """Test that values the inline path does not handle go through the backend."""
+        line = encoder.encode(
+            {"Flag": (True, MetricUnit.NONE)},
+            {"Environment": "test"},
+            {"ratio": 0.5, "empty": {}},
+        )
+
+        document = json.loads(line)
+        assert document["Flag"] is True
+        assert document["ratio"] == 0.5
+
+    def test_property_overriding_template_member(self, encoder):
+        """Test that a property replaces a dimension value without duplicating the key."""
+        metrics = {"PaymentSigningCount": (1, MetricUnit.COUNT)}
+        dimensions = {"Environment": "test"}
+
+        line = encoder.encode(metrics, dimensions, {"Environment": "override", "service": "x"}, 5)
+
+        assert line.count('"Environment"') == 2  # Dimension key list and the value
+        document = json.loads(line)
+        assert document["Environment"] == "override"
+        assert document["service"] == "x"
+
+    def test_empty_properties(self, encoder):
+        """Test that empty properties add nothing."""
+        line = encoder.encode({"A": (1, MetricUnit.COUNT)}, {"Environment": "test"}, {})
+
+        assert json.loads(line)["A"] == 1
+
+
+class TestJSONBackends:
+    """Tests for JSON backend selection."""
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            resolve_json_backend("simdjson")
+
+    def test_json_backend_is_compact(self):
+        """Test that the standard library backend writes compact JSON."""
+        assert resolve_json_backend("json")({"a": [1, 2]}) == '{"a":[1,2]}'
+
+    def test_auto_prefers_orjson(self, monkeypatch):
+        """Test that auto falls back to the standard library without orjson."""
+        from agent import emf_encoder
+
+        monkeypatch.setattr(emf_encoder, "orjson", None)
+
+        assert resolve_json_backend("auto") is emf_encoder._json_dumps
+        with pytest.raises(ValueError):
+            resolve_json_backend("orjson")
@@ -0,0 +1,183 @@
+"""
+Tests for the keyed rate limiter and the API server's per-session limit.
+"""
+
+import asyncio
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent import api_server
+from agent.config import config
+from agent.keyed_rate_limiter import KeyedRateLimiter
+from agent.rate_limiter import RateLimitConfig, RateLimitExceeded
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def limiter(clock: FakeClock, **kwargs) -> KeyedRateLimiter:
+    return KeyedRateLimiter(
+        RateLimitConfig(requests_per_second=1.0, burst_capacity=2, enable_logging=False),
+        clock=clock,
+        **kwargs,
+    )
+
+
+class TestKeyedRateLimiter:
+    """Tests for KeyedRateLimiter."""
+
+    def test_keys_have_separate_buckets(self):
+        """Test that one key running out does not affect another."""
+        keyed = limiter(FakeClock())
+
+        assert keyed.try_acquire("session:a") is True
+        assert keyed.try_acquire("session:a") is True
+        assert keyed.try_acquire("session:a") is False
+        assert keyed.try_acquire("session:b") is True
+        assert keyed.stats.throttled_requests == 1
+
+    def test_refill_and_retry_after(self):
+        """Test that a bucket refills at the configured rate."""
+        clock = FakeClock()
+        keyed = limiter(clock)
+        keyed.try_acquire("wallet:0xabc", n=2)
+
+        assert keyed.retry_after("wallet:0xabc") == pytest.approx(1.0)
+        clock.now += 1.0
+        assert keyed.retry_after("wallet:0xabc") == 0.0
+        assert keyed.try_acquire("wallet:0xabc") is True
+
+    def test_lru_eviction_caps_keys(self):
+        """Test that the least recently used bucket is evicted past max_keys."""
+        keyed = limiter(FakeClock(), max_keys=2)
+        keyed.try_acquire("a")
+        keyed.try_acquire("b")
+        keyed.try_acquire("a")
+
+        keyed.try_acquire("c")
+
+        assert len(keyed) == 2
+        assert keyed.retry_after("b") == 0.0
+        assert keyed.stats.lru_evictions == 1
+        # "a" was touched more recently than "b", so it kept its state
+        assert keyed.try_acquire("a") is False
+
+    def test_idle_buckets_expire(self):
+        """Test that buckets idle past the TTL are dropped on later calls."""
+        clock = FakeClock()
+        keyed = limiter(clock, idle_ttl_seconds=60)
+        for key in ("a", "b", "c"):
+            keyed.try_acquire(key)
+
+        clock.now += 61
+        keyed.try_acquire("d")
+
+        assert len(keyed) == 1
+        assert keyed.stats.idle_evictions == 3
+
+    def test_memory_flat_with_100k_keys(self):
+        """Test that 100k distinct keys use no more memory than max_keys of them."""
+        keyed = limiter(FakeClock(), max_keys=1_000)
+        tracemalloc.start()
+        try:
+            # Warm up past the point where the dict has grown to its working size
+            for i in range(10_000):
+                keyed.try_acquire(f"session:{i}")
+            baseline, _ = tracemalloc.get_traced_memory()
+            for i in range(10_000, 100_000):
+                keyed.try_acquire(f"session:{i}")
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert len(keyed) == 1_000
+        assert keyed.stats.lru_evictions == 99_000
+        assert current < baseline * 1.05
+
+    def test_blocking_acquire_reserves(self):
+        """Test that a blocking acquire reserves tokens and reports its wait."""
+        keyed = limiter(FakeClock())
+        keyed.acquire("a", n=2)
+
+        with patch("agent.keyed_rate_limiter.time.sleep") as sleep:
+            first = keyed.acquire("a")
+            second = keyed.acquire("a")
+
+        assert first == pytest.approx(1.0)
+        assert second == pytest.approx(2.0)
+        assert [call.args[0] for call in sleep.call_args_list] == [first, second]
+
+    def test_acquire_timeout(self):
+        """Test that a wait longer than the timeout is rejected without reserving."""
+        keyed = limiter(FakeClock())
+        keyed.acquire("a", n=2)
+
+        with pytest.raises(RateLimitExceeded):
+            keyed.acquire("a", timeout=0.5)
+        assert keyed.retry_after("a") == pytest.approx(1.0)
+
+    def test_weight_above_burst(self):
+        """Test that a request heavier than the bucket is rejected outright."""
+        with pytest.raises(ValueError):
+            limiter(FakeClock()).try_acquire("a", n=3)
+
+    @pytest.mark.asyncio
+    async def test_acquire_async(self):
+        """Test async acquisition."""
+        keyed = KeyedRateLimiter(RateLimitConfig(requests_per_second=100.0, burst_capacity=1))
+
+        waits = await asyncio.gather(*(keyed.acquire_async("a") for _ in range(3)))
+
+        assert waits[0] == 0.0
+        assert waits[2] == pytest.approx(0.02, abs=0.005)
+
+    def test_reset(self):
+        """Test resetting one key and all keys."""
+        keyed = limiter(FakeClock())
+        keyed.try_acquire("a", n=2)
+        keyed.try_acquire("b")
+
+        keyed.reset("a")
+        assert keyed.try_acquire("a") is True
+
+        keyed.reset()
+        assert len(keyed) == 0
+
+
+class TestSessionRateLimit:
+    """Tests for the API server's per-session limit."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(config, "agent_runtime_arn", "")
+        monkeypatch.setattr(config, "session_rate_limit_rps", 0.5)
+        monkeypatch.setattr(config, "session_rate_limit_burst", 1)
+        monkeypatch.setattr(api_server, "_session_limiter", None)
+        monkeypatch.setattr(api_server, "_agent", MagicMock(return_value="done"))
+        return TestClient(api_server.app)
+
+    def test_session_over_limit_gets_429(self, client):
+        """Test that a second request in the same session is rejected."""
+        body = {"prompt": "hi", "session_id": "s-1"}
+
+        assert client.post("/invoke", json=body).status_code == 200
+        response = client.post("/invoke", json=body)
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
+        assert client.post("/invoke", json={**body, "session_id": "s-2"}).status_code == 200
+
+    def test_requests_without_session_not_limited(self, client):
+        """Test that requests without a session ID are not limited."""
+        for _ in range(3):
+            assert client.post("/invoke", json={"prompt": "hi"}).status_code == 200
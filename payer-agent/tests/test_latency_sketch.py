@@ -0,0 +1,259 @@
+"""
+Tests for the latency sketches.
+"""
+
+import random
+import threading
+
+import pytest
+
+from agent.latency_sketch import (
+    DDSketch,
+    LatencyHistograms,
+    LatencyKey,
+    endpoint_path,
+    get_latency_histograms,
+    http_outcome,
+)
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def exact_percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(pct / 100 * (len(ordered) - 1))]
+
+
+class TestDDSketch:
+    """Tests for DDSketch."""
+
+    @pytest.mark.parametrize("pct", [0, 50, 90, 95, 99, 100])
+    def test_relative_accuracy(self, pct):
+        """Test that percentiles of a long-tailed distribution are within the accuracy."""
+        rng = random.Random(7)
+        values = [rng.lognormvariate(4.0, 1.2) for _ in range(10000)]
+        sketch = DDSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        expected = exact_percentile(values, pct)
+
+        assert sketch.percentile(pct) == pytest.approx(expected, rel=0.01)
+
+    def test_empty(self):
+        """Test that an empty sketch has no percentiles."""
+        assert DDSketch().percentile(50) is None
+
+    def test_zero_values(self):
+        """Test that zero and negative values are counted in the zero bucket."""
+        sketch = DDSketch()
+        for value in (0.0, -1.0, 0.0, 10.0):
+            sketch.add(value)
+
+        assert sketch.zero_count == 3
+        assert sketch.percentile(50) == 0.0
+        assert sketch.percentile(100) == pytest.approx(10.0, rel=0.01)
+
+    def test_merge_matches_single_sketch(self):
+        """Test that merged sketches report what one sketch of every value would."""
+        values = [float(v) for v in range(1, 2001)]
+        whole, first, second = DDSketch(), DDSketch(), DDSketch()
+        for value in values:
+            whole.add(value)
+            (first if value % 3 else second).add(value)
+
+        first.merge(second)
+
+        assert first.count == whole.count
+        assert first.sum == whole.sum
+        assert (first.min, first.max) == (1.0, 2000.0)
+        for pct in (1, 50, 99):
+            assert first.percentile(pct) == whole.percentile(pct)
+
+    def test_merge_rejects_other_accuracy(self):
+        """Test that sketches with different bucket sizes cannot be merged."""
+        with pytest.raises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
+
+    def test_max_bins_collapses_lowest(self):
+        """Test that the bucket limit only costs accuracy at the low end."""
+        sketch = DDSketch(relative_accuracy=0.01, max_bins=50)
+        for exponent in range(-30, 31):
+            sketch.add(10.0 ** (exponent / 10))
+
+        assert len(sketch._bins) == 50
+        assert sketch.percentile(100) == pytest.approx(1000.0, rel=0.01)
+
+    def test_invalid_accuracy(self):
+        """Test that the accuracy must be a fraction."""
+        with pytest.raises(ValueError):
+            DDSketch(relative_accuracy=0)
+
+
+class TestLatencyHistograms:
+    """Tests for LatencyHistograms."""
+
+    def test_series_are_tagged(self):
+        """Test that queries filter by tool, endpoint and outcome."""
+        latencies = LatencyHistograms(export_interval_seconds=0)
+        for _ in range(10):
+            latencies.record("mcp_invocation", 100.0, tool="get_weather")
+            latencies.record("mcp_invocation", 400.0, tool="get_premium_article")
+        latencies.record("mcp_invocation", 5000.0, tool="get_weather", outcome="error")
+
+        assert latencies.percentile("mcp_invocation", 50, tool="get_weather") == pytest.approx(
+            100.0, rel=0.01
+        )
+        assert latencies.percentile("mcp_invocation", 100, outcome="success") == pytest.approx(
+            400.0, rel=0.01
+        )
+        assert latencies.sketch("mcp_invocation").count == 21
+        assert LatencyKey("mcp_invocation", "get_weather", None, "error") in latencies.keys()
+
+    def test_min_samples(self):
+        """Test that no percentile is returned until enough samples exist."""
+        latencies = LatencyHistograms(export_interval_seconds=0)
+        latencies.record("payment_signing", 40.0)
+
+        assert latencies.percentile("payment_signing", 95, min_samples=2) is None
+        assert latencies.percentile("missing", 95) is None
+        assert latencies.percentile("payment_signing", 95) == pytest.approx(40.0, rel=0.01)
+
+    def test_export_on_schedule(self):
+        """Test that each window is summarized once its interval has passed."""
+        clock = FakeClock()
+        exported = []
+        latencies = LatencyHistograms(
+            export_interval_seconds=60.0, on_export=exported.append, clock=clock
+        )
+        for ms in range(1, 101):
+            latencies.record("content_request", float(ms), endpoint="/api/premium-article")
+        assert exported == []
+
+        clock.now += 60.0
+        latencies.record("payment_signing", 40.0)
+
+        by_operation = {summary.key.operation: summary for summary in exported}
+        summary = by_operation["content_request"]
+        assert summary.count == 100
+        assert summary.p50_ms == pytest.approx(50.0, rel=0.01)
+        assert summary.p99_ms == pytest.approx(99.0, rel=0.01)
+        assert summary.max_ms == 100.0
+        assert summary.key.endpoint == "/api/premium-article"
+
+    def test_quiet_operation_is_exported_on_schedule(self):
+        """Test that the export thread ends a window without further samples."""
+        exported = []
+        flushed = threading.Event()
+
+        def on_export(summary):
+            exported.append(summary)
+            flushed.set()
+
+        latencies = LatencyHistograms(export_interval_seconds=0.05, on_export=on_export)
+        try:
+            latencies.record("mcp_discovery", 80.0)
+
+            assert flushed.wait(timeout=2.0)
+            assert [summary.key.operation for summary in exported] == ["mcp_discovery"]
+        finally:
+            latencies.close()
+
+    def test_close_exports_the_last_window(self):
+        """Test that close exports what is left and stops the thread."""
+        exported = []
+        latencies = LatencyHistograms(export_interval_seconds=60.0, on_export=exported.append)
+        latencies.record("payment_signing", 40.0)
+
+        latencies.close()
+        latencies.close()
+
+        assert [summary.count for summary in exported] == [1]
+        assert not latencies._thread.is_alive()
+
+    def test_queries_cover_two_windows(self):
+        """Test that samples older than the previous window are dropped."""
+        clock = FakeClock()
+        latencies = LatencyHistograms(export_interval_seconds=60.0, clock=clock)
+        latencies.record("mcp_request", 5000.0)
+
+        latencies.export()
+        latencies.record("mcp_request", 100.0)
+        assert latencies.percentile("mcp_request", 100) == pytest.approx(5000.0, rel=0.01)
+
+        latencies.export()
+        assert latencies.percentile("mcp_request", 100) == pytest.approx(100.0, rel=0.01)
+        assert latencies.export() == []
+
+    def test_concurrent_recording(self):
+        """Test that parallel threads lose no samples."""
+        latencies = LatencyHistograms(export_interval_seconds=0)
+
+        def worker():
+            for ms in range(1000):
+                latencies.record("mcp_invocation", float(ms + 1), tool="get_weather")
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert latencies.sketch("mcp_invocation").count == 4000
+
+    def test_reset(self):
+        """Test that reset drops every series."""
+        latencies = LatencyHistograms(export_interval_seconds=0)
+        latencies.record("payment_signing", 40.0)
+
+        latencies.reset()
+
+        assert latencies.keys() == []
+
+    def test_agent_config_exports_metrics(self, capsys, monkeypatch):
+        """Test that the configured histograms export Latency* metrics."""
+        import json
+
+        from agent.config import config as agent_config
+        from agent.metrics import MetricsEmitter
+
+        monkeypatch.setattr(agent_config, "latency_relative_accuracy", 0.02)
+        monkeypatch.setattr("agent.metrics._metrics_emitter", MetricsEmitter())
+        latencies = LatencyHistograms.from_agent_config()
+        latencies.record("payment_signing", 40.0, outcome="error")
+
+        latencies.export()
+
+        output = json.loads(capsys.readouterr().out.strip())
+        assert latencies.relative_accuracy == 0.02
+        assert output["Operation"] == "payment_signing"
+        assert output["Outcome"] == "error"
+        assert output["LatencySamples"] == 1
+
+    def test_global_histograms_singleton(self):
+        """Test that get_latency_histograms returns one instance."""
+        assert get_latency_histograms() is get_latency_histograms()
+
+
+def test_endpoint_path():
+    """Test that series are keyed on the URL path, which is never truncated."""
+    base = "https://d1234567890abcdef.cloudfront.net"
+
+    assert endpoint_path(f"{base}/api/premium-article?id=1") == "/api/premium-article"
+    assert endpoint_path(f"{base}/api/premium-weather") == "/api/premium-weather"
+    assert endpoint_path("/api/premium-article") == "/api/premium-article"
+
+
+def test_http_outcome():
+    """Test the outcome classes of HTTP status codes."""
+    assert http_outcome(200) == "success"
+    assert http_outcome(402) == "payment_required"
+    assert http_outcome(503) == "error"
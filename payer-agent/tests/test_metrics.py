@@ -2,12 +2,17 @@
 
 import json
 import sys
+import threading
+import time
 from io import StringIO
 from unittest.mock import patch
 
 import pytest
 
+from agent.config import config
+from agent.latency_sketch import LatencyHistograms, LatencyKey
 from agent.metrics import (
+    BufferedMetricsEmitter,
     MetricsEmitter,
     MetricDimensions,
     MetricUnit,
@@ -255,6 +260,121 @@ class TestMetricsEmitter:
         assert output["errorType"] == "wallet_error"
         assert output["operation"] == "get_balance"
 
+    def test_record_error_classifies_error_type(self, capsys):
+        """Test that the ErrorType dimension is the error class, not a prefix of the text."""
+        emitter = MetricsEmitter()
+        
+        emitter.record_error(
+            error_type="Request to https://rpc.example.com/v1/abc failed: timeout",
+            error_message="timeout",
+        )
+        
+        output = json.loads(capsys.readouterr().out.strip())
+        
+        assert output["ErrorType"] == "Request to <url> failed"
+
+    def test_record_circuit_breaker_opened(self, capsys):
+        """Test recording a circuit breaker opening."""
+        emitter = MetricsEmitter()
+        
+        emitter.record_circuit_breaker(endpoint="/api/premium-article", state="open")
+        
+        captured = capsys.readouterr()
+        output = json.loads(captured.out.strip())
+        
+        assert output["MCPCircuitState"] == 2
+        assert output["MCPCircuitOpened"] == 1
+        assert output["ContentPath"] == "/api/premium-article"
+        assert "MCPCircuitRejected" not in output
+
+    def test_record_circuit_breaker_rejected(self, capsys):
+        """Test recording a call rejected by an open circuit."""
+        emitter = MetricsEmitter()
+        
+        emitter.record_circuit_breaker(
+            endpoint="/api/premium-article", state="open", rejected=True
+        )
+        
+        captured = capsys.readouterr()
+        output = json.loads(captured.out.strip())
+        
+        assert output["MCPCircuitRejected"] == 1
+        assert "MCPCircuitOpened" not in output
+
+
+    def test_record_quote_lookup(self, capsys):
+        """Test recording a payment requirements cache hit."""
+        emitter = MetricsEmitter()
+        
+        emitter.record_quote_lookup(hit=True, content_path="/api/premium-article", hit_rate=75.0)
+        
+        captured = capsys.readouterr()
+        output = json.loads(captured.out.strip())
+        
+        assert output["PaymentQuoteLookup"] == 1
+        assert output["PaymentQuoteCacheHit"] == 1
+        assert output["PaymentQuoteCacheHitRate"] == 75.0
+        assert output["ContentPath"] == "/api/premium-article"
+
+    def test_record_rate_limit(self, capsys):
+        """Test recording an adaptive rate limiter cutting its rate."""
+        emitter = MetricsEmitter()
+        
+        emitter.record_rate_limit(key="gateway.example.com", rate=5.0, throttled=True)
+        
+        captured = capsys.readouterr()
+        output = json.loads(captured.out.strip())
+        
+        assert output["RateLimitEffectiveRate"] == 5.0
+        assert output["RateLimitThrottled"] == 1
+        assert output["rateLimitKey"] == "gateway.example.com"
+        units = {m["Name"]: m["Unit"] for m in output["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+        assert units["RateLimitEffectiveRate"] == "Count/Second"
+
+    def test_latencies_feed_sketches(self, capsys):
+        """Test that the record_* helpers feed the latency sketches."""
+        latencies = LatencyHistograms(export_interval_seconds=0)
+        emitter = MetricsEmitter(latencies=latencies)
+        
+        emitter.record_mcp_invocation(True, "get_weather", 100.0)
+        emitter.record_mcp_invocation(False, "get_weather", 300.0, payment_required=True)
+        emitter.record_content_request(502, 50.0, "/api/premium-article")
+        
+        assert latencies.percentile("mcp_invocation", 50, outcome="success") == pytest.approx(
+            100.0, rel=0.01
+        )
+        assert latencies.sketch("mcp_invocation", tool="get_weather").count == 2
+        assert latencies.keys()[-1] == LatencyKey(
+            "content_request", endpoint="/api/premium-article", outcome="error"
+        )
+
+    def test_record_latency_summary(self, capsys):
+        """Test recording a window's latency percentiles."""
+        emitter = MetricsEmitter()
+        
+        emitter.record_latency_summary(
+            operation="mcp_invocation",
+            count=40,
+            p50_ms=120.0,
+            p90_ms=250.0,
+            p99_ms=900.0,
+            max_ms=1200.0,
+            tool="get_weather",
+            outcome="success",
+        )
+        
+        captured = capsys.readouterr()
+        output = json.loads(captured.out.strip())
+        
+        assert output["LatencySamples"] == 40
+        assert output["LatencyP99"] == 900.0
+        assert output["Operation"] == "mcp_invocation"
+        assert output["ToolName"] == "get_weather"
+        assert output["Outcome"] == "success"
+        assert output["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [
+            ["Environment", "Operation", "ToolName", "Outcome"]
+        ]
+
 
 class TestGlobalMetricsEmitter:
     """Tests for global metrics emitter functions."""
@@ -274,6 +394,153 @@ class TestGlobalMetricsEmitter:
         assert emitter2.service_name == "new-service"
 
 
+class TestBufferedMetricsEmitter:
+    """Tests for the aggregating EMF emitter."""
+
+    @pytest.fixture
+    def emitter(self):
+        emitter = BufferedMetricsEmitter(flush_interval_seconds=60.0, max_buffered_samples=10_000)
+        yield emitter
+        emitter.close()
+
+    @staticmethod
+    def lines(capsys) -> list[dict]:
+        return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    def test_samples_are_buffered(self, emitter, capsys):
+        """Test that recording a metric writes nothing until a flush."""
+        emitter.record_mcp_invocation(True, "get_weather", 120.0)
+        
+        assert capsys.readouterr().out == ""
+        assert emitter.buffered_samples == 3
+
+    def test_flush_packs_value_arrays(self, emitter, capsys):
+        """Test that samples with the same dimensions share one line."""
+        for latency in (10.0, 20.0, 30.0):
+            emitter.record_mcp_invocation(True, "get_weather", latency)
+        emitter.record_mcp_invocation(False, "get_weather", 40.0, error="timeout")
+        
+        assert emitter.flush() == 2
+        
+        ok, failed = self.lines(capsys)
+        assert ok["MCPInvocationLatency"] == [10.0, 20.0, 30.0]
+        assert ok["MCPInvocationSuccess"] == [1, 1, 1]
+        assert "ErrorType" not in ok
+        assert failed["ErrorType"] == "timeout"
+        assert failed["MCPInvocationFailure"] == [1]
+        names = {m["Name"] for m in ok["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+        assert names == {"MCPInvocationCount", "MCPInvocationLatency", "MCPInvocationSuccess"}
+        assert emitter.buffered_samples == 0
+
+    def test_properties_are_kept(self, emitter, capsys):
+        """Test that properties reach the line and only equal ones are packed together."""
+        emitter.record_mcp_invocation(False, "get_weather", 10.0, error="Request failed: a")
+        emitter.record_mcp_invocation(False, "get_weather", 20.0, error="Request failed: b")
+        emitter.record_mcp_invocation(False, "get_weather", 30.0, error="Request failed: a")
+
+        assert emitter.flush() == 2
+
+        first, second = self.lines(capsys)
+        assert (first["error"], first["toolName"]) == ("Request failed: a", "get_weather")
+        assert first["MCPInvocationLatency"] == [10.0, 30.0]
+        assert second["error"] == "Request failed: b"
+        assert second["MCPInvocationLatency"] == [20.0]
+
+    def test_value_arrays_capped_at_100(self, emitter, capsys):
+        """Test that more than 100 samples of a metric are split across lines."""
+        for i in range(250):
+            emitter.emit(PayerMetricName.CONTENT_REQUEST_LATENCY, float(i), MetricUnit.MILLISECONDS)
+        
+        assert emitter.flush() == 3
+        
+        arrays = [line["ContentRequestLatency"] for line in self.lines(capsys)]
+        assert [len(values) for values in arrays] == [100, 100, 50]
+        assert sum(arrays, []) == [float(i) for i in range(250)]
+
+    def test_metrics_with_fewer_samples_drop_out_of_later_lines(self, emitter, capsys):
+        """Test that a line only declares metrics it has values for."""
+        for _ in range(101):
+            emitter.emit(PayerMetricName.CONTENT_REQUEST_COUNT, 1)
+        emitter.emit(PayerMetricName.CONTENT_REQUEST_ERROR, 1)
+        emitter.flush()
+        
+        _, second = self.lines(capsys)
+        
+        assert second["ContentRequestCount"] == [1]
+        assert "ContentRequestError" not in second
+        assert len(second["_aws"]["CloudWatchMetrics"][0]["Metrics"]) == 1
+
+    def test_size_trigger_flushes_in_background(self, capsys):
+        """Test that a full buffer is flushed by the background thread."""
+        emitter = BufferedMetricsEmitter(flush_interval_seconds=60.0, max_buffered_samples=5)
+        try:
+            for _ in range(5):
+                emitter.emit(PayerMetricName.PAYMENT_SIGNING_COUNT, 1)
+            for _ in range(100):
+                if emitter.buffered_samples == 0:
+                    break
+                time.sleep(0.01)
+            
+            assert emitter.buffered_samples == 0
+        finally:
+            emitter.close()
+        assert self.lines(capsys)[0]["PaymentSigningCount"] == [1] * 5
+
+    def test_time_trigger_flushes_in_background(self, capsys):
+        """Test that buffered samples are written after the flush interval."""
+        emitter = BufferedMetricsEmitter(flush_interval_seconds=0.05)
+        try:
+            emitter.emit(PayerMetricName.PAYMENT_SIGNING_COUNT, 1)
+            time.sleep(0.2)
+            
+            assert self.lines(capsys)[0]["PaymentSigningCount"] == [1]
+        finally:
+            emitter.close()
+
+    def test_close_flushes_and_emits_directly_afterwards(self, capsys):
+        """Test that close writes the buffer and later samples are not lost."""
+        emitter = BufferedMetricsEmitter(flush_interval_seconds=60.0)
+        emitter.emit(PayerMetricName.PAYMENT_SIGNING_COUNT, 1)
+        
+        emitter.close()
+        emitter.emit(PayerMetricName.PAYMENT_SIGNING_FAILURE, 1)
+        
+        first, second = self.lines(capsys)
+        assert first["PaymentSigningCount"] == [1]
+        assert second["PaymentSigningFailure"] == 1
+
+    def test_concurrent_recording_loses_nothing(self, capsys):
+        """Test that samples recorded from many threads all reach stdout."""
+        emitter = BufferedMetricsEmitter(flush_interval_seconds=0.01, max_buffered_samples=50)
+        
+        def record():
+            for _ in range(500):
+                emitter.emit(PayerMetricName.MCP_INVOCATION_COUNT, 1)
+        
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        emitter.close()
+        
+        total = sum(len(line["MCPInvocationCount"]) for line in self.lines(capsys))
+        assert total == 2000
+
+    def test_config_selects_buffered_emitter(self, monkeypatch):
+        """Test that a flush interval in the config enables buffering."""
+        monkeypatch.setattr(config, "metrics_flush_interval_seconds", 5.0)
+        
+        emitter = init_metrics("buffered-service")
+        try:
+            assert isinstance(emitter, BufferedMetricsEmitter)
+            assert emitter.flush_interval_seconds == 5.0
+        finally:
+            emitter.close()
+            monkeypatch.setattr(config, "metrics_flush_interval_seconds", 0.0)
+            init_metrics()
+
+
 class TestEMFFormat:
     """Tests for EMF format compliance."""
 
@@ -0,0 +1,222 @@
+"""
+Tests for the payment requirements cache and the quote path that uses it.
+"""
+
+import base64
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from agent.config import config
+from agent.payment_quotes import PaymentQuoteCache, get_quote_cache
+from agent.tools.content import request_content, request_content_with_payment
+from agent.tools.discovery import quote_service, request_service
+
+SELLER_URL = "https://seller.example.com"
+ARTICLE_URL = f"{SELLER_URL}/api/premium-article"
+
+REQUIREMENTS = {
+    "x402Version": 2,
+    "accepts": [
+        {
+            "scheme": "exact",
+            "network": "eip155:84532",
+            "amount": "1000",
+            "asset": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+            "payTo": "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb0",
+            "maxTimeoutSeconds": 60,
+            "extra": {"name": "USDC", "version": "2"},
+        }
+    ],
+    "resource": {"url": "/api/premium-article", "description": "Premium article"},
+}
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def payment_required_response(request: httpx.Request) -> httpx.Response:
+    header = base64.b64encode(json.dumps(REQUIREMENTS).encode()).decode()
+    return httpx.Response(402, headers={"X-PAYMENT-REQUIRED": header}, request=request)
+
+
+@pytest.fixture
+def seller(monkeypatch):
+    """Route the tools' httpx.Client to a handler and record the requests."""
+    requests: list[httpx.Request] = []
+    state = {"handler": payment_required_response}
+    real_client = httpx.Client
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return state["handler"](request)
+
+    monkeypatch.setattr(config, "seller_api_url", SELLER_URL)
+    monkeypatch.setattr(
+        httpx,
+        "Client",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+    state["requests"] = requests
+    return state
+
+
+class TestPaymentQuoteCache:
+    """Tests for PaymentQuoteCache."""
+
+    def test_hit_and_miss(self):
+        """Test that stored requirements are returned until they expire."""
+        clock = FakeClock()
+        cache = PaymentQuoteCache(ttl_seconds=60, clock=clock)
+
+        assert cache.get(ARTICLE_URL) is None
+        cache.put(ARTICLE_URL, REQUIREMENTS)
+        assert cache.get(ARTICLE_URL) is REQUIREMENTS
+
+        clock.now += 60
+        assert cache.get(ARTICLE_URL) is None
+        assert len(cache) == 0
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 2
+        assert cache.stats.hit_rate == pytest.approx(100 / 3)
+
+    def test_invalidate(self):
+        """Test that an endpoint can be dropped explicitly."""
+        cache = PaymentQuoteCache()
+        cache.put(ARTICLE_URL, REQUIREMENTS)
+
+        assert cache.invalidate(ARTICLE_URL) is True
+        assert cache.invalidate(ARTICLE_URL) is False
+        assert cache.get(ARTICLE_URL) is None
+        assert cache.stats.invalidations == 1
+
+    def test_ignores_unusable_requirements(self):
+        """Test that raw or empty 402 bodies are not cached."""
+        cache = PaymentQuoteCache()
+
+        cache.put(ARTICLE_URL, {"raw": "abc"})
+        cache.put(ARTICLE_URL, None)
+
+        assert len(cache) == 0
+
+    def test_evicts_oldest_endpoint(self):
+        """Test that the entry budget evicts the least recently stored endpoint."""
+        cache = PaymentQuoteCache(max_entries=2)
+        for name in ("a", "b", "c"):
+            cache.put(f"{SELLER_URL}/api/{name}", REQUIREMENTS)
+
+        assert cache.get(f"{SELLER_URL}/api/a") is None
+        assert cache.get(f"{SELLER_URL}/api/c") is REQUIREMENTS
+
+    def test_disabled_with_zero_ttl(self):
+        """Test that a zero TTL disables caching."""
+        cache = PaymentQuoteCache(ttl_seconds=0)
+        cache.put(ARTICLE_URL, REQUIREMENTS)
+
+        assert cache.enabled is False
+        assert len(cache) == 0
+
+
+class TestQuoteService:
+    """Tests for the quote_service tool."""
+
+    def test_head_probe_then_cached(self, seller):
+        """Test that the first quote uses HEAD and the second needs no request."""
+        first = quote_service(service_name="get_premium_article")
+        second = quote_service(service_name="get_premium_article")
+
+        assert [r.method for r in seller["requests"]] == ["HEAD"]
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["requires_payment"] is True
+        assert second["payment_required"]["amount"] == "1000"
+        assert second["payment_required"]["recipient"] == REQUIREMENTS["accepts"][0]["payTo"]
+
+    def test_falls_back_to_get_when_head_unsupported(self, seller):
+        """Test that a 405 to HEAD is retried as a GET."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "HEAD":
+                return httpx.Response(405, request=request)
+            return payment_required_response(request)
+
+        seller["handler"] = handler
+        result = quote_service(service_name="get_premium_article")
+
+        assert [r.method for r in seller["requests"]] == ["HEAD", "GET"]
+        assert result["payment_required"]["amount"] == "1000"
+
+    def test_free_service(self, seller):
+        """Test that a service answering 200 is quoted as free."""
+        seller["handler"] = lambda request: httpx.Response(200, request=request)
+
+        result = quote_service(service_name="get_premium_article")
+
+        assert result["requires_payment"] is False
+        assert len(get_quote_cache()) == 0
+
+    def test_refresh_probes_again(self, seller):
+        """Test that refresh=True ignores the cached requirements."""
+        quote_service(service_name="get_premium_article")
+        result = quote_service(service_name="get_premium_article", refresh=True)
+
+        assert len(seller["requests"]) == 2
+        assert result["cached"] is False
+
+
+class TestProbeReuse:
+    """Tests for request_service/request_content reusing cached requirements."""
+
+    def test_request_service_reuses_402(self, seller):
+        """Test that a repeat unpaid probe is answered from the cache."""
+        request_service(service_name="get_premium_article")
+        result = request_service(service_name="get_premium_article")
+
+        assert len(seller["requests"]) == 1
+        assert result["http_status"] == 402
+        assert result["cached"] is True
+        assert result["payment_required"]["amount"] == "1000"
+
+    def test_quote_shared_with_request_content(self, seller):
+        """Test that both tools share one cache entry per endpoint."""
+        quote_service(service_name="get_premium_article")
+
+        with patch("agent.tools.content.get_metrics_emitter") as mock_emitter:
+            result = request_content(url="/api/premium-article")
+
+        assert len(seller["requests"]) == 1
+        assert result["cached"] is True
+        assert result["payment_required"]["recipient"] == REQUIREMENTS["accepts"][0]["payTo"]
+        mock_emitter.return_value.record_quote_lookup.assert_called_once()
+        assert mock_emitter.return_value.record_quote_lookup.call_args.kwargs["hit"] is True
+
+    def test_paid_request_bypasses_cache(self, seller):
+        """Test that a paid request is always sent."""
+        quote_service(service_name="get_premium_article")
+        seller["handler"] = lambda request: httpx.Response(
+            200, json={"title": "Article"}, request=request
+        )
+
+        result = request_service(
+            service_name="get_premium_article", payment_payload={"x402Version": 2}
+        )
+
+        assert result["http_status"] == 200
+        assert "X-PAYMENT-SIGNATURE" in seller["requests"][-1].headers
+
+    def test_rejected_payment_invalidates(self, seller):
+        """Test that a rejected payment drops the cached requirements."""
+        request_content(url="/api/premium-article")
+        assert len(get_quote_cache()) == 1
+
+        request_content_with_payment(url="/api/premium-article", payment_payload={"x402Version": 2})
+
+        assert len(get_quote_cache()) == 0
@@ -0,0 +1,151 @@
+"""
+Tests for the optimistic pre-payment module.
+"""
+
+from unittest.mock import patch
+
+from agent.mcp_client import MCPToolDefinition
+from agent.prepayment import (
+    PrepaymentPolicy,
+    advertised_requirement,
+    requirement_matches,
+    sign_requirement,
+)
+
+RECIPIENT = "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb0"
+ASSET = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
+
+
+def make_tool(name: str = "get_premium_article", price: str = "1000", **info) -> MCPToolDefinition:
+    payment_info = {
+        "price_units": price,
+        "network": "eip155:84532",
+        "scheme": "exact",
+        "asset_address": ASSET,
+        "pay_to": RECIPIENT,
+        "timeout_seconds": 60,
+        **info,
+    }
+    return MCPToolDefinition(
+        name=name,
+        description="Premium article",
+        operation_id=name,
+        requires_payment=True,
+        payment_info=payment_info,
+    )
+
+
+class TestAdvertisedRequirement:
+    """Tests for advertised_requirement."""
+
+    def test_builds_accepts_entry(self):
+        """Test that discovery metadata becomes an x402 v2 requirement."""
+        assert advertised_requirement(make_tool()) == {
+            "scheme": "exact",
+            "network": "eip155:84532",
+            "amount": "1000",
+            "asset": ASSET,
+            "payTo": RECIPIENT,
+            "maxTimeoutSeconds": 60,
+        }
+
+    def test_incomplete_metadata(self):
+        """Test that a requirement is not built without a recipient or price."""
+        assert advertised_requirement(make_tool(pay_to="")) is None
+        assert advertised_requirement(make_tool(price="")) is None
+        assert advertised_requirement(make_tool(price="1.5")) is None
+
+
+class TestPrepaymentPolicy:
+    """Tests for PrepaymentPolicy."""
+
+    def test_disabled_by_default(self):
+        """Test that nothing is pre-paid without an approved list."""
+        policy = PrepaymentPolicy()
+
+        assert policy.enabled is False
+        assert policy.allows(make_tool()) is False
+
+    def test_allows_approved_service_within_cap(self):
+        """Test that approved services priced within the cap are allowed."""
+        policy = PrepaymentPolicy(
+            approved_services=frozenset({"get_premium_article"}), max_price_units=1000
+        )
+
+        assert policy.allows(make_tool()) is True
+        assert policy.allows(make_tool(price="1001")) is False
+        assert policy.allows(make_tool(name="get_other")) is False
+
+    def test_free_tools_not_prepaid(self):
+        """Test that tools without payment are never pre-paid."""
+        policy = PrepaymentPolicy(approved_services=frozenset({"get_premium_article"}))
+        tool_def = make_tool()
+        tool_def.requires_payment = False
+
+        assert policy.allows(tool_def) is False
+
+    def test_from_config(self):
+        """Test that the policy is read from the agent configuration."""
+        with patch("agent.prepayment.config") as mock_config:
+            mock_config.prepay_services = ("get_premium_article",)
+            mock_config.prepay_max_price_units = 500
+            policy = PrepaymentPolicy.from_config()
+
+        assert policy.approved_services == frozenset({"get_premium_article"})
+        assert policy.max_price_units == 500
+
+
+class TestRequirementMatches:
+    """Tests for requirement_matches."""
+
+    def test_matching_accepts(self):
+        """Test that an identical accepted requirement matches (case-insensitive addresses)."""
+        requirement = advertised_requirement(make_tool())
+        payment_required = {"accepts": [{**requirement, "payTo": RECIPIENT.lower()}]}
+
+        assert requirement_matches(requirement, payment_required) is True
+
+    def test_price_changed(self):
+        """Test that a different price does not match."""
+        requirement = advertised_requirement(make_tool())
+        payment_required = {"accepts": [{**requirement, "amount": "2000"}]}
+
+        assert requirement_matches(requirement, payment_required) is False
+
+    def test_missing_requirements(self):
+        """Test that an undecodable 402 body does not match."""
+        requirement = advertised_requirement(make_tool())
+
+        assert requirement_matches(requirement, None) is False
+        assert requirement_matches(requirement, {"raw": "abc"}) is False
+
+
+class TestSignRequirement:
+    """Tests for sign_requirement."""
+
+    def test_signs_with_wallet(self):
+        """Test that the requirement is passed through to sign_payment."""
+        requirement = advertised_requirement(make_tool())
+        with patch(
+            "agent.tools.payment.sign_payment",
+            return_value={"success": True, "payload": {"x402Version": 2}},
+        ) as mock_sign:
+            payload = sign_requirement(requirement)
+
+        assert payload == {"x402Version": 2}
+        mock_sign.assert_called_once_with(
+            scheme="exact",
+            network="eip155:84532",
+            amount="1000",
+            recipient=RECIPIENT,
+            asset=ASSET,
+            max_timeout_seconds=60,
+        )
+
+    def test_signing_failure(self):
+        """Test that a failed signature returns None."""
+        with patch(
+            "agent.tools.payment.sign_payment",
+            return_value={"success": False, "error": "wallet unavailable"},
+        ):
+            assert sign_requirement(advertised_requirement(make_tool())) is None
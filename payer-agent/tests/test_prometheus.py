@@ -0,0 +1,298 @@
+"""
+Tests for the Prometheus exposition.
+"""
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from agent import api_server, mcp_client
+from agent.config import config
+from agent.mcp_client import MCPClient
+from agent.metrics import (
+    PROMETHEUS_COUNTERS,
+    PROMETHEUS_GAUGES,
+    MetricDimensions,
+    MetricsEmitter,
+)
+from agent.prometheus import (
+    EMFMirror,
+    EventLoopMonitor,
+    MetricFamily,
+    PrometheusRegistry,
+    http_pool_families,
+    rate_limiter_families,
+    snake_case,
+)
+from agent.rate_limiter import RateLimitConfig, RateLimiterRegistry
+
+
+def sample_lines(body: str) -> list[str]:
+    return [line for line in body.splitlines() if not line.startswith("#")]
+
+
+class TestPrometheusRegistry:
+    """Tests for PrometheusRegistry and its metric types."""
+
+    def test_counter_sums_threads(self):
+        """Test that increments from many threads are all counted."""
+        counter = PrometheusRegistry().counter("test_requests", "Requests")
+
+        def worker():
+            for _ in range(10000):
+                counter.inc(labels={"route": "/invoke"})
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value({"route": "/invoke"}) == 40000
+
+    def test_counter_rejects_decrease(self):
+        """Test that a counter cannot go down."""
+        with pytest.raises(ValueError):
+            PrometheusRegistry().counter("test_requests", "Requests").inc(-1)
+
+    def test_render_prometheus_format(self):
+        """Test the Prometheus 0.0.4 text format."""
+        registry = PrometheusRegistry()
+        registry.counter("test_requests", "Requests").inc(2, {"route": "/invoke"})
+        registry.gauge("test_depth", "Queue depth").set(3)
+        histogram = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+        body = registry.render()
+
+        assert "# TYPE test_requests_total counter" in body
+        assert sample_lines(body) == [
+            'test_requests_total{route="/invoke"} 2.0',
+            "test_depth 3.0",
+            'test_latency_seconds_bucket{le="0.1"} 1.0',
+            'test_latency_seconds_bucket{le="1.0"} 2.0',
+            'test_latency_seconds_bucket{le="+Inf"} 3.0',
+            "test_latency_seconds_sum 5.55",
+            "test_latency_seconds_count 3.0",
+        ]
+        assert not body.rstrip().endswith("# EOF")
+
+    def test_render_openmetrics_format(self):
+        """Test that OpenMetrics names the counter family without _total and ends with EOF."""
+        registry = PrometheusRegistry()
+        registry.counter("test_requests", "Requests").inc()
+
+        body = registry.render(openmetrics=True)
+
+        assert "# TYPE test_requests counter" in body
+        assert "test_requests_total 1.0" in body
+        assert body.endswith("# EOF\n")
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes, backslashes and newlines in label values are escaped."""
+        registry = PrometheusRegistry()
+        registry.gauge("test_gauge", "Gauge").set(1, {"error": 'bad "value"\\\n'})
+
+        assert 'test_gauge{error="bad \\"value\\"\\\\\\n"} 1.0' in registry.render()
+
+    def test_kind_conflict(self):
+        """Test that a name cannot be registered as two kinds."""
+        registry = PrometheusRegistry()
+        registry.counter("test_metric", "Metric")
+
+        with pytest.raises(ValueError):
+            registry.gauge("test_metric", "Metric")
+
+    def test_collectors_are_merged_and_isolated(self):
+        """Test that collector families merge by name and a failing collector is skipped."""
+        registry = PrometheusRegistry()
+
+        def collector(value):
+            family = MetricFamily("test_level", "gauge", "Level")
+            family.add(value, {"source": str(value)})
+            return [family]
+
+        def broken():
+            raise RuntimeError("unavailable")
+
+        registry.register_collector(lambda: collector(1))
+        registry.register_collector(broken)
+        registry.register_collector(lambda: collector(2))
+
+        body = registry.render()
+
+        assert body.count("# TYPE test_level gauge") == 1
+        assert sample_lines(body) == ['test_level{source="1"} 1.0', 'test_level{source="2"} 2.0']
+
+    @pytest.mark.parametrize(
+        "name, expected",
+        [
+            ("MCPInvocationLatency", "mcp_invocation_latency"),
+            ("ContentRequest402", "content_request_402"),
+            ("WalletBalanceETH", "wallet_balance_eth"),
+            ("RateLimitWaitP95", "rate_limit_wait_p95"),
+            ("ContentPath", "content_path"),
+        ],
+    )
+    def test_snake_case(self, name, expected):
+        """Test conversion of EMF names to Prometheus names."""
+        assert snake_case(name) == expected
+
+
+class TestEMFMirror:
+    """Tests for mirroring EMF metrics into the registry."""
+
+    @pytest.fixture
+    def registry(self):
+        return PrometheusRegistry()
+
+    @pytest.fixture
+    def emitter(self, registry, capsys):
+        mirror = EMFMirror(registry, gauges=PROMETHEUS_GAUGES, counters=PROMETHEUS_COUNTERS)
+        return MetricsEmitter(prometheus=mirror)
+
+    def test_counts_and_latencies(self, registry, emitter):
+        """Test that counts become counters and latencies histograms in seconds."""
+        emitter.record_mcp_invocation(True, "get_weather", 120.0)
+        emitter.record_mcp_invocation(False, "get_weather", 3000.0, error="timeout")
+
+        body = registry.render()
+
+        assert "# TYPE x402_payer_mcp_invocation_total counter" in body
+        assert 'x402_payer_mcp_invocation_success_total{environment="' in body
+        assert 'error_type="timeout"' in body
+        assert "# TYPE x402_payer_mcp_invocation_latency_seconds histogram" in body
+        total = registry.counter("x402_payer_mcp_invocation", "")
+        assert total.value({"environment": MetricDimensions().environment}) == 1
+
+    def test_levels_and_percentiles_are_gauges(self, registry, emitter):
+        """Test that the gauge overrides apply whatever the unit."""
+        emitter.record_latency_summary("payment_signing", 10, 40.0, 80.0, 120.0, 150.0)
+        emitter.record_circuit_breaker("/api/premium-article", "open")
+
+        body = registry.render()
+
+        assert "# TYPE x402_payer_latency_p99_seconds gauge" in body
+        assert "# TYPE x402_payer_latency_samples gauge" in body
+        assert "# TYPE x402_payer_mcp_circuit_state gauge" in body
+        assert 'operation="payment_signing"' in body
+
+    def test_buffered_emitter_records_on_the_callers_thread(self, registry):
+        """Test that buffering for EMF does not delay the Prometheus mirror."""
+        from agent.metrics import BufferedMetricsEmitter
+
+        emitter = BufferedMetricsEmitter(
+            flush_interval_seconds=60, prometheus=EMFMirror(registry)
+        )
+        try:
+            emitter.record_payment_signing(True, 40.0, network="base-sepolia")
+
+            assert "x402_payer_payment_signing_success_total" in registry.render()
+        finally:
+            emitter.close()
+
+
+class TestRuntimeCollectors:
+    """Tests for pool, rate limiter and event loop stats."""
+
+    def test_rate_limiter_families(self):
+        """Test that every bucket gets counters, gauges and a wait histogram."""
+        registry = RateLimiterRegistry(RateLimitConfig(requests_per_second=100, burst_capacity=1))
+        registry.acquire("https://gateway.example.com/mcp")
+        registry.acquire("https://gateway.example.com/mcp")
+
+        prometheus = PrometheusRegistry()
+        prometheus.register_collector(lambda: rate_limiter_families({"tools": registry}))
+        text = prometheus.render()
+
+        labels = 'limiter="tools",key="gateway.example.com"'
+        assert f"x402_payer_rate_limiter_allowed_total{{{labels}}} 2.0" in text
+        assert f'x402_payer_rate_limiter_wait_seconds_bucket{{{labels},le="+Inf"}} 2.0' in text
+        assert f"x402_payer_rate_limiter_rate{{{labels}}} 100.0" in text
+        assert f"x402_payer_rate_limiter_queue_depth{{{labels}}} 0.0" in text
+
+    @pytest.mark.asyncio
+    async def test_pool_stats_count_in_flight_requests(self):
+        """Test that requests waiting for a response are counted."""
+        seen = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(client.pool_stats().in_flight_requests)
+            return httpx.Response(200, json={})
+
+        client = MCPClient(
+            gateway_url="https://gateway.example.com",
+            enable_caching=False,
+            max_connections=7,
+            transport=httpx.MockTransport(handler),
+        )
+        await client.invoke_tool("get_premium_article")
+        stats = client.pool_stats()
+
+        assert seen == [1]
+        assert stats.in_flight_requests == 0
+        assert stats.max_connections == 7
+        families = {family.name: family for family in http_pool_families(stats)}
+        assert families["x402_payer_http_pool_max_connections"].samples == [("", {}, 7)]
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_event_loop_monitor(self):
+        """Test that the monitor records lag and the task count."""
+        registry = PrometheusRegistry()
+        monitor = EventLoopMonitor(registry, interval_seconds=0.01)
+
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        assert "x402_payer_event_loop_lag_seconds_count" in registry.render()
+        assert monitor.tasks.value() >= 1
+
+
+class TestMetricsEndpoint:
+    """Tests for GET /metrics on the API server."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(config, "agent_runtime_arn", "")
+        return TestClient(api_server.app)
+
+    def test_prometheus_scrape(self, client, monkeypatch):
+        """Test that a plain scrape gets the Prometheus text format."""
+        monkeypatch.setattr(mcp_client, "_mcp_client", MCPClient())
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "x402_payer_http_pool_max_connections" in response.text
+
+    def test_scrape_does_not_create_mcp_client(self, client, monkeypatch):
+        """Test that scraping before any MCP use leaves the global client uncreated."""
+        monkeypatch.setattr(mcp_client, "_mcp_client", None)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert "x402_payer_http_pool_max_connections" not in response.text
+        assert mcp_client.current_mcp_client() is None
+
+    def test_openmetrics_scrape(self, client):
+        """Test that OpenMetrics is served when the scraper asks for it."""
+        response = client.get(
+            "/metrics", headers={"Accept": "application/openmetrics-text; version=1.0.0"}
+        )
+
+        assert response.headers["content-type"].startswith("application/openmetrics-text")
+        assert response.text.endswith("# EOF\n")
+
+    def test_disabled(self, client, monkeypatch):
+        """Test that the endpoint can be turned off."""
+        monkeypatch.setattr(config, "prometheus_enabled", False)
+
+        assert client.get("/metrics").status_code == 404
@@ -0,0 +1,337 @@
+"""
+Tests for the purchase_service and purchase_services tools.
+"""
+
+import base64
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from agent.config import config
+from agent.payment_quotes import get_quote_cache
+from agent.tools import purchase as purchase_module
+from agent.tools.purchase import _units_to_usdc, purchase_service, purchase_services
+
+SELLER_URL = "https://seller.example.com"
+RECIPIENT = "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb0"
+
+
+def requirements(amount: str, pay_to: str = RECIPIENT) -> dict:
+    return {
+        "x402Version": 2,
+        "accepts": [
+            {
+                "scheme": "exact",
+                "network": "eip155:84532",
+                "amount": amount,
+                "asset": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+                "payTo": pay_to,
+                "maxTimeoutSeconds": 60,
+                "extra": {"name": "USDC", "version": "2"},
+            }
+        ],
+        "resource": {"description": "Premium article"},
+    }
+
+
+def encode(value: dict) -> str:
+    return base64.b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.fixture
+def seller(monkeypatch):
+    """
+    A seller charging ``state["amount"]`` that accepts any signature.
+
+    ``state["max_in_flight"]`` is the most paid requests it served at once.
+    """
+    state = {
+        "amount": "1000",
+        "requests": [],
+        "delay": 0.0,
+        "broken": set(),
+        "in_flight": 0,
+        "max_in_flight": 0,
+    }
+    lock = threading.Lock()
+    real_client = httpx.Client
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request)
+        if "X-PAYMENT-SIGNATURE" in request.headers:
+            with lock:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            time.sleep(state["delay"])
+            with lock:
+                state["in_flight"] -= 1
+            if request.url.path in state["broken"]:
+                return httpx.Response(500, request=request)
+            signed = json.loads(base64.b64decode(request.headers["X-PAYMENT-SIGNATURE"]))
+            accepted = signed["accepted"]
+            if accepted["amount"] == state["amount"] and accepted["payTo"] == RECIPIENT:
+                return httpx.Response(
+                    200,
+                    json={"title": "Article"},
+                    headers={
+                        "X-PAYMENT-RESPONSE": encode({"success": True, "transaction": "0xabc"})
+                    },
+                    request=request,
+                )
+        return httpx.Response(
+            402,
+            headers={"X-PAYMENT-REQUIRED": encode(requirements(state["amount"]))},
+            request=request,
+        )
+
+    monkeypatch.setattr(config, "seller_api_url", SELLER_URL)
+    monkeypatch.setattr(
+        httpx,
+        "Client",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+    return state
+
+
+@pytest.fixture
+def wallet():
+    """Patch the wallet: 1 USDC balance and a signer echoing the requirement."""
+    def sign(scheme, network, amount, recipient, asset="", max_timeout_seconds=60):
+        return {
+            "success": True,
+            "payload": {
+                "x402Version": 2,
+                "accepted": {
+                    "scheme": scheme,
+                    "network": network,
+                    "amount": amount,
+                    "payTo": recipient,
+                },
+                "payload": {"signature": "0x" + "ab" * 65},
+            },
+        }
+
+    with patch(
+        "agent.tools.purchase.get_wallet_balance",
+        return_value={"success": True, "usdc_balance": "1.0"},
+    ) as balance, patch("agent.tools.purchase.sign_payment", side_effect=sign) as signer:
+        yield {"balance": balance, "sign": signer}
+
+
+class TestUnitsToUsdc:
+    """Tests for atomic-unit conversion."""
+
+    @pytest.mark.parametrize(
+        "units,usdc", [("1000", "0.001"), ("500", "0.0005"), ("1000000", "1"), ("10000000", "10")]
+    )
+    def test_conversion(self, units, usdc):
+        """Test that amounts are converted without float rounding or exponents."""
+        assert _units_to_usdc(units) == usdc
+
+
+class TestPurchaseService:
+    """Tests for purchase_service."""
+
+    def test_pre_approved_purchase(self, seller, wallet):
+        """Test that a pre-approved service is bought in one call."""
+        result = purchase_service(service_name="get_premium_article", max_price="0.005")
+
+        assert result["status"] == "purchased"
+        assert result["content"] == {"title": "Article"}
+        assert result["receipt"]["amount_usdc"] == "0.001"
+        assert result["receipt"]["transaction_hash"] == "0xabc"
+        assert result["receipt"]["approval"] == "pre_approved"
+        assert [r.method for r in seller["requests"]] == ["HEAD", "GET"]
+        wallet["sign"].assert_called_once()
+
+    def test_approval_required(self, seller, wallet):
+        """Test that unapproved services are returned to the model without paying."""
+        result = purchase_service(service_name="get_research_report", max_price="0.01")
+
+        assert result["status"] == "approval_required"
+        assert result["price_usdc"] == "0.001"
+        wallet["sign"].assert_not_called()
+
+    def test_user_confirmed_purchase(self, seller, wallet):
+        """Test that a confirmed purchase of an unapproved service goes through."""
+        result = purchase_service(
+            service_name="get_research_report", max_price="0.01", user_confirmed=True
+        )
+
+        assert result["status"] == "purchased"
+        assert result["receipt"]["approval"] == "user_confirmed"
+
+    def test_price_above_max_price(self, seller, wallet):
+        """Test that max_price is a hard cap even for confirmed purchases."""
+        result = purchase_service(
+            service_name="get_premium_article", max_price="0.0005", user_confirmed=True
+        )
+
+        assert result["status"] == "rejected"
+        wallet["balance"].assert_not_called()
+        wallet["sign"].assert_not_called()
+
+    def test_insufficient_balance(self, seller, wallet):
+        """Test that the balance check stops the purchase before signing."""
+        wallet["balance"].return_value = {"success": True, "usdc_balance": "0.0001"}
+
+        result = purchase_service(service_name="get_premium_article", max_price="0.005")
+
+        assert result["status"] == "rejected"
+        assert "Insufficient balance" in result["reason"]
+        wallet["sign"].assert_not_called()
+
+    def test_stale_cached_quote_is_requoted(self, seller, wallet):
+        """Test that a price change since a cached quote is re-checked and bought once."""
+        get_quote_cache().put(f"{SELLER_URL}/api/premium-article", requirements("500"))
+
+        result = purchase_service(service_name="get_premium_article", max_price="0.005")
+
+        assert result["status"] == "purchased"
+        assert result["receipt"]["amount_units"] == "1000"
+        assert wallet["sign"].call_count == 2
+
+    def test_changed_recipient_is_checked_again(self, seller, wallet):
+        """Test that a new payTo at the same price is approved and checked before paying."""
+        old_recipient = "0x1111111111111111111111111111111111111111"
+        get_quote_cache().put(
+            f"{SELLER_URL}/api/premium-article", requirements("1000", pay_to=old_recipient)
+        )
+
+        with patch(
+            "agent.tools.purchase.analyze_payment", wraps=purchase_module.analyze_payment
+        ) as analyze:
+            result = purchase_service(service_name="get_premium_article", max_price="0.005")
+
+        assert result["status"] == "purchased"
+        assert result["receipt"]["recipient"] == RECIPIENT
+        assert [c.kwargs["recipient"] for c in analyze.call_args_list] == [
+            old_recipient,
+            RECIPIENT,
+        ]
+        assert [c.kwargs["recipient"] for c in wallet["sign"].call_args_list] == [
+            old_recipient,
+            RECIPIENT,
+        ]
+
+    def test_changed_recipient_fails_basket_item(self, seller, wallet):
+        """Test that a bulk purchase does not pay a recipient it did not check."""
+        get_quote_cache().put(
+            f"{SELLER_URL}/api/premium-article",
+            requirements("1000", pay_to="0x1111111111111111111111111111111111111111"),
+        )
+
+        result = purchase_services(
+            service_names=["get_premium_article"], max_total_price="0.01", user_confirmed=True
+        )
+
+        item = result["results"]["get_premium_article"]
+        assert item["stage"] == "requote"
+        assert "recipient" in item["error"]
+        assert wallet["sign"].call_count == 1
+
+    def test_invalid_max_price(self, seller, wallet):
+        """Test that a non-numeric max_price fails validation."""
+        result = purchase_service(service_name="get_premium_article", max_price="cheap")
+
+        assert result["status"] == "failed"
+        assert result["stage"] == "validate"
+        assert seller["requests"] == []
+
+
+class TestPurchaseServices:
+    """Tests for the bulk purchase_services tool."""
+
+    SERVICES = ["get_premium_article", "get_weather_data", "get_market_analysis"]
+
+    def test_bulk_purchase(self, seller, wallet):
+        """Test that every service is bought behind one approval and balance check."""
+        result = purchase_services(
+            service_names=self.SERVICES, max_total_price="0.01", user_confirmed=True
+        )
+
+        assert result["status"] == "purchased"
+        assert result["total_usdc"] == "0.003"
+        assert list(result["results"]) == self.SERVICES
+        assert all(r["receipt"]["transaction_hash"] == "0xabc" for r in result["results"].values())
+        wallet["balance"].assert_called_once()
+        assert wallet["sign"].call_count == 3
+
+    def test_paid_fetches_overlap(self, seller, wallet):
+        """Test that paid fetches run in parallel rather than one after another."""
+        seller["delay"] = 0.2
+
+        result = purchase_services(
+            service_names=self.SERVICES, max_total_price="0.01", user_confirmed=True
+        )
+
+        assert result["status"] == "purchased"
+        assert seller["max_in_flight"] > 1
+
+    def test_single_approval_for_basket(self, seller, wallet):
+        """Test that unapproved services in the basket ask for one confirmation."""
+        result = purchase_services(service_names=self.SERVICES, max_total_price="0.01")
+
+        assert result["status"] == "approval_required"
+        assert result["not_pre_approved"] == ["get_market_analysis"]
+        assert result["prices_usdc"]["get_weather_data"] == "0.001"
+        wallet["sign"].assert_not_called()
+
+    def test_pre_approved_basket(self, seller, wallet):
+        """Test that a fully pre-approved basket needs no confirmation."""
+        result = purchase_services(
+            service_names=["get_premium_article", "get_weather_data"], max_total_price="0.01"
+        )
+
+        assert result["status"] == "purchased"
+        assert result["results"]["get_weather_data"]["receipt"]["approval"] == "pre_approved"
+
+    def test_total_above_max(self, seller, wallet):
+        """Test that the combined price is capped by max_total_price."""
+        result = purchase_services(
+            service_names=self.SERVICES, max_total_price="0.002", user_confirmed=True
+        )
+
+        assert result["status"] == "rejected"
+        wallet["sign"].assert_not_called()
+
+    def test_combined_balance_check(self, seller, wallet):
+        """Test that the balance must cover the whole basket, not each item."""
+        wallet["balance"].return_value = {"success": True, "usdc_balance": "0.002"}
+
+        result = purchase_services(
+            service_names=self.SERVICES, max_total_price="0.01", user_confirmed=True
+        )
+
+        assert result["status"] == "rejected"
+        assert "Insufficient balance" in result["reason"]
+        wallet["sign"].assert_not_called()
+
+    def test_invalid_balance(self, seller, wallet):
+        """Test that an unreadable wallet balance fails the basket at the balance stage."""
+        wallet["balance"].return_value = {"success": True, "usdc_balance": "n/a"}
+
+        result = purchase_services(
+            service_names=self.SERVICES, max_total_price="0.01", user_confirmed=True
+        )
+
+        assert result["status"] == "failed"
+        assert result["error"] == "Invalid wallet balance: n/a"
+        assert {r["stage"] for r in result["results"].values()} == {"balance"}
+        wallet["sign"].assert_not_called()
+
+    def test_partial_failure(self, seller, wallet):
+        """Test that one failing service does not block the others."""
+        seller["broken"].add("/api/weather-data")
+
+        result = purchase_services(
+            service_names=["get_premium_article", "get_weather_data"], max_total_price="0.01"
+        )
+
+        assert result["status"] == "partial"
+        assert result["results"]["get_premium_article"]["status"] == "purchased"
+        assert result["results"]["get_weather_data"]["stage"] == "fetch"
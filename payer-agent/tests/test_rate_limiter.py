@@ -3,18 +3,26 @@ Tests for the rate limiter module.
 """
 
 import asyncio
+import json
+import threading
 import time
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
+from agent.config import config as agent_config
 from agent.rate_limiter import (
+    AdaptiveRate,
     AsyncRateLimiter,
     RateLimitConfig,
     RateLimitExceeded,
     RateLimiter,
+    RateLimiterRegistry,
+    WaitTimeHistogram,
     create_rate_limiter,
 )
+from agent.tools.content import request_content
 
 
 class TestRateLimitConfig:
@@ -247,6 +255,119 @@ class TestAsyncRateLimiter:
             await limiter.acquire()
 
 
+    @pytest.mark.asyncio
+    async def test_concurrent_waiters_all_acquire(self):
+        """Test that waiters woken together keep waiting instead of failing."""
+        limiter = AsyncRateLimiter(RateLimitConfig(requests_per_second=50.0, burst_capacity=1))
+        
+        waits = await asyncio.gather(*(limiter.acquire(timeout=1.0) for _ in range(5)))
+        
+        assert len(waits) == 5
+        assert limiter.stats.allowed_requests == 5
+        assert limiter.stats.throttled_requests == 0
+
+
+    @pytest.mark.asyncio
+    async def test_waiters_admitted_in_fifo_order(self):
+        """Test that each waiter gets its own slot, in call order."""
+        limiter = AsyncRateLimiter(
+            RateLimitConfig(requests_per_second=100.0, burst_capacity=1, enable_logging=False)
+        )
+        admitted = []
+
+        async def worker(index: int) -> None:
+            await limiter.acquire(timeout=5.0)
+            admitted.append(index)
+
+        await asyncio.gather(*(worker(i) for i in range(20)))
+
+        assert admitted == list(range(20))
+
+    @pytest.mark.asyncio
+    async def test_reservations_are_paced_at_the_rate(self):
+        """Test that reserved waits grow by exactly one interval per caller."""
+        limiter = AsyncRateLimiter(
+            RateLimitConfig(requests_per_second=100.0, burst_capacity=2, enable_logging=False)
+        )
+
+        waits = await asyncio.gather(*(limiter.acquire(timeout=5.0) for _ in range(5)))
+
+        assert waits[:2] == [0.0, 0.0]
+        for wait_time, expected in zip(waits[2:], (0.01, 0.02, 0.03)):
+            assert wait_time == pytest.approx(expected, abs=0.005)
+
+    @pytest.mark.asyncio
+    async def test_weighted_acquire(self):
+        """Test that acquire(n=...) consumes n slots."""
+        limiter = AsyncRateLimiter(
+            RateLimitConfig(requests_per_second=10.0, burst_capacity=5, block_on_limit=False)
+        )
+
+        assert await limiter.acquire(n=3) == 0.0
+        assert await limiter.try_acquire(n=2) is True
+        assert await limiter.try_acquire() is False
+        assert limiter.available_tokens < 1
+
+    @pytest.mark.asyncio
+    async def test_weight_above_burst_rejected(self):
+        """Test that a request heavier than the bucket can never be admitted."""
+        limiter = AsyncRateLimiter(RateLimitConfig(burst_capacity=2))
+
+        with pytest.raises(ValueError):
+            await limiter.acquire(n=3)
+
+    @pytest.mark.asyncio
+    async def test_timeout_leaves_no_reservation(self):
+        """Test that a caller whose slot is too far away does not hold it."""
+        limiter = AsyncRateLimiter(
+            RateLimitConfig(requests_per_second=1.0, burst_capacity=1, enable_logging=False)
+        )
+        await limiter.acquire()
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            await limiter.acquire(timeout=0.1)
+
+        assert exc_info.value.wait_time == pytest.approx(1.0, abs=0.05)
+        assert limiter.stats.throttled_requests == 1
+        assert limiter.available_tokens == pytest.approx(0.0, abs=0.05)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_returns_its_slot(self):
+        """Test that cancelling the last waiter frees its slot for the next caller."""
+        limiter = AsyncRateLimiter(
+            RateLimitConfig(requests_per_second=10.0, burst_capacity=1, enable_logging=False)
+        )
+        await limiter.acquire()
+
+        waiter = asyncio.ensure_future(limiter.acquire(timeout=5.0))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        wait_time = await limiter.acquire(timeout=5.0)
+        assert wait_time < 0.1
+
+    @pytest.mark.asyncio
+    async def test_thousand_waiters_are_fair(self):
+        """Test 1k concurrent waiters: FIFO admission and no spurious failures."""
+        limiter = AsyncRateLimiter(
+            RateLimitConfig(requests_per_second=20000.0, burst_capacity=10, enable_logging=False)
+        )
+        admitted = []
+
+        async def worker(index: int) -> None:
+            await limiter.acquire(timeout=5.0)
+            admitted.append(index)
+
+        await asyncio.gather(*(worker(i) for i in range(1000)))
+
+        assert limiter.stats.allowed_requests == 1000
+        assert limiter.stats.throttled_requests == 0
+        inversions = sum(1 for a, b in zip(admitted, admitted[1:]) if b < a)
+        assert inversions < 10
+
+
 class TestCreateRateLimiter:
     """Tests for factory function."""
 
@@ -289,3 +410,454 @@ class TestRateLimitExceeded:
         exc = RateLimitExceeded(wait_time=2.0, message="Custom error")
         assert "Custom error" in str(exc)
         assert "2.00 seconds" in str(exc)
+
+
+class TestRateLimiterRegistry:
+    """Tests for RateLimiterRegistry."""
+
+    def test_one_bucket_per_host(self):
+        """Test that URLs on the same host share a bucket."""
+        registry = RateLimiterRegistry()
+        
+        assert registry.key_for("https://gw.example.com/api/a", tool="a") == "gw.example.com"
+        assert registry.get("gw.example.com") is registry.get("gw.example.com")
+        assert registry.get("gw.example.com") is not registry.get("other.example.com")
+
+    def test_per_tool_keys(self):
+        """Test that per_tool splits a host's bucket by tool name."""
+        registry = RateLimiterRegistry(per_tool=True)
+        
+        assert registry.key_for("https://gw.example.com/api/a", tool="a") == "gw.example.com/a"
+        assert registry.key_for("https://gw.example.com/mcp/tools") == "gw.example.com"
+
+    def test_acquire_records_wait_on_span(self):
+        """Test that the key and wait time are set on the span."""
+        registry = RateLimiterRegistry(RateLimitConfig(requests_per_second=20.0, burst_capacity=1))
+        span = MagicMock()
+        
+        registry.acquire("https://gw.example.com/api/a", span=span)
+        wait_time = registry.acquire("https://gw.example.com/api/a", span=span)
+        
+        assert wait_time > 0
+        span.set_attribute.assert_any_call("rate_limit.key", "gw.example.com")
+        span.set_attribute.assert_any_call("rate_limit.wait_ms", wait_time * 1000)
+        span.set_attribute.assert_any_call("rate_limit.queue_depth", 0)
+        span.add_event.assert_called_once()
+        attributes = dict(c.args for c in span.set_attribute.call_args_list)
+        assert attributes["rate_limit.tokens"] < 1
+
+    def test_concurrent_threads_share_bucket(self):
+        """Test that threads acquiring from one host are all admitted in turn."""
+        registry = RateLimiterRegistry(RateLimitConfig(requests_per_second=100.0, burst_capacity=2))
+        threads = [
+            threading.Thread(target=registry.acquire, args=("https://gw.example.com/x",))
+            for _ in range(6)
+        ]
+        
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        stats = registry.stats()["gw.example.com"]
+        assert stats.allowed_requests == 6
+        assert stats.throttled_requests == 0
+
+    @pytest.mark.asyncio
+    async def test_async_callers_share_the_bucket(self):
+        """Test that async callers draw from the same bucket as sync ones."""
+        registry = RateLimiterRegistry()
+        
+        await registry.acquire_async("https://gw.example.com/x")
+        registry.acquire("https://gw.example.com/y")
+        
+        assert registry.get_async("gw.example.com").bucket is registry.get("gw.example.com")
+        assert list(registry.stats()) == ["gw.example.com"]
+        assert registry.stats()["gw.example.com"].allowed_requests == 2
+    
+    @pytest.mark.asyncio
+    async def test_mixed_sync_and_async_stay_within_rate(self):
+        """Test that threads and coroutines on one host share a single rate."""
+        rate, burst = 50.0, 2
+        registry = RateLimiterRegistry(
+            RateLimitConfig(requests_per_second=rate, burst_capacity=burst, enable_logging=False)
+        )
+        url = "https://gw.example.com/mcp"
+        
+        def sync_worker():
+            for _ in range(5):
+                registry.acquire(url)
+        
+        start = time.monotonic()
+        threads = [threading.Thread(target=sync_worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        await asyncio.gather(*(registry.acquire_async(url) for _ in range(10)))
+        await asyncio.to_thread(lambda: [thread.join() for thread in threads])
+        elapsed = time.monotonic() - start
+        
+        # 20 requests with a burst of 2 need at least 18 refills at 50/s
+        stats = registry.stats()["gw.example.com"]
+        assert stats.allowed_requests == 20
+        assert stats.throttled_requests == 0
+        assert elapsed >= (20 - burst) / rate * 0.95
+
+    def test_disabled_with_zero_rate(self):
+        """Test that a zero rate turns acquire into a no-op."""
+        registry = RateLimiterRegistry(RateLimitConfig(requests_per_second=0))
+        
+        assert registry.enabled is False
+        assert registry.acquire("https://gw.example.com/x") == 0.0
+        assert registry.stats() == {}
+
+    def test_from_agent_config(self, monkeypatch):
+        """Test that limits are read from AgentConfig."""
+        monkeypatch.setattr(agent_config, "rate_limit_requests_per_second", 2.5)
+        monkeypatch.setattr(agent_config, "rate_limit_burst", 4)
+        monkeypatch.setattr(agent_config, "rate_limit_per_tool", True)
+        
+        registry = RateLimiterRegistry.from_agent_config()
+        
+        assert registry.config.requests_per_second == 2.5
+        assert registry.config.burst_capacity == 4
+        assert registry.per_tool is True
+
+
+class TestWaitTimeHistogram:
+    """Tests for WaitTimeHistogram."""
+
+    def test_percentiles(self):
+        """Test that percentiles come from bucket bounds capped by the max."""
+        histogram = WaitTimeHistogram()
+        for _ in range(90):
+            histogram.record(0.0)
+        for _ in range(9):
+            histogram.record(0.015)
+        histogram.record(0.4)
+        
+        assert histogram.count == 100
+        assert histogram.percentile(50) == 0.0
+        assert histogram.percentile(95) == 20.0
+        assert histogram.percentile(99) == 20.0
+        assert histogram.percentile(100) == pytest.approx(400.0)
+        assert histogram.max_ms == pytest.approx(400.0)
+
+    def test_overflow_uses_max(self):
+        """Test that waits past the last bucket report the largest wait."""
+        histogram = WaitTimeHistogram()
+        histogram.record(45.0)
+        
+        assert histogram.percentile(99) == pytest.approx(45000.0)
+
+    def test_since_snapshot(self):
+        """Test that a window holds only the waits after the snapshot."""
+        histogram = WaitTimeHistogram()
+        histogram.record(2.0)
+        snapshot = histogram.copy()
+        histogram.record(0.003)
+        
+        window = histogram.since(snapshot)
+        
+        assert window.count == 1
+        assert window.max_ms == 5.0
+        assert WaitTimeHistogram().since(snapshot).count == 0
+
+
+class TestRateLimitSaturation:
+    """Tests for queue depth and saturation reports."""
+
+    @pytest.mark.asyncio
+    async def test_async_queue_depth(self):
+        """Test that queue depth counts callers waiting for their slot."""
+        limiter = AsyncRateLimiter(
+            RateLimitConfig(requests_per_second=20.0, burst_capacity=1, enable_logging=False)
+        )
+        await limiter.acquire()
+        
+        waiters = [asyncio.create_task(limiter.acquire()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 3
+        
+        await asyncio.gather(*waiters)
+        assert limiter.queue_depth == 0
+        assert limiter.stats.wait_histogram.count == 4
+
+    def test_sync_queue_depth(self):
+        """Test that queue depth counts blocked threads."""
+        limiter = RateLimiter(
+            RateLimitConfig(requests_per_second=10.0, burst_capacity=1, enable_logging=False)
+        )
+        limiter.acquire()
+        thread = threading.Thread(target=limiter.acquire)
+        thread.start()
+        time.sleep(0.02)
+        
+        assert limiter.queue_depth == 1
+        thread.join()
+        assert limiter.queue_depth == 0
+        assert limiter.stats.wait_histogram.percentile(99) > 0
+
+    def test_report_covers_the_window(self):
+        """Test that each report only covers traffic since the previous one."""
+        reports = []
+        registry = RateLimiterRegistry(
+            RateLimitConfig(requests_per_second=1000.0, burst_capacity=2, enable_logging=False),
+            on_saturation=reports.append,
+            report_interval_seconds=0,
+        )
+        for _ in range(5):
+            registry.acquire("https://gw.example.com/x")
+        
+        first = registry.report()
+        registry.acquire("https://gw.example.com/x")
+        second = registry.report()
+        
+        assert [r.requests for r in first] == [5]
+        assert first[0].wait_p50_ms == pytest.approx(1.0, abs=1.0)
+        assert first[0].wait_max_ms > 0
+        assert first[0].burst_capacity == 2
+        assert [r.requests for r in second] == [1]
+        assert registry.report() == []
+        assert reports == first + second
+        assert registry.saturation()["gw.example.com"].requests == 6
+
+    def test_acquire_reports_on_interval(self, monkeypatch):
+        """Test that acquire triggers a report once the interval has passed."""
+        reports = []
+        registry = RateLimiterRegistry(on_saturation=reports.append, report_interval_seconds=60.0)
+        registry.acquire("https://gw.example.com/x")
+        assert reports == []
+        
+        monkeypatch.setattr(registry, "_last_report", time.monotonic() - 61)
+        registry.acquire("https://gw.example.com/x")
+        
+        assert len(reports) == 1
+        assert reports[0].key == "gw.example.com"
+        assert reports[0].requests == 2
+
+    def test_saturation_metrics(self, capsys):
+        """Test that the agent registry exports reports as EMF metrics."""
+        registry = RateLimiterRegistry.from_agent_config()
+        registry.acquire("https://gw.example.com/x")
+        capsys.readouterr()
+        
+        registry.report()
+        
+        log = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+        assert log["ContentPath"] == "gw.example.com"
+        assert log["RateLimitRequests"] == 1
+        assert log["RateLimitWaitP99"] == 0.0
+        assert log["RateLimitQueueDepth"] == 0
+        assert log["burstCapacity"] == registry.config.burst_capacity
+
+
+class TestAdaptiveRate:
+    """Tests for AIMD control of the refill rate."""
+
+    @staticmethod
+    def _config(**overrides) -> RateLimitConfig:
+        settings = dict(
+            requests_per_second=10.0,
+            adaptive=True,
+            min_requests_per_second=2.0,
+            max_requests_per_second=12.0,
+            increase_step=1.0,
+            success_window=3,
+            decrease_factor=0.5,
+            decrease_cooldown=1.0,
+        )
+        settings.update(overrides)
+        return RateLimitConfig(**settings)
+
+    def test_additive_increase_after_window(self):
+        """Test that the rate rises by one step per window of successes."""
+        rate = AdaptiveRate(self._config())
+        
+        assert [rate.on_success() for _ in range(3)] == [False, False, True]
+        assert rate.rate == 11.0
+
+    def test_ceiling(self):
+        """Test that the rate never rises above the ceiling."""
+        rate = AdaptiveRate(self._config())
+        for _ in range(30):
+            rate.on_success()
+        
+        assert rate.rate == 12.0
+
+    def test_multiplicative_decrease_and_floor(self):
+        """Test that throttling halves the rate down to the floor."""
+        rate = AdaptiveRate(self._config(decrease_cooldown=0))
+        
+        rate.on_throttle(now=1.0)
+        assert rate.rate == 5.0
+        rate.on_throttle(now=2.0)
+        rate.on_throttle(now=3.0)
+        assert rate.rate == 2.0
+
+    def test_cooldown_coalesces_burst_of_throttles(self):
+        """Test that throttles within the cooldown only cut the rate once."""
+        rate = AdaptiveRate(self._config())
+        
+        assert rate.on_throttle(now=100.0) is True
+        assert rate.on_throttle(now=100.5) is False
+        assert rate.rate == 5.0
+        assert rate.on_throttle(now=101.5) is True
+        assert rate.rate == 2.5
+
+    def test_throttle_resets_success_window(self):
+        """Test that successes only count once the server stops throttling."""
+        rate = AdaptiveRate(self._config())
+        rate.on_success()
+        rate.on_success()
+        rate.on_throttle(now=100.0)
+        
+        assert rate.on_success() is False
+
+    def test_fixed_rate_when_not_adaptive(self):
+        """Test that a non-adaptive controller ignores feedback."""
+        rate = AdaptiveRate(RateLimitConfig(requests_per_second=10.0))
+        rate.on_throttle(now=100.0)
+        for _ in range(20):
+            rate.on_success()
+        
+        assert rate.rate == 10.0
+
+
+class TestAdaptiveRateLimiter:
+    """Tests for feeding responses back into RateLimiter and AsyncRateLimiter."""
+
+    def test_429_slows_refill(self):
+        """Test that a 429 halves the rate tokens are refilled at."""
+        changes = []
+        limiter = RateLimiter(
+            RateLimitConfig(requests_per_second=10.0, adaptive=True, enable_logging=False),
+            on_rate_change=lambda rate, decreased: changes.append((rate, decreased)),
+        )
+        
+        assert limiter.record_response(429) == 5.0
+        assert limiter.effective_rate == 5.0
+        assert changes == [(5.0, True)]
+
+    def test_success_raises_rate(self):
+        """Test that sustained success raises the rate."""
+        limiter = RateLimiter(
+            RateLimitConfig(requests_per_second=10.0, adaptive=True, success_window=2)
+        )
+        
+        for status in (200, 402, 200, 200):
+            limiter.record_response(status)
+        
+        assert limiter.effective_rate == 12.0
+
+    def test_retry_after_holds_back_tokens(self):
+        """Test that Retry-After empties the bucket until it has passed."""
+        limiter = RateLimiter(
+            RateLimitConfig(
+                requests_per_second=10.0, burst_capacity=5, adaptive=True, block_on_limit=False
+            )
+        )
+        
+        limiter.record_response(200, retry_after=2.0)
+        
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.acquire()
+        assert exc_info.value.wait_time == pytest.approx(2.0, abs=0.05)
+        assert limiter.effective_rate == 5.0
+
+    def test_feedback_ignored_when_not_adaptive(self):
+        """Test that a fixed-rate limiter is unaffected by 429s."""
+        limiter = RateLimiter(RateLimitConfig(requests_per_second=10.0))
+        
+        limiter.record_response(429, retry_after=5.0)
+        
+        assert limiter.effective_rate == 10.0
+        assert limiter.try_acquire() is True
+
+    def test_reset_restores_starting_rate(self):
+        """Test that reset returns to requests_per_second."""
+        limiter = RateLimiter(RateLimitConfig(requests_per_second=10.0, adaptive=True))
+        limiter.record_response(503)
+        
+        limiter.reset()
+        
+        assert limiter.effective_rate == 10.0
+
+    @pytest.mark.asyncio
+    async def test_async_limiter_adapts(self):
+        """Test that the async limiter waits longer after a 429."""
+        limiter = AsyncRateLimiter(
+            RateLimitConfig(requests_per_second=20.0, burst_capacity=1, adaptive=True)
+        )
+        await limiter.acquire()
+        
+        limiter.record_response(429)
+        wait_time = await limiter.acquire(timeout=1.0)
+        
+        assert limiter.effective_rate == 10.0
+        assert wait_time >= 0.09
+
+    def test_registry_reports_to_every_bucket_for_key(self):
+        """Test that sync and async callers of a key see one adaptive rate."""
+        changes = []
+        registry = RateLimiterRegistry(
+            RateLimitConfig(requests_per_second=10.0, adaptive=True),
+            on_rate_change=lambda key, rate, decreased: changes.append((key, rate, decreased)),
+        )
+        registry.get("gw.example.com")
+        registry.get_async("gw.example.com")
+        
+        registry.record_response("https://gw.example.com/api/a", None, 200, retry_after="1")
+        
+        assert registry.effective_rates() == {"gw.example.com": 5.0}
+        assert registry.get_async("gw.example.com").effective_rate == 5.0
+        assert changes == [("gw.example.com", 5.0, True)]
+
+    def test_agent_config_registry_emits_gauge(self, monkeypatch, capsys):
+        """Test that the configured registry exports rate changes as a metric."""
+        monkeypatch.setattr(agent_config, "rate_limit_adaptive", True)
+        registry = RateLimiterRegistry.from_agent_config()
+        registry.get("gw.example.com")
+        
+        registry.record_response("https://gw.example.com/api/a", None, 429)
+        
+        lines = [
+            line
+            for line in capsys.readouterr().out.splitlines()
+            if "RateLimitEffectiveRate" in line
+        ]
+        assert len(lines) == 1
+        assert json.loads(lines[0])["RateLimitThrottled"] == 1
+
+
+class TestToolRateLimiting:
+    """Tests for rate limiting in the HTTP tools."""
+
+    def test_request_content_returns_429_without_sending(self, monkeypatch):
+        """Test that a tool that cannot get a token reports 429 and sends nothing."""
+        requests = []
+        real_client = httpx.Client
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"title": "Article"}, request=request)
+
+        monkeypatch.setattr(agent_config, "seller_api_url", "https://seller.example.com")
+        monkeypatch.setattr(
+            httpx,
+            "Client",
+            lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+        )
+        monkeypatch.setattr(
+            "agent.rate_limiter._registry",
+            RateLimiterRegistry(
+                RateLimitConfig(requests_per_second=1.0, burst_capacity=1, block_on_limit=False)
+            ),
+        )
+
+        first = request_content(url="/api/free-article")
+        second = request_content(url="/api/free-article")
+
+        assert first["http_status"] == 200
+        assert second["http_status"] == 429
+        assert second["retry_after_seconds"] > 0
+        assert len(requests) == 1
@@ -0,0 +1,220 @@
+"""
+Tests for the response cache module.
+"""
+
+import time
+from email.utils import formatdate
+
+from agent.response_cache import (
+    ResponseCache,
+    ResponseCacheConfig,
+    freshness_lifetime,
+)
+
+URL = "https://gateway.example.com/api/catalog"
+ACCEPT_JSON = {"Accept": "application/json"}
+
+
+class TestFreshnessLifetime:
+    """Tests for freshness_lifetime."""
+
+    def test_max_age(self):
+        """Test that max-age sets the freshness lifetime."""
+        assert freshness_lifetime({"cache-control": "public, max-age=60"}) == 60
+
+    def test_max_age_minus_age(self):
+        """Test that the Age header is subtracted from max-age."""
+        assert freshness_lifetime({"Cache-Control": "max-age=60", "Age": "45"}) == 15
+        assert freshness_lifetime({"Cache-Control": "max-age=60", "Age": "90"}) == 0
+
+    def test_no_cache_is_stale(self):
+        """Test that no-cache responses must always be revalidated."""
+        assert freshness_lifetime({"cache-control": "no-cache, max-age=60"}) == 0
+
+    def test_expires_relative_to_date(self):
+        """Test that Expires is measured against the origin's Date header."""
+        now = time.time()
+        headers = {
+            "date": formatdate(now - 1000, usegmt=True),
+            "expires": formatdate(now - 970, usegmt=True),
+        }
+        assert abs(freshness_lifetime(headers) - 30) <= 1
+
+    def test_invalid_expires_is_expired(self):
+        """Test that an unparseable Expires value means already expired."""
+        assert freshness_lifetime({"expires": "0"}) == 0
+
+    def test_no_freshness_headers(self):
+        """Test that responses without caching headers have no lifetime."""
+        assert freshness_lifetime({"content-type": "application/json"}) is None
+
+
+class TestResponseCache:
+    """Tests for ResponseCache."""
+
+    def test_store_and_hit(self):
+        """Test that a fresh response is served from the cache."""
+        cache = ResponseCache()
+        stored = cache.store(
+            URL, ACCEPT_JSON, 200, {"cache-control": "max-age=60"}, {"items": [1]}, 12
+        )
+
+        entry = cache.lookup(URL, ACCEPT_JSON)
+
+        assert stored is True
+        assert entry is not None
+        assert entry.is_fresh()
+        assert entry.data == {"items": [1]}
+        assert cache.stats.hits == 1
+        assert cache.stats.hit_rate == 100.0
+
+    def test_miss(self):
+        """Test that an unknown URL is a miss."""
+        cache = ResponseCache()
+
+        assert cache.lookup(URL, ACCEPT_JSON) is None
+        assert cache.stats.misses == 1
+
+    def test_key_includes_accept(self):
+        """Test that responses are keyed on the Accept header."""
+        cache = ResponseCache()
+        cache.store(URL, ACCEPT_JSON, 200, {"cache-control": "max-age=60"}, "json", 4)
+
+        assert cache.lookup(URL, {"Accept": "text/html"}) is None
+        assert cache.lookup(URL, ACCEPT_JSON) is not None
+
+    def test_vary_headers_join_key(self):
+        """Test that headers listed in Vary become part of the key."""
+        cache = ResponseCache()
+        en = {**ACCEPT_JSON, "Accept-Language": "en"}
+        de = {**ACCEPT_JSON, "Accept-Language": "de"}
+        cache.store(
+            URL, en, 200,
+            {"cache-control": "max-age=60", "vary": "Accept-Language"}, "hello", 5,
+        )
+
+        assert cache.lookup(URL, de) is None
+        assert cache.lookup(URL, en).data == "hello"
+
+    def test_not_stored_without_freshness_or_validator(self):
+        """Test that responses with no caching headers are not stored."""
+        cache = ResponseCache()
+
+        assert cache.store(URL, ACCEPT_JSON, 200, {}, "data", 4) is False
+        assert len(cache) == 0
+
+    def test_not_stored_when_no_store(self):
+        """Test that Cache-Control: no-store is honored."""
+        cache = ResponseCache()
+
+        assert cache.store(
+            URL, ACCEPT_JSON, 200, {"cache-control": "no-store, max-age=60"}, "data", 4
+        ) is False
+
+    def test_not_stored_for_non_200(self):
+        """Test that only 200 responses are stored."""
+        cache = ResponseCache()
+
+        assert cache.store(URL, ACCEPT_JSON, 404, {"cache-control": "max-age=60"}, None, 0) is False
+
+    def test_payment_responses_never_stored(self):
+        """Test that responses or requests carrying x402 headers are never stored."""
+        cache = ResponseCache()
+        fresh = {"cache-control": "max-age=60"}
+
+        assert cache.store(
+            URL, ACCEPT_JSON, 200, {**fresh, "PAYMENT-RESPONSE": "eyJ9"}, "paid", 4
+        ) is False
+        assert cache.store(
+            URL, ACCEPT_JSON, 200, {**fresh, "x-payment-required": "eyJ9"}, "paid", 4
+        ) is False
+        assert cache.store(
+            URL, {**ACCEPT_JSON, "X-PAYMENT-SIGNATURE": "sig"}, 200, fresh, "paid", 4
+        ) is False
+        assert len(cache) == 0
+
+    def test_paid_request_bypasses_lookup(self):
+        """Test that a request with a payment signature never reads the cache."""
+        cache = ResponseCache()
+        cache.store(URL, ACCEPT_JSON, 200, {"cache-control": "max-age=60"}, "free", 4)
+
+        assert cache.lookup(URL, {**ACCEPT_JSON, "X-PAYMENT-SIGNATURE": "sig"}) is None
+
+    def test_stale_entry_with_etag_is_revalidated(self):
+        """Test that stale entries with a validator are returned for revalidation."""
+        cache = ResponseCache()
+        cache.store(
+            URL, ACCEPT_JSON, 200, {"cache-control": "no-cache", "etag": '"v1"'}, "data", 4
+        )
+
+        entry = cache.lookup(URL, ACCEPT_JSON)
+
+        assert entry is not None
+        assert not entry.is_fresh()
+        assert ResponseCache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+        assert cache.stats.revalidations == 1
+
+        cache.refresh(entry, {"cache-control": "max-age=60"})
+        assert cache.lookup(URL, ACCEPT_JSON).is_fresh()
+
+    def test_stale_entry_without_validator_is_dropped(self):
+        """Test that expired entries without validators are evicted on lookup."""
+        cache = ResponseCache()
+        cache.store(URL, ACCEPT_JSON, 200, {"cache-control": "max-age=60"}, "data", 4)
+        cache._entries[next(iter(cache._entries))].expires_at = time.time() - 1
+
+        assert cache.lookup(URL, ACCEPT_JSON) is None
+        assert len(cache) == 0
+        assert cache.total_bytes == 0
+
+    def test_lru_eviction_by_bytes(self):
+        """Test that the least recently used entries are evicted past the byte budget."""
+        cache = ResponseCache(ResponseCacheConfig(max_bytes=100))
+        fresh = {"cache-control": "max-age=60"}
+        cache.store(f"{URL}/a", ACCEPT_JSON, 200, fresh, "a", 40)
+        cache.store(f"{URL}/b", ACCEPT_JSON, 200, fresh, "b", 40)
+        cache.lookup(f"{URL}/a", ACCEPT_JSON)  # a is now most recently used
+        cache.store(f"{URL}/c", ACCEPT_JSON, 200, fresh, "c", 40)
+
+        assert cache.lookup(f"{URL}/b", ACCEPT_JSON) is None
+        assert cache.lookup(f"{URL}/a", ACCEPT_JSON) is not None
+        assert cache.lookup(f"{URL}/c", ACCEPT_JSON) is not None
+        assert cache.total_bytes == 80
+        assert cache.stats.evictions == 1
+
+    def test_oversized_response_not_stored(self):
+        """Test that a body larger than the whole budget is not stored."""
+        cache = ResponseCache(ResponseCacheConfig(max_bytes=10))
+
+        assert cache.store(URL, ACCEPT_JSON, 200, {"cache-control": "max-age=60"}, "x", 11) is False
+
+    def test_max_entries(self):
+        """Test that the entry count is bounded."""
+        cache = ResponseCache(ResponseCacheConfig(max_entries=2))
+        for name in "abc":
+            cache.store(f"{URL}/{name}", ACCEPT_JSON, 200, {"cache-control": "max-age=60"}, name, 1)
+
+        assert len(cache) == 2
+        assert cache.lookup(f"{URL}/a", ACCEPT_JSON) is None
+
+    def test_disabled_with_zero_budget(self):
+        """Test that a zero byte budget disables the cache."""
+        cache = ResponseCache(ResponseCacheConfig(max_bytes=0))
+
+        assert cache.enabled is False
+        assert cache.store(URL, ACCEPT_JSON, 200, {"cache-control": "max-age=60"}, "x", 0) is False
+        assert cache.lookup(URL, ACCEPT_JSON) is None
+
+    def test_invalidate_and_clear(self):
+        """Test explicit invalidation by URL and clearing."""
+        cache = ResponseCache()
+        fresh = {"cache-control": "max-age=60"}
+        cache.store(URL, ACCEPT_JSON, 200, fresh, "a", 4)
+        cache.store(f"{URL}/other", ACCEPT_JSON, 200, fresh, "b", 4)
+
+        assert cache.invalidate(URL) == 1
+        assert cache.lookup(URL, ACCEPT_JSON) is None
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.total_bytes == 0
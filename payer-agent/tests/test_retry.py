@@ -0,0 +1,87 @@
+"""
+Tests for the retry module.
+"""
+
+import time
+from email.utils import formatdate
+
+from agent.retry import (
+    RetryBudget,
+    RetryConfig,
+    backoff_delay,
+    parse_retry_after,
+)
+
+
+class TestParseRetryAfter:
+    """Tests for parse_retry_after."""
+
+    def test_delay_seconds(self):
+        """Test a delay-seconds value."""
+        assert parse_retry_after("3") == 3.0
+
+    def test_http_date(self):
+        """Test an HTTP-date value."""
+        now = time.time()
+        delay = parse_retry_after(formatdate(now + 30, usegmt=True), now=now)
+        assert 29 <= delay <= 30
+
+    def test_past_http_date(self):
+        """Test that a date in the past means retry immediately."""
+        assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+    def test_invalid_values(self):
+        """Test that missing or malformed values are ignored."""
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("") is None
+        assert parse_retry_after("soon") is None
+
+
+class TestBackoffDelay:
+    """Tests for backoff_delay."""
+
+    def test_exponential_ceiling(self):
+        """Test that the jitter ceiling doubles per attempt."""
+        config = RetryConfig(backoff_base_seconds=0.1, backoff_max_seconds=10.0)
+        assert backoff_delay(0, config, lambda: 1.0) == 0.1
+        assert backoff_delay(1, config, lambda: 1.0) == 0.2
+        assert backoff_delay(3, config, lambda: 1.0) == 0.8
+
+    def test_capped(self):
+        """Test that the ceiling is capped at backoff_max_seconds."""
+        config = RetryConfig(backoff_base_seconds=1.0, backoff_max_seconds=2.0)
+        assert backoff_delay(10, config, lambda: 1.0) == 2.0
+
+    def test_full_jitter(self):
+        """Test that the delay is spread uniformly below the ceiling."""
+        config = RetryConfig(backoff_base_seconds=1.0)
+        assert backoff_delay(0, config, lambda: 0.0) == 0.0
+        assert backoff_delay(0, config, lambda: 0.5) == 0.5
+
+
+class TestRetryBudget:
+    """Tests for RetryBudget."""
+
+    def test_starts_with_reserve(self):
+        """Test that a new budget allows a burst of min_retries."""
+        budget = RetryBudget(ratio=0.1, min_retries=3)
+        assert [budget.try_withdraw() for _ in range(4)] == [True, True, True, False]
+
+    def test_requests_refill_budget(self):
+        """Test that each request deposits ratio tokens."""
+        budget = RetryBudget(ratio=0.5, min_retries=1)
+        assert budget.try_withdraw() is True
+        assert budget.try_withdraw() is False
+
+        budget.record_request()
+        assert budget.try_withdraw() is False
+        budget.record_request()
+        assert budget.try_withdraw() is True
+
+    def test_balance_capped(self):
+        """Test that deposits never exceed the reserve."""
+        budget = RetryBudget(ratio=1.0, min_retries=2)
+        for _ in range(10):
+            budget.record_request()
+        assert budget.balance == 2.0
+
@@ -0,0 +1,178 @@
+"""
+Tests for the x402 header codec.
+"""
+
+import base64
+import json
+import time
+
+import httpx
+import pytest
+
+from agent.x402_headers import (
+    PAYMENT_SIGNATURE_HEADER,
+    decode_header_value,
+    encode_payment_signature,
+    get_header,
+    read_payment_required,
+    read_payment_response,
+)
+
+REQUIREMENTS = {
+    "x402Version": 2,
+    "accepts": [
+        {
+            "scheme": "exact",
+            "network": "eip155:84532",
+            "amount": "1000",
+            "asset": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+            "payTo": "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb0",
+            "maxTimeoutSeconds": 60,
+            "extra": {"name": "USDC", "version": "2"},
+        }
+    ],
+    "resource": {"url": "/api/premium-article", "description": "Premium article"},
+}
+
+
+def encode(value: dict) -> str:
+    return base64.b64encode(json.dumps(value).encode()).decode()
+
+
+class TestGetHeader:
+    """Tests for get_header."""
+
+    def test_httpx_headers_any_case(self):
+        """Test that httpx.Headers is looked up case-insensitively in place."""
+        headers = httpx.Headers({"X-Payment-Required": "abc"})
+
+        assert get_header(headers, "x-payment-required") == "abc"
+
+    @pytest.mark.parametrize(
+        "name", ["X-PAYMENT-REQUIRED", "x-payment-required", "X-Payment-Required"]
+    )
+    def test_plain_dict_any_case(self, name):
+        """Test that plain dicts are matched regardless of key case."""
+        assert get_header({name: "abc"}, "x-payment-required") == "abc"
+
+    def test_preference_order(self):
+        """Test that the prefixed name wins when both are present."""
+        headers = {"PAYMENT-REQUIRED": "bare", "X-PAYMENT-REQUIRED": "prefixed"}
+
+        assert get_header(headers, "x-payment-required", "payment-required") == "prefixed"
+
+    def test_falls_back_to_later_names(self):
+        """Test that later names are used when earlier ones are absent."""
+        headers = httpx.Headers({"Payment-Required": "bare"})
+
+        assert get_header(headers, "x-payment-required", "payment-required") == "bare"
+
+    def test_missing(self):
+        """Test that an absent header returns None."""
+        assert get_header(httpx.Headers(), "x-payment-required") is None
+        assert get_header({}, "x-payment-required") is None
+
+
+class TestDecoding:
+    """Tests for reading x402 headers."""
+
+    def test_read_payment_required(self):
+        """Test decoding payment requirements."""
+        headers = httpx.Headers({"X-PAYMENT-REQUIRED": encode(REQUIREMENTS)})
+
+        assert read_payment_required(headers) == REQUIREMENTS
+
+    def test_read_payment_response(self):
+        """Test decoding a settlement receipt under the bare header name."""
+        settlement = {"success": True, "transactionHash": "0xabc"}
+        headers = {"PAYMENT-RESPONSE": encode(settlement)}
+
+        assert read_payment_response(headers) == settlement
+
+    def test_absent_header(self):
+        """Test that a missing header decodes to None."""
+        assert read_payment_required(httpx.Headers()) is None
+
+    def test_invalid_value_is_raw(self):
+        """Test that undecodable values are returned as {"raw": value}."""
+        headers = {"X-PAYMENT-REQUIRED": "not-valid-base64!!!"}
+
+        assert read_payment_required(headers) == {"raw": "not-valid-base64!!!"}
+
+    def test_invalid_value_strict(self):
+        """Test that strict mode raises ValueError for undecodable values."""
+        headers = {"X-PAYMENT-REQUIRED": base64.b64encode(b"not json").decode()}
+
+        with pytest.raises(ValueError):
+            read_payment_required(headers, strict=True)
+
+    def test_decode_is_memoized(self):
+        """Test that the same header value is only decoded once."""
+        value = encode({**REQUIREMENTS, "nonce": "memo-test"})
+        before = decode_header_value.cache_info()
+
+        first = decode_header_value(value)
+        second = decode_header_value(value)
+
+        after = decode_header_value.cache_info()
+        assert first is second
+        assert after.misses == before.misses + 1
+        assert after.hits == before.hits + 1
+
+
+class TestEncoding:
+    """Tests for encode_payment_signature."""
+
+    def test_round_trip(self):
+        """Test that the encoded signature decodes to the original payload."""
+        payload = {"x402Version": 2, "payload": {"signature": "0x" + "ab" * 65}}
+
+        encoded = encode_payment_signature(payload)
+
+        assert json.loads(base64.b64decode(encoded)) == payload
+
+    def test_header_name(self):
+        """Test the x402 v2 signature header name."""
+        assert PAYMENT_SIGNATURE_HEADER == "X-PAYMENT-SIGNATURE"
+
+
+class TestCodecBenchmark:
+    """Microbenchmark for per-response header handling."""
+
+    @staticmethod
+    def _legacy_decode(headers: httpx.Headers) -> dict:
+        """The previous per-call path: copy headers, probe four names, decode."""
+        response_headers = dict(headers)
+        header = (
+            response_headers.get("X-PAYMENT-REQUIRED") or
+            response_headers.get("x-payment-required") or
+            response_headers.get("PAYMENT-REQUIRED") or
+            response_headers.get("payment-required")
+        )
+        return json.loads(base64.b64decode(header))
+
+    def test_per_response_overhead(self):
+        """Test that the codec is cheaper per 402 response than the old path."""
+        headers = httpx.Headers({
+            "Content-Type": "application/json",
+            "Content-Length": "512",
+            "Date": "Sat, 17 Oct 2026 00:00:00 GMT",
+            "Via": "1.1 abc.cloudfront.net (CloudFront)",
+            "X-Amz-Cf-Id": "abc123",
+            "X-Cache": "Error from cloudfront",
+            "PAYMENT-REQUIRED": encode(REQUIREMENTS),
+        })
+        iterations = 5000
+
+        def timed(fn) -> float:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn(headers)
+            return (time.perf_counter() - start) / iterations * 1e6
+
+        assert self._legacy_decode(headers) == read_payment_required(headers)
+        legacy_us = timed(self._legacy_decode)
+        codec_us = timed(read_payment_required)
+
+        print(f"\nper-response: legacy={legacy_us:.2f}us codec={codec_us:.2f}us")
+        assert codec_us < legacy_us
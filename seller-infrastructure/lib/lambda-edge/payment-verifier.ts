@@ -567,6 +567,7 @@ function createMCPDiscoveryResponse(requestId: string): CloudFrontRequestResult
         scheme: item.pricing.scheme,
         asset_address: item.pricing.asset,
         asset_name: 'USDC',
+        pay_to: item.pricing.payTo,
         timeout_seconds: item.pricing.maxTimeoutSeconds,
       },
       input_schema: {